@@ -0,0 +1,32 @@
+"""Indexes for keyset pagination of list endpoints
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_users_created_at_id', 'users', ['created_at', 'id'], unique=False)
+    op.create_index('ix_cases_created_at_id', 'cases', ['created_at', 'id'], unique=False)
+    op.create_index('ix_cases_status_created_at_id', 'cases', ['status', 'created_at', 'id'], unique=False)
+    op.create_index('ix_sar_reports_created_at_id', 'sar_reports', ['created_at', 'id'], unique=False)
+    op.create_index('ix_sar_reports_created_by_created_at_id', 'sar_reports', ['created_by', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sar_reports_created_by_created_at_id', table_name='sar_reports')
+    op.drop_index('ix_sar_reports_created_at_id', table_name='sar_reports')
+    op.drop_index('ix_cases_status_created_at_id', table_name='cases')
+    op.drop_index('ix_cases_created_at_id', table_name='cases')
+    op.drop_index('ix_users_created_at_id', table_name='users')
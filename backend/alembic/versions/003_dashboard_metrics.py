@@ -0,0 +1,59 @@
+"""Dashboard summary tables, backfilled from existing SARs, CQI scores and detections
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'dashboard_counters',
+        sa.Column('metric', sa.String(length=50), nullable=False),
+        sa.Column('dimension', sa.String(length=100), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('metric', 'dimension')
+    )
+    op.create_table(
+        'daily_cqi_metrics',
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('day')
+    )
+
+    # Backfill
+    op.execute(
+        "INSERT INTO dashboard_counters (metric, dimension, count, total) "
+        "SELECT 'sar_volume', '', COUNT(*), 0 FROM sar_reports"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (metric, dimension, count, total) "
+        "SELECT 'cqi', '', COUNT(*), COALESCE(SUM(overall_score), 0) FROM cqi_scores"
+    )
+    op.execute(
+        "INSERT INTO dashboard_counters (metric, dimension, count, total) "
+        "SELECT 'typology', detection_type, COUNT(*), 0 FROM typology_detections GROUP BY detection_type"
+    )
+    op.execute(
+        "INSERT INTO daily_cqi_metrics (day, count, total) "
+        "SELECT date(s.created_at), COUNT(*), COALESCE(SUM(c.overall_score), 0) "
+        "FROM cqi_scores c JOIN sar_reports s ON s.id = c.sar_id "
+        "WHERE s.created_at IS NOT NULL GROUP BY date(s.created_at)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_cqi_metrics')
+    op.drop_table('dashboard_counters')
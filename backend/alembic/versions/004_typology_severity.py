@@ -0,0 +1,68 @@
+"""Promote typology detection severity from the details JSON to an indexed column
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK = 10000
+
+
+def _severity(details):
+    # same rule as models.severity_from_details, frozen for this migration
+    if not details:
+        return "MEDIUM"
+    try:
+        meta = json.loads(details)
+    except ValueError:
+        return None
+    if not isinstance(meta, dict):
+        return None
+    return meta.get("severity", "MEDIUM")
+
+
+def upgrade() -> None:
+    op.add_column('typology_detections', sa.Column('severity', sa.String(length=20), nullable=True))
+
+    # Backfill in id-ordered chunks so large tables are never loaded at once
+    conn = op.get_bind()
+    select_chunk = sa.text(
+        "SELECT id, details FROM typology_detections WHERE id > :after ORDER BY id LIMIT :limit"
+    )
+    update_chunk = sa.text(
+        "UPDATE typology_detections SET severity = :severity WHERE id IN :ids"
+    ).bindparams(sa.bindparam('ids', expanding=True))
+    after = 0
+    while True:
+        rows = conn.execute(select_chunk, {"after": after, "limit": BACKFILL_CHUNK}).all()
+        if not rows:
+            break
+        by_severity = {}
+        for row_id, details in rows:
+            severity = _severity(details)
+            if severity is not None:
+                by_severity.setdefault(severity, []).append(row_id)
+        for severity, ids in by_severity.items():
+            conn.execute(update_chunk, {"severity": str(severity)[:20], "ids": ids})
+        after = rows[-1][0]
+
+    op.create_index(op.f('ix_typology_detections_severity'), 'typology_detections', ['severity'], unique=False)
+    # lets the per-type counts scan the index instead of the table
+    op.create_index(op.f('ix_typology_detections_detection_type'), 'typology_detections', ['detection_type'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_typology_detections_detection_type'), table_name='typology_detections')
+    op.drop_index(op.f('ix_typology_detections_severity'), table_name='typology_detections')
+    op.drop_column('typology_detections', 'severity')
@@ -0,0 +1,109 @@
+"""Transaction content fingerprints with a unique index, and import manifests for resumable imports
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+from alembic import op
+from collections import Counter
+import hashlib
+import re
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+BACKFILL_CHUNK = 10000
+
+# meta_data written by the statement importer
+STATEMENT_META_RE = re.compile(r'^Page: (\d+) \| (.*) \| Ref: (.*) \| Balance: [^|]*$', re.DOTALL)
+
+
+def _fingerprint(account_id, timestamp, amount, narration, ref_no, occurrence=0):
+    # same rule as transaction_ingest_service.transaction_fingerprint, frozen for this migration
+    key = "\x1f".join((
+        str(account_id),
+        timestamp.date().isoformat() if timestamp else "",
+        f"{float(amount):.2f}",
+        " ".join((narration or "").split()),
+        (ref_no or "").strip(),
+        str(occurrence),
+    ))
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _identity(txn_id, meta_data):
+    """(narration, ref, page) the importers would have fingerprinted this row with"""
+    match = STATEMENT_META_RE.match(meta_data or "")
+    if match:
+        return match.group(2), match.group(3), int(match.group(1))
+    # CSV/Parquet rows use the source transaction id as the reference
+    return meta_data, txn_id, None
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('fingerprint', sa.String(length=64), nullable=True))
+
+    # Stream the table in (account, timestamp, id) order: identical rows are numbered
+    # within an account-day (and page, for statement rows) like the importers do, so
+    # the counters never outgrow one day of one account
+    conn = op.get_bind()
+    transactions = sa.table(
+        'transactions',
+        sa.column('id', sa.Integer), sa.column('txn_id', sa.String), sa.column('account_id', sa.Integer),
+        sa.column('amount', sa.Float), sa.column('timestamp', sa.DateTime), sa.column('meta_data', sa.Text),
+    )
+    rows = conn.execution_options(stream_results=True).execute(
+        sa.select(transactions.c.id, transactions.c.txn_id, transactions.c.account_id, transactions.c.amount,
+                  transactions.c.timestamp, transactions.c.meta_data)
+        .order_by(transactions.c.account_id, transactions.c.timestamp, transactions.c.id)
+    )
+    update = sa.text("UPDATE transactions SET fingerprint = :fingerprint WHERE id = :row_id")
+    day, seen = None, Counter()
+    for chunk in rows.partitions(BACKFILL_CHUNK):
+        updates = []
+        for row_id, txn_id, account_id, amount, timestamp, meta_data in chunk:
+            if (account_id, timestamp and timestamp.date()) != day:
+                day, seen = (account_id, timestamp and timestamp.date()), Counter()
+            narration, ref_no, page = _identity(txn_id, meta_data)
+            fingerprint = _fingerprint(account_id, timestamp, amount, narration, ref_no)
+            seen[fingerprint, page] += 1
+            if seen[fingerprint, page] > 1:
+                fingerprint = _fingerprint(account_id, timestamp, amount, narration, ref_no, seen[fingerprint, page] - 1)
+            updates.append({"fingerprint": fingerprint, "row_id": row_id})
+        conn.execute(update, updates)
+
+    op.create_index(op.f('ix_transactions_fingerprint'), 'transactions', ['fingerprint'], unique=True)
+
+    op.create_table(
+        'import_manifests',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('source_hash', sa.String(length=64), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('source_name', sa.String(length=500), nullable=True),
+        sa.Column('account_id', sa.Integer(), nullable=True),
+        sa.Column('unit_size', sa.Integer(), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('checkpoint', sa.Integer(), nullable=False),
+        sa.Column('inserted', sa.Integer(), nullable=False),
+        sa.Column('skipped', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('completed_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('source_hash', 'kind', name='uq_import_manifests_source_hash_kind')
+    )
+    op.create_index(op.f('ix_import_manifests_id'), 'import_manifests', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_import_manifests_id'), table_name='import_manifests')
+    op.drop_table('import_manifests')
+    op.drop_index(op.f('ix_transactions_fingerprint'), table_name='transactions')
+    op.drop_column('transactions', 'fingerprint')
@@ -0,0 +1,40 @@
+"""Structured narration columns on transactions: channel, counterparty, jurisdiction, direction
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19 14:00:00.000000
+
+Column-only: the migration does not import the application's parser, whose rules
+keep changing after this revision. Rows stored before it are left unparsed (NULL
+channel) until `python manage.py backfill-narrations` is run after upgrading.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+INDEXED = ('channel', 'counterparty_id', 'counterparty_bank', 'jurisdiction')
+COLUMNS = ('channel', 'counterparty_id', 'counterparty_bank', 'jurisdiction', 'direction')
+
+
+def upgrade() -> None:
+    op.add_column('transactions', sa.Column('channel', sa.String(length=20), nullable=True))
+    op.add_column('transactions', sa.Column('counterparty_id', sa.String(length=100), nullable=True))
+    op.add_column('transactions', sa.Column('counterparty_bank', sa.String(length=20), nullable=True))
+    op.add_column('transactions', sa.Column('jurisdiction', sa.String(length=20), nullable=True))
+    op.add_column('transactions', sa.Column('direction', sa.String(length=10), nullable=True))
+
+    for column in INDEXED:
+        op.create_index(op.f(f'ix_transactions_{column}'), 'transactions', [column], unique=False)
+
+
+def downgrade() -> None:
+    for column in reversed(INDEXED):
+        op.drop_index(op.f(f'ix_transactions_{column}'), table_name='transactions')
+    for column in reversed(COLUMNS):
+        op.drop_column('transactions', column)
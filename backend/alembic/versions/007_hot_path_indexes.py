@@ -0,0 +1,36 @@
+"""Composite and foreign key indexes for the transaction, case and SAR hot paths
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-19 15:00:00.000000
+
+sar_reports(created_by, created_at) is already served by ix_sar_reports_created_by_created_at_id
+(002) and cqi_scores(sar_id) by its unique constraint, so neither gets a second index.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # risk analysis / SAR generation: a customer's transactions in time order
+    op.create_index('ix_transactions_account_id_timestamp', 'transactions', ['account_id', 'timestamp'], unique=False)
+    op.create_index('ix_accounts_customer_id', 'accounts', ['customer_id'], unique=False)
+    op.create_index('ix_cases_customer_id', 'cases', ['customer_id'], unique=False)
+    # analyst queue: open cases plus those assigned to the caller
+    op.create_index('ix_cases_status_assigned_to', 'cases', ['status', 'assigned_to'], unique=False)
+    op.create_index('ix_sar_reports_case_id', 'sar_reports', ['case_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sar_reports_case_id', table_name='sar_reports')
+    op.drop_index('ix_cases_status_assigned_to', table_name='cases')
+    op.drop_index('ix_cases_customer_id', table_name='cases')
+    op.drop_index('ix_accounts_customer_id', table_name='accounts')
+    op.drop_index('ix_transactions_account_id_timestamp', table_name='transactions')
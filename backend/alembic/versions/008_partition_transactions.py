@@ -0,0 +1,127 @@
+"""Range-partition transactions by timestamp, one partition per month (PostgreSQL)
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19 16:00:00.000000
+
+The existing table is rebuilt as transactions PARTITION BY RANGE (timestamp) with a
+partition for every month from the oldest row to MONTHS_AHEAD months from now, plus
+a DEFAULT partition; later months are created on demand by app.db.partitions.
+
+PostgreSQL requires the partition key in every unique index, so the primary key
+becomes (id, timestamp) and the txn_id / fingerprint unique indexes become
+(txn_id, timestamp) / (fingerprint, timestamp): uniqueness is per timestamp.
+Re-imports still dedupe because bulk ingestion rejects rows without a timestamp, so
+the same source row always carries the same one. timestamp becomes NOT NULL;
+existing rows without one get 1970-01-01 and land in the DEFAULT partition. id keeps
+its sequence.
+
+Other databases keep the plain table; this revision does nothing there.
+"""
+from alembic import op
+from datetime import date, datetime
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+EPOCH = "1970-01-01"
+
+COLUMNS = """
+    id integer NOT NULL DEFAULT nextval('{sequence}'::regclass),
+    txn_id varchar(150) NOT NULL,
+    amount double precision NOT NULL,
+    txn_type varchar(50) NOT NULL,
+    account_id integer NOT NULL,
+    timestamp timestamp without time zone {timestamp_null},
+    meta_data text,
+    fingerprint varchar(64),
+    channel varchar(20),
+    counterparty_id varchar(100),
+    counterparty_bank varchar(20),
+    jurisdiction varchar(20),
+    direction varchar(10)
+"""
+COLUMN_NAMES = ("id, txn_id, amount, txn_type, account_id, timestamp, meta_data, fingerprint, "
+                "channel, counterparty_id, counterparty_bank, jurisdiction, direction")
+INDEXED = ('channel', 'counterparty_id', 'counterparty_bank', 'jurisdiction')
+
+
+def _next_month(month):
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def _partition_name(month):
+    # same naming as app.db.partitions.partition_name, frozen for this migration
+    return f"transactions_y{month.year}m{month.month:02d}"
+
+
+def _create_indexes(unique_columns):
+    op.create_index('ix_transactions_id', 'transactions', ['id'], unique=False)
+    op.create_index('ix_transactions_txn_id', 'transactions', unique_columns('txn_id'), unique=True)
+    op.create_index('ix_transactions_fingerprint', 'transactions', unique_columns('fingerprint'), unique=True)
+    op.create_index('ix_transactions_account_id_timestamp', 'transactions', ['account_id', 'timestamp'], unique=False)
+    for column in INDEXED:
+        op.create_index(f'ix_transactions_{column}', 'transactions', [column], unique=False)
+    op.create_foreign_key('transactions_account_id_fkey', 'transactions', 'accounts', ['account_id'], ['id'])
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+
+    sequence = conn.scalar(sa.text("SELECT pg_get_serial_sequence('transactions', 'id')"))
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute("ALTER TABLE transactions RENAME TO transactions_old")
+    op.execute(
+        f"CREATE TABLE transactions ({COLUMNS.format(sequence=sequence, timestamp_null='NOT NULL')}) "
+        "PARTITION BY RANGE (timestamp)"
+    )
+
+    oldest = conn.scalar(sa.text("SELECT min(timestamp) FROM transactions_old WHERE timestamp > :epoch"),
+                         {"epoch": EPOCH})
+    today = datetime.utcnow().date()
+    month = date((oldest or today).year, (oldest or today).month, 1)
+    last = date(today.year, today.month, 1)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        op.execute(
+            f"CREATE TABLE {_partition_name(month)} PARTITION OF transactions "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_next_month(month).isoformat()}')"
+        )
+        month = _next_month(month)
+    op.execute("CREATE TABLE transactions_default PARTITION OF transactions DEFAULT")
+
+    select_columns = COLUMN_NAMES.replace("timestamp,", f"COALESCE(timestamp, '{EPOCH}'),")
+    op.execute(f"INSERT INTO transactions ({COLUMN_NAMES}) SELECT {select_columns} FROM transactions_old")
+    op.execute("DROP TABLE transactions_old")
+
+    # indexes on the parent are created on (and attached from) every partition
+    op.create_primary_key('transactions_pkey', 'transactions', ['id', 'timestamp'])
+    _create_indexes(lambda column: [column, 'timestamp'])
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY transactions.id")
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+
+    sequence = conn.scalar(sa.text("SELECT pg_get_serial_sequence('transactions', 'id')"))
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+    op.execute("ALTER TABLE transactions RENAME TO transactions_old")
+    op.execute(f"CREATE TABLE transactions ({COLUMNS.format(sequence=sequence, timestamp_null='NULL')})")
+    op.execute(f"INSERT INTO transactions ({COLUMN_NAMES}) SELECT {COLUMN_NAMES} FROM transactions_old")
+    # drops every partition with it
+    op.execute("DROP TABLE transactions_old")
+
+    op.create_primary_key('transactions_pkey', 'transactions', ['id'])
+    _create_indexes(lambda column: [column])
+    op.execute(f"ALTER SEQUENCE {sequence} OWNED BY transactions.id")
@@ -0,0 +1,79 @@
+"""Daily per-account transaction statistics, backfilled from existing transactions
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+# same bands as app.services.transaction_stats_service, frozen for this migration
+STRUCTURING_BAND = (8000, 9500)
+LARGE_AMOUNT = 50000
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_account_stats',
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('customer_id', sa.Integer(), nullable=True),
+        sa.Column('txn_count', sa.Integer(), nullable=False),
+        sa.Column('volume', sa.Float(), nullable=False),
+        sa.Column('max_amount', sa.Float(), nullable=False),
+        sa.Column('band_count', sa.Integer(), nullable=False),
+        sa.Column('wire_count', sa.Integer(), nullable=False),
+        sa.Column('large_count', sa.Integer(), nullable=False),
+        sa.Column('counterparty_count', sa.Integer(), nullable=False),
+        sa.Column('first_at', sa.DateTime(), nullable=True),
+        sa.Column('last_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+        sa.ForeignKeyConstraint(['customer_id'], ['customers.id'], ),
+        sa.PrimaryKeyConstraint('account_id', 'day')
+    )
+    op.create_index('ix_daily_account_stats_customer_id_day', 'daily_account_stats', ['customer_id', 'day'],
+                    unique=False)
+    op.create_table(
+        'daily_account_counterparties',
+        sa.Column('account_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('counterparty_id', sa.String(length=100), nullable=False),
+        sa.ForeignKeyConstraint(['account_id'], ['accounts.id'], ),
+        sa.PrimaryKeyConstraint('account_id', 'day', 'counterparty_id')
+    )
+
+    # Backfill; date() gives the ISO text SQLite stores Date columns as
+    day = "date(t.timestamp)" if op.get_bind().dialect.name == 'sqlite' else "CAST(t.timestamp AS DATE)"
+    op.execute(
+        "INSERT INTO daily_account_counterparties (account_id, day, counterparty_id) "
+        f"SELECT DISTINCT t.account_id, {day}, t.counterparty_id FROM transactions t "
+        "WHERE t.timestamp IS NOT NULL AND t.counterparty_id IS NOT NULL"
+    )
+    op.execute(
+        "INSERT INTO daily_account_stats (account_id, day, customer_id, txn_count, volume, max_amount, band_count, "
+        "wire_count, large_count, counterparty_count, first_at, last_at) "
+        f"SELECT t.account_id, {day}, a.customer_id, COUNT(*), SUM(t.amount), MAX(t.amount), "
+        f"SUM(CASE WHEN t.amount BETWEEN {STRUCTURING_BAND[0]} AND {STRUCTURING_BAND[1]} THEN 1 ELSE 0 END), "
+        "SUM(CASE WHEN lower(t.txn_type) LIKE '%wire%' THEN 1 ELSE 0 END), "
+        f"SUM(CASE WHEN t.amount > {LARGE_AMOUNT} THEN 1 ELSE 0 END), 0, MIN(t.timestamp), MAX(t.timestamp) "
+        "FROM transactions t JOIN accounts a ON a.id = t.account_id WHERE t.timestamp IS NOT NULL "
+        f"GROUP BY t.account_id, {day}, a.customer_id"
+    )
+    op.execute(
+        "UPDATE daily_account_stats SET counterparty_count = (SELECT COUNT(*) FROM daily_account_counterparties p "
+        "WHERE p.account_id = daily_account_stats.account_id AND p.day = daily_account_stats.day)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('daily_account_counterparties')
+    op.drop_index('ix_daily_account_stats_customer_id_day', table_name='daily_account_stats')
+    op.drop_table('daily_account_stats')
@@ -0,0 +1,49 @@
+"""Monitoring sweep runs, and the case a typology detection opened
+
+Revision ID: 010
+Revises: 009
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '010'
+down_revision = '009'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'monitoring_runs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('from_transaction_id', sa.Integer(), nullable=False),
+        sa.Column('to_transaction_id', sa.Integer(), nullable=False),
+        sa.Column('customers_scanned', sa.Integer(), nullable=False),
+        sa.Column('alerts', sa.Integer(), nullable=False),
+        sa.Column('cases_opened', sa.Integer(), nullable=False),
+        sa.Column('deduplicated', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(), nullable=True),
+        sa.Column('finished_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_monitoring_runs_id'), 'monitoring_runs', ['id'], unique=False)
+
+    with op.batch_alter_table('typology_detections') as batch_op:
+        batch_op.add_column(sa.Column('case_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_typology_detections_case_id_cases', 'cases', ['case_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_typology_detections_case_id'), ['case_id'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('typology_detections') as batch_op:
+        batch_op.drop_index(batch_op.f('ix_typology_detections_case_id'))
+        batch_op.drop_constraint('fk_typology_detections_case_id_cases', type_='foreignkey')
+        batch_op.drop_column('case_id')
+    op.drop_index(op.f('ix_monitoring_runs_id'), table_name='monitoring_runs')
+    op.drop_table('monitoring_runs')
@@ -0,0 +1,40 @@
+"""Declarative typology rules, overriding the built-in ones by name
+
+Revision ID: 011
+Revises: 010
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '011'
+down_revision = '010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'typology_rules',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=100), nullable=False),
+        sa.Column('definition', sa.Text(), nullable=False),
+        sa.Column('enabled', sa.Boolean(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.Column('updated_by', sa.Integer(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['updated_by'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_typology_rules_id'), 'typology_rules', ['id'], unique=False)
+    op.create_index(op.f('ix_typology_rules_name'), 'typology_rules', ['name'], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_typology_rules_name'), table_name='typology_rules')
+    op.drop_index(op.f('ix_typology_rules_id'), table_name='typology_rules')
+    op.drop_table('typology_rules')
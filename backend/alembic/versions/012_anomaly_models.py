@@ -0,0 +1,37 @@
+"""Fitted anomaly scorers for customer activity
+
+Revision ID: 012
+Revises: 011
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '012'
+down_revision = '011'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'anomaly_models',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('method', sa.String(length=30), nullable=False),
+        sa.Column('window_days', sa.Integer(), nullable=False),
+        sa.Column('contamination', sa.Float(), nullable=False),
+        sa.Column('trained_customers', sa.Integer(), nullable=False),
+        sa.Column('fit_seconds', sa.Float(), nullable=True),
+        sa.Column('scorer', sa.LargeBinary(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_anomaly_models_id'), 'anomaly_models', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_anomaly_models_id'), table_name='anomaly_models')
+    op.drop_table('anomaly_models')
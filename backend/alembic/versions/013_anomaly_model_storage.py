@@ -0,0 +1,28 @@
+"""Store anomaly scorers without pickling them whole: the forest and the scikit-learn version get their own columns
+
+Revision ID: 013
+Revises: 012
+Create Date: 2026-10-19 22:00:00.000000
+
+Rows stored before this have no sklearn_version; they hold a pickled scorer,
+which is no longer loaded, so refit with `python manage.py fit-anomaly-model`.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '013'
+down_revision = '012'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('anomaly_models', sa.Column('forest', sa.LargeBinary(), nullable=True))
+    op.add_column('anomaly_models', sa.Column('sklearn_version', sa.String(length=20), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('anomaly_models', 'sklearn_version')
+    op.drop_column('anomaly_models', 'forest')
@@ -0,0 +1,24 @@
+"""Occurrence counts checkpointed with statement imports, so a resumed import numbers identical rows on
+
+Revision ID: 014
+Revises: 013
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '014'
+down_revision = '013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('import_manifests', sa.Column('occurrences', sa.Text(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('import_manifests', 'occurrences')
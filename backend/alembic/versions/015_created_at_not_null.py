@@ -0,0 +1,37 @@
+"""Backfill and require created_at on the keyset-paginated tables
+
+Revision ID: 015
+Revises: 014
+Create Date: 2026-10-19 23:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '015'
+down_revision = '014'
+branch_labels = None
+depends_on = None
+
+# rows with a NULL created_at never compare true against a cursor, so they are
+# only ever listed on the first page; updated_at is the closest known time
+BACKFILL = {
+    'users': 'CURRENT_TIMESTAMP',
+    'cases': 'COALESCE(updated_at, CURRENT_TIMESTAMP)',
+    'sar_reports': 'COALESCE(updated_at, CURRENT_TIMESTAMP)',
+}
+
+
+def upgrade() -> None:
+    for table, value in BACKFILL.items():
+        op.execute(f"UPDATE {table} SET created_at = {value} WHERE created_at IS NULL")
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=False)
+
+
+def downgrade() -> None:
+    for table in BACKFILL:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('created_at', existing_type=sa.DateTime(), nullable=True)
@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from . import auth, cases, sar, audit, dashboard, admin, risk
+from . import auth, cases, sar, audit, dashboard, admin, risk, ingest
 
 router = APIRouter()
 
@@ -11,3 +11,4 @@ router.include_router(audit.router, prefix="/audit", tags=["audit"])
 router.include_router(dashboard.router, prefix="/dashboard", tags=["dashboard"])
 router.include_router(admin.router, prefix="/admin", tags=["admin"])
 router.include_router(risk.router, prefix="/risk", tags=["risk"])
+router.include_router(ingest.router, prefix="/ingest", tags=["ingest"])
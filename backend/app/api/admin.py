@@ -1,21 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
 from ..core.deps import require_role, get_current_user
-from ..db.session import get_db
+from ..db.session import get_db, get_pool_metrics, get_async_pool_metrics, get_replica_router
+from ..core.security import password_hasher
+from ..core.rate_limit import login_limiter
 from .. import models
-from ..schemas import UserRead
-from typing import List
+from ..schemas import UserRead, Role, TypologyRuleRead, TypologyRuleWrite
+from ..services.anomaly_service import anomaly_models
+from ..services.rule_engine import Rule, RuleError, parse_rules, typology_rules
+from .pagination import PageParams
+from .caching import response_cache
+from .dashboard import dashboard_broadcaster
+from .responses import ORJSONResponse
+from typing import List, Optional
 from sqlalchemy.orm import Session
 
 router = APIRouter()
 
 
 @router.get("/users", response_model=List[UserRead])
-def list_users(db: Session = Depends(get_db), current=Depends(require_role('admin'))):
-    users = db.query(models.User).all()
-    return users
+def list_users(
+    response: Response,
+    role: Optional[Role] = None,
+    is_active: Optional[bool] = None,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db),
+    current=Depends(require_role('admin')),
+):
+    query = db.query(models.User)
+    if role is not None:
+        query = query.filter(models.User.role == models.RoleEnum(role.value))
+    if is_active is not None:
+        query = query.filter(models.User.is_active == is_active)
+    return page.page(page.apply(query, models.User), response)
 
 
-@router.post("/users/{user_id}/deactivate")
+@router.post("/users/{user_id}/deactivate", response_class=ORJSONResponse)
 def deactivate_user(user_id: int, db: Session = Depends(get_db), current=Depends(require_role('admin'))):
     user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
@@ -25,3 +44,66 @@ def deactivate_user(user_id: int, db: Session = Depends(get_db), current=Depends
     db.commit()
     db.refresh(user)
     return {"ok": True}
+
+
+@router.get("/metrics", response_class=ORJSONResponse)
+def runtime_metrics(current=Depends(require_role('admin'))):
+    """Process-local runtime metrics for capacity monitoring"""
+    return {
+        "password_hashing": password_hasher.metrics(),
+        "login_throttling": login_limiter.metrics(),
+        "db_pool": get_pool_metrics(),
+        "db_async_pool": get_async_pool_metrics(),
+        "db_replicas": get_replica_router().metrics(),
+        "dashboard_stream": dashboard_broadcaster.metrics(),
+        "response_cache": response_cache.metrics(),
+        "typology_rules": typology_rules.metrics(),
+        "anomaly_model": anomaly_models.metrics(),
+    }
+
+
+def _rule_in_effect(name: str) -> dict:
+    return next(rule for rule in typology_rules.describe() if rule["name"] == name)
+
+
+@router.get("/rules", response_model=List[TypologyRuleRead])
+def list_rules(db: Session = Depends(get_db), current=Depends(require_role('admin'))):
+    """The typology rules in effect, with per-rule evaluation counts and timings for this process"""
+    typology_rules.refresh(db)
+    return typology_rules.describe()
+
+
+@router.put("/rules/{name}", response_model=TypologyRuleRead)
+def put_rule(name: str, payload: TypologyRuleWrite, db: Session = Depends(get_db),
+             current=Depends(require_role('admin'))):
+    """Create a rule, or override one (including a built-in); every process picks it up on its next reload"""
+    try:
+        definitions = parse_rules(payload.definition)
+        if len(definitions) != 1:
+            raise RuleError("Expected exactly one rule")
+        Rule({**definitions[0], "name": name})
+    except RuleError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    rule = db.query(models.TypologyRule).filter(models.TypologyRule.name == name).first()
+    if rule is None:
+        rule = models.TypologyRule(name=name, version=0)
+        db.add(rule)
+    rule.definition = payload.definition
+    rule.enabled = payload.enabled
+    rule.version += 1
+    rule.updated_by = current.id
+    db.commit()
+    typology_rules.refresh(db, force=True)
+    return _rule_in_effect(name)
+
+
+@router.delete("/rules/{name}", response_class=ORJSONResponse)
+def delete_rule(name: str, db: Session = Depends(get_db), current=Depends(require_role('admin'))):
+    """Remove a stored rule; a built-in rule of the same name applies again"""
+    rule = db.query(models.TypologyRule).filter(models.TypologyRule.name == name).first()
+    if not rule:
+        raise HTTPException(status_code=404, detail='Rule not found')
+    db.delete(rule)
+    db.commit()
+    typology_rules.refresh(db, force=True)
+    return {"ok": True}
@@ -1,27 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.exc import IntegrityError
+from typing import Optional
 from .. import schemas, models
-from ..db.session import get_db
+from ..db.session import run_with_session
 from ..core import security
+from ..core.rate_limit import client_ip, login_limiter
 from sqlalchemy.orm import Session
 from ..schemas import UserCreate, Token, UserRead
 from datetime import datetime
 
 router = APIRouter()
 
+# Login and register are async so bcrypt can run on the dedicated hashing
+# executor. They don't take a request session (get_db): each short DB step below
+# runs via run_with_session, so no connection or session slot is held while
+# bcrypt runs.
 
-@router.post("/register", response_model=UserRead)
-def register(user_in: UserCreate, db: Session = Depends(get_db)):
-    # check existing
-    existing = db.query(models.User).filter((models.User.username == user_in.username) | (models.User.email == user_in.email)).first()
-    if existing:
-        raise HTTPException(status_code=400, detail="User already exists")
+
+def _find_user(db: Session, identifier: str) -> Optional[models.User]:
+    return db.query(models.User).filter(
+        (models.User.username == identifier) | (models.User.email == identifier)
+    ).first()
+
+
+def _user_exists(db: Session, username: str, email: str) -> bool:
+    return db.query(models.User.id).filter(
+        (models.User.username == username) | (models.User.email == email)
+    ).first() is not None
+
+
+def _create_user(db: Session, user_in: UserCreate, hashed_password: str) -> models.User:
     user = models.User(
         username=user_in.username,
         email=user_in.email,
         full_name=user_in.full_name,
-        hashed_password=security.hash_password(user_in.password),
+        hashed_password=hashed_password,
         role=user_in.role,
     )
     db.add(user)
@@ -31,55 +45,105 @@ def register(user_in: UserCreate, db: Session = Depends(get_db)):
     except IntegrityError:
         db.rollback()
         raise HTTPException(status_code=400, detail="Could not create user")
-    
+
     # Audit log the registration
     audit = models.AuditLog(
         user_id=user.id,
         action="USER_REGISTERED",
         entity_type="User",
         entity_id=str(user.id),
-        metadata=f"username={user.username}, role={user.role.value}",
+        meta_data=f"username={user.username}, role={user.role.value}",
         timestamp=datetime.utcnow()
     )
     db.add(audit)
     db.commit()
-    
+    db.refresh(user)
     return user
 
 
+def _record_login(db: Session, user_id: int, username: str, rehashed_password: Optional[str]):
+    if rehashed_password:
+        # bcrypt cost changed since this hash was created; store the upgraded hash
+        db.query(models.User).filter(models.User.id == user_id).update(
+            {models.User.hashed_password: rehashed_password}
+        )
+    audit = models.AuditLog(
+        user_id=user_id,
+        action="USER_LOGIN",
+        entity_type="User",
+        entity_id=str(user_id),
+        meta_data=f"username={username}" + (", password_rehashed=true" if rehashed_password else ""),
+        timestamp=datetime.utcnow()
+    )
+    db.add(audit)
+    db.commit()
+
+
+def _hashing_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Authentication service busy, please retry",
+        headers={"Retry-After": "1"},
+    )
+
+
+@router.post("/register", response_model=UserRead)
+async def register(user_in: UserCreate):
+    # check existing
+    if await run_with_session(_user_exists, user_in.username, user_in.email):
+        raise HTTPException(status_code=400, detail="User already exists")
+    try:
+        hashed = await security.hash_password_async(user_in.password)
+    except security.HashQueueFull:
+        raise _hashing_unavailable()
+    return await run_with_session(_create_user, user_in, hashed)
+
+
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+async def login(request: Request, form_data: OAuth2PasswordRequestForm = Depends()):
     # OAuth2PasswordRequestForm uses 'username' and 'password' fields
-    user = db.query(models.User).filter(
-        (models.User.username == form_data.username) | (models.User.email == form_data.username)
-    ).first()
-    
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
+    address = client_ip(request)
+
+    # Shed brute-force traffic before spending any bcrypt time on it
+    retry_after = login_limiter.retry_after(form_data.username, address)
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many failed login attempts, try again later",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+    user = await run_with_session(_find_user, form_data.username)
+
+    valid, new_hash = False, None
+    try:
+        if user:
+            valid, new_hash = await security.verify_and_update_password(form_data.password, user.hashed_password)
+        else:
+            # same bcrypt work either way, so response times don't reveal which usernames exist
+            await security.verify_unknown_user_password(form_data.password)
+    except security.HashQueueFull:
+        raise _hashing_unavailable()
+
+    if not valid:
+        login_limiter.record_failure(form_data.username, address)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    
+    login_limiter.reset(form_data.username)
+
     if not user.is_active:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="User account is deactivated")
-    
+
     token = security.create_access_token({
         "user_id": user.id,
         "username": user.username,
         "role": user.role.value
     })
-    
-    # Audit log the login
-    audit = models.AuditLog(
-        user_id=user.id,
-        action="USER_LOGIN",
-        entity_type="User",
-        entity_id=str(user.id),
-        metadata=f"username={user.username}",
-        timestamp=datetime.utcnow()
-    )
-    db.add(audit)
-    db.commit()
-    
+
+    # Audit log the login (and persist a rehashed password if the cost changed)
+    await run_with_session(_record_login, user.id, user.username, new_hash)
+
     return {"access_token": token, "token_type": "bearer"}
@@ -0,0 +1,139 @@
+"""
+HTTP caching for read endpoints.
+Single records get strong ETags derived from their updated_at, so a matching
+If-None-Match is answered with 304 before the record is serialized. Aggregates
+(dashboard metrics, intelligence report) are additionally kept in a short-lived
+in-process cache that is invalidated when a commit in this process writes one of
+the tables they read; writes from other processes are picked up when the TTL expires.
+"""
+from fastapi import Request, Response
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+import hashlib
+import threading
+import time
+from ..core.config import settings
+from .responses import dumps
+
+# clients must revalidate, but can reuse their copy on 304
+CACHE_CONTROL = "private, no-cache"
+
+
+def entity_etag(kind: str, entity_id: int, version: Optional[datetime]) -> str:
+    stamp = version.isoformat() if version else ""
+    return '"' + hashlib.sha1(f"{kind}:{entity_id}:{stamp}".encode()).hexdigest()[:24] + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    # If-None-Match uses weak comparison, so W/"x" matches "x"
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+def not_modified(request: Request, etag: str) -> Optional[Response]:
+    """A 304 response when the client already holds this ETag, else None"""
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+    return None
+
+
+def set_cache_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+class CachedResponse:
+    def __init__(self, body: bytes, versions: Tuple[int, ...], expires_at: float):
+        self.body = body
+        self.versions = versions
+        self.expires_at = expires_at
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:24] + '"'
+
+    def respond(self, request: Request) -> Response:
+        cached = not_modified(request, self.etag)
+        if cached is not None:
+            return cached
+        return Response(content=self.body, media_type="application/json",
+                        headers={"ETag": self.etag, "Cache-Control": CACHE_CONTROL})
+
+
+class ResponseCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries: Dict[str, CachedResponse] = {}
+        self._table_versions: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def versions(self, tables: Iterable[str]) -> Tuple[int, ...]:
+        """Take before computing, and pass to put(), so a write during the computation isn't lost"""
+        with self._lock:
+            return tuple(self._table_versions.get(t, 0) for t in tables)
+
+    def get(self, key: str, tables: Iterable[str]) -> Optional[CachedResponse]:
+        current = self.versions(tables)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.versions != current or entry.expires_at <= time.monotonic():
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry
+
+    def put(self, key: str, versions: Tuple[int, ...], payload) -> CachedResponse:
+        body = dumps(payload)
+        entry = CachedResponse(body, versions, time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def invalidate(self, tables: Iterable[str]):
+        with self._lock:
+            for table in tables:
+                self._table_versions[table] = self._table_versions.get(table, 0) + 1
+            self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+response_cache = ResponseCache(settings.RESPONSE_CACHE_TTL_SECONDS)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_written_tables(session, flush_context):
+    written = session.info.setdefault("written_tables", set())
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        table = getattr(obj, "__tablename__", None)
+        if table:
+            written.add(table)
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_written_tables(session):
+    written = session.info.pop("written_tables", None)
+    if written:
+        response_cache.invalidate(written)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_written_tables(session):
+    session.info.pop("written_tables", None)
@@ -1,22 +1,40 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from typing import List, Optional
 from ..schemas import CaseCreate, CaseRead
-from ..core.deps import get_current_user, require_role
-from ..db.session import get_db
+from ..core.deps import get_current_user, get_current_user_async, require_role
+from ..db.session import get_db, get_async_db
+from .caching import entity_etag, not_modified, set_cache_headers
+from .pagination import PageParams
 from .. import models
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 router = APIRouter()
 
 
 @router.get("/", response_model=List[CaseRead])
-def list_cases(db: Session = Depends(get_db), user=Depends(get_current_user)):
+async def list_cases(
+    response: Response,
+    status: Optional[models.CaseStatus] = None,
+    customer_id: Optional[int] = None,
+    assigned_to: Optional[int] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user_async),
+):
     # simple RBAC: analysts see assigned or open, admins see all
-    if user.role.value == "admin":
-        cases = db.query(models.Case).all()
-    else:
-        cases = db.query(models.Case).filter((models.Case.assigned_to == user.id) | (models.Case.status == "open")).all()
-    return cases
+    stmt = select(models.Case)
+    if user.role.value != "admin":
+        stmt = stmt.where((models.Case.assigned_to == user.id) | (models.Case.status == "open"))
+    if status is not None:
+        stmt = stmt.where(models.Case.status == status)
+    if customer_id is not None:
+        stmt = stmt.where(models.Case.customer_id == customer_id)
+    if assigned_to is not None:
+        stmt = stmt.where(models.Case.assigned_to == assigned_to)
+    result = await db.execute(page.apply(stmt, models.Case))
+    return page.page(result.scalars(), response)
 
 
 @router.post("/", response_model=CaseRead)
@@ -34,8 +52,13 @@ def create_case(payload: CaseCreate, db: Session = Depends(get_db), user=Depends
 
 
 @router.get("/{case_id}", response_model=CaseRead)
-def get_case(case_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+def get_case(case_id: int, request: Request, response: Response, db: Session = Depends(get_db), user=Depends(get_current_user)):
     case = db.query(models.Case).filter(models.Case.id == case_id).first()
     if not case:
         raise HTTPException(status_code=404, detail="Case not found")
+    etag = entity_etag("case", case.id, case.updated_at or case.created_at)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    set_cache_headers(response, etag)
     return case
@@ -1,59 +1,79 @@
-from fastapi import APIRouter, Depends
-from ..db.session import get_db
-from ..core.deps import get_current_user
+from fastapi import APIRouter, Depends, Request
+from fastapi.responses import StreamingResponse
+from ..db.session import get_async_db, get_async_read_db
+from ..core.config import settings
+from ..core.deps import get_current_user_async
+from ..services.dashboard_metrics_service import build_dashboard_metrics, trend_cutoff
+from ..services.metrics_broadcaster import MetricsBroadcaster
+from .caching import response_cache
+from .responses import dumps
 from .. import models
-from sqlalchemy.orm import Session
-from collections import Counter, defaultdict
-from datetime import datetime, timedelta
+from contextlib import asynccontextmanager
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+import asyncio
 
 router = APIRouter()
 
 
+async def _load_metrics(db: AsyncSession) -> dict:
+    # served from the summary tables maintained on write (see dashboard_metrics_service)
+    counters = (await db.execute(select(models.DashboardCounter))).scalars().all()
+    daily = (await db.execute(
+        select(models.DailyCQIMetric).where(models.DailyCQIMetric.day >= trend_cutoff())
+    )).scalars().all()
+    return build_dashboard_metrics(counters, daily)
+
+
+async def _compute_metrics() -> dict:
+    async with asynccontextmanager(get_async_read_db)() as db:
+        return await _load_metrics(db)
+
+
+dashboard_broadcaster = MetricsBroadcaster(_compute_metrics, settings.DASHBOARD_PUSH_INTERVAL_SECONDS)
+
+
+# the summary tables change only when these are written (see dashboard_metrics_service)
+METRICS_TABLES = ("sar_reports", "cqi_scores", "typology_detections")
+
+
 @router.get("/metrics")
-def metrics(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    sar_volume = db.query(models.SARReport).count()
-
-    # Average CQI (scores stored as 0–100)
-    avg_cqi_rows = db.query(models.CQIScore).with_entities(models.CQIScore.overall_score).all()
-    avg = float(sum([r[0] for r in avg_cqi_rows]) / len(avg_cqi_rows)) if avg_cqi_rows else 0.0
-
-    # Typology counts
-    typologies = db.query(models.TypologyDetection).all()
-    typ_counts = Counter([t.detection_type for t in typologies])
-
-    # CQI trend: group CQI scores by day over the last 30 days
-    cutoff = datetime.utcnow() - timedelta(days=30)
-    cqi_records = (
-        db.query(models.CQIScore, models.SARReport)
-        .join(models.SARReport, models.CQIScore.sar_id == models.SARReport.id)
-        .filter(models.SARReport.created_at >= cutoff)
-        .all()
-    )
+async def metrics(request: Request, db: AsyncSession = Depends(get_async_read_db), user=Depends(get_current_user_async)):
+    cached = response_cache.get("dashboard_metrics", METRICS_TABLES)
+    if cached is None:
+        versions = response_cache.versions(METRICS_TABLES)
+        cached = response_cache.put("dashboard_metrics", versions, await _load_metrics(db))
+    return cached.respond(request)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {dumps(data).decode()}\n\n"
+
 
-    daily_scores: dict = defaultdict(list)
-    for cqi, sar in cqi_records:
-        day = sar.created_at.strftime("%b %d")
-        daily_scores[day].append(cqi.overall_score)
-
-    # Build sorted trend list
-    trend = []
-    for day in sorted(daily_scores.keys()):
-        scores = daily_scores[day]
-        trend.append({
-            "date": day,
-            "score": round(sum(scores) / len(scores), 1)
-        })
-
-    # Fallback: if no recent data, generate a smooth estimate from historical average
-    if not trend and avg_cqi_rows:
-        for i in range(7, -1, -1):
-            day = (datetime.utcnow() - timedelta(days=i)).strftime("%b %d")
-            variation = round(avg + (i - 3.5) * 1.5, 1)
-            trend.append({"date": day, "score": max(0, min(100, variation))})
-
-    return {
-        "sar_volume": sar_volume,
-        "average_cqi": avg,
-        "typology_counts": dict(typ_counts),
-        "risk_score_trend": trend
-    }
+@router.get("/stream")
+async def stream_metrics(request: Request, db: AsyncSession = Depends(get_async_db), user=Depends(get_current_user_async)):
+    """
+    Server-sent events: a `snapshot` event with the full metrics, then `delta` events
+    carrying only the keys that changed. All subscribers share one computation.
+    """
+    # the stream can stay open for hours; don't keep the auth lookup's connection
+    await db.close()
+
+    async def events():
+        queue = dashboard_broadcaster.subscribe()
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=settings.DASHBOARD_STREAM_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield _sse(event, data)
+        finally:
+            dashboard_broadcaster.unsubscribe(queue)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
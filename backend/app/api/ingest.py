@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
+from ..core.deps import require_role_async
+from ..db.session import run_with_session
+from ..importers.tabular import TABULAR_BATCH_SIZE, IngestError, detect_format, ingest_file
+from ..schemas import IngestResult
+from typing import Optional
+import json
+
+router = APIRouter()
+
+
+@router.post("/transactions", response_model=IngestResult)
+async def ingest_transactions(
+    file: UploadFile = File(...),
+    format: Optional[str] = Form(None),
+    mapping: Optional[str] = Form(None, description='JSON object of field -> column, e.g. {"txn_id": "Reference"}'),
+    create_accounts: bool = Form(False),
+    restart: bool = Form(False, description="re-import a file that was already loaded"),
+    user=Depends(require_role_async('admin')),
+):
+    """
+    Bulk load a CSV or Parquet file of transactions, one committed batch at a time.
+    Uploading a file again resumes an interrupted load, or reports it as already imported.
+    """
+    try:
+        fmt = detect_format(file.filename or "", format)
+        columns = json.loads(mapping) if mapping else None
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="mapping must be a JSON object")
+    if columns is not None and not isinstance(columns, dict):
+        raise HTTPException(status_code=400, detail="mapping must be a JSON object")
+
+    try:
+        # the upload is already spooled to disk; parse and load it in the threadpool
+        return await run_with_session(
+            ingest_file, file.file, fmt, columns, create_accounts, TABULAR_BATCH_SIZE, file.filename, restart,
+        )
+    except IngestError as e:
+        raise HTTPException(status_code=400, detail=str(e))
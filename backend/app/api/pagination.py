@@ -0,0 +1,75 @@
+"""
+Keyset pagination for list endpoints.
+Pages are ordered by (created_at, id) and continued with an opaque cursor holding the
+last row's key, so a page costs one index range scan however deep the client pages.
+The cursor for the next page is returned in the X-Next-Cursor response header and is
+absent on the last page.
+"""
+from fastapi import HTTPException, Query, Response
+from datetime import datetime
+from enum import Enum
+from sqlalchemy import and_, or_
+from typing import Optional, Tuple
+import base64
+import json
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+
+class SortOrder(str, Enum):
+    asc = "asc"
+    desc = "desc"
+
+
+def encode_cursor(created_at: datetime, row_id: int) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+class PageParams:
+    """Query parameters shared by paginated list endpoints"""
+
+    def __init__(
+        self,
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+        cursor: Optional[str] = Query(None, description="X-Next-Cursor value from the previous page"),
+        order: SortOrder = Query(SortOrder.desc, description="Sort by creation time"),
+    ):
+        self.limit = limit
+        self.cursor = cursor
+        self.order = order
+
+    def apply(self, stmt, model):
+        """Add keyset condition, ordering and limit (one extra row to detect a next page)"""
+        created_at, row_id = model.created_at, model.id
+        if self.cursor:
+            after_created, after_id = decode_cursor(self.cursor)
+            if self.order == SortOrder.desc:
+                stmt = stmt.where(or_(created_at < after_created, and_(created_at == after_created, row_id < after_id)))
+            else:
+                stmt = stmt.where(or_(created_at > after_created, and_(created_at == after_created, row_id > after_id)))
+        if self.order == SortOrder.desc:
+            stmt = stmt.order_by(created_at.desc(), row_id.desc())
+        else:
+            stmt = stmt.order_by(created_at.asc(), row_id.asc())
+        return stmt.limit(self.limit + 1)
+
+    def page(self, rows, response: Response):
+        """Trim the look-ahead row and set the next-page cursor header"""
+        rows = list(rows)
+        if len(rows) > self.limit:
+            rows = rows[:self.limit]
+            last = rows[-1]
+            response.headers[NEXT_CURSOR_HEADER] = encode_cursor(last.created_at, last.id)
+        return rows
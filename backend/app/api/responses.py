@@ -0,0 +1,28 @@
+"""
+orjson serialization for payloads FastAPI would otherwise pass through
+jsonable_encoder + json.dumps (plain dicts returned without a response model,
+cached aggregate bodies, server-sent events); routes returning plain dicts declare
+response_class=ORJSONResponse.
+
+Routes with a response_model (or a return annotation) are left on FastAPI's default
+response class: since FastAPI 0.130 it serializes them straight to JSON bytes with
+pydantic-core, which is faster than validating to Python objects and rendering them
+with orjson. A default_response_class would switch that off for every route.
+"""
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from typing import Any
+import orjson
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def dumps(content: Any) -> bytes:
+    # orjson handles datetimes, enums, dataclasses and numpy natively; anything else
+    # (pydantic models, ORM rows, Decimal) goes through FastAPI's encoder
+    return orjson.dumps(content, default=jsonable_encoder, option=ORJSON_OPTIONS)
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -2,18 +2,25 @@
 Risk Analysis & Regulatory Simulation API Endpoints
 Exposes advanced risk detection and SAR defensibility analysis
 """
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from typing import Dict, Any
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Dict, Any, List, Optional
+import time
 from .. import models
-from ..db.session import get_db
+from ..db.session import get_db, get_read_db, get_async_read_db, run_with_session
+from ..schemas import ScreeningRequest, ScreeningResult
 from ..services.risk_analysis_service import analyze_transaction_risk
+from ..services.rule_engine import typology_rules
+from ..services.screening_service import ScreeningError, load_customer_state, screening_store
 from ..services.regulatory_simulation_service import (
     simulate_regulatory_review,
     get_improvement_plan
 )
 from ..services.cross_case_intelligence_service import generate_intelligence_report
-from ..core.deps import get_current_user
+from ..core.deps import get_current_user, get_current_user_async
+from .caching import response_cache
 
 router = APIRouter(tags=["Risk Analysis"])
 
@@ -21,13 +28,22 @@ router = APIRouter(tags=["Risk Analysis"])
 @router.get("/analyze/{case_id}")
 def analyze_case_risk(
     case_id: int,
+    lookback_days: Optional[int] = Query(None, ge=1, description="Analyze only this many days of history"),
+    windows: Optional[List[int]] = Query(None, description="Lookback windows in days, e.g. ?windows=30&windows=90"),
     db: Session = Depends(get_db),
     current_user: models.User = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
     Perform comprehensive risk analysis on a case
     Detects 6 typologies: structuring, layering, velocity, income mismatch, geographic, counterparty
+    Each detection reports the lookback window (window_days) that produced it;
+    windows default to settings.RISK_LOOKBACK_WINDOWS
     """
+    if windows and min(windows) < 1:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Lookback windows must be at least 1 day"
+        )
     # Verify case exists
     case = db.query(models.Case).filter(models.Case.id == case_id).first()
     if not case:
@@ -37,7 +53,7 @@ def analyze_case_risk(
         )
     
     try:
-        risk_profile = analyze_transaction_risk(db, case_id)
+        risk_profile = analyze_transaction_risk(db, case_id, lookback_days, windows)
         return {
             "success": True,
             "case_id": case_id,
@@ -51,6 +67,32 @@ def analyze_case_risk(
         )
 
 
+@router.post("/screen", response_model=ScreeningResult)
+async def screen_transaction(
+    txn: ScreeningRequest,
+    current_user: models.User = Depends(get_current_user_async)
+):
+    """
+    Score one incoming transaction against its customer's rolling state and return
+    an alert decision. Uses the case analysis rules over the last
+    SCREENING_WINDOW_DAYS days; only a customer's first screening touches the database
+    (and a check for rule edits every RULES_RELOAD_INTERVAL_SECONDS).
+    """
+    if typology_rules.due():
+        await run_with_session(typology_rules.refresh)
+    state = screening_store.get(txn.account_id)
+    if state is None:
+        try:
+            customer_id, state = await run_with_session(load_customer_state, txn.account_id, screening_store.window_days)
+        except ScreeningError as e:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=str(e))
+        state = screening_store.put(txn.account_id, customer_id, state)
+
+    started = time.perf_counter()
+    result = screening_store.screen(state, txn.amount, txn.txn_type, txn.timestamp, txn.narration, txn.txn_id)
+    return {**result, "txn_id": txn.txn_id, "elapsed_ms": (time.perf_counter() - started) * 1000}
+
+
 @router.post("/sar/{sar_id}/simulate")
 def simulate_regulatory_review(
     sar_id: int,
@@ -128,9 +170,14 @@ def check_filing_readiness(
         )
 
 
+INTELLIGENCE_TABLES = ("sar_reports", "typology_detections", "cases", "customers", "cqi_scores")
+
+
 @router.get("/intelligence/cross-case")
 def get_cross_case_intelligence(
+    request: Request,
     db: Session = Depends(get_db),
+    read_db: Session = Depends(get_read_db),
     current_user: models.User = Depends(get_current_user)
 ) -> Dict[str, Any]:
     """
@@ -144,67 +191,65 @@ def get_cross_case_intelligence(
             detail="Insufficient permissions. Admin or auditor role required."
         )
     
+    cached = response_cache.get("cross_case_intelligence", INTELLIGENCE_TABLES)
+    if cached is not None:
+        return cached.respond(request)
+
     try:
-        intelligence = generate_intelligence_report(db)
-        return {
+        versions = response_cache.versions(INTELLIGENCE_TABLES)
+        # full-table analysis runs on a replica when one is available; the audit entry goes to primary
+        intelligence = generate_intelligence_report(db, read_db=read_db)
+        cached = response_cache.put("cross_case_intelligence", versions, {
             "success": True,
             "intelligence": intelligence
-        }
+        })
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Intelligence generation failed: {str(e)}"
         )
+    return cached.respond(request)
 
 
 @router.get("/dashboard/risk-summary")
-def get_risk_dashboard_summary(
-    db: Session = Depends(get_db),
-    current_user: models.User = Depends(get_current_user)
+async def get_risk_dashboard_summary(
+    db: AsyncSession = Depends(get_async_read_db),
+    current_user: models.User = Depends(get_current_user_async)
 ) -> Dict[str, Any]:
     """
     Risk summary for dashboard visualization
     """
-    # Get all typology detections
-    typologies = db.query(models.TypologyDetection).all()
-    
-    # Count by type
-    type_counts = {}
+    detection = models.TypologyDetection
+    type_counts = dict((await db.execute(
+        select(detection.detection_type, func.count(detection.id)).group_by(detection.detection_type)
+    )).all())
+
     severity_counts = {"CRITICAL": 0, "HIGH": 0, "MEDIUM": 0, "LOW": 0}
-    
-    for typ in typologies:
-        # Count by type
-        type_counts[typ.detection_type] = type_counts.get(typ.detection_type, 0) + 1
-        
-        # Parse details for severity
-        import json
-        try:
-            meta = json.loads(typ.details) if typ.details else {}
-            severity = meta.get("severity", "MEDIUM")
-            if severity in severity_counts:
-                severity_counts[severity] += 1
-        except:
-            pass
-    
-    # Get recent SARs with CQI scores
-    recent_sars = db.query(models.SARReport).order_by(models.SARReport.created_at.desc()).limit(10).all()
-    
-    avg_cqi = 0
-    if recent_sars:
-        cqi_scores = []
-        for sar in recent_sars:
-            cqi = db.query(models.CQIScore).filter(models.CQIScore.sar_id == sar.id).first()
-            if cqi:
-                cqi_scores.append(cqi.overall_score)
-        
-        if cqi_scores:
-            avg_cqi = sum(cqi_scores) / len(cqi_scores)
-    
+    severity_counts.update((await db.execute(
+        select(detection.severity, func.count(detection.id))
+        .where(detection.severity.in_(list(severity_counts)))
+        .group_by(detection.severity)
+    )).all())
+
+    # CQI of the 10 most recent SARs in one query
+    recent = (
+        select(models.SARReport.id)
+        .order_by(models.SARReport.created_at.desc())
+        .limit(10)
+        .subquery()
+    )
+    recent_sar_count, avg_cqi = (await db.execute(
+        select(func.count(recent.c.id), func.avg(models.CQIScore.overall_score))
+        .select_from(recent)
+        .outerjoin(models.CQIScore, models.CQIScore.sar_id == recent.c.id)
+    )).one()
+    avg_cqi = avg_cqi or 0
+
     return {
         "typology_distribution": type_counts,
         "severity_breakdown": severity_counts,
-        "total_detections": len(typologies),
+        "total_detections": sum(type_counts.values()),
         "average_cqi_score": round(avg_cqi, 2),
-        "recent_sar_count": len(recent_sars),
+        "recent_sar_count": recent_sar_count,
         "high_risk_cases": severity_counts["CRITICAL"] + severity_counts["HIGH"]
     }
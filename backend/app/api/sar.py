@@ -1,12 +1,18 @@
-from fastapi import APIRouter, Depends, HTTPException
-from ..core.deps import get_current_user
-from ..db.session import get_db
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from typing import Optional
+from ..core.deps import get_current_user, get_current_user_async
+from ..db.session import get_db, get_async_db
+from sqlalchemy import select
+from sqlalchemy.orm import Session, defer
+from sqlalchemy.ext.asyncio import AsyncSession
 from ..services.ai_service import generate_sar
 from ..services.cqi_service import calculate_cqi
 from ..services.typology_service import detect_typologies
 from .. import models
-from ..schemas import SARGenerateRequest, SARRead
+from ..schemas import SARGenerateRequest, SARRead, SARListItem
+from .caching import entity_etag, not_modified, set_cache_headers
+from .pagination import PageParams
+from .responses import ORJSONResponse
 
 router = APIRouter()
 
@@ -25,14 +31,20 @@ def generate(payload: SARGenerateRequest, db: Session = Depends(get_db), user=De
 
 
 @router.get("/{sar_id}", response_model=SARRead)
-def get_sar(sar_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
-    sar = db.query(models.SARReport).filter(models.SARReport.id == sar_id).first()
+def get_sar(sar_id: int, request: Request, response: Response, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    # the narrative is loaded only if the client's copy is stale
+    sar = db.query(models.SARReport).options(defer(models.SARReport.narrative)).filter(models.SARReport.id == sar_id).first()
     if not sar:
         raise HTTPException(status_code=404, detail="SAR not found")
+    etag = entity_etag("sar", sar.id, sar.updated_at or sar.created_at)
+    cached = not_modified(request, etag)
+    if cached is not None:
+        return cached
+    set_cache_headers(response, etag)
     return sar
 
 
-@router.post("/{sar_id}/approve")
+@router.post("/{sar_id}/approve", response_class=ORJSONResponse)
 def approve_sar(sar_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
     sar = db.query(models.SARReport).filter(models.SARReport.id == sar_id).first()
     if not sar:
@@ -58,10 +70,35 @@ def approve_sar(sar_id: int, db: Session = Depends(get_db), user=Depends(get_cur
     return {"ok": True}
 
 
-@router.get("/", response_model=list[SARRead])
-def list_sars(db: Session = Depends(get_db), user=Depends(get_current_user)):
-    if user.role.value == 'admin':
-        sars = db.query(models.SARReport).all()
-    else:
-        sars = db.query(models.SARReport).filter(models.SARReport.created_by == user.id).all()
-    return sars
+# columns for the list view; narratives can be many KB each and are only needed per SAR
+SAR_LIST_COLUMNS = (
+    models.SARReport.id,
+    models.SARReport.sar_ref,
+    models.SARReport.case_id,
+    models.SARReport.created_by,
+    models.SARReport.approved,
+    models.SARReport.created_at,
+)
+
+
+@router.get("/", response_model=list[SARListItem])
+async def list_sars(
+    response: Response,
+    approved: Optional[bool] = None,
+    case_id: Optional[int] = None,
+    created_by: Optional[int] = None,
+    page: PageParams = Depends(),
+    db: AsyncSession = Depends(get_async_db),
+    user=Depends(get_current_user_async),
+):
+    stmt = select(*SAR_LIST_COLUMNS)
+    if user.role.value != 'admin':
+        stmt = stmt.where(models.SARReport.created_by == user.id)
+    if approved is not None:
+        stmt = stmt.where(models.SARReport.approved == approved)
+    if case_id is not None:
+        stmt = stmt.where(models.SARReport.case_id == case_id)
+    if created_by is not None:
+        stmt = stmt.where(models.SARReport.created_by == created_by)
+    result = await db.execute(page.apply(stmt, models.SARReport))
+    return page.page(result.all(), response)
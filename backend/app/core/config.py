@@ -8,12 +8,82 @@ class Settings(BaseSettings):
     BACKEND_CORS_ORIGINS: List[str] = Field(default=["http://localhost:3000"])  # frontend
 
     DATABASE_URL: str = Field(default="postgresql://postgres:postgres@db:5432/aegis")
+    # Async engine for read-heavy endpoints; derived from DATABASE_URL (asyncpg / aiosqlite) when unset
+    ASYNC_DATABASE_URL: str | None = None
+
+    # Read replicas for analytics reads (intelligence, dashboards, audit listing)
+    DATABASE_REPLICA_URLS: List[str] = Field(default=[])
+    REPLICA_MAX_LAG_SECONDS: float = Field(default=5.0)  # replicas further behind fall back to primary
+    REPLICA_CHECK_INTERVAL_SECONDS: float = Field(default=10.0)
+
+    # Connection pool (per process). pool_size + max_overflow bounds concurrent DB connections.
+    DB_POOL_SIZE: int = Field(default=20)
+    DB_MAX_OVERFLOW: int = Field(default=20)
+    DB_POOL_TIMEOUT: int = Field(default=30)  # seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = Field(default=1800)  # seconds; avoids connections killed by failover/idle timeouts
+    DB_POOL_PRE_PING: bool = Field(default=True)
+    DB_MAX_CONCURRENT_SESSIONS: int | None = None  # request sessions admitted at once; defaults to pool capacity
     CHROMA_API_URL: str = Field(default="http://chroma:8000")
 
     JWT_SECRET: str = Field(default="changeme-secret-in-prod")
     JWT_ALGORITHM: str = Field(default="HS256")
     ACCESS_TOKEN_EXPIRE_MINUTES: int = Field(default=60*24)
 
+    # Password hashing (bcrypt runs on a dedicated executor, not the request threadpool)
+    BCRYPT_ROUNDS: int = Field(default=12)
+    PASSWORD_HASH_WORKERS: int = Field(default=4)
+    PASSWORD_HASH_MAX_QUEUE: int = Field(default=64)
+
+    # Failed-login throttling, tracked per username and per client IP. Many users can share an IP (NAT, a
+    # corporate proxy), so it gets its own, higher limit; 0 turns the IP limit off
+    LOGIN_MAX_FAILED_ATTEMPTS: int = Field(default=5)
+    LOGIN_MAX_FAILED_ATTEMPTS_PER_IP: int = Field(default=100)
+    LOGIN_FAILURE_WINDOW_SECONDS: int = Field(default=300)
+    # Reverse proxies (IPs or CIDR ranges) whose X-Forwarded-For is trusted for the client IP
+    TRUSTED_PROXIES: List[str] = Field(default=[])
+
+    # Dashboard metrics pushed to /api/dashboard/stream subscribers
+    DASHBOARD_PUSH_INTERVAL_SECONDS: float = Field(default=5.0)  # one recompute per interval, shared by all clients
+    DASHBOARD_STREAM_KEEPALIVE_SECONDS: float = Field(default=15.0)
+
+    # In-process cache for aggregate endpoints; invalidated by local writes, expires for remote ones
+    RESPONSE_CACHE_TTL_SECONDS: float = Field(default=10.0)
+
+    # Response compression (brotli when installed and accepted, else gzip)
+    COMPRESSION_MINIMUM_SIZE: int = Field(default=1024)  # bytes; smaller bodies aren't worth the CPU
+    GZIP_COMPRESS_LEVEL: int = Field(default=6)
+    BROTLI_QUALITY: int = Field(default=4)
+
+    # Risk analysis looks back over these windows (days); each signal reports the one that produced it.
+    # Empty analyzes the whole history
+    RISK_LOOKBACK_WINDOWS: List[int] = Field(default=[30, 90, 365])
+
+    # Typology rules (services/rule_engine.py): how often each process checks typology_rules for edits
+    RULES_RELOAD_INTERVAL_SECONDS: float = Field(default=5.0)
+
+    # Real-time screening (/api/risk/screen): rolling per-customer state held in memory
+    SCREENING_WINDOW_DAYS: int = Field(default=30)
+    SCREENING_MAX_CUSTOMERS: int = Field(default=100_000)  # least recently screened are evicted first
+    SCREENING_STATE_TTL_SECONDS: float = Field(default=300.0)  # reloaded from the daily statistics after this
+    SCREENING_MAX_CLOCK_SKEW_SECONDS: float = Field(default=300.0)  # how far ahead of the server a timestamp may be
+
+    # Monitoring sweep (manage.py run-monitoring): customers assessed per batch and batches assessed at once.
+    # A run still marked running after MONITORING_RUN_TIMEOUT_SECONDS is assumed dead and no longer blocks the next
+    MONITORING_BATCH_SIZE: int = Field(default=1000)
+    MONITORING_WORKERS: int = Field(default=4)
+    MONITORING_RUN_TIMEOUT_SECONDS: int = Field(default=6 * 3600)
+
+    # Backtests (manage.py backtest): worker processes and customers per task
+    BACKTEST_WORKERS: int = Field(default=os.cpu_count() or 4)
+    BACKTEST_CHUNK_SIZE: int = Field(default=5000)
+
+    # Anomaly scoring (services/anomaly_service.py): the window the customer vectors cover, the share of the
+    # population flagged, customers sampled per fit (manage.py fit-anomaly-model) and how often processes reload
+    ANOMALY_WINDOW_DAYS: int = Field(default=90)
+    ANOMALY_CONTAMINATION: float = Field(default=0.01)
+    ANOMALY_FIT_SAMPLE: int = Field(default=200_000)
+    ANOMALY_RELOAD_INTERVAL_SECONDS: float = Field(default=60.0)
+
     OPENAI_API_KEY: str | None = None
 
     class Config:
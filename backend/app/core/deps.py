@@ -1,14 +1,15 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from .security import decode_access_token
-from ..db.session import get_db
+from ..db.session import get_db, get_async_db
 from .. import models
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+def _user_id_from_token(token: str) -> int:
     try:
         payload = decode_access_token(token)
     except Exception:
@@ -16,15 +17,39 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     user_id = payload.get("user_id") or payload.get("sub")
     if not user_id:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid auth token")
-    user = db.query(models.User).filter(models.User.id == int(user_id)).first()
+    return int(user_id)
+
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    user_id = _user_id_from_token(token)
+    user = db.query(models.User).filter(models.User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
 
 
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    """get_current_user for async endpoints; shares the endpoint's AsyncSession"""
+    user_id = _user_id_from_token(token)
+    user = await db.get(models.User, user_id)
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return user
+
+
+def _check_role(user, role: str):
+    if user.role.value != role and user.role.value != 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient role")
+    return user
+
+
 def require_role(role: str):
     def role_checker(user = Depends(get_current_user)):
-        if user.role.value != role and user.role.value != 'admin':
-            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Insufficient role")
-        return user
+        return _check_role(user, role)
+    return role_checker
+
+
+def require_role_async(role: str):
+    async def role_checker(user = Depends(get_current_user_async)):
+        return _check_role(user, role)
     return role_checker
@@ -0,0 +1,117 @@
+"""
+In-process throttling for failed login attempts.
+Failures are counted per username and per client IP over a sliding window, each
+with its own limit (an IP may be shared by a whole office); once either key
+exceeds its limit, login is rejected before any bcrypt work runs.
+"""
+from collections import OrderedDict, deque
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+import ipaddress
+import threading
+import time
+from .config import settings
+
+
+@lru_cache(maxsize=8)
+def _networks(proxies: Tuple[str, ...]) -> list:
+    return [ipaddress.ip_network(proxy, strict=False) for proxy in proxies]
+
+
+def _trusted(address: str, proxies: Sequence[str]) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _networks(tuple(proxies)))
+
+
+def client_ip(request, trusted_proxies: Optional[Sequence[str]] = None) -> Optional[str]:
+    """
+    The request's client address. Behind a trusted proxy it is the last
+    X-Forwarded-For hop that isn't itself a trusted proxy; the header is ignored
+    from anyone else, since clients can set it to anything
+    """
+    trusted_proxies = settings.TRUSTED_PROXIES if trusted_proxies is None else trusted_proxies
+    address = request.client.host if request.client else None
+    if not address or not trusted_proxies or not _trusted(address, trusted_proxies):
+        return address
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        address = hop
+        if not _trusted(hop, trusted_proxies):
+            break
+    return address
+
+
+class LoginAttemptLimiter:
+    """Sliding-window failure counter with LRU eviction to keep memory bounded"""
+
+    def __init__(self, max_failures: int, window_seconds: int, max_keys: int = 100_000,
+                 max_ip_failures: int = 0):
+        self.max_failures = max_failures
+        self.max_ip_failures = max_ip_failures  # 0: client IPs aren't throttled
+        self.window_seconds = window_seconds
+        self.max_keys = max_keys
+        self._failures: "OrderedDict[str, deque]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.blocked_total = 0
+
+    def _keys(self, username: str, ip: Optional[str]) -> List[Tuple[str, int]]:
+        """(key, limit) pairs a login attempt counts against"""
+        keys = [(f"user:{username.lower()}", self.max_failures)]
+        if ip and self.max_ip_failures:
+            keys.append((f"ip:{ip}", self.max_ip_failures))
+        return keys
+
+    def _prune(self, key: str, now: float) -> deque:
+        hits = self._failures.get(key)
+        if hits is None:
+            return deque()
+        while hits and now - hits[0] > self.window_seconds:
+            hits.popleft()
+        if not hits:
+            del self._failures[key]
+        return hits
+
+    def retry_after(self, username: str, ip: Optional[str] = None, now: Optional[float] = None) -> int:
+        """Seconds until the caller may try again; 0 when not throttled"""
+        now = now or time.monotonic()
+        wait = 0.0
+        with self._lock:
+            for key, limit in self._keys(username, ip):
+                hits = self._prune(key, now)
+                if len(hits) >= limit:
+                    wait = max(wait, self.window_seconds - (now - hits[0]))
+            if wait > 0:
+                self.blocked_total += 1
+        return int(wait) + 1 if wait > 0 else 0
+
+    def record_failure(self, username: str, ip: Optional[str] = None, now: Optional[float] = None):
+        now = now or time.monotonic()
+        with self._lock:
+            for key, limit in self._keys(username, ip):
+                hits = self._failures.setdefault(key, deque(maxlen=limit))
+                hits.append(now)
+                self._failures.move_to_end(key)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+
+    def reset(self, username: str):
+        # only the username key: a shared NAT IP keeps its own failure history
+        with self._lock:
+            self._failures.pop(f"user:{username.lower()}", None)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "tracked_keys": len(self._failures),
+                "blocked_total": self.blocked_total,
+                "max_failures": self.max_failures,
+                "max_ip_failures": self.max_ip_failures,
+                "window_seconds": self.window_seconds,
+            }
+
+
+login_limiter = LoginAttemptLimiter(settings.LOGIN_MAX_FAILED_ATTEMPTS, settings.LOGIN_FAILURE_WINDOW_SECONDS,
+                                   max_ip_failures=settings.LOGIN_MAX_FAILED_ATTEMPTS_PER_IP)
@@ -1,10 +1,91 @@
 from passlib.context import CryptContext
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from jose import jwt
-from typing import Optional
+from typing import Optional, Tuple
+import asyncio
+import threading
+import time
 from .config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes created with a different cost than BCRYPT_ROUNDS are flagged by
+# needs_update(), which lets login transparently upgrade them.
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+
+class HashQueueFull(Exception):
+    """Raised when the password hashing executor has no queue capacity left"""
+
+
+class PasswordHashExecutor:
+    """
+    Bounded executor for bcrypt work.
+    Keeps ~250ms hashes off the shared request threadpool and rejects new work
+    once max_queue jobs are pending, so a login burst cannot pile up unbounded.
+    """
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pwd-hash")
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._total_run = 0.0
+
+    def _acquire(self):
+        with self._lock:
+            if self._pending >= self.max_queue:
+                self._rejected += 1
+                raise HashQueueFull("Password hashing queue is full")
+            self._pending += 1
+            self._submitted += 1
+
+    def _wrap(self, fn, args, enqueued_at: float):
+        started = time.perf_counter()
+        wait = started - enqueued_at
+        with self._lock:
+            self._running += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+        try:
+            return fn(*args)
+        finally:
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._completed += 1
+                self._total_run += elapsed
+
+    async def run(self, fn, *args):
+        self._acquire()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._wrap, fn, args, time.perf_counter())
+
+    def metrics(self) -> dict:
+        with self._lock:
+            completed = self._completed or 1
+            return {
+                "workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._running,
+                "queued": self._pending - self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "avg_wait_ms": round(self._total_wait / completed * 1000, 2),
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                "avg_hash_ms": round(self._total_run / completed * 1000, 2),
+            }
+
+
+password_hasher = PasswordHashExecutor(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_QUEUE)
 
 
 def hash_password(password: str) -> str:
@@ -15,6 +96,28 @@ def verify_password(plain: str, hashed: str) -> bool:
     return pwd_context.verify(plain, hashed)
 
 
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.run(pwd_context.hash, password)
+
+
+async def verify_and_update_password(plain: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    """Verify on the hashing executor; returns (valid, new_hash) where new_hash is set when the cost changed"""
+    return await password_hasher.run(pwd_context.verify_and_update, plain, hashed)
+
+
+# Login verifies against this when no user matches, so an unknown username costs the
+# same bcrypt time as a wrong password; hashed on first use at the configured cost
+_unknown_user_hash: Optional[str] = None
+
+
+async def verify_unknown_user_password(plain: str) -> None:
+    """Spend one password verification on the hashing executor for a login that matched no user"""
+    global _unknown_user_hash
+    if _unknown_user_hash is None:
+        _unknown_user_hash = await password_hasher.run(pwd_context.hash, "unknown-user")
+    await password_hasher.run(pwd_context.verify, plain, _unknown_user_hash)
+
+
 def create_access_token(subject: str | dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = subject if isinstance(subject, dict) else {"sub": subject}
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
@@ -0,0 +1,147 @@
+"""
+Monthly range partitions of the transactions table (PostgreSQL).
+Migration 008 turns transactions into a table partitioned by RANGE (timestamp)
+with one partition per calendar month plus a DEFAULT partition for rows outside
+them; timestamp is NOT NULL there. Partitions are created on demand: bulk ingestion and
+ORM inserts call ensure_partitions() for the months they are about to write, and
+maintain_partitions() (run at startup and by `python manage.py maintain-partitions`)
+keeps the next few months ready in advance.
+
+On other databases, or on a PostgreSQL schema that hasn't been migrated, every
+function here is a no-op, so callers never need to check.
+"""
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Set
+from sqlalchemy import event, text
+from .. import models
+
+PARTITIONED_TABLE = "transactions"
+DEFAULT_PARTITION = f"{PARTITIONED_TABLE}_default"
+MONTHS_AHEAD = 3
+# serializes partition DDL across processes
+PARTITION_LOCK_KEY = 7_300_431
+
+# partitioned flag and known partitions per database, so the hot path is a set lookup
+_partitioned: Dict[str, bool] = {}
+_known: Dict[str, Set[date]] = {}
+
+
+def month_start(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def next_month(month: date) -> date:
+    return date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def add_months(month: date, count: int) -> date:
+    for _ in range(count):
+        month = next_month(month)
+    return month
+
+
+def partition_name(month: date) -> str:
+    return f"{PARTITIONED_TABLE}_y{month.year}m{month.month:02d}"
+
+
+def _database_key(connection) -> str:
+    return connection.engine.url.render_as_string(hide_password=True)
+
+
+def is_partitioned(connection) -> bool:
+    """Whether transactions is a partitioned table on this connection's database"""
+    if connection.dialect.name != "postgresql":
+        return False
+    key = _database_key(connection)
+    if key not in _partitioned:
+        _partitioned[key] = bool(connection.scalar(text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = :table AND c.relnamespace = to_regnamespace(current_schema())"
+        ), {"table": PARTITIONED_TABLE}))
+    return _partitioned[key]
+
+
+def _existing_months(connection) -> Set[date]:
+    names = connection.scalars(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = :table"
+    ), {"table": PARTITIONED_TABLE})
+    months = set()
+    for name in names:
+        suffix = name[len(PARTITIONED_TABLE) + 1:]
+        if suffix.startswith("y") and "m" in suffix:
+            year, month = suffix[1:].split("m")
+            months.add(date(int(year), int(month), 1))
+    return months
+
+
+def _create_partition(connection, month: date):
+    name, start, end = partition_name(month), month, next_month(month)
+    bounds = f"FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    has_rows = connection.scalar(text(
+        f'SELECT EXISTS (SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE timestamp >= :start AND timestamp < :end)'
+    ), {"start": start, "end": end})
+    if not has_rows:
+        connection.execute(text(f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{PARTITIONED_TABLE}" FOR VALUES {bounds}'))
+        return
+    # rows that landed in the default partition have to move into the new one,
+    # which PostgreSQL only allows while the default is detached
+    connection.execute(text(f'ALTER TABLE "{PARTITIONED_TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"'))
+    connection.execute(text(f'CREATE TABLE "{name}" PARTITION OF "{PARTITIONED_TABLE}" FOR VALUES {bounds}'))
+    connection.execute(text(
+        f'WITH moved AS (DELETE FROM "{DEFAULT_PARTITION}" WHERE timestamp >= :start AND timestamp < :end RETURNING *) '
+        f'INSERT INTO "{PARTITIONED_TABLE}" SELECT * FROM moved'
+    ), {"start": start, "end": end})
+    connection.execute(text(f'ALTER TABLE "{PARTITIONED_TABLE}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT'))
+
+
+def ensure_partitions(connection, months: Iterable[date]) -> List[str]:
+    """
+    Create the monthly partitions for months (first-of-month dates) that don't exist
+    yet, inside the connection's current transaction. Returns the names created.
+    """
+    if not is_partitioned(connection):
+        return []
+    key = _database_key(connection)
+    known = _known.setdefault(key, set())
+    missing = {month_start(month) for month in months} - known
+    if not missing:
+        return []
+    connection.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": PARTITION_LOCK_KEY})
+    existing = _existing_months(connection)
+    created = []
+    for month in sorted(missing - existing):
+        _create_partition(connection, month)
+        created.append(partition_name(month))
+    # only remembered once committed: a rollback also undoes the DDL
+    _after_commit(connection, lambda conn: known.update(existing | missing))
+    return created
+
+
+def _after_commit(connection, callback):
+    event.listen(connection, "commit", callback, once=True)
+
+
+def ensure_partitions_for(connection, timestamps: Iterable[Optional[datetime]]) -> List[str]:
+    """ensure_partitions for the months of these timestamps (None is skipped: the NOT NULL column rejects it)"""
+    if connection.dialect.name != "postgresql":
+        return []
+    return ensure_partitions(connection, {month_start(ts) for ts in timestamps if ts is not None})
+
+
+def maintain_partitions(connection, months_ahead: int = MONTHS_AHEAD, today: Optional[date] = None) -> List[str]:
+    """Make sure this month and the next months_ahead months have partitions"""
+    first = month_start(today or date.today())
+    return ensure_partitions(connection, [add_months(first, i) for i in range(months_ahead + 1)])
+
+
+@event.listens_for(models.Transaction, "before_insert")
+def _partition_on_insert(mapper, connection, target):
+    # the column default is applied after this hook, so an unset timestamp means now
+    ensure_partitions_for(connection, [target.timestamp or datetime.utcnow()])
+
+
+def reset_cache():
+    """Forget what is known about the database, e.g. after migrating it"""
+    _partitioned.clear()
+    _known.clear()
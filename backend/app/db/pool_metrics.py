@@ -0,0 +1,137 @@
+"""
+Connection pool instrumentation.
+Tracks how long requests wait to check out a connection, how long they hold it,
+how often the pool times out or has to replace stale connections, and how long
+requests queue for a session slot (see db.session.get_db).
+"""
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+import threading
+import time
+
+
+class PoolMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.checkouts = 0
+            self.checkins = 0
+            self.checked_out = 0
+            self.peak_checked_out = 0
+            self.timeouts = 0
+            self.invalidations = 0
+            self.connects = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self.total_hold = 0.0
+            self.max_hold = 0.0
+            self.sessions_active = 0
+            self.peak_sessions_active = 0
+            self.session_waits = 0
+            self.total_session_wait = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False):
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+                return
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def record_session_wait(self, seconds: float):
+        with self._lock:
+            self.sessions_active += 1
+            self.peak_sessions_active = max(self.peak_sessions_active, self.sessions_active)
+            if seconds > 0.001:
+                self.session_waits += 1
+                self.total_session_wait += seconds
+
+    def record_session_closed(self):
+        with self._lock:
+            self.sessions_active -= 1
+
+    def on_checkout(self, dbapi_conn, record, proxy):
+        record.info["checkout_at"] = time.perf_counter()
+        with self._lock:
+            self.checkouts += 1
+            self.checked_out += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+
+    def on_checkin(self, dbapi_conn, record):
+        started = record.info.pop("checkout_at", None)
+        with self._lock:
+            self.checkins += 1
+            if started is None:
+                return
+            self.checked_out -= 1
+            held = time.perf_counter() - started
+            self.total_hold += held
+            self.max_hold = max(self.max_hold, held)
+
+    def on_connect(self, dbapi_conn, record):
+        with self._lock:
+            self.connects += 1
+
+    def on_invalidate(self, dbapi_conn, record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self, pool=None) -> dict:
+        with self._lock:
+            checkouts = self.checkouts or 1
+            data = {
+                "checkouts": self.checkouts,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "connects": self.connects,
+                "avg_wait_ms": round(self.total_wait / checkouts * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "avg_hold_ms": round(self.total_hold / max(self.checkins, 1) * 1000, 3),
+                "max_hold_ms": round(self.max_hold * 1000, 3),
+                "sessions_active": self.sessions_active,
+                "peak_sessions_active": self.peak_sessions_active,
+                "session_waits": self.session_waits,
+                "total_session_wait_ms": round(self.total_session_wait * 1000, 3),
+            }
+        if pool is not None:
+            data["pool_status"] = pool.status()
+        return data
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that times connect() so checkout waits and timeouts are visible"""
+
+    metrics: PoolMetrics = None
+
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            conn = super().connect()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - started)
+        return conn
+
+
+def instrument_engine(engine, metrics: PoolMetrics):
+    pool = engine.pool
+    if isinstance(pool, InstrumentedQueuePool):
+        pool.metrics = metrics
+    event.listen(pool, "checkout", metrics.on_checkout)
+    event.listen(pool, "checkin", metrics.on_checkin)
+    event.listen(pool, "connect", metrics.on_connect)
+    event.listen(pool, "invalidate", metrics.on_invalidate)
+    return engine
+
+
+pool_metrics = PoolMetrics()
+async_pool_metrics = PoolMetrics()
@@ -0,0 +1,187 @@
+"""
+Read-replica routing for analytics workloads.
+Replicas come from Settings.DATABASE_REPLICA_URLS. Each replica's replication lag is
+probed at most every REPLICA_CHECK_INTERVAL_SECONDS; replicas that lag by more than
+REPLICA_MAX_LAG_SECONDS (or cannot be reached) are skipped, and when none are usable
+callers fall back to the primary.
+"""
+from sqlalchemy import create_engine, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from typing import Callable, List, Optional
+import itertools
+import threading
+import time
+
+# Seconds behind the primary. 0 when the replica has replayed everything it received,
+# so an idle primary doesn't make a caught-up replica look stale.
+LAG_QUERIES = {
+    "postgresql": (
+        "SELECT CASE WHEN NOT pg_is_in_recovery() "
+        "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+        "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+    ),
+}
+
+
+def default_lag_probe(conn) -> float:
+    sql = LAG_QUERIES.get(conn.dialect.name)
+    if sql is None:
+        # no replication lag to measure (e.g. a SQLite copy used for local testing)
+        conn.execute(text("SELECT 1"))
+        return 0.0
+    return float(conn.execute(text(sql)).scalar() or 0.0)
+
+
+class Replica:
+    def __init__(self, url: str, engine_kwargs: dict, async_url: Optional[str] = None):
+        self.url = url
+        self.async_url = async_url
+        self._engine_kwargs = engine_kwargs
+        self._engine = None
+        self._async_engine = None
+        self._sessionmaker = None
+        self._async_sessionmaker = None
+        self.lag: Optional[float] = None
+        self.healthy = False
+        self.checked_at = 0.0
+        self.last_error: Optional[str] = None
+        self.routed = 0
+
+    @property
+    def name(self) -> str:
+        return make_url(self.url).render_as_string(hide_password=True)
+
+    def engine(self):
+        if self._engine is None:
+            self._engine = create_engine(self.url, future=True, **self._engine_kwargs)
+        return self._engine
+
+    def async_engine(self):
+        if self._async_engine is None:
+            self._async_engine = create_async_engine(self.async_url, **self._engine_kwargs)
+        return self._async_engine
+
+    def sessionmaker(self):
+        if self._sessionmaker is None:
+            self._sessionmaker = sessionmaker(bind=self.engine(), autoflush=False, autocommit=False, future=True)
+        return self._sessionmaker
+
+    def async_sessionmaker(self):
+        if self._async_sessionmaker is None:
+            self._async_sessionmaker = async_sessionmaker(bind=self.async_engine(), autoflush=False, expire_on_commit=False, class_=AsyncSession)
+        return self._async_sessionmaker
+
+    def dispose(self):
+        if self._engine is not None:
+            self._engine.dispose()
+        if self._async_engine is not None:
+            self._async_engine.sync_engine.dispose(close=False)
+        self._engine = self._async_engine = None
+        self._sessionmaker = self._async_sessionmaker = None
+
+    async def dispose_async(self):
+        if self._async_engine is not None:
+            await self._async_engine.dispose()
+        self._async_engine = None
+        self._async_sessionmaker = None
+
+
+class ReplicaRouter:
+    def __init__(self, replicas: List[Replica], max_lag: float, check_interval: float,
+                 lag_probe: Callable = default_lag_probe):
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.lag_probe = lag_probe
+        self._cycle = itertools.cycle(replicas) if replicas else None
+        self._lock = threading.Lock()
+        self.primary_fallbacks = 0
+
+    def _record(self, replica: Replica, lag: Optional[float], error: Optional[Exception]):
+        replica.checked_at = time.monotonic()
+        replica.lag = lag
+        replica.last_error = str(error) if error else None
+        replica.healthy = error is None and lag is not None and lag <= self.max_lag
+
+    def _due(self, replica: Replica) -> bool:
+        return time.monotonic() - replica.checked_at >= self.check_interval
+
+    def check(self, replica: Replica):
+        try:
+            with replica.engine().connect() as conn:
+                lag = self.lag_probe(conn)
+        except Exception as e:
+            self._record(replica, None, e)
+            return
+        self._record(replica, lag, None)
+
+    async def check_async(self, replica: Replica):
+        try:
+            async with replica.async_engine().connect() as conn:
+                lag = await conn.run_sync(self.lag_probe)
+        except Exception as e:
+            self._record(replica, None, e)
+            return
+        self._record(replica, lag, None)
+
+    def _next_candidates(self) -> List[Replica]:
+        # round-robin starting point, then every other replica as a fallback
+        with self._lock:
+            first = next(self._cycle)
+        start = self.replicas.index(first)
+        return self.replicas[start:] + self.replicas[:start]
+
+    def _chosen(self, replica: Optional[Replica]) -> Optional[Replica]:
+        with self._lock:
+            if replica is None:
+                self.primary_fallbacks += 1
+            else:
+                replica.routed += 1
+        return replica
+
+    def pick(self) -> Optional[Replica]:
+        """A healthy replica, or None to use the primary"""
+        if not self.replicas:
+            return None
+        for replica in self._next_candidates():
+            if self._due(replica):
+                self.check(replica)
+            if replica.healthy:
+                return self._chosen(replica)
+        return self._chosen(None)
+
+    async def pick_async(self) -> Optional[Replica]:
+        if not self.replicas:
+            return None
+        for replica in self._next_candidates():
+            if self._due(replica):
+                await self.check_async(replica)
+            if replica.healthy:
+                return self._chosen(replica)
+        return self._chosen(None)
+
+    def dispose(self):
+        for replica in self.replicas:
+            replica.dispose()
+
+    async def dispose_async(self):
+        for replica in self.replicas:
+            await replica.dispose_async()
+
+    def metrics(self) -> dict:
+        return {
+            "max_lag_seconds": self.max_lag,
+            "primary_fallbacks": self.primary_fallbacks,
+            "replicas": [
+                {
+                    "url": r.name,
+                    "healthy": r.healthy,
+                    "lag_seconds": r.lag,
+                    "routed": r.routed,
+                    "last_error": r.last_error,
+                }
+                for r in self.replicas
+            ],
+        }
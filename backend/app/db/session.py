@@ -1,32 +1,225 @@
+from contextlib import asynccontextmanager, contextmanager
+import asyncio
+import time
 from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, scoped_session
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from starlette.concurrency import run_in_threadpool
 from ..core.config import settings
+from .pool_metrics import InstrumentedQueuePool, instrument_engine, pool_metrics, async_pool_metrics
+from .replicas import Replica, ReplicaRouter
 
 _engine = None
 _SessionLocal = None
+_request_slots = None
+_async_engine = None
+_AsyncSessionLocal = None
+_replica_router = None
+
+# async drivers used when ASYNC_DATABASE_URL is not set explicitly
+ASYNC_DRIVERS = {
+    "postgresql": "asyncpg",
+    "sqlite": "aiosqlite",
+}
+
+
+def _pool_kwargs(url: str, instrumented: bool = True) -> dict:
+    """Pool settings from Settings; in-memory SQLite keeps SQLAlchemy's single-connection pool"""
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite" and parsed.database in (None, "", ":memory:"):
+        return {}
+    kwargs = {"poolclass": InstrumentedQueuePool} if instrumented else {}
+    return {
+        **kwargs,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
 
 
 def get_engine():
     global _engine
     if _engine is None:
-        _engine = create_engine(settings.DATABASE_URL, future=True)
+        _engine = create_engine(settings.DATABASE_URL, future=True, **_pool_kwargs(settings.DATABASE_URL))
+        instrument_engine(_engine, pool_metrics)
     return _engine
 
 
-def get_session():
+def get_sessionmaker():
     global _SessionLocal
     if _SessionLocal is None:
-        engine = get_engine()
-        _SessionLocal = scoped_session(sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True))
+        _SessionLocal = sessionmaker(bind=get_engine(), autoflush=False, autocommit=False, future=True)
     return _SessionLocal
 
 
-def get_db():
+def get_session():
+    """Return a new Session; the caller owns it and must close() it"""
+    return get_sessionmaker()()
+
+
+@contextmanager
+def session_scope():
+    """Short-lived session for work done entirely inside one threadpool call"""
     db = get_session()
     try:
         yield db
     finally:
-        db.remove()
+        db.close()
+
+
+def _get_request_slots() -> asyncio.Semaphore:
+    global _request_slots
+    if _request_slots is None:
+        limit = settings.DB_MAX_CONCURRENT_SESSIONS or (settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW)
+        _request_slots = asyncio.Semaphore(limit)
+    return _request_slots
+
+
+@asynccontextmanager
+async def session_slot():
+    """
+    Admission for DB work from async code. A session can hold a connection while it
+    waits for a threadpool worker, so if threads were allowed to block on the pool,
+    busy threads would wait for connections whose holders are waiting for threads.
+    Waiting here happens on the event loop instead, and never more sessions are
+    admitted than the pool can serve.
+    """
+    slots = _get_request_slots()
+    started = time.perf_counter()
+    async with slots:
+        pool_metrics.record_session_wait(time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            pool_metrics.record_session_closed()
+
+
+async def get_db():
+    # one Session per request, closed (and its connection returned) when the request ends
+    async with session_slot():
+        db = get_session()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+
+async def run_with_session(fn, *args):
+    """Run fn(db, *args) in the threadpool with its own short-lived session"""
+    def call():
+        with session_scope() as db:
+            return fn(db, *args)
+
+    async with session_slot():
+        return await run_in_threadpool(call)
+
+
+def to_async_url(url: str) -> str:
+    """Swap a sync database URL's driver for its async counterpart"""
+    parsed = make_url(url)
+    driver = ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if driver is None:
+        raise ValueError(f"No async driver configured for {parsed.get_backend_name()}")
+    return parsed.set(drivername=f"{parsed.get_backend_name()}+{driver}").render_as_string(hide_password=False)
+
+
+def get_async_database_url() -> str:
+    """ASYNC_DATABASE_URL if set, else DATABASE_URL with its driver swapped for the async one"""
+    return settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+
+
+def get_async_engine():
+    global _async_engine
+    if _async_engine is None:
+        url = get_async_database_url()
+        _async_engine = create_async_engine(url, **_pool_kwargs(url, instrumented=False))
+        instrument_engine(_async_engine.sync_engine, async_pool_metrics)
+    return _async_engine
+
+
+def get_async_sessionmaker():
+    global _AsyncSessionLocal
+    if _AsyncSessionLocal is None:
+        _AsyncSessionLocal = async_sessionmaker(bind=get_async_engine(), autoflush=False, expire_on_commit=False, class_=AsyncSession)
+    return _AsyncSessionLocal
+
+
+async def get_async_db():
+    # async sessions wait for connections on the event loop, so they need no session slot
+    async with get_async_sessionmaker()() as db:
+        yield db
+
+
+def get_replica_router() -> ReplicaRouter:
+    global _replica_router
+    if _replica_router is None:
+        replicas = [
+            Replica(url, _pool_kwargs(url, instrumented=False), async_url=to_async_url(url))
+            for url in settings.DATABASE_REPLICA_URLS
+        ]
+        _replica_router = ReplicaRouter(replicas, settings.REPLICA_MAX_LAG_SECONDS, settings.REPLICA_CHECK_INTERVAL_SECONDS)
+    return _replica_router
+
+
+async def get_read_db():
+    """
+    Session for read-only analytics (intelligence, dashboards, audit listing).
+    Routed to a replica within the lag budget, otherwise to the primary. Never write with it.
+    """
+    async with session_slot():
+        replica = await run_in_threadpool(get_replica_router().pick)
+        db = replica.sessionmaker()() if replica else get_session()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+
+async def get_async_read_db():
+    """Async counterpart of get_read_db"""
+    replica = await get_replica_router().pick_async()
+    factory = replica.async_sessionmaker() if replica else get_async_sessionmaker()
+    async with factory() as db:
+        yield db
+
+
+def dispose_engine():
+    """Drop pooled connections and forget the engine, e.g. after failover or a settings change"""
+    global _engine, _SessionLocal, _request_slots, _async_engine, _AsyncSessionLocal, _replica_router
+    if _engine is not None:
+        _engine.dispose()
+    if _async_engine is not None:
+        # connections were opened on the event loop; drop them without awaiting
+        _async_engine.sync_engine.dispose(close=False)
+    if _replica_router is not None:
+        _replica_router.dispose()
+    _engine = None
+    _SessionLocal = None
+    _request_slots = None
+    _async_engine = None
+    _AsyncSessionLocal = None
+    _replica_router = None
+
+
+async def dispose_async_engine():
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is not None:
+        await _async_engine.dispose()
+    _async_engine = None
+    _AsyncSessionLocal = None
+    if _replica_router is not None:
+        await _replica_router.dispose_async()
+
+
+def get_pool_metrics() -> dict:
+    return pool_metrics.snapshot(_engine.pool if _engine is not None else None)
+
+
+def get_async_pool_metrics() -> dict:
+    return async_pool_metrics.snapshot(_async_engine.sync_engine.pool if _async_engine is not None else None)
 
 
 # helper used in startup
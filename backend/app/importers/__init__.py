@@ -0,0 +1,15 @@
+"""
+Bank statement importers: one parser per statement layout, and a streaming,
+page-parallel pipeline that feeds parsed transactions to the bulk writer, with
+per-file manifests that let an interrupted import resume.
+
+Adding a layout means subclassing StatementParser in a new module here, decorating
+it with @register_parser and importing the module below.
+"""
+from .registry import StatementParser, available_parsers, detect_parser, get_parser, register_parser  # noqa: F401
+from . import generic, hdfc  # noqa: F401  registers the built-in layouts
+from .pipeline import (  # noqa: F401
+    ImportMetrics, iter_statement_transactions, page_count, resolve_parser, write_transactions,
+)
+
+from .manifest import complete_manifest, file_sha256, open_manifest, record_checkpoint  # noqa: F401
@@ -0,0 +1,58 @@
+"""
+Fallback for statements without a registered layout: any line carrying a date and a
+decimal amount is a transaction. The date carries over to following lines, as many
+statements print it once per day. The side is inferred from credit keywords.
+"""
+from typing import List
+import re
+from .registry import AMOUNT_RE, StatementParser, parse_amount, register_parser
+
+DATE_RE = re.compile(
+    r'\d{1,2}[-/]\d{1,2}[-/]\d{2,4}'                                      # DD/MM/YYYY or DD-MM-YYYY
+    r'|\d{4}[-/]\d{2}[-/]\d{2}'                                           # YYYY-MM-DD
+    r'|(?:Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},?\s+\d{4}'  # Month DD, YYYY
+)
+CREDIT_RE = re.compile(r'\b(?:CR|CREDIT|DEPOSIT|RECEIVED|REFUND|INTEREST)\b', re.IGNORECASE)
+
+
+@register_parser
+class GenericStatementParser(StatementParser):
+    name = "generic"
+    description = "Any statement with one dated amount per line"
+    priority = -100
+    date_formats = (
+        '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y', '%d-%m-%y', '%Y-%m-%d', '%Y/%m/%d',
+        '%b %d, %Y', '%b %d %Y',
+    )
+
+    def detect(self, first_page_text: str) -> bool:
+        return True
+
+    def parse_text(self, text: str, page_num: int) -> List[dict]:
+        transactions = []
+        current_date = None
+        for line in text.split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            date_match = DATE_RE.search(line)
+            if date_match:
+                current_date = date_match.group(0)
+            if current_date is None:
+                continue
+            # only look for amounts after the date, so its digits aren't read as one
+            rest = line[date_match.end():] if date_match else line
+            amount_match = AMOUNT_RE.search(rest)
+            if not amount_match:
+                continue
+            amount = parse_amount(amount_match.group(0))
+            if amount <= 0:
+                continue
+            description = rest[:amount_match.start()].strip() or "Transaction from PDF"
+            balances = AMOUNT_RE.findall(rest[amount_match.end():])
+            transactions.append(self.transaction(
+                page_num, current_date, description, amount,
+                'deposit' if CREDIT_RE.search(description) else 'withdrawal',
+                balance=parse_amount(balances[-1]) if balances else None,
+            ))
+        return transactions
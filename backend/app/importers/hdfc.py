@@ -0,0 +1,114 @@
+"""
+HDFC Bank savings account statement:
+Date | Narration | Chq./Ref.No. | Value Dt | Withdrawal Amt. | Deposit Amt. | Closing Balance
+Narrations wrap onto continuation lines under the narration column.
+"""
+from bisect import bisect_right
+from typing import List, Optional
+import re
+from .registry import AMOUNT_RE, StatementParser, parse_amount, register_parser
+
+DATE_RE = re.compile(r'(\d{2}/\d{2}/\d{2})')
+ROW_DATE_RE = re.compile(r'\d{2}/\d{2}/\d{2}')
+CHANNELS = ('UPI', 'NEFT', 'IMPS')
+CREDIT_WORDS = ('CR', 'CREDIT', 'DEPOSIT', 'RECEIVED')
+
+# right-hand x edge of each column but the last, in PDF points
+COLUMN_EDGES = (68, 255, 357, 397, 475, 552)
+DATE, NARRATION, REF, VALUE_DATE, WITHDRAWAL, DEPOSIT, BALANCE = range(7)
+LINE_TOLERANCE = 2.0
+# rows are ~17pt apart; a larger gap means the table has ended (statement summary, footer)
+MAX_CONTINUATION_GAP = 25.0
+
+
+@register_parser
+class HDFCStatementParser(StatementParser):
+    name = "hdfc"
+    description = "HDFC Bank statement of account"
+    priority = 10
+    date_formats = ('%d/%m/%y', '%d/%m/%Y')
+
+    def detect(self, first_page_text: str) -> bool:
+        return 'WithdrawalAmt' in first_page_text and 'ClosingBalance' in first_page_text
+
+    def parse_words(self, words: List[dict], page_num: int) -> Optional[List[dict]]:
+        rows = []
+        current = None
+        current_top = 0.0
+        for line in _lines(words):
+            top = line[0]['top']
+            cells = {}
+            for word in line:
+                column = bisect_right(COLUMN_EDGES, (word['x0'] + word['x1']) / 2)
+                cells.setdefault(column, []).append(word['text'])
+            date = ' '.join(cells.get(DATE, ()))
+            if ROW_DATE_RE.fullmatch(date) and BALANCE in cells:
+                current = {column: ' '.join(texts) for column, texts in cells.items()}
+                rows.append(current)
+                current_top = top
+            elif current is not None and set(cells) <= {NARRATION, REF} and top - current_top <= MAX_CONTINUATION_GAP:
+                # wrapped narration: the statement breaks lines mid-token
+                current[NARRATION] = current.get(NARRATION, '') + ''.join(cells.get(NARRATION, ()))
+                current_top = top
+            else:
+                current = None
+
+        transactions = []
+        for row in rows:
+            withdrawal = parse_amount(row.get(WITHDRAWAL))
+            deposit = parse_amount(row.get(DEPOSIT))
+            amount = deposit or withdrawal
+            if amount > 0:
+                transactions.append(self.transaction(
+                    page_num, row[DATE], row.get(NARRATION, 'Transaction'), amount,
+                    'deposit' if deposit else 'withdrawal',
+                    balance=parse_amount(row[BALANCE]), ref_no=row.get(REF, ''),
+                ))
+        return transactions
+
+    def parse_text(self, text: str, page_num: int) -> List[dict]:
+        """Line-based fallback for text without word positions; infers the side from the narration"""
+        transactions = []
+        for line in text.split('\n'):
+            date_match = DATE_RE.search(line)
+            if not date_match or 'WithdrawalAmt' in line or 'DepositAmt' in line:
+                continue
+            amounts = AMOUNT_RE.findall(line)
+            if len(amounts) < 2:
+                continue
+
+            txn_date = date_match.group(1)
+            narration_start = line.find(txn_date) + len(txn_date)
+            first_amount_pos = line.find(amounts[0])
+            narration = line[narration_start:first_amount_pos].strip() if first_amount_pos > narration_start else "Transaction"
+
+            # the last amount is the closing balance
+            closing_balance = parse_amount(amounts[-1])
+            withdrawal_amt = deposit_amt = 0.0
+            if len(amounts) == 3:
+                withdrawal_amt = parse_amount(amounts[0])
+                deposit_amt = parse_amount(amounts[1]) if amounts[1] != amounts[-1] else 0.0
+            elif len(amounts) == 2:
+                txn_amt = parse_amount(amounts[0])
+                if any(channel in narration for channel in CHANNELS) and any(w in narration.upper() for w in CREDIT_WORDS):
+                    deposit_amt = txn_amt
+                else:
+                    withdrawal_amt = txn_amt
+
+            amount = deposit_amt if deposit_amt > 0 else withdrawal_amt
+            if amount > 0:
+                transactions.append(self.transaction(
+                    page_num, txn_date, narration, amount,
+                    'deposit' if deposit_amt > 0 else 'withdrawal', balance=closing_balance,
+                ))
+        return transactions
+
+
+def _lines(words: List[dict]) -> List[List[dict]]:
+    lines: List[List[dict]] = []
+    for word in sorted(words, key=lambda w: (round(w['top']), w['x0'])):
+        if lines and abs(word['top'] - lines[-1][0]['top']) <= LINE_TOLERANCE:
+            lines[-1].append(word)
+        else:
+            lines.append([word])
+    return lines
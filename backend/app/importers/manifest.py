@@ -0,0 +1,92 @@
+"""
+Import manifests.
+Every imported file is identified by the SHA-256 of its contents and gets one
+ImportManifest row. Importers commit a checkpoint together with the rows of each
+completed page (statements) or batch (CSV/Parquet), so when an import is
+interrupted, running it again over the same file resumes after the last checkpoint,
+and running it over a completed file is a no-op unless a restart is asked for.
+"""
+from datetime import datetime
+from typing import IO, Dict, Mapping, Optional, Union
+import hashlib
+import json
+from sqlalchemy import select
+from ..models import ImportManifest
+
+HASH_BLOCK_SIZE = 1 << 20
+
+
+def file_sha256(source: Union[str, IO[bytes]]) -> str:
+    """Content hash of a path or a seekable binary file (whose position is restored)"""
+    digest = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            while block := f.read(HASH_BLOCK_SIZE):
+                digest.update(block)
+        return digest.hexdigest()
+    position = source.tell()
+    source.seek(0)
+    while block := source.read(HASH_BLOCK_SIZE):
+        digest.update(block)
+    source.seek(position)
+    return digest.hexdigest()
+
+
+def open_manifest(
+    db,
+    source_hash: str,
+    kind: str,
+    source_name: Optional[str] = None,
+    account_id: Optional[int] = None,
+    unit_size: Optional[int] = None,
+    restart: bool = False,
+) -> ImportManifest:
+    """
+    The manifest for this file, created if it's new and reset to the beginning
+    when restart is given. Committed, so it outlives a crash before the first
+    checkpoint. Callers resume after manifest.checkpoint unless status is completed.
+    """
+    manifest = db.scalar(
+        select(ImportManifest).where(ImportManifest.source_hash == source_hash, ImportManifest.kind == kind)
+    )
+    if manifest is None:
+        manifest = ImportManifest(source_hash=source_hash, kind=kind, checkpoint=0, inserted=0, skipped=0)
+        db.add(manifest)
+    elif restart:
+        manifest.checkpoint = manifest.inserted = manifest.skipped = 0
+        manifest.occurrences = None
+    if manifest.checkpoint == 0:
+        # nothing committed yet, so the caller's settings win
+        manifest.unit_size = unit_size
+        manifest.account_id = account_id
+    if restart or manifest.checkpoint == 0:
+        manifest.status = "running"
+        manifest.completed_at = None
+    manifest.source_name = source_name or manifest.source_name
+    db.commit()
+    return manifest
+
+
+def record_checkpoint(db, manifest: ImportManifest, unit: int, counts: Dict[str, int],
+                      occurrences: Optional[Mapping[str, int]] = None):
+    """
+    Commit the rows written so far together with the page/batch number they complete
+    and, for importers that number identical rows, how often each has been seen
+    """
+    manifest.checkpoint = unit
+    manifest.inserted += counts["inserted"]
+    manifest.skipped += counts["skipped"]
+    if occurrences is not None:
+        manifest.occurrences = json.dumps(occurrences, separators=(",", ":"))
+    db.commit()
+
+
+def checkpoint_occurrences(manifest: ImportManifest) -> Dict[str, int]:
+    """The occurrence counts recorded with the manifest's checkpoint; empty before the first"""
+    return json.loads(manifest.occurrences) if manifest.checkpoint and manifest.occurrences else {}
+
+
+def complete_manifest(db, manifest: ImportManifest):
+    manifest.status = "completed"
+    manifest.completed_at = datetime.utcnow()
+    db.commit()
@@ -0,0 +1,215 @@
+"""
+Streaming, page-parallel statement extraction.
+Pages are split into small batches and parsed by a process pool (pdfplumber layout
+analysis is pure Python and CPU bound, so threads would serialize on the GIL).
+iter_statement_transactions() yields transactions in page order as soon as each
+batch finishes, keeping only a bounded window of batches in flight, so the DB
+writer consumes the first pages while later ones are still being extracted and
+the full statement is never held in memory.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import os
+import statistics
+import time
+from ..models import ImportManifest
+from ..services.transaction_ingest_service import bulk_insert_transactions, transaction_fingerprint
+from .manifest import checkpoint_occurrences, record_checkpoint
+from .registry import StatementParser, detect_parser, get_parser
+
+try:
+    import pdfplumber
+    PDFPLUMBER_AVAILABLE = True
+except ImportError:
+    PDFPLUMBER_AVAILABLE = False
+
+# enough pages to amortize task overhead, small enough that the first
+# transactions reach the writer quickly
+PAGES_PER_TASK = 4
+
+
+class ImportMetrics:
+    """Per-page extraction timings; pass as on_page to iter_statement_transactions"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.page_seconds: Dict[int, float] = {}
+        self.transactions = 0
+
+    def __call__(self, page_number: int, transaction_count: int, seconds: float):
+        self.page_seconds[page_number] = seconds
+        self.transactions += transaction_count
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.started
+        timings = sorted(self.page_seconds.values()) or [0.0]
+        return {
+            "pages": len(self.page_seconds),
+            "transactions": self.transactions,
+            "elapsed_seconds": round(elapsed, 3),
+            "pages_per_second": round(len(self.page_seconds) / elapsed, 2) if elapsed else 0.0,
+            "transactions_per_second": round(self.transactions / elapsed, 1) if elapsed else 0.0,
+            "page_ms_median": round(statistics.median(timings) * 1000, 1),
+            "page_ms_p95": round(timings[int(0.95 * (len(timings) - 1))] * 1000, 1),
+            "page_ms_max": round(timings[-1] * 1000, 1),
+            "slowest_page": max(self.page_seconds, key=self.page_seconds.get) if self.page_seconds else None,
+        }
+
+
+def _require_pdfplumber():
+    if not PDFPLUMBER_AVAILABLE:
+        raise RuntimeError("pdfplumber is required for statement import: pip install pdfplumber")
+
+
+def page_count(path: str, password: Optional[str] = None) -> int:
+    _require_pdfplumber()
+    with pdfplumber.open(path, password=password) as pdf:
+        return len(pdf.pages)
+
+
+def resolve_parser(path: str, password: Optional[str] = None, name: Optional[str] = None) -> StatementParser:
+    """The named parser, or the highest priority one that recognises the first page"""
+    if name:
+        return get_parser(name)
+    _require_pdfplumber()
+    with pdfplumber.open(path, password=password, pages=[1]) as pdf:
+        first_page = pdf.pages[0].extract_text() if pdf.pages else ''
+    return detect_parser(first_page or '')
+
+
+# documents opened by this pool worker, kept for the worker's lifetime so each
+# batch is a page lookup rather than a re-parse of the document structure
+_worker_documents: Dict[Tuple[str, Optional[str]], "pdfplumber.PDF"] = {}
+
+
+def _extract_page(parser: StatementParser, page) -> Tuple[int, List[dict], float]:
+    started = time.perf_counter()
+    transactions = parser.parse_page(page)
+    # release the parsed layout before moving on to the next page
+    page.close()
+    return page.page_number, transactions, time.perf_counter() - started
+
+
+def extract_pages(path: str, password: Optional[str], parser_name: str,
+                  page_numbers: Sequence[int]) -> List[Tuple[int, List[dict], float]]:
+    """Worker task: (page number, transactions, seconds) for each 1-based page number"""
+    _require_pdfplumber()
+    key = (path, password)
+    pdf = _worker_documents.get(key)
+    if pdf is None:
+        pdf = _worker_documents[key] = pdfplumber.open(path, password=password)
+    parser = get_parser(parser_name)
+    return [_extract_page(parser, pdf.pages[number - 1]) for number in page_numbers]
+
+
+def _batches(pages: int, pages_per_task: int, first_page: int = 1) -> Iterator[List[int]]:
+    for start in range(first_page, pages + 1, pages_per_task):
+        yield list(range(start, min(start + pages_per_task, pages + 1)))
+
+
+def iter_statement_transactions(
+    path: str,
+    password: Optional[str] = None,
+    parser: Optional[str] = None,
+    workers: Optional[int] = None,
+    pages_per_task: int = PAGES_PER_TASK,
+    on_page: Optional[Callable[[int, int, float], None]] = None,
+    first_page: int = 1,
+) -> Iterator[dict]:
+    """
+    Yield every transaction in the statement from first_page on, in page order,
+    parsed with the named layout (detected from the first page when not given).
+    workers=1 extracts in this process; otherwise at most 2 * workers page batches
+    are in flight at once. on_page(page_number, transaction_count, seconds) is called
+    as each page is yielded.
+    """
+    layout = resolve_parser(path, password, parser)
+    workers = workers or os.cpu_count() or 1
+
+    def emit(results):
+        for page_number, transactions, seconds in results:
+            if on_page:
+                on_page(page_number, len(transactions), seconds)
+            yield from transactions
+
+    if workers <= 1:
+        with pdfplumber.open(path, password=password) as pdf:
+            for page in pdf.pages[first_page - 1:]:
+                yield from emit([_extract_page(layout, page)])
+        return
+
+    pages = page_count(path, password)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        for batch in _batches(pages, pages_per_task, first_page):
+            pending.append(pool.submit(extract_pages, path, password, layout.name, batch))
+            if len(pending) >= 2 * workers:
+                yield from emit(pending.popleft().result())
+        while pending:
+            yield from emit(pending.popleft().result())
+
+
+def write_transactions(
+    db,
+    transactions: Iterable[dict],
+    account_id: int,
+    txn_prefix: str,
+    batch_size: int = 500,
+    manifest: Optional[ImportManifest] = None,
+) -> Dict[str, int]:
+    """
+    Persist streamed transactions as they arrive, one bulk insert per batch_size rows,
+    cut at page boundaries. Each row gets a content fingerprint and its txn_id is
+    txn_prefix plus the start of that fingerprint, so re-importing a statement skips
+    rows that already exist even if parsing changes moved them around. The running
+    balance, where printed, tells identical rows apart; otherwise they are numbered
+    across the whole statement. Rows whose date didn't parse are counted as rejected
+    and not written. With a manifest, every bulk insert is committed with a
+    checkpoint at its last page, together with how often each row without a balance
+    has been seen so far, and a resumed import carries on numbering from there.
+    """
+    counts = {"inserted": 0, "skipped": 0, "rejected": 0}
+    rows: List[dict] = []
+    page = None
+    # only rows without a balance can repeat across pages, so only theirs are checkpointed
+    unbalanced = Counter(checkpoint_occurrences(manifest) if manifest is not None else {})
+    seen = Counter(unbalanced)
+
+    def flush():
+        written = bulk_insert_transactions(db, rows, chunk_size=batch_size)
+        counts["inserted"] += written["inserted"]
+        counts["skipped"] += written["skipped"]
+        if manifest is not None:
+            record_checkpoint(db, manifest, page, written, occurrences=unbalanced)
+        rows.clear()
+
+    for txn in transactions:
+        if txn['page'] != page:
+            if len(rows) >= batch_size:
+                flush()
+            page = txn['page']
+        if txn['timestamp'] is None:
+            counts["rejected"] += 1
+            continue
+        fields = (account_id, txn['timestamp'], txn['amount'], txn['narration'], txn['ref_no'])
+        fingerprint = transaction_fingerprint(*fields, balance=txn['balance'])
+        seen[fingerprint] += 1
+        if txn['balance'] is None:
+            unbalanced[fingerprint] += 1
+        if seen[fingerprint] > 1:
+            # an identical row earlier in the statement
+            fingerprint = transaction_fingerprint(*fields, occurrence=seen[fingerprint] - 1, balance=txn['balance'])
+        rows.append({
+            'txn_id': f"{txn_prefix}{fingerprint[:16].upper()}",
+            'account_id': account_id,
+            'amount': txn['amount'],
+            'txn_type': txn['txn_type'],
+            'meta_data': f"Page: {txn['page']} | {txn['narration']} | Ref: {txn['ref_no']} | Balance: {txn['balance']}",
+            'narration': txn['narration'],
+            'timestamp': txn['timestamp'],
+            'fingerprint': fingerprint,
+        })
+    if rows:
+        flush()
+    return counts
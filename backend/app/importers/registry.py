@@ -0,0 +1,102 @@
+"""
+Statement parser registry.
+Each bank layout is a StatementParser subclass registered under a short name. A
+parser turns one pdfplumber page into transaction dicts; when the layout is a
+fixed-column table it reads word positions (table extraction), otherwise it falls
+back to matching precompiled patterns against the page text.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Type
+import re
+
+AMOUNT_RE = re.compile(r'\d[\d,]*\.\d{2}')
+
+_parsers: Dict[str, "StatementParser"] = {}
+
+
+def parse_amount(amount_str: Optional[str]) -> float:
+    if not amount_str or amount_str.strip() == '':
+        return 0.0
+    try:
+        return float(amount_str.replace(',', '').strip())
+    except ValueError:
+        return 0.0
+
+
+class StatementParser:
+    """
+    Base class for a statement layout. Subclasses set name and date_formats and
+    implement parse_text(); layouts with fixed columns also implement parse_words().
+    Parsed transactions are dicts with timestamp, narration, ref_no, amount,
+    txn_type ('deposit'/'withdrawal'), balance (None if not printed) and page;
+    timestamp is None when the date matches none of date_formats.
+    """
+    name: str = ""
+    description: str = ""
+    # higher priority parsers get the first chance to claim a statement in detect()
+    priority: int = 0
+    date_formats: Sequence[str] = ()
+
+    def detect(self, first_page_text: str) -> bool:
+        return False
+
+    def parse_date(self, date_str: str) -> Optional[datetime]:
+        for fmt in self.date_formats:
+            try:
+                return datetime.strptime(date_str, fmt)
+            except (TypeError, ValueError):
+                continue
+        return None
+
+    def parse_text(self, text: str, page_num: int) -> List[dict]:
+        raise NotImplementedError
+
+    def parse_words(self, words: List[dict], page_num: int) -> Optional[List[dict]]:
+        """Rows rebuilt from pdfplumber word boxes, or None when the layout has no fixed columns"""
+        return None
+
+    def parse_page(self, page) -> List[dict]:
+        transactions = self.parse_words(page.extract_words(), page.page_number)
+        if transactions is None:
+            transactions = self.parse_text(page.extract_text() or '', page.page_number)
+        return transactions
+
+    def transaction(self, page_num: int, date_str: str, narration: str, amount: float, txn_type: str,
+                    balance: Optional[float] = None, ref_no: str = '') -> dict:
+        return {
+            'timestamp': self.parse_date(date_str),
+            'narration': narration[:500],
+            'ref_no': ref_no,
+            'amount': amount,
+            'txn_type': txn_type,
+            'balance': balance,
+            'page': page_num,
+        }
+
+
+def register_parser(cls: Type[StatementParser]) -> Type[StatementParser]:
+    """Class decorator adding a layout to the registry"""
+    if not cls.name:
+        raise ValueError(f"{cls.__name__} needs a name to be registered")
+    if cls.name in _parsers:
+        raise ValueError(f"Statement parser '{cls.name}' is already registered")
+    _parsers[cls.name] = cls()
+    return cls
+
+
+def get_parser(name: str) -> StatementParser:
+    try:
+        return _parsers[name]
+    except KeyError:
+        raise ValueError(f"Unknown statement parser '{name}' (available: {', '.join(sorted(_parsers))})")
+
+
+def available_parsers() -> List[StatementParser]:
+    return sorted(_parsers.values(), key=lambda p: -p.priority)
+
+
+def detect_parser(first_page_text: str) -> StatementParser:
+    for parser in available_parsers():
+        if parser.detect(first_page_text):
+            return parser
+    raise ValueError("No statement parser recognises this layout")
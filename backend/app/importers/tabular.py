@@ -0,0 +1,281 @@
+"""
+CSV / Parquet transaction ingestion.
+Files are read in record batches (pyarrow when installed, the csv module otherwise),
+each batch is mapped onto Transaction columns, its account references are resolved
+against a per-file cache, and it is bulk inserted and committed before the next
+batch is read, so memory stays bounded by the batch size whatever the file size.
+Each commit records a checkpoint in the file's import manifest, so an interrupted
+load picks up at the next batch when the same file is ingested again.
+"""
+from collections import Counter
+from datetime import datetime
+from itertools import islice
+from typing import IO, Dict, Iterator, List, Optional
+import csv
+import io
+from sqlalchemy import select
+from ..models import Account, Customer
+from ..services.transaction_ingest_service import bulk_insert_transactions, transaction_fingerprint
+from .manifest import complete_manifest, file_sha256, open_manifest, record_checkpoint
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pa_parquet
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+TABULAR_BATCH_SIZE = 10_000
+FORMATS = ("csv", "parquet")
+MAX_REPORTED_ERRORS = 20
+
+# field -> source column names tried in order (case-insensitive)
+DEFAULT_COLUMN_MAPPING = {
+    "txn_id": ("txn_id", "transaction_id", "reference", "ref_no"),
+    "account_id": ("account_id", "account", "account_number"),
+    "customer_id": ("customer_id", "customer"),
+    "amount": ("amount", "txn_amount"),
+    "txn_type": ("txn_type", "type", "transaction_type"),
+    "timestamp": ("timestamp", "date", "txn_date", "transaction_date"),
+    "meta_data": ("meta_data", "narration", "description", "memo"),
+}
+REQUIRED_FIELDS = ("txn_id", "account_id", "amount")
+DATE_FORMATS = ('%d/%m/%Y', '%d/%m/%y', '%d-%m-%Y')
+
+
+class IngestError(ValueError):
+    """The file can't be ingested at all (unknown format, missing required columns)"""
+
+
+def detect_format(filename: str, declared: Optional[str] = None) -> str:
+    fmt = (declared or filename.rsplit('.', 1)[-1]).lower()
+    if fmt not in FORMATS:
+        raise IngestError(f"Unsupported format '{fmt}' (expected one of: {', '.join(FORMATS)})")
+    if fmt == "parquet" and not PYARROW_AVAILABLE:
+        raise IngestError("Parquet ingestion requires pyarrow: pip install pyarrow")
+    return fmt
+
+
+def resolve_columns(header: List[str], mapping: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """field -> source column, from an explicit mapping or the default aliases"""
+    by_name = {name.strip().lower(): name for name in header}
+    columns = {}
+    for field, aliases in DEFAULT_COLUMN_MAPPING.items():
+        if mapping and field in mapping:
+            if mapping[field] not in header:
+                raise IngestError(f"Mapped column '{mapping[field]}' for {field} is not in the file")
+            columns[field] = mapping[field]
+            continue
+        for alias in aliases:
+            if alias in by_name:
+                columns[field] = by_name[alias]
+                break
+    missing = [field for field in REQUIRED_FIELDS if field not in columns]
+    if missing:
+        raise IngestError(f"No column for {', '.join(missing)} (columns: {', '.join(header)})")
+    return columns
+
+
+def _csv_header(source: IO[bytes]) -> List[str]:
+    first_line = source.readline()
+    source.seek(0)
+    return next(csv.reader([first_line.decode('utf-8-sig')]), [])
+
+
+def iter_batches(source: IO[bytes], fmt: str, batch_size: int = TABULAR_BATCH_SIZE) -> Iterator[tuple]:
+    """Yield (header, rows) per record batch; rows are dicts keyed by source column"""
+    if fmt == "parquet":
+        parquet = pa_parquet.ParquetFile(source)
+        header = parquet.schema_arrow.names
+        for batch in parquet.iter_batches(batch_size=batch_size):
+            yield header, batch.to_pylist()
+        return
+
+    header = _csv_header(source)
+    if PYARROW_AVAILABLE:
+        # every column is read as text: streaming type inference only sees the
+        # first block, and mapping converts the values itself
+        reader = pa_csv.open_csv(
+            source,
+            read_options=pa_csv.ReadOptions(block_size=1 << 20),
+            convert_options=pa_csv.ConvertOptions(column_types={name: pa.string() for name in header}),
+        )
+        pending: List[dict] = []
+        for batch in reader:
+            pending.extend(batch.to_pylist())
+            while len(pending) >= batch_size:
+                yield header, pending[:batch_size]
+                pending = pending[batch_size:]
+        if pending:
+            yield header, pending
+        return
+
+    rows = csv.DictReader(io.TextIOWrapper(source, encoding='utf-8-sig', newline=''))
+    while batch := list(islice(rows, batch_size)):
+        yield header, batch
+
+
+def _parse_timestamp(value) -> Optional[datetime]:
+    if value is None or isinstance(value, datetime):
+        return value
+    value = str(value).strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognised date '{value}'")
+
+
+def _text(value) -> Optional[str]:
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def map_row(row: dict, columns: Dict[str, str]) -> dict:
+    """Source row -> transaction fields; raises ValueError for unusable rows"""
+    values = {field: row.get(column) for field, column in columns.items()}
+    txn_id, account = _text(values.get("txn_id")), _text(values.get("account_id"))
+    if not txn_id or not account:
+        raise ValueError("missing txn_id or account")
+    timestamp = _parse_timestamp(values.get("timestamp"))
+    if timestamp is None:
+        raise ValueError("missing timestamp")
+    amount = values.get("amount")
+    amount = float(amount.replace(',', '')) if isinstance(amount, str) else float(amount)
+    txn_type = _text(values.get("txn_type"))
+    if txn_type is None:
+        # signed amounts: debits are negative
+        txn_type = "withdrawal" if amount < 0 else "deposit"
+    return {
+        "txn_id": txn_id,
+        "account": account,
+        "customer": _text(values.get("customer_id")),
+        "amount": abs(amount),
+        "txn_type": txn_type,
+        "timestamp": timestamp,
+        "meta_data": _text(values.get("meta_data")),
+    }
+
+
+class AccountLookup:
+    """account_id -> accounts.id for one file; each unseen id is queried once per batch"""
+
+    def __init__(self, db, create_missing: bool = False):
+        self.db = db
+        self.create_missing = create_missing
+        self.ids: Dict[str, Optional[int]] = {}
+        self.created = 0
+
+    def resolve(self, rows: List[dict]):
+        unseen = {row["account"] for row in rows} - self.ids.keys()
+        if not unseen:
+            return
+        found = dict(self.db.execute(select(Account.account_id, Account.id).where(Account.account_id.in_(unseen))).all())
+        self.ids.update(found)
+        missing = unseen - found.keys()
+        if self.create_missing:
+            owners = {row["account"]: row["customer"] for row in rows if row["account"] in missing and row["customer"]}
+            self._create(owners)
+            missing -= owners.keys()
+        for account in missing:
+            self.ids[account] = None
+
+    def _create(self, owners: Dict[str, str]):
+        if not owners:
+            return
+        customer_ids = set(owners.values())
+        customers = dict(self.db.execute(
+            select(Customer.customer_id, Customer.id).where(Customer.customer_id.in_(customer_ids))
+        ).all())
+        for customer_id in customer_ids - customers.keys():
+            customer = Customer(customer_id=customer_id, name=customer_id)
+            self.db.add(customer)
+            self.db.flush()
+            customers[customer_id] = customer.id
+        accounts = [Account(account_id=account, customer_id=customers[owner]) for account, owner in owners.items()]
+        self.db.add_all(accounts)
+        self.db.flush()
+        self.ids.update({account.account_id: account.id for account in accounts})
+        self.created += len(accounts)
+
+
+def ingest_file(
+    db,
+    source: IO[bytes],
+    fmt: str,
+    mapping: Optional[Dict[str, str]] = None,
+    create_accounts: bool = False,
+    batch_size: int = TABULAR_BATCH_SIZE,
+    source_name: Optional[str] = None,
+    restart: bool = False,
+) -> dict:
+    """
+    Load a CSV/Parquet file of transactions, committing after each batch.
+    Rows with missing fields, unparseable values or an unknown account are rejected
+    (with create_accounts, unknown accounts that carry a customer_id are created).
+    A file seen before resumes after its last committed batch, using the batch size
+    it started with; a completed file is not read again unless restart is given.
+    """
+    result = {"rows": 0, "inserted": 0, "skipped": 0, "rejected": 0, "accounts_created": 0, "batches": 0, "errors": []}
+    manifest = open_manifest(db, file_sha256(source), fmt, source_name, unit_size=batch_size, restart=restart)
+    result.update(manifest_id=manifest.id, resumed_from_batch=manifest.checkpoint,
+                  already_imported=manifest.status == "completed")
+    if result["already_imported"]:
+        return result
+
+    accounts = AccountLookup(db, create_missing=create_accounts)
+    columns = None
+    for number, (header, batch) in enumerate(iter_batches(source, fmt, manifest.unit_size or batch_size), 1):
+        if columns is None:
+            columns = resolve_columns(header, mapping)
+        if number <= manifest.checkpoint:
+            continue
+        offset = (number - 1) * (manifest.unit_size or batch_size)
+        result["rows"] += len(batch)
+        result["batches"] += 1
+
+        mapped = []
+        for line, row in enumerate(batch, offset + 1):
+            try:
+                mapped.append(map_row(row, columns))
+            except (TypeError, ValueError) as e:
+                _reject(result, line, str(e))
+        accounts.resolve(mapped)
+
+        rows = []
+        seen = Counter()
+        for row in mapped:
+            account_id = accounts.ids.get(row["account"])
+            if account_id is None:
+                _reject(result, None, f"unknown account {row['account']}")
+                continue
+            row["account_id"] = account_id
+            fields = (account_id, row["timestamp"], row["amount"], row["meta_data"], row["txn_id"])
+            row["fingerprint"] = transaction_fingerprint(*fields)
+            seen[row["fingerprint"]] += 1
+            if seen[row["fingerprint"]] > 1:
+                row["fingerprint"] = transaction_fingerprint(*fields, occurrence=seen[row["fingerprint"]] - 1)
+            rows.append(row)
+        counts = bulk_insert_transactions(db, rows, chunk_size=batch_size)
+        record_checkpoint(db, manifest, number, counts)
+        result["inserted"] += counts["inserted"]
+        result["skipped"] += counts["skipped"]
+    complete_manifest(db, manifest)
+    result["accounts_created"] = accounts.created
+    return result
+
+
+def _reject(result: dict, line: Optional[int], reason: str):
+    result["rejected"] += 1
+    if len(result["errors"]) < MAX_REPORTED_ERRORS:
+        result["errors"].append(f"row {line}: {reason}" if line else reason)
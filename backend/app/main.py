@@ -2,8 +2,11 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .core.config import settings
 from .api import router as api_router
-from .db import base, session
-from .middleware.audit_middleware import AuditMiddleware
+from .api.dashboard import dashboard_broadcaster
+from .api.pagination import NEXT_CURSOR_HEADER
+from .db import base, partitions, session
+from .middleware.audit_middleware import AuditMiddleware, flush_pending_audit_logs
+from .middleware.compression import CompressionMiddleware
 
 app = FastAPI(title="AEGIS - Adaptive Enterprise Governance & Intelligence System")
 
@@ -14,11 +17,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 
 # Audit middleware to capture request-level access for compliance
 app.add_middleware(AuditMiddleware)
 
+# Compress large responses; outermost, so it sees the final body
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    compresslevel=settings.GZIP_COMPRESS_LEVEL,
+    brotli_quality=settings.BROTLI_QUALITY,
+)
+
 # include main API router
 app.include_router(api_router, prefix="/api")
 
@@ -33,3 +45,13 @@ def health():
 def on_startup():
     engine = session.get_engine()
     base.Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        partitions.maintain_partitions(connection)
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await dashboard_broadcaster.stop()
+    await flush_pending_audit_logs()
+    await session.dispose_async_engine()
+    session.dispose_engine()
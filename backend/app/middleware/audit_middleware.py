@@ -1,10 +1,34 @@
 from starlette.middleware.base import BaseHTTPMiddleware
+import asyncio
 from starlette.requests import Request
 from ..core.security import decode_access_token
-from ..db.session import get_session
+from ..db.session import run_with_session
 from .. import models
 from datetime import datetime
 
+
+def _write_audit_log(db, user_id, action: str):
+    log = models.AuditLog(user_id=int(user_id) if user_id else None, action=action, entity_type=None, entity_id=None, meta_data=None, timestamp=datetime.utcnow())
+    db.add(log)
+    db.commit()
+
+
+_pending_writes = set()
+
+
+async def _record_request(user_id, action: str):
+    try:
+        await run_with_session(_write_audit_log, user_id, action)
+    except Exception:
+        pass
+
+
+async def flush_pending_audit_logs():
+    """Wait for in-flight request audit writes, e.g. on shutdown"""
+    if _pending_writes:
+        await asyncio.gather(*list(_pending_writes), return_exceptions=True)
+
+
 class AuditMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         # extract token if present
@@ -19,12 +43,10 @@ class AuditMiddleware(BaseHTTPMiddleware):
                 user_id = None
         # call next
         response = await call_next(request)
-        try:
-            db = get_session()
-            log = models.AuditLog(user_id=int(user_id) if user_id else None, action=f"{request.method} {request.url.path}", entity_type=None, entity_id=None, meta_data=None, timestamp=datetime.utcnow())
-            db.add(log)
-            db.commit()
-            db.remove()
-        except Exception:
-            pass
+        # Written by a detached task with its own session: awaiting a session slot
+        # here (or in a response background task, which still runs inside this
+        # request) could wait on the slot this request's get_db still holds.
+        task = asyncio.create_task(_record_request(user_id, f"{request.method} {request.url.path}"))
+        _pending_writes.add(task)
+        task.add_done_callback(_pending_writes.discard)
         return response
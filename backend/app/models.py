@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Float, Boolean, ForeignKey, Enum, Text
+from sqlalchemy import Column, Integer, String, Date, DateTime, Float, Boolean, ForeignKey, Enum, Text, Index, UniqueConstraint, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import enum
+import json
 
 from .db.base import Base
 
@@ -29,12 +30,16 @@ class User(Base):
     hashed_password = Column(String(512), nullable=False)
     role = Column(Enum(RoleEnum), default=RoleEnum.analyst)
     is_active = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
 
     cases = relationship("Case", back_populates="assigned_to_user")
     ai_invocations = relationship("AIInvocation", back_populates="user")
     audit_logs = relationship("AuditLog", back_populates="user")
 
+    __table_args__ = (
+        Index("ix_users_created_at_id", "created_at", "id"),
+    )
+
 
 class Customer(Base):
     __tablename__ = "customers"
@@ -53,7 +58,7 @@ class Account(Base):
     __tablename__ = "accounts"
     id = Column(Integer, primary_key=True, index=True)
     account_id = Column(String(100), unique=True, nullable=False, index=True)
-    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=False, index=True)
     account_type = Column(String(50), nullable=True)
     balance = Column(Float, default=0.0)
     created_at = Column(DateTime, default=datetime.utcnow)
@@ -65,15 +70,31 @@ class Account(Base):
 class Transaction(Base):
     __tablename__ = "transactions"
     id = Column(Integer, primary_key=True, index=True)
+    # unique on its own here; on partitioned PostgreSQL (migration 008) the unique
+    # indexes on txn_id and fingerprint include timestamp, so a row that came back
+    # with a different timestamp would be stored twice
     txn_id = Column(String(150), unique=True, nullable=False, index=True)
     amount = Column(Float, nullable=False)
     txn_type = Column(String(50), nullable=False)
     account_id = Column(Integer, ForeignKey("accounts.id"), nullable=False)
     timestamp = Column(DateTime, default=datetime.utcnow)
     meta_data = Column(Text, nullable=True)  # Renamed from 'metadata' to avoid SQLAlchemy reserved word
+    # SHA-256 of (account, date, amount, narration, ref); set by the importers
+    fingerprint = Column(String(64), unique=True, nullable=True, index=True)
+    # parsed from the narration by services.narration_service
+    channel = Column(String(20), nullable=True, index=True)  # UPI / NEFT / IMPS / ... / OTHER
+    counterparty_id = Column(String(100), nullable=True, index=True)  # VPA, account or remitter
+    counterparty_bank = Column(String(20), nullable=True, index=True)  # IFSC bank code
+    jurisdiction = Column(String(20), nullable=True, index=True)  # ISO 3166 alpha-2 or OFFSHORE
+    direction = Column(String(10), nullable=True)  # credit / debit
 
     account = relationship("Account", back_populates="transactions")
 
+    # a customer's transactions in time order, account by account
+    __table_args__ = (
+        Index("ix_transactions_account_id_timestamp", "account_id", "timestamp"),
+    )
+
 
 class Case(Base):
     __tablename__ = "cases"
@@ -81,31 +102,45 @@ class Case(Base):
     case_ref = Column(String(150), unique=True, nullable=False, index=True)
     title = Column(String(300), nullable=False)
     description = Column(Text, nullable=True)
-    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True, index=True)
     assigned_to = Column(Integer, ForeignKey("users.id"), nullable=True)
     status = Column(Enum(CaseStatus), default=CaseStatus.open)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     customer = relationship("Customer", back_populates="cases")
     assigned_to_user = relationship("User", back_populates="cases")
     sar = relationship("SARReport", back_populates="case", uselist=False)
 
+    # keyset pagination on (created_at, id), optionally narrowed by status;
+    # (status, assigned_to) serves the analyst queue
+    __table_args__ = (
+        Index("ix_cases_created_at_id", "created_at", "id"),
+        Index("ix_cases_status_created_at_id", "status", "created_at", "id"),
+        Index("ix_cases_status_assigned_to", "status", "assigned_to"),
+    )
+
 
 class SARReport(Base):
     __tablename__ = "sar_reports"
     id = Column(Integer, primary_key=True, index=True)
     sar_ref = Column(String(150), unique=True, nullable=False, index=True)
-    case_id = Column(Integer, ForeignKey("cases.id"), nullable=False)
+    case_id = Column(Integer, ForeignKey("cases.id"), nullable=False, index=True)
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)
     narrative = Column(Text, nullable=True)
     approved = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     case = relationship("Case", back_populates="sar")
     cqi = relationship("CQIScore", back_populates="sar", uselist=False)
 
+    # keyset pagination on (created_at, id); analysts only list their own SARs
+    __table_args__ = (
+        Index("ix_sar_reports_created_at_id", "created_at", "id"),
+        Index("ix_sar_reports_created_by_created_at_id", "created_by", "created_at", "id"),
+    )
+
 
 class CQIScore(Base):
     __tablename__ = "cqi_scores"
@@ -134,14 +169,50 @@ class AuditLog(Base):
     user = relationship("User", back_populates="audit_logs")
 
 
+def severity_from_details(details):
+    """Severity recorded in a detection's JSON details; MEDIUM if absent, None if details isn't a JSON object"""
+    if not details:
+        return "MEDIUM"
+    try:
+        meta = json.loads(details)
+    except ValueError:
+        return None
+    if not isinstance(meta, dict):
+        return None
+    return meta.get("severity", "MEDIUM")
+
+
+def _default_severity(context):
+    return severity_from_details(context.get_current_parameters().get("details"))
+
+
 class TypologyDetection(Base):
     __tablename__ = "typology_detections"
     id = Column(Integer, primary_key=True, index=True)
     sar_id = Column(Integer, ForeignKey("sar_reports.id"), nullable=True)
-    detection_type = Column(String(100), nullable=False)
+    case_id = Column(Integer, ForeignKey("cases.id"), nullable=True, index=True)  # set by the monitoring sweep
+    detection_type = Column(String(100), nullable=False, index=True)
     score = Column(Float, default=0.0)
     details = Column(Text, nullable=True)
+    # CRITICAL / HIGH / MEDIUM / LOW; taken from details when not given explicitly
+    severity = Column(String(20), nullable=True, index=True, default=_default_severity)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class TypologyRule(Base):
+    """
+    A typology rule definition (YAML or JSON, see services.rule_engine); overrides the
+    built-in rule of the same name. version is bumped on every change
+    """
+    __tablename__ = "typology_rules"
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, nullable=False, index=True)
+    definition = Column(Text, nullable=False)
+    enabled = Column(Boolean, nullable=False, default=True)
+    version = Column(Integer, nullable=False, default=1)
+    updated_by = Column(Integer, ForeignKey("users.id"), nullable=True)
     created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
 
 class AIInvocation(Base):
@@ -156,3 +227,121 @@ class AIInvocation(Base):
     created_at = Column(DateTime, default=datetime.utcnow)
 
     user = relationship("User", back_populates="ai_invocations")
+
+
+class ImportManifest(Base):
+    """One row per imported file, keyed by content hash; checkpoint is the last page or batch committed"""
+    __tablename__ = "import_manifests"
+    id = Column(Integer, primary_key=True, index=True)
+    source_hash = Column(String(64), nullable=False)
+    kind = Column(String(20), nullable=False)  # statement / csv / parquet
+    source_name = Column(String(500), nullable=True)
+    account_id = Column(Integer, ForeignKey("accounts.id"), nullable=True)
+    unit_size = Column(Integer, nullable=True)  # rows per batch for CSV/Parquet
+    status = Column(String(20), nullable=False, default="running")  # running / completed
+    checkpoint = Column(Integer, nullable=False, default=0)
+    inserted = Column(Integer, nullable=False, default=0)
+    skipped = Column(Integer, nullable=False, default=0)
+    # JSON {fingerprint: times seen} of the statement rows without a balance up to the checkpoint
+    occurrences = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    completed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("source_hash", "kind", name="uq_import_manifests_source_hash_kind"),
+    )
+
+
+class DashboardCounter(Base):
+    """Running totals behind the dashboard, e.g. ("sar_volume", ""), ("cqi", ""), ("typology", "structuring")"""
+    __tablename__ = "dashboard_counters"
+    metric = Column(String(50), primary_key=True)
+    dimension = Column(String(100), primary_key=True, default="")
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+
+
+class DailyCQIMetric(Base):
+    """Per-day CQI count and sum, keyed by the SAR's creation date"""
+    __tablename__ = "daily_cqi_metrics"
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
+
+
+class DailyAccountStat(Base):
+    """Per-account, per-day transaction totals; customer-level figures are sums over the customer's rows"""
+    __tablename__ = "daily_account_stats"
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    customer_id = Column(Integer, ForeignKey("customers.id"), nullable=True)
+    txn_count = Column(Integer, nullable=False, default=0)
+    volume = Column(Float, nullable=False, default=0.0)
+    max_amount = Column(Float, nullable=False, default=0.0)
+    band_count = Column(Integer, nullable=False, default=0)  # amounts in the structuring band, 8000-9500
+    wire_count = Column(Integer, nullable=False, default=0)
+    large_count = Column(Integer, nullable=False, default=0)  # amounts above 50000
+    counterparty_count = Column(Integer, nullable=False, default=0)  # distinct counterparties that day
+    first_at = Column(DateTime, nullable=True)
+    last_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_daily_account_stats_customer_id_day", "customer_id", "day"),
+    )
+
+
+class DailyAccountCounterparty(Base):
+    """Counterparties seen per account and day: keeps counterparty_count exact and answers distinct counts over a range"""
+    __tablename__ = "daily_account_counterparties"
+    account_id = Column(Integer, ForeignKey("accounts.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    counterparty_id = Column(String(100), primary_key=True)
+
+
+
+class MonitoringRun(Base):
+    """
+    One monitoring sweep over the customers with transactions in
+    (from_transaction_id, to_transaction_id]; the next sweep starts after the last completed one
+    """
+    __tablename__ = "monitoring_runs"
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String(20), nullable=False, default="running")  # running / completed / failed
+    from_transaction_id = Column(Integer, nullable=False, default=0)
+    to_transaction_id = Column(Integer, nullable=False, default=0)
+    customers_scanned = Column(Integer, nullable=False, default=0)
+    alerts = Column(Integer, nullable=False, default=0)  # customers with at least one detection
+    cases_opened = Column(Integer, nullable=False, default=0)
+    deduplicated = Column(Integer, nullable=False, default=0)  # alerts on customers with an active case
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+
+
+class AnomalyModel(Base):
+    """
+    A fitted anomaly scorer (services.anomaly_service); the newest row is the one in
+    effect. Written only by `manage.py fit-anomaly-model`
+    """
+    __tablename__ = "anomaly_models"
+    id = Column(Integer, primary_key=True, index=True)
+    method = Column(String(30), nullable=False)  # isolation_forest / robust_z
+    window_days = Column(Integer, nullable=False)
+    contamination = Column(Float, nullable=False)
+    trained_customers = Column(Integer, nullable=False)
+    fit_seconds = Column(Float, nullable=True)
+    scorer = Column(LargeBinary, nullable=False)  # .npz of the median, scale and reference quantiles
+    forest = Column(LargeBinary, nullable=True)  # the IsolationForest, pickled; loaded with an allow-list
+    sklearn_version = Column(String(20), nullable=True)  # the forest only loads under the same version
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+# keeps the tables above current on every SAR / CQI / detection write
+from .services import dashboard_metrics_service  # noqa: E402,F401
+# fills the parsed narration columns on ORM transaction inserts
+from .services import narration_service  # noqa: E402,F401
+# creates the monthly transactions partition an ORM insert needs (PostgreSQL)
+from .db import partitions  # noqa: E402,F401
+# keeps daily_account_stats current on ORM transaction inserts
+from .services import transaction_stats_service  # noqa: E402,F401
@@ -1,7 +1,8 @@
-from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, field_validator
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta, timezone
 from enum import Enum
+from .core.config import settings
 
 
 class Role(str, Enum):
@@ -82,6 +83,78 @@ class SARRead(BaseModel):
         orm_mode = True
 
 
+class IngestResult(BaseModel):
+    """Outcome of a CSV/Parquet transaction upload"""
+    rows: int
+    inserted: int
+    skipped: int
+    rejected: int
+    accounts_created: int
+    batches: int
+    errors: List[str] = []
+    manifest_id: Optional[int] = None
+    resumed_from_batch: int = 0
+    already_imported: bool = False
+
+
+class ScreeningRequest(BaseModel):
+    """One incoming transaction to screen"""
+    account_id: str  # the account's external id, e.g. ACC-001
+    amount: float
+    txn_type: str
+    timestamp: Optional[datetime] = None  # defaults to now
+    narration: Optional[str] = None
+    txn_id: Optional[str] = None
+
+    @field_validator("timestamp")
+    @classmethod
+    def within_screening_window(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """Naive UTC, like stored transactions, and inside the rolling window the state covers"""
+        if value is None:
+            return value
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        now = datetime.utcnow()
+        if value > now + timedelta(seconds=settings.SCREENING_MAX_CLOCK_SKEW_SECONDS):
+            raise ValueError("timestamp is in the future")
+        if value < now - timedelta(days=settings.SCREENING_WINDOW_DAYS):
+            raise ValueError(f"timestamp is older than the {settings.SCREENING_WINDOW_DAYS}-day screening window")
+        return value
+
+
+class ScreeningDetection(BaseModel):
+    type: str
+    score: float
+    severity: str
+
+
+class ScreeningResult(BaseModel):
+    """Alert decision for a screened transaction, over the customer's rolling window"""
+    txn_id: Optional[str] = None
+    customer_id: int
+    alert: bool
+    risk_score: float
+    risk_level: str
+    jurisdiction: Optional[str] = None
+    window_days: int
+    window_transactions: int
+    detections: List[ScreeningDetection] = []
+    elapsed_ms: float
+
+
+class SARListItem(BaseModel):
+    """List view of a SAR; the narrative is only served by GET /api/sar/{id}"""
+    id: int
+    sar_ref: str
+    case_id: int
+    created_by: int
+    approved: bool
+    created_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
 # Audit
 class AuditLogRead(BaseModel):
     id: int
@@ -103,3 +176,24 @@ class DashboardMetrics(BaseModel):
     typology_counts: dict
     risk_score_trend: list
 
+
+# Typology rules
+class TypologyRuleWrite(BaseModel):
+    """One rule as YAML or JSON text (see services/rule_engine.py); its name comes from the URL"""
+    definition: str
+    enabled: bool = True
+
+
+class TypologyRuleRead(BaseModel):
+    """A rule in effect, where it came from, and its evaluation statistics in this process"""
+    name: str
+    kind: str
+    type: str
+    enabled: bool
+    source: str  # default / database
+    definition: Dict[str, Any]
+    calls: int
+    rows: int
+    hits: int
+    seconds: float
+    us_per_row: Optional[float] = None
@@ -3,10 +3,15 @@ from .. import models
 from .llm_service import llm_client
 from .langchain_service import langchain_llm_service
 from .chroma_client import chroma_client
+from .risk_analysis_service import customer_transactions_stmt
+from .transaction_stats_service import LARGE_AMOUNT, STRUCTURING_BAND, customer_window_stats
 from ..core.config import settings
 import httpx
 from datetime import datetime
 
+# most recent transactions listed line by line in the prompt; the rest are summarized
+PROMPT_TRANSACTIONS = 20
+
 
 def retrieve_templates(query: str = "SAR template"):
     """Retrieve templates from ChromaDB using semantic search"""
@@ -17,16 +22,27 @@ def retrieve_templates(query: str = "SAR template"):
         return chroma_client._get_fallback_templates()
 
 
-def build_prompt(case, transactions, templates, customer=None):
+def build_prompt(case, transactions, templates, customer=None, stats=None):
     """Build comprehensive prompt for SAR generation"""
     template = templates[0]['content'] if templates else "Generate SAR for case {case_ref}"
     
     # Transaction summary (limit to top 20)
     tx_summary = "\n".join([
         f"- {t.txn_id}: ${t.amount:,.2f} {t.txn_type} @ {t.timestamp}"
-        for t in transactions[:20]
+        for t in transactions[:PROMPT_TRANSACTIONS]
     ])
     
+    # Whole-history figures from the daily statistics (transaction_stats_service)
+    activity = ""
+    if stats and stats["txn_count"]:
+        activity = f"""
+Activity Summary:
+- {stats['txn_count']} transactions totaling ${stats['volume']:,.2f} from {stats['first_at']:%Y-%m-%d} to {stats['last_at']:%Y-%m-%d}
+- Largest transaction: ${stats['max_amount']:,.2f}
+- Between ${STRUCTURING_BAND[0]:,} and ${STRUCTURING_BAND[1]:,}: {stats['band_count']}; wires: {stats['wire_count']}; above ${LARGE_AMOUNT:,}: {stats['large_count']}
+- Distinct counterparties: {stats['counterparty_count']}
+"""
+    
     # Customer info
     customer_info = ""
     if customer:
@@ -46,7 +62,7 @@ Title: {case.title}
 
 Case Description:
 {case.description or 'No description provided'}
-
+{activity}
 Recent Transactions:
 {tx_summary or 'No transactions available'}
 
@@ -87,24 +103,32 @@ def generate_sar(db, case_id: int, user_id: int):
     
     # Fetch transactions linked to case/customer
     txs = []
+    stats = None
     customer = None
     if case.customer_id:
         customer = db.query(models.Customer).filter(models.Customer.id == case.customer_id).first()
         if customer:
-            # Collect transactions across accounts
-            for acct in customer.accounts:
-                txs.extend(acct.transactions)
+            stats = customer_window_stats(db, customer.id, {None: None})[None]
+            # The most recent transactions across accounts, listed oldest first
+            recent = (
+                customer_transactions_stmt(customer.id)
+                .order_by(None)
+                .order_by(models.Transaction.timestamp.desc(), models.Transaction.id.desc())
+                .limit(PROMPT_TRANSACTIONS)
+            )
+            txs = db.scalars(recent).all()[::-1]
     
     # Retrieve templates from ChromaDB using semantic search
     query = f"SAR template for {case.title} suspicious activity"
     templates = retrieve_templates(query)
     
     # Build structured prompt
-    prompt = build_prompt(case, txs, templates, customer)
+    prompt = build_prompt(case, txs, templates, customer, stats)
     
     # Use LangChain service for generation
     customer_summary = f"{customer.name} (Risk: {customer.risk_rating}/5)" if customer else "N/A"
-    tx_summary = f"{len(txs)} transactions totaling ${sum(t.amount for t in txs):,.2f}" if txs else "No transactions"
+    tx_summary = (f"{stats['txn_count']} transactions totaling ${stats['volume']:,.2f}"
+                  if stats and stats["txn_count"] else "No transactions")
     
     resp = langchain_llm_service.generate_sar_narrative(
         case_ref=case.case_ref,
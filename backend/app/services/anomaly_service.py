@@ -0,0 +1,319 @@
+"""
+Anomaly scoring of customer activity.
+Next to the typology rules, each customer is scored by an unsupervised model over
+a vector of their activity in one lookback window (VECTOR_FEATURES: counts and
+volumes on a log scale, the shares of structuring-band, wire, large and high-risk
+transactions, counterparties per transaction, velocity and risk rating). Two
+methods:
+
+- isolation_forest: scikit-learn's IsolationForest; customers that a few random
+  splits isolate score high
+- robust_z: per-feature median and MAD; a customer scores their largest |z|
+
+A model is fitted offline on a sample of the customers active in the window
+(`python manage.py fit-anomaly-model`) and stored in anomaly_models: the median,
+scale and reference quantiles as an .npz archive loaded without pickle, and the
+IsolationForest pickled but loaded through an allow-list of scikit-learn and numpy
+classes, and only by the scikit-learn version that fitted it.
+Scores are reported as the share of that population scoring lower, and customers
+above 1 - contamination get an "anomaly" detection naming the features furthest
+from the median. Every process loads the newest model, checking for a refit at most
+every ANOMALY_RELOAD_INTERVAL_SECONDS; until one is fitted the stage is skipped.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List, Mapping, Optional, Tuple
+import io
+import logging
+import pickle
+import threading
+import time
+import numpy as np
+import sklearn
+from sklearn.ensemble import IsolationForest
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+from .. import models
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ISOLATION_FOREST, ROBUST_Z = "isolation_forest", "robust_z"
+METHODS = (ISOLATION_FOREST, ROBUST_Z)
+VECTOR_FEATURES = (
+    "log_txn_count", "log_volume", "log_max_amount", "band_share", "wire_share", "large_share",
+    "counterparty_share", "high_risk_share", "log_velocity", "risk_rating",
+)
+MIN_CUSTOMERS = 50  # fewer active customers than this don't make a population
+REFERENCE_POINTS = 10_001  # quantiles of the training scores kept to turn scores into percentiles
+FIT_BATCH = 5000
+# everything a pickled IsolationForest refers to; any other global fails to load
+FOREST_GLOBALS = frozenset({
+    ("sklearn.ensemble._iforest", "IsolationForest"), ("sklearn.tree._classes", "ExtraTreeRegressor"),
+    ("sklearn.tree._tree", "Tree"), ("numpy", "dtype"), ("numpy", "ndarray"),
+    ("numpy._core.numeric", "_frombuffer"), ("numpy.core.numeric", "_frombuffer"),
+    ("numpy._core.multiarray", "_reconstruct"), ("numpy.core.multiarray", "_reconstruct"),
+})
+
+
+class AnomalyError(Exception):
+    pass
+
+
+class _ForestUnpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str):
+        if (module, name) not in FOREST_GLOBALS:
+            raise pickle.UnpicklingError(f"{module}.{name} is not allowed in a stored forest")
+        return super().find_class(module, name)
+
+
+def customer_vectors(features: Mapping[str, np.ndarray]) -> np.ndarray:
+    """One VECTOR_FEATURES row per row of rule features (rule_engine.customer_features)"""
+    count = features["txn_count"]
+
+    def log(name):
+        return np.log1p(np.maximum(features[name], 0))
+
+    def share(name):
+        return np.divide(features[name], count, out=np.zeros(len(count)), where=count > 0)
+
+    return np.column_stack([
+        log("txn_count"), log("volume"), log("max_amount"), share("band_count"), share("wire_count"),
+        share("large_count"), share("counterparty_count"), share("high_risk_count"), log("velocity"),
+        features["risk_rating"],
+    ])
+
+
+class AnomalyScorer:
+    """A model fitted on a population's vectors; stored with dump_scorer(), read back with load_scorer()"""
+
+    def __init__(self, vectors: np.ndarray, method: str = ISOLATION_FOREST, window_days: int = 90,
+                 contamination: float = 0.01, random_state: int = 0):
+        if method not in METHODS:
+            raise AnomalyError(f"Unknown method {method}; expected one of {', '.join(METHODS)}")
+        if not 0 < contamination < 0.5:
+            raise AnomalyError("contamination must be between 0 and 0.5")
+        if vectors.ndim != 2 or vectors.shape[1] != len(VECTOR_FEATURES):
+            raise AnomalyError(f"Expected vectors of the {len(VECTOR_FEATURES)} VECTOR_FEATURES")
+        if len(vectors) < MIN_CUSTOMERS:
+            raise AnomalyError(f"Need at least {MIN_CUSTOMERS} active customers to fit, found {len(vectors)}")
+        self.method, self.window_days, self.contamination = method, window_days, contamination
+        self.features = VECTOR_FEATURES
+        self.median = np.median(vectors, axis=0)
+        deviation = np.abs(vectors - self.median)
+        # a feature most customers share (no wires, say) has no MAD; fall back to the mean absolute deviation
+        mad, mean_deviation = 1.4826 * np.median(deviation, axis=0), 1.2533 * deviation.mean(axis=0)
+        self.scale = np.where(mad > 0, mad, np.where(mean_deviation > 0, mean_deviation, 1.0))
+        self.forest = None
+        if method == ISOLATION_FOREST:
+            self.forest = IsolationForest(n_estimators=100, max_samples=min(256, len(vectors)),
+                                          random_state=random_state).fit(vectors)
+        self.reference = np.quantile(self.raw_scores(vectors), np.linspace(0, 1, REFERENCE_POINTS))
+
+    @classmethod
+    def from_parts(cls, method: str, window_days: int, contamination: float, median: np.ndarray,
+                   scale: np.ndarray, reference: np.ndarray, forest: Optional[IsolationForest] = None):
+        """A scorer fitted earlier, from what dump_scorer() stored"""
+        scorer = cls.__new__(cls)
+        scorer.method, scorer.window_days, scorer.contamination = method, window_days, contamination
+        scorer.features = VECTOR_FEATURES
+        scorer.median, scorer.scale, scorer.reference, scorer.forest = median, scale, reference, forest
+        return scorer
+
+    def z_scores(self, vectors: np.ndarray) -> np.ndarray:
+        return (vectors - self.median) / self.scale
+
+    def raw_scores(self, vectors: np.ndarray) -> np.ndarray:
+        """Higher is more unusual; only comparable within one model"""
+        if self.forest is not None:
+            return -self.forest.score_samples(vectors)
+        return np.abs(self.z_scores(vectors)).max(axis=1)
+
+    def percentiles(self, vectors: np.ndarray) -> np.ndarray:
+        """The share of the training population scoring at most each vector's score"""
+        return np.searchsorted(self.reference, self.raw_scores(vectors), side="right") / len(self.reference)
+
+    def detections(self, vectors: np.ndarray, percentiles: np.ndarray) -> List[Optional[dict]]:
+        """An anomaly detection for each vector above 1 - contamination, else None"""
+        threshold = 1 - self.contamination
+        flagged = np.flatnonzero(percentiles > threshold)
+        found: List[Optional[dict]] = [None] * len(vectors)
+        if not flagged.size:
+            return found
+        z = self.z_scores(vectors[flagged])
+        for row, i in enumerate(flagged):
+            # 0.5 at the threshold up to 1 for the most unusual customer seen in training
+            score = float(min(1.0, 0.5 + 0.5 * (percentiles[i] - threshold) / self.contamination))
+            furthest = np.argsort(-np.abs(z[row]))[:2]
+            found[i] = {
+                "type": "anomaly", "rule": self.method, "score": score,
+                "severity": "HIGH" if score >= 0.85 else "MEDIUM",
+                "evidence": f"Activity over {self.window_days} days more unusual than {percentiles[i]:.1%} of "
+                            "customers; furthest from typical: "
+                            + ", ".join(f"{self.features[j]} (z={z[row, j]:+.1f})" for j in furthest),
+                "recommendation": "Review the activity against the customer's profile; no typology rule explains it",
+                "window_days": self.window_days,
+            }
+        return found
+
+
+class AnomalyModelRegistry:
+    """The newest fitted model, reloaded when a new one is stored, and scoring timings; safe to share between threads"""
+
+    def __init__(self, reload_interval: float):
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self.scorer: Optional[AnomalyScorer] = None
+        self.model_id = None
+        self._checked_at = float("-inf")
+        self.reloads = 0
+        self._stats = [0, 0, 0.0]  # calls, rows, seconds
+
+    def current(self, db, force: bool = False) -> Optional[AnomalyScorer]:
+        """The model in effect, checking anomaly_models at most once per reload interval unless forced"""
+        if force or time.monotonic() - self._checked_at >= self.reload_interval:
+            self._checked_at = time.monotonic()
+            table = models.AnomalyModel
+            try:
+                with db.get_bind().connect() as connection:
+                    latest = connection.scalar(select(func.max(table.id)))
+                    if latest != self.model_id:
+                        row = connection.execute(
+                            select(table.id, table.method, table.window_days, table.contamination, table.scorer,
+                                   table.forest, table.sklearn_version).where(table.id == latest)
+                        ).first()
+                        scorer = load_scorer(row) if row is not None else None
+                        with self._lock:
+                            self.scorer, self.model_id = scorer, latest
+                            self.reloads += 1
+            except AnomalyError as e:  # keep the model we have, and say so on every check until it's refitted
+                logger.error("Refusing to load the anomaly model: %s", e)
+            except Exception as e:  # e.g. the table isn't migrated yet; keep the model we have
+                logger.warning("Could not load the anomaly model: %s", e)
+        return self.scorer
+
+    def score(self, scorer: AnomalyScorer, features: Mapping[str, np.ndarray]) -> Tuple[np.ndarray, List[Optional[dict]]]:
+        """
+        Percentiles and detections for rows of rule features over the model's window;
+        customers without transactions in it get a percentile of 0 and no detection
+        """
+        started = time.perf_counter()
+        vectors = customer_vectors(features)
+        active = features["txn_count"] > 0
+        percentiles = np.zeros(len(vectors))
+        if active.any():
+            percentiles[active] = scorer.percentiles(vectors[active])
+        found = scorer.detections(vectors, percentiles)
+        with self._lock:
+            self._stats[0] += 1
+            self._stats[1] += len(vectors)
+            self._stats[2] += time.perf_counter() - started
+        return percentiles, found
+
+    def metrics(self) -> dict:
+        with self._lock:
+            calls, rows, seconds = self._stats
+            scorer = self.scorer
+            return {
+                "model_id": self.model_id,
+                "method": scorer.method if scorer else None,
+                "window_days": scorer.window_days if scorer else None,
+                "reloads": self.reloads,
+                "calls": calls,
+                "rows": rows,
+                "seconds": round(seconds, 6),
+                "us_per_row": round(seconds / rows * 1e6, 3) if rows else None,
+            }
+
+    def reset(self):
+        """Forget the model and statistics (tests)"""
+        with self._lock:
+            self.scorer, self.model_id, self._checked_at = None, None, float("-inf")
+            self._stats = [0, 0, 0.0]
+
+
+def dump_scorer(scorer: AnomalyScorer) -> Tuple[bytes, Optional[bytes]]:
+    """(parameters as .npz, pickled forest or None) to store"""
+    params = io.BytesIO()
+    np.savez(params, median=scorer.median, scale=scorer.scale, reference=scorer.reference,
+             features=np.array(scorer.features))
+    forest = pickle.dumps(scorer.forest, protocol=pickle.HIGHEST_PROTOCOL) if scorer.forest is not None else None
+    return params.getvalue(), forest
+
+
+def load_scorer(row) -> AnomalyScorer:
+    """
+    The scorer stored in an anomaly_models row. Raises AnomalyError for rows this
+    process can't trust to score as they did when fitted: stored before the
+    sklearn_version column, fitted by another scikit-learn, or with other features
+    """
+    if row.sklearn_version is None:
+        raise AnomalyError(f"model {row.id} predates the current storage format; refit it")
+    if row.forest is not None and row.sklearn_version != sklearn.__version__:
+        raise AnomalyError(f"model {row.id} was fitted with scikit-learn {row.sklearn_version} but this process "
+                           f"runs {sklearn.__version__}; refit it")
+    try:
+        with np.load(io.BytesIO(row.scorer), allow_pickle=False) as params:
+            median, scale, reference = params["median"], params["scale"], params["reference"]
+            features = tuple(params["features"].tolist())
+        forest = _ForestUnpickler(io.BytesIO(row.forest)).load() if row.forest is not None else None
+    except (KeyError, ValueError, TypeError, AttributeError, EOFError, OSError, pickle.UnpicklingError) as e:
+        raise AnomalyError(f"model {row.id} can't be read: {e}")
+    if features != VECTOR_FEATURES or (forest is not None and not isinstance(forest, IsolationForest)):
+        raise AnomalyError(f"model {row.id} was fitted on other features; refit it")
+    return AnomalyScorer.from_parts(row.method, row.window_days, row.contamination, median, scale, reference, forest)
+
+
+def save_scorer(db: Session, scorer: AnomalyScorer, trained_customers: int,
+                fit_seconds: Optional[float] = None) -> models.AnomalyModel:
+    """Store a fitted model, making it the one in effect; flushed, not committed"""
+    params, forest = dump_scorer(scorer)
+    row = models.AnomalyModel(
+        method=scorer.method, window_days=scorer.window_days, contamination=scorer.contamination,
+        trained_customers=trained_customers, fit_seconds=fit_seconds, scorer=params, forest=forest,
+        sklearn_version=sklearn.__version__,
+    )
+    db.add(row)
+    db.flush()
+    return row
+
+
+def fit_anomaly_model(db: Session, method: str = ISOLATION_FOREST, window_days: Optional[int] = None,
+                      sample: Optional[int] = None, contamination: Optional[float] = None,
+                      now: Optional[datetime] = None, seed: int = 0) -> Dict:
+    """
+    Fit a model on up to sample customers (drawn at random) active in the window
+    ending now and store it, committed; it applies in this process at once and in
+    others within ANOMALY_RELOAD_INTERVAL_SECONDS. Returns the stored model's summary
+    """
+    # risk_analysis_service scores with this module's registry, so it can only be imported here
+    from .risk_analysis_service import customers_window_features
+
+    window_days = window_days or settings.ANOMALY_WINDOW_DAYS
+    sample = sample or settings.ANOMALY_FIT_SAMPLE
+    contamination = contamination or settings.ANOMALY_CONTAMINATION
+    now = now or datetime.utcnow()
+    daily = models.DailyAccountStat
+    population = np.asarray(db.scalars(
+        select(daily.customer_id).distinct()
+        .where(daily.customer_id.is_not(None), daily.day >= (now - timedelta(days=window_days)).date())
+    ).all(), dtype=np.int64)
+    if len(population) > sample:
+        population = np.sort(np.random.default_rng(seed).choice(population, sample, replace=False))
+
+    started = time.perf_counter()
+    vectors = [np.zeros((0, len(VECTOR_FEATURES)))]
+    for start in range(0, len(population), FIT_BATCH):
+        _, features = customers_window_features(db, population[start:start + FIT_BATCH].tolist(), [window_days], now)
+        vectors.append(customer_vectors(features)[features["txn_count"] > 0])
+    vectors = np.concatenate(vectors)
+    read = time.perf_counter()
+    scorer = AnomalyScorer(vectors, method, window_days, contamination, random_state=seed)
+    fitted = time.perf_counter()
+    row = save_scorer(db, scorer, len(vectors), fitted - read)
+    db.commit()
+    anomaly_models.current(db, force=True)
+    return {"model_id": row.id, "method": method, "window_days": window_days, "contamination": contamination,
+            "trained_customers": len(vectors), "read_seconds": read - started, "fit_seconds": fitted - read}
+
+
+anomaly_models = AnomalyModelRegistry(settings.ANOMALY_RELOAD_INTERVAL_SECONDS)
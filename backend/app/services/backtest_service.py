@@ -0,0 +1,256 @@
+"""
+Backtesting the typology rules over historical data.
+A backtest (`python manage.py backtest`) replays the customers' transactions as
+they stood on an as-of day through the customer rules, once for the rules in
+effect ("current") and once per variant: a set of overrides merged into the rules
+by name, e.g. a different threshold, or new rules. Each variant reports how many
+customers it alerts, its alerts (typologies fired per customer) and how many of the
+alerted customers have an escalated case or a filed SAR, overall and per rule.
+
+The work is split into chunks of BACKTEST_CHUNK_SIZE customers across
+BACKTEST_WORKERS processes. The extract step reads each chunk's window features
+(risk_analysis_service.customers_window_features) into a memory-mapped .npy matrix,
+one column per customer and window; the evaluate step maps it read-only in every
+process and runs each variant's rules over whole columns at once, so the
+database is read once however many variants are tried.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+import numpy as np
+import yaml
+from sqlalchemy import select, union
+from sqlalchemy.orm import Session
+from .. import models
+from ..core.config import settings
+from ..db.session import session_scope
+from .risk_analysis_service import customers_window_features, resolve_windows
+from .rule_engine import CUSTOMER_FEATURES, Rule, RuleError, RuleSet, typology_rules
+
+CURRENT = "current"
+
+
+class BacktestError(Exception):
+    pass
+
+
+def parse_variants(text: str) -> Dict[str, List[dict]]:
+    """
+    Variants from YAML or JSON text, {"variants": {name: [override, ...]}} or just
+    {name: [override, ...]}; an override is a partial rule definition with a name
+    """
+    try:
+        data = yaml.safe_load(text) or {}
+    except yaml.YAMLError as e:
+        raise BacktestError(f"Invalid YAML/JSON: {e}")
+    if isinstance(data, Mapping) and "variants" in data:
+        data = data["variants"]
+    if not isinstance(data, Mapping):
+        raise BacktestError("Expected a mapping of variant names to rule overrides")
+    variants = {}
+    for name, overrides in data.items():
+        if isinstance(overrides, Mapping):
+            overrides = [overrides]
+        if not isinstance(overrides, list) or not all(isinstance(o, Mapping) and o.get("name") for o in overrides):
+            raise BacktestError(f"Variant {name}: expected a list of rule overrides, each with a name")
+        if str(name) == CURRENT:
+            raise BacktestError(f"Variant name {CURRENT} is reserved for the rules in effect")
+        variants[str(name)] = [dict(o) for o in overrides]
+    return variants
+
+
+def variant_definitions(rules: Sequence[Rule], overrides: Sequence[Mapping]) -> List[dict]:
+    """The customer rule definitions with overrides merged in by name (unknown names add rules); validated"""
+    definitions = {rule.name: dict(rule.definition) for rule in rules if rule.kind == "customer"}
+    for override in overrides:
+        definitions[override["name"]] = {**definitions.get(override["name"], {}), **override}
+    try:
+        return [Rule(definition).definition for definition in definitions.values()]
+    except RuleError as e:
+        raise BacktestError(str(e))
+
+
+def backtest_population(db: Session, until: date, limit: Optional[int] = None) -> List[int]:
+    """Customers with transactions up to until, in id order"""
+    daily = models.DailyAccountStat
+    stmt = (
+        select(daily.customer_id).distinct()
+        .where(daily.customer_id.is_not(None), daily.day <= until)
+        .order_by(daily.customer_id)
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    return db.scalars(stmt).all()
+
+
+def positive_customers(db: Session) -> set:
+    """Customers with an escalated case or a filed (approved) SAR, whenever it happened"""
+    escalated = select(models.Case.customer_id).where(models.Case.status == models.CaseStatus.escalated)
+    filed = (
+        select(models.Case.customer_id)
+        .join(models.SARReport, models.SARReport.case_id == models.Case.id)
+        .where(models.SARReport.approved.is_(True))
+    )
+    return {customer_id for customer_id in db.scalars(union(escalated, filed)) if customer_id is not None}
+
+
+def _init_worker(database_url: str):
+    settings.DATABASE_URL = database_url
+
+
+def _extract(path: str, offset: int, customer_ids: Sequence[int], windows: Sequence[Optional[int]],
+             now: datetime, until: date):
+    """Write the features of customer_ids into columns [offset, ...) of the matrix at path, in their order"""
+    with session_scope() as db:
+        ids, features = customers_window_features(db, customer_ids, windows, now, until)
+    width = len(windows)
+    found = {customer_id: i for i, customer_id in enumerate(ids)}
+    source = np.array([found[c] * width + w for c in customer_ids if c in found for w in range(width)], dtype=np.int64)
+    target = np.array([(offset + j) * width + w for j, c in enumerate(customer_ids) if c in found
+                       for w in range(width)], dtype=np.int64)
+    matrix = np.load(path, mmap_mode="r+")
+    for row, name in enumerate(CUSTOMER_FEATURES):
+        matrix[row, target] = features[name][source]
+    matrix.flush()
+
+
+def _evaluate(features_path: str, labels_path: str, start: int, stop: int, width: int,
+              definitions: Sequence[dict]) -> Dict[str, Any]:
+    """Alert and hit counts for customers [start, stop) under one variant's rules"""
+    matrix = np.load(features_path, mmap_mode="r")
+    labels = np.load(labels_path, mmap_mode="r")[start:stop]
+    features = {name: matrix[row, start * width:stop * width] for row, name in enumerate(CUSTOMER_FEATURES)}
+    n = (stop - start) * width
+    by_type: Dict[str, np.ndarray] = {}
+    counts: Dict[str, Any] = {"rules": {}}
+    with np.errstate(invalid="ignore", over="ignore"):
+        for rule in RuleSet([Rule(definition) for definition in definitions]).by_kind["customer"]:
+            # a customer is alerted by a rule when it fires in any window
+            alerted = rule.fire(features, n)[1].reshape(-1, width).any(axis=1)
+            by_type[rule.type] = by_type[rule.type] | alerted if rule.type in by_type else alerted
+            counts["rules"][rule.name] = {"alerted": int(alerted.sum()), "hits": int((alerted & labels).sum())}
+    types = np.array(list(by_type.values())).reshape(len(by_type), stop - start)
+    alerted = types.any(axis=0)
+    counts.update(alerted=int(alerted.sum()), alerts=int(types.sum()), hits=int((alerted & labels).sum()))
+    return counts
+
+
+def _add_counts(total: Dict[str, Any], counts: Dict[str, Any]):
+    for key in ("alerted", "alerts", "hits"):
+        total[key] = total.get(key, 0) + counts[key]
+    for name, rule_counts in counts["rules"].items():
+        rule_total = total.setdefault("rules", {}).setdefault(name, {"alerted": 0, "hits": 0})
+        rule_total["alerted"] += rule_counts["alerted"]
+        rule_total["hits"] += rule_counts["hits"]
+
+
+def _rates(counts: Dict[str, Any], positives: int) -> Dict[str, Any]:
+    return {
+        **counts,
+        "hit_rate": counts["hits"] / counts["alerted"] if counts["alerted"] else None,
+        "recall": counts["hits"] / positives if positives else None,
+    }
+
+
+def run_backtest(db: Session, variants: Optional[Mapping[str, Sequence[Mapping]]] = None,
+                 windows: Optional[Sequence[int]] = None, as_of: Optional[date] = None,
+                 workers: Optional[int] = None, chunk_size: Optional[int] = None, limit: Optional[int] = None,
+                 workdir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Replay the customers with transactions up to as_of (today by default; the first
+    limit of them) through the current rules and each variant. With workers <= 1
+    everything runs in this process. The feature matrix is written to workdir if
+    given (and left there), otherwise to a temporary directory that is removed.
+    """
+    workers = settings.BACKTEST_WORKERS if workers is None else workers
+    chunk_size = chunk_size or settings.BACKTEST_CHUNK_SIZE
+    windows = resolve_windows(windows=windows)
+    until = as_of or datetime.utcnow().date()
+    now = datetime.combine(until + timedelta(days=1), datetime.min.time())
+    typology_rules.refresh(db, force=True)
+    rule_sets = {CURRENT: variant_definitions(typology_rules.rule_set.rules, [])}
+    for name, overrides in (variants or {}).items():
+        rule_sets[name] = variant_definitions(typology_rules.rule_set.rules, overrides)
+
+    customer_ids = backtest_population(db, until, limit)
+    positives = positive_customers(db)
+    labels = np.isin(np.asarray(customer_ids, dtype=np.int64), np.fromiter(positives, dtype=np.int64))
+    chunks = [(start, min(start + chunk_size, len(customer_ids))) for start in range(0, len(customer_ids), chunk_size)]
+
+    directory = workdir or tempfile.mkdtemp(prefix="aegis-backtest-")
+    os.makedirs(directory, exist_ok=True)
+    features_path = os.path.join(directory, "features.npy")
+    labels_path = os.path.join(directory, "labels.npy")
+    pool = None
+    try:
+        if customer_ids:  # an empty matrix can't be mapped
+            np.lib.format.open_memmap(features_path, mode="w+", dtype=np.float64,
+                                      shape=(len(CUSTOMER_FEATURES), len(customer_ids) * len(windows))).flush()
+            np.save(labels_path, labels)
+        if workers > 1 and len(chunks) > 1:
+            # spawned, not forked: the children must not share this process's pooled connections
+            pool = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker, initargs=(settings.DATABASE_URL,))
+
+        def run(fn, tasks):
+            if pool is None:
+                return [fn(*task) for task in tasks]
+            return list(pool.map(fn, *zip(*tasks)))
+
+        started = time.perf_counter()
+        run(_extract, [(features_path, start, customer_ids[start:stop], windows, now, until) for start, stop in chunks])
+        extracted = time.perf_counter()
+        tasks = [(name, start, stop) for name in rule_sets for start, stop in chunks]
+        results = run(_evaluate, [(features_path, labels_path, start, stop, len(windows), rule_sets[name])
+                                  for name, start, stop in tasks])
+        evaluated = time.perf_counter()
+    finally:
+        if pool is not None:
+            pool.shutdown()
+        if workdir is None:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    totals = {name: {"alerted": 0, "alerts": 0, "hits": 0, "rules": {}} for name in rule_sets}
+    for (name, _, _), counts in zip(tasks, results):
+        _add_counts(totals[name], counts)
+    positive_count = int(labels.sum())
+    return {
+        "as_of": until.isoformat(),
+        "windows": list(windows),
+        "customers": len(customer_ids),
+        "positives": positive_count,
+        "extract_seconds": extracted - started,
+        "evaluate_seconds": evaluated - extracted,
+        "variants": {
+            name: {**_rates(total, positive_count),
+                   "rules": {rule: _rates(counts, positive_count) for rule, counts in total["rules"].items()}}
+            for name, total in totals.items()
+        },
+    }
+
+
+def _percent(rate: Optional[float]) -> str:
+    return "-" if rate is None else f"{rate:.1%}"
+
+
+def format_report(result: Mapping[str, Any]) -> str:
+    """run_backtest()'s result as a table: each variant, then its rules"""
+    windows = "/".join(str(days) if days else "all" for days in result["windows"])
+    lines = [
+        f"As of {result['as_of']}, {windows}-day windows: {result['customers']} customers, "
+        f"{result['positives']} escalated or filed (extract {result['extract_seconds']:.1f}s, "
+        f"evaluate {result['evaluate_seconds']:.1f}s)",
+        f"{'variant / rule':<32}{'alerted':>9}{'alerts':>9}{'hits':>8}{'hit rate':>10}{'recall':>8}",
+    ]
+    for name, variant in result["variants"].items():
+        lines.append(f"{name:<32}{variant['alerted']:>9}{variant['alerts']:>9}{variant['hits']:>8}"
+                     f"{_percent(variant['hit_rate']):>10}{_percent(variant['recall']):>8}")
+        for rule, counts in variant["rules"].items():
+            lines.append(f"  {rule:<30}{counts['alerted']:>9}{'':>9}{counts['hits']:>8}"
+                         f"{_percent(counts['hit_rate']):>10}{_percent(counts['recall']):>8}")
+    return "\n".join(lines)
@@ -4,6 +4,7 @@ Analyzes patterns across ALL SARs to detect emerging threats
 Provides forward-looking intelligence from historical data
 """
 from .. import models
+from .rule_engine import typology_rules
 from sqlalchemy.orm import Session
 from sklearn.cluster import KMeans, DBSCAN
 from sklearn.feature_extraction.text import TfidfVectorizer
@@ -25,6 +26,7 @@ class CrossCaseIntelligenceEngine:
         Main analysis method
         Returns enterprise-level intelligence
         """
+        typology_rules.refresh(db)
         # Fetch all SARs
         sars = db.query(models.SARReport).all()
         if len(sars) < 2:
@@ -123,19 +125,8 @@ class CrossCaseIntelligenceEngine:
         return [word for word, _ in Counter(filtered).most_common(15)]
     
     def _infer_pattern_type(self, keywords: List[str]) -> str:
-        """Infer typology from keywords"""
-        keyword_set = set(keywords)
-        
-        if any(k in keyword_set for k in ['structur', 'split', 'multiple', 'below']):
-            return "Structuring Pattern"
-        elif any(k in keyword_set for k in ['layer', 'complex', 'chain', 'obfusc']):
-            return "Layering Pattern"
-        elif any(k in keyword_set for k in ['rapid', 'velocity', 'frequent', 'many']):
-            return "Velocity Anomaly"
-        elif any(k in keyword_set for k in ['offshore', 'international', 'foreign']):
-            return "Geographic Risk Pattern"
-        else:
-            return "Mixed/Unknown Pattern"
+        """Infer typology from keywords (kind: pattern in the typology rules)"""
+        return typology_rules.infer_pattern(keywords) or "Mixed/Unknown Pattern"
     
     def _detect_typology_drift(self, db: Session) -> List[Dict[str, Any]]:
         """
@@ -336,12 +327,13 @@ class CrossCaseIntelligenceEngine:
         return recommendations
 
 
-def generate_intelligence_report(db: Session) -> Dict[str, Any]:
+def generate_intelligence_report(db: Session, read_db: Session = None) -> Dict[str, Any]:
     """
     Generate comprehensive cross-case intelligence report
+    Analysis reads from read_db (e.g. a replica) when given; the audit entry is written to db
     """
     engine = CrossCaseIntelligenceEngine()
-    analysis = engine.analyze_cross_case_patterns(db)
+    analysis = engine.analyze_cross_case_patterns(read_db or db)
     
     # Store as audit log
     audit = models.AuditLog(
@@ -0,0 +1,92 @@
+"""
+Fan-out of periodically computed metrics to streaming subscribers.
+One background task recomputes the metrics every interval while anyone is subscribed
+and publishes only the top-level keys that changed, so N connected dashboards cost
+one computation per interval instead of N polls.
+"""
+from typing import Awaitable, Callable, Optional
+import asyncio
+
+SUBSCRIBER_QUEUE_SIZE = 16
+
+
+class MetricsBroadcaster:
+    def __init__(self, compute: Callable[[], Awaitable[dict]], interval: float):
+        self._compute = compute
+        self.interval = interval
+        self._subscribers = set()
+        self._task: Optional[asyncio.Task] = None
+        self._latest: Optional[dict] = None
+        self.computations = 0
+        self.failures = 0
+        self.published = 0
+        self.resyncs = 0
+
+    def subscribe(self) -> asyncio.Queue:
+        """Queue of (event, data) pairs; starts with a full snapshot"""
+        queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        if self._latest is not None:
+            queue.put_nowait(("snapshot", self._latest))
+        self._subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers.discard(queue)
+
+    def _publish(self, event: str, data: dict):
+        for queue in list(self._subscribers):
+            if queue.full():
+                # slow client: drop its backlog and resync it with the full state
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(("snapshot", self._latest))
+                self.resyncs += 1
+                continue
+            queue.put_nowait((event, data))
+        self.published += 1
+
+    async def refresh(self):
+        """Recompute once and publish the snapshot or the changed keys"""
+        try:
+            current = await self._compute()
+        except Exception:
+            self.failures += 1
+            return
+        self.computations += 1
+        previous, self._latest = self._latest, current
+        if previous is None:
+            self._publish("snapshot", current)
+            return
+        delta = {k: v for k, v in current.items() if previous.get(k) != v}
+        if delta:
+            self._publish("delta", delta)
+
+    async def _run(self):
+        # computes while there are subscribers; the next subscriber restarts it
+        while self._subscribers:
+            await self.refresh()
+            await asyncio.sleep(self.interval)
+        # nobody is listening, so the cached state would go stale
+        self._latest = None
+
+    async def stop(self):
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._latest = None
+
+    def metrics(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "interval_seconds": self.interval,
+            "computations": self.computations,
+            "failures": self.failures,
+            "published": self.published,
+            "resyncs": self.resyncs,
+        }
@@ -0,0 +1,169 @@
+"""
+Transaction monitoring sweep.
+Opens cases automatically: each run (`python manage.py run-monitoring`, from cron)
+takes the customers with transactions written since the last completed run, runs
+the risk detectors over their lookback windows, and opens one case per alerted
+customer with the triggering detections attached (TypologyDetection.case_id).
+
+Customers are assessed in batches of MONITORING_BATCH_SIZE, MONITORING_WORKERS
+batches at a time, each with its own session and a few grouped queries over the
+daily statistics (risk_analysis_service.assess_customers). Customers that already
+have an active case (anything not closed) are not given another one. Cases and
+detections are bulk inserted and committed batch by batch, so a failed run
+leaves what it opened; the next run covers the failed run's transactions again
+and those customers are then deduplicated.
+
+New transactions are found by id: a run covers ids up to the largest when it
+started. A transaction whose id was allocated before a run started but that
+commits after it is missed until its customer next has activity.
+"""
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Sequence
+import json
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session
+from .. import models
+from ..core.config import settings
+from ..db.session import session_scope
+from .dashboard_metrics_service import record_detections
+from .risk_analysis_service import assess_customers, overall_risk
+
+RUNNING, COMPLETED, FAILED = "running", "completed", "failed"
+# cases in these states are still being worked, so an alert doesn't open another
+ACTIVE_CASE_STATUSES = [status for status in models.CaseStatus if status != models.CaseStatus.closed]
+
+
+class MonitoringError(Exception):
+    pass
+
+
+def changed_customers(db: Session, after_id: int, upto_id: int) -> List[int]:
+    """Customers with a transaction whose id is in (after_id, upto_id], in id order"""
+    return db.scalars(
+        select(models.Account.customer_id).distinct()
+        .join(models.Transaction, models.Transaction.account_id == models.Account.id)
+        .where(models.Transaction.id > after_id, models.Transaction.id <= upto_id)
+        .order_by(models.Account.customer_id)
+    ).all()
+
+
+def _batches(customer_ids: Sequence[int], size: int) -> Iterator[Sequence[int]]:
+    for i in range(0, len(customer_ids), size):
+        yield customer_ids[i:i + size]
+
+
+def _assess(customer_ids: Sequence[int], windows: Optional[Sequence[int]], now: datetime) -> Dict[int, list]:
+    with session_scope() as db:
+        return assess_customers(db, customer_ids, windows, now)
+
+
+def _start_run(db: Session, full: bool) -> models.MonitoringRun:
+    running = db.scalar(
+        select(models.MonitoringRun.id).where(
+            models.MonitoringRun.status == RUNNING,
+            models.MonitoringRun.started_at > datetime.utcnow() - timedelta(seconds=settings.MONITORING_RUN_TIMEOUT_SECONDS),
+        )
+    )
+    if running is not None:
+        raise MonitoringError(f"Monitoring run {running} is still running")
+    after_id = 0 if full else db.scalar(
+        select(func.max(models.MonitoringRun.to_transaction_id)).where(models.MonitoringRun.status == COMPLETED)
+    ) or 0
+    upto_id = db.scalar(select(func.max(models.Transaction.id))) or 0
+    run = models.MonitoringRun(status=RUNNING, from_transaction_id=after_id, to_transaction_id=max(after_id, upto_id))
+    db.add(run)
+    db.commit()
+    return run
+
+
+def open_cases(db: Session, run: models.MonitoringRun, detections: Dict[int, list]) -> Dict[str, int]:
+    """
+    One case per customer in detections (customer id -> its detections) that has
+    no active case, with the detections attached; flushed, not committed
+    """
+    alerted = {customer_id: found for customer_id, found in detections.items() if found}
+    if not alerted:
+        return {"alerts": 0, "cases_opened": 0, "deduplicated": 0}
+    active = set(db.scalars(
+        select(models.Case.customer_id).distinct()
+        .where(models.Case.customer_id.in_(alerted), models.Case.status.in_(ACTIVE_CASE_STATUSES))
+    ))
+    new = {customer_id: found for customer_id, found in alerted.items() if customer_id not in active}
+    if new:
+        now = datetime.utcnow()
+        cases = []
+        for customer_id, found in new.items():
+            score, level = overall_risk(found)
+            types = ", ".join(d["type"] for d in found)
+            cases.append({
+                "case_ref": f"MON-{run.id}-{customer_id}",
+                "title": f"Monitoring alert ({level}): {types}",
+                "description": "\n".join(
+                    [f"Opened by monitoring run {run.id}; overall risk {score:.2f}."]
+                    + [f"- {d['type']} ({d['score']:.2f}): {d['evidence']}" for d in found]
+                ),
+                "customer_id": customer_id,
+                "status": models.CaseStatus.open,
+                "created_at": now,
+                "updated_at": now,
+            })
+        case_ids = dict(db.execute(
+            insert(models.Case).returning(models.Case.customer_id, models.Case.id), cases
+        ).all())
+        rows = [
+            {"case_id": case_ids[customer_id], "detection_type": d["type"], "score": d["score"],
+             "severity": d["severity"], "created_at": now,
+             "details": json.dumps({"severity": d["severity"], "evidence": d["evidence"],
+                                    "recommendation": d["recommendation"], "window_days": d["window_days"],
+                                    "monitoring_run_id": run.id})}
+            for customer_id, found in new.items() for d in found
+        ]
+        db.execute(insert(models.TypologyDetection), rows)
+        record_detections(db.connection(), [row["detection_type"] for row in rows])
+    return {"alerts": len(alerted), "cases_opened": len(new), "deduplicated": len(alerted) - len(new)}
+
+
+def run_monitoring(db: Session, full: bool = False, windows: Optional[Sequence[int]] = None,
+                   batch_size: Optional[int] = None, workers: Optional[int] = None) -> Dict[str, int]:
+    """
+    Sweep the customers with new transactions (all customers with transactions when
+    full) and open cases for the ones the detectors flag; returns the run's totals
+    """
+    batch_size = batch_size or settings.MONITORING_BATCH_SIZE
+    workers = workers or settings.MONITORING_WORKERS
+    run = _start_run(db, full)
+    now = datetime.utcnow()
+    try:
+        customer_ids = changed_customers(db, run.from_transaction_id, run.to_transaction_id)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="monitoring") as pool:
+            # up to 2 * workers batches in flight, written in order as they complete
+            pending = deque()
+            batches = _batches(customer_ids, batch_size)
+            for batch in islice(batches, 2 * workers):
+                pending.append((batch, pool.submit(_assess, batch, windows, now)))
+            while pending:
+                batch, assessed = pending.popleft()
+                detections = assessed.result()
+                for following in islice(batches, 1):
+                    pending.append((following, pool.submit(_assess, following, windows, now)))
+                totals = open_cases(db, run, detections)
+                run.customers_scanned += len(batch)
+                run.alerts += totals["alerts"]
+                run.cases_opened += totals["cases_opened"]
+                run.deduplicated += totals["deduplicated"]
+                db.commit()
+    except Exception as e:
+        db.rollback()
+        run.status, run.error, run.finished_at = FAILED, str(e)[:2000], datetime.utcnow()
+        db.commit()
+        raise
+    run.status, run.finished_at = COMPLETED, datetime.utcnow()
+    db.commit()
+    return {
+        "run_id": run.id, "from_transaction_id": run.from_transaction_id, "to_transaction_id": run.to_transaction_id,
+        "customers_scanned": run.customers_scanned, "alerts": run.alerts, "cases_opened": run.cases_opened,
+        "deduplicated": run.deduplicated,
+    }
@@ -0,0 +1,208 @@
+"""
+Narration parsing.
+Bank narrations pack the payment rail, the counterparty and their bank into one
+free-text string, e.g. "UPI-TANVI KABI-TANVI.KABI@OKAXIS-SBIN0017042-424035494393-NOTE"
+or "IMPS-432808682196-MS MEENA PUGGAL-SBIN-XXXXXXXXXXXXX0064-REQPAY".
+parse_narration() splits them once, at ingest, into the structured Transaction
+columns (channel, counterparty_id, counterparty_bank, jurisdiction, direction) so
+detectors filter on indexed columns instead of substring-searching meta_data.
+
+Bulk ingestion parses rows as it writes them and ORM inserts are parsed by a
+before_insert hook. Rows stored before the columns existed (migration 006 only
+adds them) are parsed by backfill_narration_fields() (`python manage.py
+backfill-narrations`), which also re-parses everything after rule changes.
+"""
+from functools import lru_cache
+from typing import Dict, List, Optional
+import re
+from sqlalchemy import bindparam, event, select, update
+from .. import models
+
+NARRATION_COLUMNS = ("channel", "counterparty_id", "counterparty_bank", "jurisdiction", "direction")
+BACKFILL_BATCH_SIZE = 5000
+# narrations that match no rail; NULL channel means "not parsed yet"
+OTHER_CHANNEL = "OTHER"
+
+# matched in order at the start of the upper-cased narration
+CHANNEL_PREFIXES = (
+    ("UPI", r'UPI\b'),
+    ("NEFT", r'NEFT'),
+    ("IMPS", r'IMPS'),
+    ("RTGS", r'RTGS'),
+    ("POS", r'POS'),
+    ("ATM", r'(?:ATM|ATW|NWD|EAW)'),
+    ("ACH", r'N?ACH'),
+    ("CHEQUE", r'(?:CHQ|CHEQUE|CLG)'),
+    ("INTEREST", r'INTEREST'),
+    # HDFC third-party (intra-bank) transfer: <account>-TPT-<note>-<name>
+    ("TPT", r'\d{9,18}-TPT-'),
+)
+CHANNEL_PREFIX_RE = re.compile("|".join(f"(?P<{channel}>{pattern})" for channel, pattern in CHANNEL_PREFIXES))
+# otherwise, any of these words anywhere in the narration
+CHANNEL_WORDS = (("WIRE", "WIRE"), ("SWIFT", "WIRE"), ("CASH", "CASH"))
+# fallback when the narration says nothing: txn_type substring -> channel
+TXN_TYPE_CHANNELS = (("wire", "WIRE"), ("cash", "CASH"), ("ach", "ACH"), ("check", "CHEQUE"), ("cheque", "CHEQUE"))
+# Indian interbank rails; anything else is only placed by a jurisdiction keyword
+DOMESTIC_CHANNELS = {"UPI": "IN", "NEFT": "IN", "IMPS": "IN", "RTGS": "IN"}
+
+# ISO 3166 alpha-2 codes, or OFFSHORE when the narration names no country
+JURISDICTION_KEYWORDS = (
+    ("cayman", "KY"),
+    ("panama", "PA"),
+    ("hong kong", "HK"),
+    ("switzerland", "CH"),
+    ("swiss", "CH"),
+    ("offshore", "OFFSHORE"),
+)
+HIGH_RISK_JURISDICTIONS = ("KY", "PA", "HK", "CH", "OFFSHORE")
+JURISDICTION_RE = re.compile("|".join(keyword.upper() for keyword, _ in JURISDICTION_KEYWORDS))
+JURISDICTION_CODES = {keyword.upper(): code for keyword, code in JURISDICTION_KEYWORDS}
+JURISDICTION_PRIORITY = {code: i for i, (_, code) in reversed(list(enumerate(JURISDICTION_KEYWORDS)))}
+
+VPA_HANDLE_RE = re.compile(r'[A-Z0-9._]*@[A-Z]+$')
+IFSC_RE = re.compile(r'[A-Z]{4}0[A-Z0-9]{6}$')
+MASKED_ACCOUNT_RE = re.compile(r'X{4,}\d{3,}$')
+BANK_CODE_RE = re.compile(r'[A-Z]{4}$')
+CREDIT_WORDS, DEBIT_WORDS = {"CREDIT", "INWARD", "RECEIVED"}, {"DEBIT", "OUTWARD", "PAID"}
+DIRECTION_WORDS = (*CREDIT_WORDS, *DEBIT_WORDS)
+DIRECTION_WORD_RE = re.compile(r'\b(?:' + '|'.join(DIRECTION_WORDS) + r')\b')
+# UPI-<name>-<vpa>[-<IFSC>]-...; most statement lines, so they skip the general path
+UPI_RE = re.compile(r'UPI-[^-]*-([A-Z0-9._\-]*?@[A-Z]+)(?:-([A-Z]{4})0[A-Z0-9]{6}(?![A-Z0-9]))?')
+
+# meta_data written by the statement importer: "Page: N | narration | Ref: .. | Balance: .."
+STATEMENT_META_RE = re.compile(r'^Page: \d+ \| (.*) \| Ref: .* \| Balance: [^|]*$', re.DOTALL)
+
+
+def narration_from_meta(meta_data: Optional[str]) -> str:
+    """The narration part of a stored meta_data string"""
+    if not meta_data:
+        return ""
+    match = STATEMENT_META_RE.match(meta_data)
+    return match.group(1) if match else meta_data
+
+
+def _channel(text: str, words: set, txn_type: str) -> str:
+    match = CHANNEL_PREFIX_RE.match(text)
+    if match:
+        return match.lastgroup
+    for word, channel in CHANNEL_WORDS:
+        if word in words:
+            return channel
+    for fragment, channel in TXN_TYPE_CHANNELS:
+        if fragment in txn_type:
+            return channel
+    return OTHER_CHANNEL
+
+
+def _counterparty(text: str, parts: List[str], channel: str):
+    """(counterparty_id, counterparty_bank) from the '-' separated narration fields"""
+    ifsc = next((part for part in parts if len(part) == 11 and IFSC_RE.match(part)), None)
+    bank = ifsc[:4] if ifsc else None
+    if '@' in text:
+        handle = next((i for i, part in enumerate(parts) if '@' in part and VPA_HANDLE_RE.match(part)), None)
+        if handle is not None:
+            # UPI-<name>-<vpa>-...: a VPA may itself contain '-', so it runs from
+            # after the name up to its @handle
+            start = 2 if channel == "UPI" and handle >= 2 else handle
+            return "-".join(parts[start:handle + 1]).lower()[:100], bank
+    if channel == "TPT":
+        return parts[0], bank
+    if channel == "IMPS" and bank is None:
+        # IMPS-<ref>-<name>-<bank code>-<masked account>-...
+        bank = next((part for part in parts[2:] if len(part) == 4 and BANK_CODE_RE.match(part)), None)
+    account = next((part for part in parts if part.startswith("XXXX") and MASKED_ACCOUNT_RE.match(part)), None)
+    if account:
+        return account, bank
+    if channel in ("NEFT", "RTGS", "IMPS") and len(parts) > 2:
+        # NEFTCR-<IFSC>-<remitter name>-...: the name is all there is
+        name = parts[2] if ifsc and parts[1] == ifsc else parts[1]
+        return (name.replace(' ', '')[:100] or None), bank
+    return None, bank
+
+
+def _jurisdiction(text: str, channel: str) -> Optional[str]:
+    found = JURISDICTION_RE.findall(text)
+    if found:
+        # a named country wins over a bare "offshore"
+        return min((JURISDICTION_CODES[keyword] for keyword in found), key=JURISDICTION_PRIORITY.get)
+    return DOMESTIC_CHANNELS.get(channel)
+
+
+def _direction(text: str, txn_type: str) -> Optional[str]:
+    if text:
+        # NEFTCR-... / ... CR, and the reverse for debits
+        head = text[:text.find('-')] if '-' in text else text.split(' ', 1)[0]
+        last = text.rsplit(' ', 1)[-1]
+        # the substring test is much cheaper than the word-boundary search it guards
+        word = DIRECTION_WORD_RE.search(text) if any(map(text.__contains__, DIRECTION_WORDS)) else None
+        word = word.group(0) if word else None
+        if (len(head) > 2 and head.endswith("CR")) or last in ("CR", "IN") or word in CREDIT_WORDS:
+            return "credit"
+        if (len(head) > 2 and head.endswith("DR")) or last in ("DR", "OUT") or word in DEBIT_WORDS:
+            return "debit"
+    return _type_direction(txn_type)
+
+
+@lru_cache(maxsize=256)
+def _type_direction(txn_type: str) -> Optional[str]:
+    # a handful of distinct txn_types, against every row of an import
+    if any(word in txn_type for word in ("deposit", "credit", "_in")):
+        return "credit"
+    if any(word in txn_type for word in ("withdraw", "debit", "_out", "payment")):
+        return "debit"
+    return None
+
+
+def parse_narration(narration: Optional[str], txn_type: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """channel, counterparty_id, counterparty_bank, jurisdiction and direction of one transaction"""
+    text = " ".join((narration or "").upper().split())
+    txn_type = (txn_type or "").lower()
+    upi = UPI_RE.match(text)
+    if upi:
+        channel, counterparty_id, counterparty_bank = "UPI", upi.group(1).lower()[:100], upi.group(2)
+    else:
+        channel = _channel(text, set(text.replace('-', ' ').split()), txn_type)
+        counterparty_id, counterparty_bank = _counterparty(text, [part.strip() for part in text.split('-')], channel)
+    return {
+        "channel": channel,
+        "counterparty_id": counterparty_id,
+        "counterparty_bank": counterparty_bank,
+        "jurisdiction": _jurisdiction(text, channel),
+        "direction": _direction(text, txn_type),
+    }
+
+
+@event.listens_for(models.Transaction, "before_insert")
+def _parse_on_insert(mapper, connection, target):
+    if target.channel is None:
+        for column, value in parse_narration(narration_from_meta(target.meta_data), target.txn_type).items():
+            setattr(target, column, value)
+
+
+def backfill_narration_fields(db, batch_size: int = BACKFILL_BATCH_SIZE, reparse: bool = False) -> int:
+    """
+    Parse stored narrations into the structured columns, batch_size rows per commit
+    in id order. Only rows not parsed yet (channel IS NULL) unless reparse is given,
+    e.g. after the parsing rules change. Returns the number of rows updated.
+    """
+    table = models.Transaction.__table__
+    # bind names can't repeat the column names in an executemany UPDATE
+    stmt = update(table).where(table.c.id == bindparam("row_id")).values(
+        {column: bindparam(f"new_{column}") for column in NARRATION_COLUMNS}
+    )
+    updated, after = 0, 0
+    while True:
+        query = select(table.c.id, table.c.txn_type, table.c.meta_data).where(table.c.id > after)
+        if not reparse:
+            query = query.where(table.c.channel.is_(None))
+        rows = db.execute(query.order_by(table.c.id).limit(batch_size)).all()
+        if not rows:
+            return updated
+        db.execute(stmt, [
+            {"row_id": row_id, **{f"new_{column}": value for column, value in
+                                   parse_narration(narration_from_meta(meta_data), txn_type).items()}}
+            for row_id, txn_type, meta_data in rows
+        ])
+        db.commit()
+        updated += len(rows)
+        after = rows[-1][0]
@@ -7,233 +7,242 @@ Detects:
 - Income-to-transaction mismatch
 - Geographic risk
 - Counterparty risk propagation
+The checks and their thresholds are declarative rules (rule_engine, default_typology_rules.yaml)
+- Anomalies: customers a fitted unsupervised model finds unusual (anomaly_service)
 """
 from .. import models
+from .anomaly_service import AnomalyScorer, anomaly_models
+from .narration_service import HIGH_RISK_JURISDICTIONS
+from .rule_engine import customer_features, typology_rules
+from .transaction_stats_service import customer_window_stats, customers_window_stats
+from ..core.config import settings
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
-from sklearn.cluster import KMeans
 import numpy as np
-from datetime import datetime, timedelta
-from typing import List, Dict, Any
+from datetime import date, datetime, time, timedelta
+from typing import List, Dict, Any, Optional, Sequence, Tuple
 from collections import Counter
 
 
-def analyze_transaction_risk(db: Session, case_id: int) -> Dict[str, Any]:
+def customer_transactions_stmt(customer_id: int, since: Optional[datetime] = None):
+    """
+    All transactions on a customer's accounts, oldest first: an accounts(customer_id)
+    lookup, then an ix_transactions_account_id_timestamp range per account.
+    since bounds the timestamp, which on the partitioned PostgreSQL table also
+    prunes the scan to the months it covers.
+    """
+    stmt = (
+        select(models.Transaction)
+        .join(models.Account, models.Transaction.account_id == models.Account.id)
+        .where(models.Account.customer_id == customer_id)
+        .order_by(models.Transaction.timestamp, models.Transaction.id)
+    )
+    if since is not None:
+        stmt = stmt.where(models.Transaction.timestamp >= since)
+    return stmt
+
+
+def window_start(now: datetime, days: Optional[int]) -> Optional[datetime]:
+    """Midnight at the start of a days-long lookback window, matching the daily statistics"""
+    if not days:
+        return None
+    return datetime.combine((now - timedelta(days=days)).date(), datetime.min.time())
+
+
+def resolve_windows(lookback_days: Optional[int] = None, windows: Optional[Sequence[int]] = None) -> List[Optional[int]]:
+    """
+    Lookback windows in days, shortest first: the given windows, else the single
+    lookback_days, else settings.RISK_LOOKBACK_WINDOWS. [None] means the whole history.
+    """
+    if windows is None:
+        windows = [lookback_days] if lookback_days else settings.RISK_LOOKBACK_WINDOWS
+    windows = sorted({int(days) for days in windows if days})
+    return windows or [None]
+
+
+def analyze_transaction_risk(db: Session, case_id: int, lookback_days: Optional[int] = None,
+                             windows: Optional[Sequence[int]] = None) -> Dict[str, Any]:
     """
     Comprehensive risk analysis of transaction patterns
     Returns structured risk intelligence profile
+    Every detector runs on each lookback window and reports the window (window_days)
+    that gave its strongest signal. Windows are read from the daily statistics, not
+    the raw transactions.
     """
     case = db.query(models.Case).filter(models.Case.id == case_id).first()
     if not case or not case.customer_id:
         return {"error": "Case or customer not found"}
     
     customer = db.query(models.Customer).filter(models.Customer.id == case.customer_id).first()
-    transactions = []
-    for account in customer.accounts:
-        transactions.extend(account.transactions)
+    typology_rules.refresh(db)
+    scorer = anomaly_models.current(db)
+    windows = resolve_windows(lookback_days, windows)
+    read = _with_model_window(windows, scorer)
+    now = datetime.utcnow()
+    starts = {days: window_start(now, days) for days in read}
+    stats = customer_window_stats(db, customer.id, starts)
+    geo_counts = _high_risk_jurisdiction_counts(db, [a.id for a in customer.accounts], starts)
     
     risk_profile = {
         "customer_id": customer.id,
         "customer_name": customer.name,
         "risk_rating": customer.risk_rating,
-        "total_transactions": len(transactions),
-        "total_volume": sum(t.amount for t in transactions),
+        "lookback_days": windows[-1],
+        "windows": windows,
+        "total_transactions": stats[windows[-1]]["txn_count"],
+        "total_volume": stats[windows[-1]]["volume"],
+        "distinct_counterparties": stats[windows[-1]]["counterparty_count"],
         "detections": []
     }
     
-    # 1. Structuring Detection
-    structuring_score = _detect_structuring(transactions)
-    if structuring_score > 0.7:
-        risk_profile["detections"].append({
-            "type": "structuring",
-            "score": structuring_score,
-            "severity": "HIGH" if structuring_score > 0.9 else "MEDIUM",
-            "evidence": "Multiple transactions below reporting threshold detected",
-            "recommendation": "Flag for enhanced due diligence"
-        })
-    
-    # 2. Layering Detection
-    layering_score = _detect_layering(transactions)
-    if layering_score > 0.6:
-        risk_profile["detections"].append({
-            "type": "layering",
-            "score": layering_score,
-            "severity": "HIGH" if layering_score > 0.8 else "MEDIUM",
-            "evidence": "Complex transaction chains indicating obfuscation",
-            "recommendation": "Investigate transaction origins"
-        })
-    
-    # 3. Velocity Anomaly Detection
-    velocity_score = _detect_velocity_anomaly(transactions)
-    if velocity_score > 0.75:
-        risk_profile["detections"].append({
-            "type": "velocity_anomaly",
-            "score": velocity_score,
-            "severity": "HIGH" if velocity_score > 0.9 else "MEDIUM",
-            "evidence": f"Abnormally high transaction frequency: {len(transactions)} in short period",
-            "recommendation": "Review customer business profile"
-        })
-    
-    # 4. Income-to-Transaction Mismatch
-    mismatch_score = _detect_income_mismatch(customer, transactions)
-    if mismatch_score > 0.7:
-        risk_profile["detections"].append({
-            "type": "income_mismatch",
-            "score": mismatch_score,
-            "severity": "HIGH",
-            "evidence": "Transaction volume inconsistent with stated income/business profile",
-            "recommendation": "Request updated KYC documentation"
-        })
-    
-    # 5. Geographic Risk
-    geo_risk_score = _evaluate_geographic_risk(transactions)
-    if geo_risk_score > 0.65:
-        risk_profile["detections"].append({
-            "type": "geographic_risk",
-            "score": geo_risk_score,
-            "severity": "MEDIUM",
-            "evidence": "Transactions involving high-risk jurisdictions",
-            "recommendation": "Enhanced monitoring for sanctions compliance"
-        })
-    
-    # 6. Counterparty Risk Propagation
-    counterparty_score = _analyze_counterparty_risk(transactions)
-    if counterparty_score > 0.6:
-        risk_profile["detections"].append({
-            "type": "counterparty_risk",
-            "score": counterparty_score,
-            "severity": "MEDIUM" if counterparty_score < 0.8 else "HIGH",
-            "evidence": "Transactions with potentially high-risk counterparties",
-            "recommendation": "Conduct counterparty due diligence"
-        })
+    features = customer_features([(stats[days], geo_counts[days], customer.risk_rating, days) for days in read])
+    found = typology_rules.evaluate_customers(_rows(features, np.arange(len(windows))))
+    risk_profile["detections"] = strongest_detections(dict(zip(windows, found)))
+    risk_profile["anomaly_score"] = None
+    if scorer is not None:
+        percentiles, anomalies = anomaly_models.score(scorer, _rows(features, [read.index(scorer.window_days)]))
+        risk_profile["anomaly_score"] = float(percentiles[0])
+        risk_profile["detections"] += [anomalies[0]] if anomalies[0] else []
     
     # Overall risk score
-    if risk_profile["detections"]:
-        risk_profile["overall_risk_score"] = np.mean([d["score"] for d in risk_profile["detections"]])
-        risk_profile["risk_level"] = _categorize_risk(risk_profile["overall_risk_score"])
-    else:
-        risk_profile["overall_risk_score"] = 0.0
-        risk_profile["risk_level"] = "LOW"
+    risk_profile["overall_risk_score"], risk_profile["risk_level"] = overall_risk(risk_profile["detections"])
     
     return risk_profile
 
 
-def _detect_structuring(transactions: List) -> float:
-    """Detect structuring (smurfing) patterns"""
-    if len(transactions) < 3:
-        return 0.0
-    
-    # Threshold just below reporting limit ($10,000 USD)
-    THRESHOLD = 9500
-    suspicious_count = sum(1 for t in transactions if 8000 <= t.amount <= THRESHOLD)
-    
-    if suspicious_count >= 3:
-        # Check temporal clustering
-        timestamps = [t.timestamp for t in transactions if 8000 <= t.amount <= THRESHOLD]
-        if timestamps:
-            time_deltas = [(timestamps[i+1] - timestamps[i]).total_seconds() / 3600 
-                           for i in range(len(timestamps)-1)]
-            # If transactions within 24 hours
-            clustered = sum(1 for delta in time_deltas if delta < 24)
-            return min(1.0, 0.6 + (clustered / len(transactions)) * 0.4)
-    
-    return min(1.0, suspicious_count / len(transactions))
+def assess_customers(db: Session, customer_ids: Sequence[int], windows: Optional[Sequence[int]] = None,
+                     now: Optional[datetime] = None) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    The detections analyze_transaction_risk would report for each of a batch of
+    customers (customer id -> detections, empty when nothing fired), read with a
+    handful of queries and scored by the rules in one pass over every customer and window
+    """
+    typology_rules.refresh(db)
+    scorer = anomaly_models.current(db)
+    windows = resolve_windows(windows=windows)
+    read = _with_model_window(windows, scorer)
+    ids, features = customers_window_features(db, customer_ids, read, now or datetime.utcnow())
+    rows = np.arange(len(ids))[:, None] * len(read)  # each customer's first row
+    found = iter(typology_rules.evaluate_customers(_rows(features, (rows + np.arange(len(windows))).ravel())))
+    anomalies = [None] * len(ids)
+    if scorer is not None:
+        anomalies = anomaly_models.score(scorer, _rows(features, rows.ravel() + read.index(scorer.window_days)))[1]
+    return {
+        customer_id: strongest_detections({days: next(found) for days in windows}) + ([anomaly] if anomaly else [])
+        for customer_id, anomaly in zip(ids, anomalies)
+    }
 
 
-def _detect_layering(transactions: List) -> float:
-    """Detect layering through complex transaction patterns"""
-    if len(transactions) < 5:
-        return 0.0
-    
-    # Look for rapid movement patterns
-    wire_transfers = [t for t in transactions if 'wire' in t.txn_type.lower()]
-    if len(wire_transfers) >= 3:
-        # High number of wire transfers suggests layering
-        return min(1.0, len(wire_transfers) / len(transactions) + 0.3)
-    
-    # Check for round-trip patterns (placeholder - would need counterparty data)
-    return min(0.8, len(wire_transfers) / 10.0)
+def _with_model_window(windows: List[Optional[int]], scorer: Optional[AnomalyScorer]) -> List[Optional[int]]:
+    """The windows to read: the rules' windows, then the anomaly model's if it isn't one of them"""
+    if scorer is None or scorer.window_days in windows:
+        return list(windows)
+    return [*windows, scorer.window_days]
 
 
-def _detect_velocity_anomaly(transactions: List) -> float:
-    """Detect abnormal transaction velocity"""
-    if len(transactions) < 2:
-        return 0.0
-    
-    # Calculate transaction frequency
-    timestamps = sorted([t.timestamp for t in transactions])
-    time_span = (timestamps[-1] - timestamps[0]).total_seconds() / 86400  # days
-    
-    if time_span < 1:
-        time_span = 1  # At least 1 day
-    
-    velocity = len(transactions) / time_span
-    
-    # Normal business: ~2-5 transactions/day
-    # Suspicious: >15 transactions/day
-    if velocity > 15:
-        return min(1.0, velocity / 20.0)
-    elif velocity > 10:
-        return 0.75
-    elif velocity > 7:
-        return 0.6
-    return 0.0
+def _rows(features: Dict[str, np.ndarray], index) -> Dict[str, np.ndarray]:
+    return {name: values[index] for name, values in features.items()}
 
 
-def _detect_income_mismatch(customer, transactions: List) -> float:
-    """Detect mismatch between customer profile and transaction volume"""
-    if not transactions:
-        return 0.0
-    
-    total_volume = sum(t.amount for t in transactions)
-    
-    # Simplified risk scoring based on customer risk rating
-    # In production, would compare against declared income/revenue
-    if customer.risk_rating >= 4:  # High risk customer
-        if total_volume > 500000:  # $500k threshold
-            return 0.9
-        elif total_volume > 250000:
-            return 0.75
-    
-    if total_volume > 1000000:  # $1M threshold for any customer
-        return 0.85
-    
-    return min(1.0, total_volume / 2000000)  # Scale up to $2M
+def customers_window_features(db: Session, customer_ids: Sequence[int], windows: Sequence[Optional[int]],
+                              now: datetime, until: Optional[date] = None) -> Tuple[List[int], Dict[str, np.ndarray]]:
+    """
+    The customers among customer_ids that exist and their rule features
+    (customer_features), one row per customer and window in that order. With until,
+    transactions after that day are left out, replaying the history as it stood then.
+    """
+    starts = {days: window_start(now, days) for days in windows}
+    customers = db.execute(
+        select(models.Customer.id, models.Customer.risk_rating).where(models.Customer.id.in_(customer_ids))
+    ).all()
+    ids = [customer.id for customer in customers]
+    stats = customers_window_stats(db, ids, starts, until)
+    before = datetime.combine(until + timedelta(days=1), time.min) if until is not None else None
+    geo_counts = customers_high_risk_jurisdiction_counts(db, ids, starts, before)
+    return ids, customer_features([
+        (stats[customer.id][days], geo_counts[customer.id][days], customer.risk_rating, days)
+        for customer in customers for days in windows
+    ])
 
 
-def _evaluate_geographic_risk(transactions: List) -> float:
-    """Evaluate geographic risk factors"""
-    # Simplified - would integrate with sanctions lists & high-risk jurisdictions
-    # Check transaction metadata for geographic indicators
-    
-    high_risk_keywords = ['offshore', 'cayman', 'panama', 'hong kong', 'switzerland']
-    risk_count = 0
-    
-    for t in transactions:
-        metadata = (t.meta_data or "").lower()
-        if any(keyword in metadata for keyword in high_risk_keywords):
-            risk_count += 1
-    
-    if risk_count > 0:
-        return min(1.0, risk_count / len(transactions) + 0.5)
-    
-    return 0.0
+def strongest_detections(detections: Dict[Optional[int], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Each typology's strongest detection across the windows (window days -> detections), tagged with its window_days"""
+    strongest = {}
+    for days, found in detections.items():
+        for detection in found:
+            # ties go to the shorter window, the more specific signal
+            if detection["type"] not in strongest or detection["score"] > strongest[detection["type"]]["score"]:
+                strongest[detection["type"]] = {**detection, "window_days": days}
+    return list(strongest.values())
 
 
-def _analyze_counterparty_risk(transactions: List) -> float:
-    """Analyze counterparty risk propagation"""
-    # Simplified - would perform network analysis of counterparties
-    # Check for PEP, sanctions, adverse media
-    
-    # For demo: check transaction patterns
-    large_transactions = [t for t in transactions if t.amount > 50000]
-    
-    if large_transactions:
-        return min(0.8, len(large_transactions) / len(transactions) + 0.4)
-    
-    return 0.0
+def overall_risk(detections: List[Dict[str, Any]]) -> Tuple[float, str]:
+    """Mean detection score and its risk level; LOW when nothing was detected"""
+    if detections:
+        score = float(np.mean([d["score"] for d in detections]))
+        return score, categorize_risk(score)
+    return 0.0, "LOW"
+
+
+def detect_typologies(customer, stats: Dict[str, Any], geo_risk_count: int) -> List[Dict[str, Any]]:
+    """
+    The customer typology rules (rule_engine, default_typology_rules.yaml) over one
+    window's statistics (see transaction_stats_service); customer only needs a risk_rating
+    """
+    return typology_rules.evaluate_customers(customer_features([(stats, geo_risk_count, customer.risk_rating, None)]))[0]
+
+
+def _high_risk_jurisdiction_counts(db: Session, account_ids: List[int],
+                                   starts: Dict[Optional[int], Optional[datetime]]) -> Dict[Optional[int], int]:
+    """
+    Transactions with a high-risk parsed jurisdiction per lookback window, counted
+    in one query over the indexed column and bounded by the longest window
+    """
+    if not account_ids:
+        return {days: 0 for days in starts}
+    timestamp = models.Transaction.timestamp
+    counts = [
+        func.count(models.Transaction.id) if since is None else func.count(models.Transaction.id).filter(timestamp >= since)
+        for since in starts.values()
+    ]
+    stmt = select(*counts).where(
+        models.Transaction.account_id.in_(account_ids),
+        models.Transaction.jurisdiction.in_(HIGH_RISK_JURISDICTIONS),
+    )
+    if None not in starts.values():
+        stmt = stmt.where(timestamp >= min(starts.values()))
+    return dict(zip(starts, db.execute(stmt).one()))
+
+
+def customers_high_risk_jurisdiction_counts(db: Session, customer_ids: Sequence[int],
+                                            starts: Dict[Optional[int], Optional[datetime]],
+                                            before: Optional[datetime] = None) -> Dict[int, Dict[Optional[int], int]]:
+    """_high_risk_jurisdiction_counts() for a batch of customers in one grouped query, optionally only before a time"""
+    counts = {customer_id: {days: 0 for days in starts} for customer_id in customer_ids}
+    if not counts:
+        return counts
+    timestamp = models.Transaction.timestamp
+    columns = [
+        func.count(models.Transaction.id) if since is None else func.count(models.Transaction.id).filter(timestamp >= since)
+        for since in starts.values()
+    ]
+    stmt = (
+        select(models.Account.customer_id, *columns)
+        .join(models.Account, models.Transaction.account_id == models.Account.id)
+        .where(models.Account.customer_id.in_(customer_ids),
+               models.Transaction.jurisdiction.in_(HIGH_RISK_JURISDICTIONS))
+        .group_by(models.Account.customer_id)
+    )
+    if None not in starts.values():
+        stmt = stmt.where(timestamp >= min(starts.values()))
+    if before is not None:
+        stmt = stmt.where(timestamp < before)
+    for customer_id, *window_counts in db.execute(stmt):
+        counts[customer_id] = dict(zip(starts, window_counts))
+    return counts
 
 
-def _categorize_risk(score: float) -> str:
+def categorize_risk(score: float) -> str:
     """Categorize overall risk level"""
     if score >= 0.85:
         return "CRITICAL"
@@ -256,6 +265,7 @@ def store_risk_analysis(db: Session, case_id: int, risk_profile: Dict[str, Any])
             detection_type=detection["type"],
             score=detection["score"],
             details=f"{detection['evidence']} | {detection['recommendation']}",
+            severity=detection.get("severity"),
             created_at=datetime.utcnow()
         )
         db.add(typology)
@@ -0,0 +1,438 @@
+"""
+Declarative typology rules.
+A rule is a small YAML or JSON document. Customer rules score the statistics of a
+customer's lookback window with an expression and fire above a threshold:
+
+    name: structuring
+    kind: customer
+    when: txn_count >= 3
+    score: "min(1, 0.6 + band_clustered / txn_count * 0.4) if band_count >= 3 else min(1, band_count / txn_count)"
+    threshold: 0.7                                  # fires when score > threshold
+    severity: {HIGH: score > 0.9, default: MEDIUM}  # first condition that holds, else default
+    evidence: "{band_count} transactions below the reporting threshold"
+    recommendation: Flag for enhanced due diligence
+
+Expressions use the CUSTOMER_FEATURES names, numbers, + - * / (x / 0 is 0),
+comparisons, and / or / not, `a if cond else b`, min, max, abs and where(cond, a, b).
+They are compiled once into numpy functions taking one array per feature, so a
+batch of customers and windows is scored by every rule in a single pass.
+
+Narrative rules flag SAR narratives (typology_service) and pattern rules label
+clusters of SARs (cross_case_intelligence_service) by keyword; a keyword matches
+at the start of a word.
+
+The built-in rules are in default_typology_rules.yaml. Rows in typology_rules
+override them by name (enabled=false switches one off) or add new ones; the
+registry checks the table for changes at most every RULES_RELOAD_INTERVAL_SECONDS
+and recompiles, so edits apply without a restart.
+"""
+from functools import reduce
+from typing import Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+import ast
+import logging
+import os
+import re
+import string
+import threading
+import time
+import numpy as np
+import yaml
+from sqlalchemy import func, select
+from .. import models
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_RULES_PATH = os.path.join(os.path.dirname(__file__), "default_typology_rules.yaml")
+KINDS = ("customer", "narrative", "pattern")
+CUSTOMER_FEATURES = (
+    "txn_count", "volume", "max_amount", "band_count", "wire_count", "large_count", "counterparty_count",
+    "band_clustered",  # structuring band transactions within CLUSTER_HOURS of the previous one
+    "high_risk_count",  # transactions with a high-risk parsed jurisdiction
+    "span_days",  # first to last transaction
+    "velocity",  # transactions per day over span_days, at least one day
+    "risk_rating",  # the customer's, 0 when unset
+    "window_days",  # the lookback window, 0 for the whole history
+)
+CLUSTER_HOURS = 24
+
+Expression = Callable[[Mapping[str, np.ndarray]], np.ndarray]
+
+
+class RuleError(ValueError):
+    pass
+
+
+def _divide(a, b):
+    a, b = np.broadcast_arrays(np.asarray(a, dtype=float), np.asarray(b, dtype=float))
+    return np.divide(a, b, out=np.zeros(a.shape), where=b != 0)
+
+
+_BINARY = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: _divide}
+_COMPARE = {ast.Lt: np.less, ast.LtE: np.less_equal, ast.Gt: np.greater, ast.GtE: np.greater_equal,
+            ast.Eq: np.equal, ast.NotEq: np.not_equal}
+# name -> (function, fewest arguments, most arguments)
+_FUNCTIONS = {
+    "min": (lambda *args: reduce(np.minimum, args), 2, None),
+    "max": (lambda *args: reduce(np.maximum, args), 2, None),
+    "abs": (np.abs, 1, 1),
+    "where": (np.where, 3, 3),
+}
+
+
+def compile_expression(source, names: Sequence[str]) -> Expression:
+    """Compile an expression over names into a function of {name: array}"""
+    if isinstance(source, (int, float)):
+        value = float(source)
+        return lambda env: value
+    try:
+        tree = ast.parse(str(source).strip(), mode="eval")
+    except SyntaxError as e:
+        raise RuleError(f"Invalid expression {source!r}: {e.msg}")
+    return _compile(tree.body, str(source), set(names))
+
+
+def _compile(node, source: str, names: set) -> Expression:
+    def sub(child):
+        return _compile(child, source, names)
+
+    if isinstance(node, ast.Constant) and isinstance(node.value, (int, float)):
+        value = node.value
+        return lambda env: value
+    if isinstance(node, ast.Name):
+        if node.id not in names:
+            raise RuleError(f"Unknown name {node.id!r} in {source!r}")
+        name = node.id
+        return lambda env: env[name]
+    if isinstance(node, ast.BinOp) and type(node.op) in _BINARY:
+        op, left, right = _BINARY[type(node.op)], sub(node.left), sub(node.right)
+        return lambda env: op(left(env), right(env))
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.Not)):
+        op, operand = (np.negative if isinstance(node.op, ast.USub) else np.logical_not), sub(node.operand)
+        return lambda env: op(operand(env))
+    if isinstance(node, ast.BoolOp):
+        op, values = (np.logical_and if isinstance(node.op, ast.And) else np.logical_or), [sub(v) for v in node.values]
+        return lambda env: reduce(op, [value(env) for value in values])
+    if isinstance(node, ast.Compare) and all(type(op) in _COMPARE for op in node.ops):
+        ops = [_COMPARE[type(op)] for op in node.ops]
+        operands = [sub(node.left)] + [sub(c) for c in node.comparators]
+
+        def compare(env):
+            values = [operand(env) for operand in operands]
+            return reduce(np.logical_and, [op(values[i], values[i + 1]) for i, op in enumerate(ops)])
+        return compare
+    if isinstance(node, ast.IfExp):
+        test, body, orelse = sub(node.test), sub(node.body), sub(node.orelse)
+        return lambda env: np.where(test(env), body(env), orelse(env))
+    if isinstance(node, ast.Call) and isinstance(node.func, ast.Name) and node.func.id in _FUNCTIONS and not node.keywords:
+        fn, fewest, most = _FUNCTIONS[node.func.id]
+        if len(node.args) < fewest or (most is not None and len(node.args) > most):
+            raise RuleError(f"Wrong number of arguments to {node.func.id}() in {source!r}")
+        args = [sub(arg) for arg in node.args]
+        return lambda env: fn(*[arg(env) for arg in args])
+    raise RuleError(f"Unsupported {type(node).__name__} in {source!r}")
+
+
+def _template_fields(template: str, names: Sequence[str]) -> List[str]:
+    try:
+        fields = [field for _, field, _, _ in string.Formatter().parse(template) if field is not None]
+    except ValueError as e:
+        raise RuleError(f"Invalid template {template!r}: {e}")
+    unknown = [field for field in fields if field not in names]
+    if unknown:
+        raise RuleError(f"Unknown field {unknown[0]!r} in {template!r}")
+    # features are filled in as ints or floats (_plain); the format specs must take both
+    for sample in (1, 1.5):
+        try:
+            template.format(**{field: sample for field in fields})
+        except (TypeError, ValueError) as e:
+            raise RuleError(f"Invalid template {template!r}: {e}")
+    return fields
+
+
+def _plain(value):
+    value = float(value)
+    return int(value) if value.is_integer() else round(value, 4)
+
+
+def _column(values, n: int, dtype) -> np.ndarray:
+    """An expression's result as a writable array of n values (constants are broadcast)"""
+    values = np.asarray(values, dtype=dtype)
+    return values if values.shape == (n,) else np.full(n, values, dtype=dtype)
+
+
+class Rule:
+    """A validated rule definition with its expressions compiled"""
+
+    def __init__(self, definition: Mapping, source: str = "default"):
+        if not isinstance(definition, Mapping):
+            raise RuleError("A rule must be a mapping")
+        self.definition = dict(definition)
+        self.source = source
+        self.name = str(definition.get("name") or "").strip()
+        if not self.name:
+            raise RuleError("A rule needs a name")
+        self.kind = definition.get("kind", "customer")
+        if self.kind not in KINDS:
+            raise RuleError(f"Rule {self.name}: kind must be one of {', '.join(KINDS)}")
+        self.type = str(definition.get("type") or self.name)
+        self.enabled = bool(definition.get("enabled", True))
+        self.evidence = str(definition.get("evidence", ""))
+        self.recommendation = str(definition.get("recommendation", ""))
+        try:
+            self.priority = int(definition.get("priority", 100))
+            if self.kind == "customer":
+                self._compile_customer(definition)
+            else:
+                self._compile_keywords(definition)
+        except RuleError as e:
+            raise RuleError(f"Rule {self.name}: {e}")
+        except (TypeError, ValueError) as e:  # a non-numeric priority, threshold or score
+            raise RuleError(f"Rule {self.name}: {e}")
+
+    def _compile_customer(self, definition: Mapping):
+        if "score" not in definition:
+            raise RuleError("customer rules need a score")
+        self.score = compile_expression(definition["score"], CUSTOMER_FEATURES)
+        self.when = compile_expression(definition["when"], CUSTOMER_FEATURES) if "when" in definition else None
+        self.threshold = float(definition.get("threshold", 0.0))
+        severity = definition.get("severity", "MEDIUM")
+        if isinstance(severity, Mapping):
+            severity = dict(severity)
+            self.default_severity = str(severity.pop("default", "MEDIUM"))
+            self.severities = [(str(level), compile_expression(condition, (*CUSTOMER_FEATURES, "score")))
+                               for level, condition in severity.items()]
+        else:
+            self.default_severity, self.severities = str(severity), []
+        self.evidence_fields = _template_fields(self.evidence, CUSTOMER_FEATURES)
+
+    def fire(self, features: Mapping[str, np.ndarray], n: int) -> Tuple[np.ndarray, np.ndarray]:
+        """A customer rule's scores over n rows of features and where it fires (call under np.errstate)"""
+        score = _column(self.score(features), n, float)
+        fired = score > self.threshold
+        if self.when is not None:
+            fired &= _column(self.when(features), n, bool)
+        return score, fired
+
+    def _compile_keywords(self, definition: Mapping):
+        keywords = definition.get("keywords")
+        if not keywords or not isinstance(keywords, list):
+            raise RuleError(f"{self.kind} rules need a list of keywords")
+        self.keywords = [str(k).lower() for k in keywords]
+        self.pattern = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in self.keywords) + ")")
+        self.score_value = float(definition.get("score", 0.0))
+        self.label = str(definition.get("label", self.type))
+
+
+def parse_rules(text: str) -> List[dict]:
+    """Rule definitions from YAML or JSON text: one rule, a list of rules, or {"rules": [...]}"""
+    try:
+        data = yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise RuleError(f"Invalid YAML/JSON: {e}")
+    if isinstance(data, Mapping) and "rules" in data:
+        data = data["rules"]
+    if isinstance(data, Mapping):
+        data = [data]
+    if not isinstance(data, list) or not all(isinstance(d, Mapping) for d in data):
+        raise RuleError("Expected a rule or a list of rules")
+    return [dict(d) for d in data]
+
+
+def customer_features(rows: Sequence[Tuple[dict, int, Optional[int], Optional[int]]]) -> Dict[str, np.ndarray]:
+    """
+    One array per CUSTOMER_FEATURES name from (window stats, high-risk jurisdiction
+    count, risk rating, window days) rows; stats as transaction_stats_service builds them
+    """
+    n = len(rows)
+    features = {name: np.zeros(n) for name in CUSTOMER_FEATURES}
+    cluster_seconds = CLUSTER_HOURS * 3600
+    for i, (stats, high_risk_count, risk_rating, window_days) in enumerate(rows):
+        for name in ("txn_count", "volume", "max_amount", "band_count", "wire_count", "large_count",
+                     "counterparty_count"):
+            features[name][i] = stats[name]
+        timestamps = stats["band_timestamps"]
+        features["band_clustered"][i] = sum(
+            1 for j in range(len(timestamps) - 1) if (timestamps[j + 1] - timestamps[j]).total_seconds() < cluster_seconds
+        )
+        if stats["first_at"] is not None:
+            features["span_days"][i] = (stats["last_at"] - stats["first_at"]).total_seconds() / 86400
+        features["high_risk_count"][i] = high_risk_count
+        features["risk_rating"][i] = risk_rating or 0
+        features["window_days"][i] = window_days or 0
+    features["velocity"] = _divide(features["txn_count"], np.maximum(features["span_days"], 1))
+    return features
+
+
+class RuleSet:
+    """Enabled rules by kind, in priority order"""
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = list(rules)
+        ordered = sorted((rule for rule in self.rules if rule.enabled), key=lambda rule: rule.priority)
+        self.by_kind = {kind: [rule for rule in ordered if rule.kind == kind] for kind in KINDS}
+
+
+def load_default_rules(path: str = DEFAULT_RULES_PATH) -> List[Rule]:
+    with open(path) as f:
+        return [Rule(definition) for definition in parse_rules(f.read())]
+
+
+def build_rule_set(defaults: Sequence[Rule], rows) -> RuleSet:
+    """The defaults overridden by name (and extended) by typology_rules rows; rows that don't compile are skipped"""
+    rules = {rule.name: rule for rule in defaults}
+    for row in rows:
+        try:
+            definitions = parse_rules(row.definition)
+            if len(definitions) != 1:
+                raise RuleError("Expected exactly one rule")
+            rule = Rule({**definitions[0], "name": row.name, "enabled": row.enabled}, source="database")
+        except RuleError as e:
+            logger.warning("Skipping typology rule %s: %s", row.name, e)
+            continue
+        rules[rule.name] = rule
+    return RuleSet(rules.values())
+
+
+class RuleRegistry:
+    """
+    The rules in effect in this process, reloaded when typology_rules changes, and
+    per-rule evaluation counts and timings; safe to share between threads
+    """
+
+    def __init__(self, reload_interval: float):
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._defaults = load_default_rules()
+        self.rule_set = RuleSet(self._defaults)
+        self._revision = None
+        self._checked_at = float("-inf")
+        self.reloads = 0
+        self._stats: Dict[str, list] = {}  # rule name -> [calls, rows, hits, seconds]
+
+    def due(self) -> bool:
+        return time.monotonic() - self._checked_at >= self.reload_interval
+
+    def refresh(self, db, force: bool = False):
+        """Recompile from typology_rules if it changed; at most once per reload interval unless forced"""
+        if not force and not self.due():
+            return
+        self._checked_at = time.monotonic()
+        table = models.TypologyRule
+        try:
+            with db.get_bind().connect() as connection:
+                revision = tuple(connection.execute(
+                    select(func.count(table.id), func.max(table.updated_at), func.sum(table.version))
+                ).one())
+                if revision == self._revision and not force:
+                    return
+                rows = connection.execute(select(table.name, table.definition, table.enabled).order_by(table.id)).all()
+        except Exception as e:  # e.g. the table isn't migrated yet; keep the rules we have
+            logger.warning("Could not reload typology rules: %s", e)
+            return
+        rule_set = build_rule_set(self._defaults, rows)
+        with self._lock:
+            self.rule_set, self._revision = rule_set, revision
+            self.reloads += 1
+
+    def _record(self, timings: List[tuple]):
+        with self._lock:
+            for name, rows, hits, seconds in timings:
+                stats = self._stats.setdefault(name, [0, 0, 0, 0.0])
+                stats[0] += 1
+                stats[1] += rows
+                stats[2] += hits
+                stats[3] += seconds
+
+    def evaluate_customers(self, features: Mapping[str, np.ndarray]) -> List[List[dict]]:
+        """The customer rules' detections for every row of features (see customer_features)"""
+        n = len(features["txn_count"])
+        detections: List[List[dict]] = [[] for _ in range(n)]
+        timings = []
+        with np.errstate(invalid="ignore", over="ignore"):
+            for rule in self.rule_set.by_kind["customer"]:
+                started = time.perf_counter()
+                try:
+                    found = self._fire_customer_rule(rule, features, n)
+                except Exception as e:  # one broken rule mustn't stop the others
+                    logger.warning("Typology rule %s failed and was skipped: %s", rule.name, e)
+                    continue
+                for i, detection in found:
+                    detections[i].append(detection)
+                timings.append((rule.name, n, len(found), time.perf_counter() - started))
+        self._record(timings)
+        return detections
+
+    @staticmethod
+    def _fire_customer_rule(rule: Rule, features: Mapping[str, np.ndarray], n: int) -> List[Tuple[int, dict]]:
+        """(row, detection) for every row of features a customer rule fires on"""
+        score, fired = rule.fire(features, n)
+        rows = np.flatnonzero(fired)
+        if not rows.size:
+            return []
+        severity = np.full(n, rule.default_severity, dtype=object)
+        env = {**features, "score": score}
+        for level, condition in reversed(rule.severities):  # the first that holds wins
+            severity[_column(condition(env), n, bool)] = level
+        return [(i, {
+            "type": rule.type, "rule": rule.name, "score": float(score[i]), "severity": severity[i],
+            "evidence": rule.evidence.format(**{f: _plain(features[f][i]) for f in rule.evidence_fields}),
+            "recommendation": rule.recommendation,
+        }) for i in rows]
+
+    def match_narrative(self, text: str) -> List[dict]:
+        """Detections from the narrative rules whose keywords appear in text"""
+        text = (text or "").lower()
+        detections, timings = [], []
+        for rule in self.rule_set.by_kind["narrative"]:
+            started = time.perf_counter()
+            hit = rule.pattern.search(text) is not None
+            if hit:
+                detections.append({"type": rule.type, "rule": rule.name, "score": rule.score_value,
+                                   "evidence": rule.evidence})
+            timings.append((rule.name, 1, int(hit), time.perf_counter() - started))
+        self._record(timings)
+        return detections
+
+    def infer_pattern(self, keywords: Sequence[str]) -> Optional[str]:
+        """The label of the first pattern rule matching any of keywords"""
+        text = " ".join(keywords).lower()
+        for rule in self.rule_set.by_kind["pattern"]:
+            if rule.pattern.search(text):
+                return rule.label
+        return None
+
+    def describe(self) -> List[dict]:
+        """Every rule in effect, enabled or not, with its definition, source and statistics"""
+        with self._lock:
+            stats = {name: list(values) for name, values in self._stats.items()}
+            rules = list(self.rule_set.rules)
+        return [
+            {"name": rule.name, "kind": rule.kind, "type": rule.type, "enabled": rule.enabled,
+             "source": rule.source, "definition": rule.definition, **_rule_stats(stats.get(rule.name))}
+            for rule in sorted(rules, key=lambda rule: (KINDS.index(rule.kind), rule.priority, rule.name))
+        ]
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "rules": len(self.rule_set.rules),
+                "enabled": sum(len(rules) for rules in self.rule_set.by_kind.values()),
+                "reloads": self.reloads,
+                "seconds": round(sum(values[3] for values in self._stats.values()), 6),
+            }
+
+    def reset(self):
+        """Back to the built-in rules, forgetting statistics (tests)"""
+        with self._lock:
+            self.rule_set, self._revision, self._checked_at = RuleSet(self._defaults), None, float("-inf")
+            self._stats.clear()
+
+
+def _rule_stats(values: Optional[list]) -> dict:
+    calls, rows, hits, seconds = values or (0, 0, 0, 0.0)
+    return {"calls": calls, "rows": rows, "hits": hits, "seconds": round(seconds, 6),
+            "us_per_row": round(seconds / rows * 1e6, 3) if rows else None}
+
+
+typology_rules = RuleRegistry(settings.RULES_RELOAD_INTERVAL_SECONDS)
@@ -0,0 +1,262 @@
+"""
+Real-time transaction screening.
+Each screened customer has a compact rolling state in memory: per-day buckets for
+the last SCREENING_WINDOW_DAYS days (count, volume, largest amount, structuring
+band / wire / large / high-risk jurisdiction counts, first and last timestamps,
+and the counterparties seen that day) and the sorted timestamps of its
+structuring-band transactions. Scoring a transaction adds it to the state and
+runs the same typology rules as the case analysis
+(risk_analysis_service.detect_typologies) over the window, without a database
+round trip. A txn_id screened again (a retried request) is scored without being
+added twice; the last MAX_RECENT_TXN_IDS ids per customer are remembered.
+
+State is loaded from daily_account_stats the first time a customer is screened,
+and again once it is older than SCREENING_STATE_TTL_SECONDS, which also picks up
+transactions ingested in between. The store holds at most SCREENING_MAX_CUSTOMERS
+customers and evicts the least recently screened.
+"""
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Set, Tuple
+import threading
+import time
+from sqlalchemy import or_, select
+from .. import models
+from ..core.config import settings
+from .narration_service import HIGH_RISK_JURISDICTIONS, parse_narration
+from .risk_analysis_service import detect_typologies, overall_risk, window_start
+from .transaction_stats_service import LARGE_AMOUNT, STRUCTURING_BAND, empty_stats, in_band, is_wire
+
+# bucket fields
+COUNT, VOLUME, MAX_AMOUNT, BAND, WIRE, LARGE, HIGH_RISK, FIRST_AT, LAST_AT = range(9)
+# band timestamps kept per customer; structuring only needs the recent ones
+MAX_BAND_TIMESTAMPS = 1000
+# screened txn_ids remembered per customer, to spot retries
+MAX_RECENT_TXN_IDS = 1000
+
+
+class ScreeningError(Exception):
+    pass
+
+
+class CustomerState:
+    __slots__ = ("customer_id", "risk_rating", "days", "counterparties", "band_times", "txn_ids", "loaded_at")
+
+    def __init__(self, customer_id: int, risk_rating: int, loaded_at: float):
+        self.customer_id = customer_id
+        self.risk_rating = risk_rating or 0
+        self.days: Dict[int, list] = {}  # date ordinal -> bucket
+        self.counterparties: Dict[int, Set[str]] = {}  # date ordinal -> counterparty ids
+        self.band_times: List[datetime] = []
+        self.txn_ids: Dict[str, None] = {}  # insertion ordered, oldest first
+        self.loaded_at = loaded_at
+
+    def seen(self, txn_id: str) -> bool:
+        """Whether txn_id was screened before; remembers it otherwise"""
+        if txn_id in self.txn_ids:
+            return True
+        self.txn_ids[txn_id] = None
+        if len(self.txn_ids) > MAX_RECENT_TXN_IDS:
+            del self.txn_ids[next(iter(self.txn_ids))]
+        return False
+
+    def add(self, timestamp: datetime, amount: float, txn_type: Optional[str], high_risk: bool,
+            counterparty_id: Optional[str] = None):
+        if counterparty_id:
+            self.counterparties.setdefault(timestamp.toordinal(), set()).add(counterparty_id)
+        bucket = self.days.get(timestamp.toordinal())
+        if bucket is None:
+            bucket = self.days[timestamp.toordinal()] = [0, 0.0, 0.0, 0, 0, 0, 0, timestamp, timestamp]
+        bucket[COUNT] += 1
+        bucket[VOLUME] += amount
+        bucket[MAX_AMOUNT] = max(bucket[MAX_AMOUNT], amount)
+        bucket[BAND] += in_band(amount)
+        bucket[WIRE] += is_wire(txn_type)
+        bucket[LARGE] += amount > LARGE_AMOUNT
+        bucket[HIGH_RISK] += high_risk
+        bucket[FIRST_AT] = min(bucket[FIRST_AT], timestamp)
+        bucket[LAST_AT] = max(bucket[LAST_AT], timestamp)
+        if in_band(amount):
+            insort(self.band_times, timestamp)
+            if len(self.band_times) > MAX_BAND_TIMESTAMPS:
+                del self.band_times[0]
+
+    def window(self, now: datetime, days: int) -> Tuple[dict, int]:
+        """
+        (stats, high-risk count) over the days-long window ending now. Buckets are
+        dropped once they are out of the window for both now and the real clock, so
+        a backdated or future-dated transaction doesn't discard history still in use
+        """
+        start = window_start(now, days)
+        first_day, last_day = start.toordinal(), now.toordinal()
+        expired = window_start(min(now, datetime.utcnow()), days)
+        for day in [day for day in self.days if day < expired.toordinal()]:
+            del self.days[day]
+        for day in [day for day in self.counterparties if day < expired.toordinal()]:
+            del self.counterparties[day]
+        del self.band_times[:bisect_left(self.band_times, expired)]
+
+        stats, high_risk = empty_stats(), 0
+        for day, bucket in self.days.items():
+            if not first_day <= day <= last_day:
+                continue
+            stats["txn_count"] += bucket[COUNT]
+            stats["volume"] += bucket[VOLUME]
+            stats["max_amount"] = max(stats["max_amount"], bucket[MAX_AMOUNT])
+            stats["band_count"] += bucket[BAND]
+            stats["wire_count"] += bucket[WIRE]
+            stats["large_count"] += bucket[LARGE]
+            high_risk += bucket[HIGH_RISK]
+            stats["first_at"] = min(stats["first_at"] or bucket[FIRST_AT], bucket[FIRST_AT])
+            stats["last_at"] = max(stats["last_at"] or bucket[LAST_AT], bucket[LAST_AT])
+        stats["counterparty_count"] = len(set().union(*(
+            counterparties for day, counterparties in self.counterparties.items() if first_day <= day <= last_day
+        )))
+        stats["band_timestamps"] = self.band_times[bisect_left(self.band_times, start):
+                                                    bisect_right(self.band_times, now)]
+        return stats, high_risk
+
+
+def load_customer_state(db, account_ref: str, window_days: int) -> Tuple[int, CustomerState]:
+    """(customer id, state) for the customer owning the account with this account_id"""
+    owner = db.execute(
+        select(models.Account.customer_id, models.Customer.risk_rating)
+        .join(models.Customer, models.Account.customer_id == models.Customer.id)
+        .where(models.Account.account_id == account_ref)
+    ).first()
+    if owner is None:
+        raise ScreeningError(f"Unknown account {account_ref}")
+    customer_id, risk_rating = owner
+    state = CustomerState(customer_id, risk_rating, time.monotonic())
+    start = window_start(datetime.utcnow(), window_days)
+
+    daily = models.DailyAccountStat
+    rows = db.execute(
+        select(daily.day, daily.txn_count, daily.volume, daily.max_amount, daily.band_count, daily.wire_count,
+               daily.large_count, daily.first_at, daily.last_at)
+        .where(daily.customer_id == customer_id, daily.day >= start.date())
+    ).all()
+    for day, count, volume, max_amount, band, wire, large, first_at, last_at in rows:
+        bucket = state.days.get(day.toordinal())
+        if bucket is None:
+            state.days[day.toordinal()] = [count, volume, max_amount, band, wire, large, 0, first_at, last_at]
+            continue
+        for field, value in ((COUNT, count), (VOLUME, volume), (BAND, band), (WIRE, wire), (LARGE, large)):
+            bucket[field] += value
+        bucket[MAX_AMOUNT] = max(bucket[MAX_AMOUNT], max_amount)
+        bucket[FIRST_AT] = min(bucket[FIRST_AT], first_at)
+        bucket[LAST_AT] = max(bucket[LAST_AT], last_at)
+
+    pairs = models.DailyAccountCounterparty
+    counterparties = db.execute(
+        select(pairs.day, pairs.counterparty_id)
+        .join(models.Account, pairs.account_id == models.Account.id)
+        .where(models.Account.customer_id == customer_id, pairs.day >= start.date())
+    ).all()
+    for day, counterparty_id in counterparties:
+        state.counterparties.setdefault(day.toordinal(), set()).add(counterparty_id)
+
+    # the window's band and high-risk jurisdiction transactions, typically a handful
+    t = models.Transaction
+    flagged = db.execute(
+        select(t.timestamp, t.amount, t.jurisdiction)
+        .join(models.Account, t.account_id == models.Account.id)
+        .where(models.Account.customer_id == customer_id, t.timestamp >= start,
+               or_(t.amount.between(*STRUCTURING_BAND), t.jurisdiction.in_(HIGH_RISK_JURISDICTIONS)))
+        .order_by(t.timestamp)
+    ).all()
+    for timestamp, amount, jurisdiction in flagged:
+        if in_band(amount):
+            state.band_times.append(timestamp)
+        if jurisdiction in HIGH_RISK_JURISDICTIONS and timestamp.toordinal() in state.days:
+            state.days[timestamp.toordinal()][HIGH_RISK] += 1
+    del state.band_times[:-MAX_BAND_TIMESTAMPS]
+    return customer_id, state
+
+
+class ScreeningStore:
+    """LRU of customer states plus the account -> customer mapping; safe to share between threads"""
+
+    def __init__(self, max_customers: int, ttl: float, window_days: int):
+        self.max_customers = max_customers
+        self.ttl = ttl
+        self.window_days = window_days
+        self._lock = threading.Lock()
+        self._states: "OrderedDict[int, CustomerState]" = OrderedDict()
+        self._accounts: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, account_ref: str) -> Optional[CustomerState]:
+        """The cached state of the account's customer, or None when it must be loaded"""
+        with self._lock:
+            customer_id = self._accounts.get(account_ref)
+            state = self._states.get(customer_id) if customer_id is not None else None
+            if state is None or time.monotonic() - state.loaded_at > self.ttl:
+                self.misses += 1
+                return None
+            self._states.move_to_end(customer_id)
+            self.hits += 1
+            return state
+
+    def put(self, account_ref: str, customer_id: int, state: CustomerState) -> CustomerState:
+        with self._lock:
+            current = self._states.get(customer_id)
+            if current is not None and time.monotonic() - current.loaded_at <= self.ttl:
+                # loaded concurrently through another account; keep the one already scoring
+                state = current
+            self._states[customer_id] = state
+            self._states.move_to_end(customer_id)
+            self._accounts[account_ref] = customer_id
+            while len(self._states) > self.max_customers:
+                self._states.popitem(last=False)
+                self.evictions += 1
+            if len(self._accounts) > 2 * self.max_customers:
+                # drop mappings of evicted customers
+                self._accounts = {a: c for a, c in self._accounts.items() if c in self._states}
+            return state
+
+    def screen(self, state: CustomerState, amount: float, txn_type: str, timestamp: Optional[datetime] = None,
+               narration: Optional[str] = None, txn_id: Optional[str] = None) -> dict:
+        """
+        Add the transaction to the customer's state and score the window it completes;
+        a txn_id already screened is only scored
+        """
+        timestamp = timestamp or datetime.utcnow()
+        if timestamp.tzinfo is not None:
+            timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+        parsed = parse_narration(narration, txn_type) if narration else {"jurisdiction": None, "counterparty_id": None}
+        jurisdiction = parsed["jurisdiction"]
+        high_risk = jurisdiction in HIGH_RISK_JURISDICTIONS
+        with self._lock:
+            if txn_id is None or not state.seen(txn_id):
+                state.add(timestamp, amount, txn_type, high_risk, parsed["counterparty_id"])
+            stats, high_risk_count = state.window(timestamp, self.window_days)
+            detections = detect_typologies(state, stats, high_risk_count)
+        score, level = overall_risk(detections)
+        return {
+            "customer_id": state.customer_id,
+            "alert": bool(detections),
+            "risk_score": score,
+            "risk_level": level,
+            "jurisdiction": jurisdiction,
+            "window_days": self.window_days,
+            "window_transactions": stats["txn_count"],
+            "detections": [{"type": d["type"], "score": d["score"], "severity": d["severity"]} for d in detections],
+        }
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+            self._accounts.clear()
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {"customers": len(self._states), "hits": self.hits, "misses": self.misses,
+                    "evictions": self.evictions}
+
+
+screening_store = ScreeningStore(settings.SCREENING_MAX_CUSTOMERS, settings.SCREENING_STATE_TTL_SECONDS,
+                                 settings.SCREENING_WINDOW_DAYS)
@@ -0,0 +1,121 @@
+"""
+Bulk transaction ingestion.
+Rows are written in chunks, each one multi-row INSERT ... ON CONFLICT DO NOTHING, so
+importing a statement is a few round trips instead of an existence query and an ORM
+flush per transaction. A row is skipped when its txn_id or its content fingerprint
+(see transaction_fingerprint) is already stored, so re-importing a file skips the
+rows already loaded even if their ids were assigned differently. On the way in each
+row's narration (the "narration" key, else meta_data) is parsed into the channel /
+counterparty / jurisdiction columns, and on a partitioned PostgreSQL table the
+monthly partitions a chunk needs are created first (see db.partitions). The ids the
+INSERT returns are then added to the daily per-account statistics in the database
+(see transaction_stats_service.record_transaction_ids). Everything goes through the
+caller's session connection and commits with the rest of its transaction; this is
+a Core insert, so ORM events on Transaction do not fire for these rows.
+"""
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional
+import hashlib
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from ..db.partitions import ensure_partitions_for
+from ..models import Transaction
+from .narration_service import NARRATION_COLUMNS, narration_from_meta, parse_narration
+from .transaction_stats_service import record_transaction_ids, record_transactions
+
+INGEST_CHUNK_SIZE = 5000
+TRANSACTION_COLUMNS = ("txn_id", "account_id", "amount", "txn_type", "timestamp", "meta_data", "fingerprint",
+                       *NARRATION_COLUMNS)
+
+_UPSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def transaction_fingerprint(account_id: int, timestamp: Optional[datetime], amount: float,
+                            narration: Optional[str], ref_no: Optional[str], occurrence: int = 0,
+                            balance: Optional[float] = None) -> str:
+    """
+    SHA-256 hex digest identifying a transaction by content: account, value date,
+    amount, narration and reference, plus the running balance where the source
+    prints one. occurrence numbers otherwise identical rows within one import (two
+    equal payments on the same day), so both are kept.
+    """
+    key = "\x1f".join((
+        str(account_id),
+        timestamp.date().isoformat() if timestamp else "",
+        f"{float(amount):.2f}",
+        " ".join((narration or "").split()),
+        (ref_no or "").strip(),
+        str(occurrence),
+    ))
+    if balance is not None:
+        key += f"\x1f{float(balance):.2f}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _chunks(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+def _normalize(row: dict) -> dict:
+    # executemany needs every row to bind the same columns
+    values = {column: row.get(column) for column in TRANSACTION_COLUMNS}
+    if values["timestamp"] is None:
+        # a partitioned table is unique per (txn_id, timestamp): stamping the time of
+        # import would store the row again on every re-import
+        raise ValueError(f"transaction {values['txn_id']} has no timestamp")
+    if values["channel"] is None:
+        narration = row["narration"] if "narration" in row else narration_from_meta(values["meta_data"])
+        values.update(parse_narration(narration, values["txn_type"]))
+    return values
+
+
+def insert_transaction_chunk(connection, rows: List[dict]) -> int:
+    """Insert rows whose txn_id and fingerprint are not already stored; returns how many were inserted"""
+    table = Transaction.__table__
+    rows = [_normalize(row) for row in rows]
+    ensure_partitions_for(connection, (row["timestamp"] for row in rows))
+    insert = _UPSERTS.get(connection.dialect.name)
+    if insert is not None:
+        # no conflict target: a clash on either unique column skips the row
+        stmt = insert(table).on_conflict_do_nothing()
+        # RETURNING yields only the inserted rows; executemany rowcount isn't
+        # reliable across drivers
+        inserted = connection.execute(stmt.returning(table.c.id), rows).scalars().all()
+        record_transaction_ids(connection, inserted)
+        return len(inserted)
+
+    existing = set(connection.scalars(select(table.c.txn_id).where(table.c.txn_id.in_([r["txn_id"] for r in rows]))))
+    fingerprints = [r["fingerprint"] for r in rows if r["fingerprint"]]
+    existing.update(connection.scalars(select(table.c.fingerprint).where(table.c.fingerprint.in_(fingerprints))))
+    new_rows = []
+    for row in rows:
+        if row["txn_id"] not in existing and row["fingerprint"] not in existing:
+            existing.add(row["txn_id"])
+            if row["fingerprint"]:
+                existing.add(row["fingerprint"])
+            new_rows.append(row)
+    if new_rows:
+        connection.execute(table.insert(), new_rows)
+        record_transactions(connection, new_rows)
+    return len(new_rows)
+
+
+def bulk_insert_transactions(db, rows: Iterable[dict], chunk_size: int = INGEST_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Insert transaction dicts (txn_id, account_id, amount, txn_type, timestamp, meta_data
+    and optionally fingerprint and narration) in chunks, skipping rows whose txn_id or
+    fingerprint already exists. rows may be a generator; at most
+    one chunk is held in memory. Returns {"inserted": n, "skipped": n}; raises
+    ValueError for a row without a timestamp.
+    """
+    connection = db.connection()
+    counts = {"inserted": 0, "skipped": 0}
+    for chunk in _chunks(rows, chunk_size):
+        inserted = insert_transaction_chunk(connection, chunk)
+        counts["inserted"] += inserted
+        counts["skipped"] += len(chunk) - inserted
+    return counts
@@ -0,0 +1,349 @@
+"""
+Daily transaction statistics.
+DailyAccountStat keeps, per account and day, the count, volume and largest amount
+of its transactions, how many fell in the structuring band, were wires or were
+large, how many distinct counterparties they involved, and the first/last
+timestamps. Rows are added to as transactions are written, by
+bulk_insert_transactions for every chunk it inserts and by an after_insert hook for
+ORM inserts, so the risk detectors and SAR prompts read a few hundred summary rows
+per customer instead of the raw history.
+
+Deletes and writes that bypass both paths are not tracked: run
+`python manage.py rebuild-transaction-stats` after them.
+"""
+from datetime import date, datetime, timedelta
+from collections import Counter
+from typing import Dict, Iterable, List, Mapping, Optional
+from sqlalchemy import Date, bindparam, case, cast, delete, distinct, event, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from .. import models
+
+# Threshold just below the reporting limit ($10,000 USD)
+STRUCTURING_BAND = (8000, 9500)
+LARGE_AMOUNT = 50000
+COUNT_COLUMNS = ("txn_count", "band_count", "wire_count", "large_count", "counterparty_count")
+
+_UPSERTS = {"postgresql": pg_insert, "sqlite": sqlite_insert}
+
+
+def in_band(amount: float) -> bool:
+    return STRUCTURING_BAND[0] <= amount <= STRUCTURING_BAND[1]
+
+
+def is_wire(txn_type: Optional[str]) -> bool:
+    return 'wire' in (txn_type or '').lower()
+
+
+def empty_stats() -> dict:
+    return {"txn_count": 0, "volume": 0.0, "max_amount": 0.0, "band_count": 0, "wire_count": 0, "large_count": 0,
+            "counterparty_count": 0, "first_at": None, "last_at": None, "band_timestamps": []}
+
+
+def stats_from_transactions(transactions: Iterable) -> dict:
+    """The figures customer_window_stats() reads from the table, computed from Transaction objects (oldest first)"""
+    stats = empty_stats()
+    counterparties = set()
+    for t in transactions:
+        _add_transaction(stats, t.amount, t.txn_type, t.timestamp)
+        if in_band(t.amount):
+            stats["band_timestamps"].append(t.timestamp)
+        if t.counterparty_id:
+            counterparties.add(t.counterparty_id)
+    stats["counterparty_count"] = len(counterparties)
+    return stats
+
+
+def _add_transaction(stats: dict, amount: float, txn_type: Optional[str], timestamp: Optional[datetime]):
+    stats["txn_count"] += 1
+    stats["volume"] += amount
+    stats["max_amount"] = max(stats["max_amount"], amount)
+    stats["band_count"] += in_band(amount)
+    stats["wire_count"] += is_wire(txn_type)
+    stats["large_count"] += amount > LARGE_AMOUNT
+    if timestamp is not None:
+        stats["first_at"] = min(stats["first_at"] or timestamp, timestamp)
+        stats["last_at"] = max(stats["last_at"] or timestamp, timestamp)
+
+
+def _add_day(stats: dict, row):
+    for column in ("txn_count", "band_count", "wire_count", "large_count"):
+        stats[column] += row[column]
+    stats["volume"] += row["volume"]
+    stats["max_amount"] = max(stats["max_amount"], row["max_amount"])
+    if row["first_at"] is not None:
+        stats["first_at"] = min(stats["first_at"] or row["first_at"], row["first_at"])
+        stats["last_at"] = max(stats["last_at"] or row["last_at"], row["last_at"])
+
+
+def _larger(current, new):
+    return case((current.is_(None), new), (current >= new, current), else_=new)
+
+
+def _smaller(current, new):
+    return case((current.is_(None), new), (current <= new, current), else_=new)
+
+
+def _new_counterparties(connection, keys: set) -> Dict[tuple, int]:
+    """Store (account_id, day, counterparty_id) keys; returns how many were new per (account_id, day)"""
+    table = models.DailyAccountCounterparty.__table__
+    rows = [{"account_id": a, "day": d, "counterparty_id": c} for a, d, c in keys]
+    insert = _UPSERTS.get(connection.dialect.name)
+    if insert is not None:
+        stmt = insert(table).on_conflict_do_nothing().returning(table.c.account_id, table.c.day)
+        added = connection.execute(stmt, rows).all()
+    else:
+        existing = set(connection.execute(
+            select(table.c.account_id, table.c.day, table.c.counterparty_id)
+            .where(table.c.account_id.in_({a for a, _, _ in keys}), table.c.day.in_({d for _, d, _ in keys}))
+        ).all())
+        rows = [row for row in rows if tuple(row.values()) not in existing]
+        if rows:
+            connection.execute(table.insert(), rows)
+        added = [(row["account_id"], row["day"]) for row in rows]
+    counts = {}
+    for key in added:
+        counts[tuple(key)] = counts.get(tuple(key), 0) + 1
+    return counts
+
+
+def record_transactions(connection, rows: Iterable[Mapping]):
+    """
+    Add newly written transactions (mappings with account_id, timestamp, amount,
+    txn_type and counterparty_id) to their accounts' daily rows, in the caller's transaction
+    """
+    days: Dict[tuple, dict] = {}
+    counterparties = set()
+    for row in rows:
+        if row["timestamp"] is None:
+            continue
+        key = (row["account_id"], row["timestamp"].date())
+        stats = days.get(key)
+        if stats is None:
+            stats = days[key] = empty_stats()
+        _add_transaction(stats, row["amount"], row["txn_type"], row["timestamp"])
+        if row["counterparty_id"]:
+            counterparties.add((*key, row["counterparty_id"]))
+    if not days:
+        return
+
+    customers = dict(connection.execute(
+        select(models.Account.id, models.Account.customer_id).where(models.Account.id.in_({a for a, _ in days}))
+    ).all())
+    new_counterparties = _new_counterparties(connection, counterparties) if counterparties else {}
+    table = models.DailyAccountStat.__table__
+    values = [
+        {"account_id": account_id, "day": day, "customer_id": customers.get(account_id),
+         **{column: stats[column] for column in ("txn_count", "volume", "max_amount", "band_count", "wire_count",
+                                                 "large_count", "first_at", "last_at")},
+         "counterparty_count": new_counterparties.get((account_id, day), 0)}
+        for (account_id, day), stats in days.items()
+    ]
+
+    insert = _UPSERTS.get(connection.dialect.name)
+    if insert is not None:
+        stmt = insert(table)
+        connection.execute(stmt.on_conflict_do_update(index_elements=["account_id", "day"], set_={
+            **{column: table.c[column] + stmt.excluded[column] for column in (*COUNT_COLUMNS, "volume")},
+            "max_amount": _larger(table.c.max_amount, stmt.excluded.max_amount),
+            "first_at": _smaller(table.c.first_at, stmt.excluded.first_at),
+            "last_at": _larger(table.c.last_at, stmt.excluded.last_at),
+        }), values)
+        return
+    for row in values:
+        where = (table.c.account_id == row["account_id"], table.c.day == row["day"])
+        result = connection.execute(update(table).where(*where).values(
+            **{column: table.c[column] + row[column] for column in (*COUNT_COLUMNS, "volume")},
+            max_amount=_larger(table.c.max_amount, row["max_amount"]),
+            first_at=_smaller(table.c.first_at, row["first_at"]),
+            last_at=_larger(table.c.last_at, row["last_at"]),
+        ))
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(**row))
+
+
+def record_transaction_ids(connection, ids: List[int]):
+    """
+    record_transactions() for stored transactions given by id, aggregated in the
+    database: one INSERT ... SELECT ... GROUP BY per table instead of a row per
+    transaction through Python. PostgreSQL and SQLite only (it needs ON CONFLICT).
+    """
+    if not ids:
+        return
+    t, stats, pairs = models.Transaction, models.DailyAccountStat.__table__, models.DailyAccountCounterparty.__table__
+    insert = _UPSERTS[connection.dialect.name]
+    day = _day(connection, t.timestamp)
+    low, high = min(ids), max(ids)
+    # one INSERT's ids are normally a single run from the sequence: a range is
+    # cheaper to bind and scan than an IN list of thousands
+    written = t.id.between(low, high) if high - low + 1 == len(ids) else t.id.in_(ids)
+    written = (written, t.timestamp.isnot(None))
+
+    stmt = insert(pairs).from_select(
+        ["account_id", "day", "counterparty_id"],
+        select(t.account_id, day, t.counterparty_id).distinct().where(*written, t.counterparty_id.isnot(None)),
+    )
+    new_counterparties = Counter(tuple(key) for key in connection.execute(
+        stmt.on_conflict_do_nothing().returning(pairs.c.account_id, pairs.c.day)
+    ))
+
+    stmt = insert(stats).from_select(
+        ["account_id", "day", "customer_id", "txn_count", "volume", "max_amount", "band_count", "wire_count",
+         "large_count", "counterparty_count", "first_at", "last_at"],
+        select(
+            t.account_id, day, models.Account.customer_id, func.count(t.id), func.sum(t.amount), func.max(t.amount),
+            func.sum(case((t.amount.between(*STRUCTURING_BAND), 1), else_=0)),
+            func.sum(case((func.lower(t.txn_type).like("%wire%"), 1), else_=0)),
+            func.sum(case((t.amount > LARGE_AMOUNT, 1), else_=0)),
+            0, func.min(t.timestamp), func.max(t.timestamp),
+        )
+        .join(models.Account, t.account_id == models.Account.id)
+        .where(*written)
+        .group_by(t.account_id, day, models.Account.customer_id),
+    )
+    connection.execute(stmt.on_conflict_do_update(index_elements=["account_id", "day"], set_={
+        **{column: stats.c[column] + stmt.excluded[column] for column in (*COUNT_COLUMNS, "volume")},
+        "max_amount": _larger(stats.c.max_amount, stmt.excluded.max_amount),
+        "first_at": _smaller(stats.c.first_at, stmt.excluded.first_at),
+        "last_at": _larger(stats.c.last_at, stmt.excluded.last_at),
+    }))
+    if new_counterparties:
+        connection.execute(
+            update(stats)
+            .where(stats.c.account_id == bindparam("key_account_id"), stats.c.day == bindparam("key_day"))
+            .values(counterparty_count=stats.c.counterparty_count + bindparam("added")),
+            [{"key_account_id": account_id, "key_day": day, "added": added}
+             for (account_id, day), added in new_counterparties.items()],
+        )
+
+
+@event.listens_for(models.Transaction, "after_insert")
+def _transaction_inserted(mapper, connection, target):
+    record_transactions(connection, [{
+        "account_id": target.account_id, "timestamp": target.timestamp, "amount": target.amount,
+        "txn_type": target.txn_type, "counterparty_id": target.counterparty_id,
+    }])
+
+
+def customer_window_stats(db, customer_id: int, starts: Mapping) -> Dict:
+    """
+    Statistics of a customer's transactions for each window in starts (key -> start
+    datetime, None for the whole history). Windows are whole days: a window covers
+    its start's day in full. Read from the daily rows; only the structuring-band
+    timestamps, when a window has enough of them to matter, come from transactions.
+    """
+    return customers_window_stats(db, [customer_id], starts)[customer_id]
+
+
+def customers_window_stats(db, customer_ids: Iterable[int], starts: Mapping,
+                           until: Optional[date] = None) -> Dict[int, Dict]:
+    """
+    customer_window_stats() for a batch of customers in three queries: customer id ->
+    key -> stats. With until, the windows end with that day (replaying history).
+    """
+    customer_ids = list(customer_ids)
+    stats = {customer_id: {key: empty_stats() for key in starts} for customer_id in customer_ids}
+    first_days = {key: since.date() if since is not None else None for key, since in starts.items()}
+    earliest = None if None in first_days.values() else min(first_days.values(), default=None)
+
+    daily = models.DailyAccountStat
+    query = select(daily.customer_id, daily.day, daily.txn_count, daily.volume, daily.max_amount, daily.band_count,
+                   daily.wire_count, daily.large_count, daily.first_at, daily.last_at
+                   ).where(daily.customer_id.in_(customer_ids))
+    if earliest is not None:
+        query = query.where(daily.day >= earliest)
+    if until is not None:
+        query = query.where(daily.day <= until)
+    for row in db.execute(query).mappings():
+        windows = stats[row["customer_id"]]
+        for key, first_day in first_days.items():
+            if first_day is None or row["day"] >= first_day:
+                _add_day(windows[key], row)
+
+    pairs = models.DailyAccountCounterparty
+    distinct_counterparties = distinct(pairs.counterparty_id)
+    query = (
+        select(models.Account.customer_id, *[
+            func.count(distinct_counterparties) if first_day is None
+            else func.count(distinct_counterparties).filter(pairs.day >= first_day)
+            for first_day in first_days.values()
+        ])
+        .join(models.Account, pairs.account_id == models.Account.id)
+        .where(models.Account.customer_id.in_(customer_ids))
+        .group_by(models.Account.customer_id)
+    )
+    if earliest is not None:
+        query = query.where(pairs.day >= earliest)
+    if until is not None:
+        query = query.where(pairs.day <= until)
+    for customer_id, *counts in db.execute(query):
+        for key, count in zip(starts, counts):
+            stats[customer_id][key]["counterparty_count"] = count
+
+    # structuring looks at how closely band transactions cluster, which needs their timestamps
+    clustered = [customer_id for customer_id, windows in stats.items()
+                 if any(s["band_count"] >= 3 for s in windows.values())]
+    if clustered:
+        query = (
+            select(models.Account.customer_id, models.Transaction.timestamp)
+            .join(models.Account, models.Transaction.account_id == models.Account.id)
+            .where(models.Account.customer_id.in_(clustered),
+                   models.Transaction.amount.between(*STRUCTURING_BAND))
+            .order_by(models.Transaction.timestamp, models.Transaction.id)
+        )
+        if earliest is not None:
+            query = query.where(models.Transaction.timestamp >= datetime.combine(earliest, datetime.min.time()))
+        if until is not None:
+            day_after = datetime.combine(until + timedelta(days=1), datetime.min.time())
+            query = query.where(models.Transaction.timestamp < day_after)
+        timestamps = {customer_id: [] for customer_id in clustered}
+        for customer_id, timestamp in db.execute(query):
+            timestamps[customer_id].append(timestamp)
+        for customer_id, customer_timestamps in timestamps.items():
+            for key, first_day in first_days.items():
+                stats[customer_id][key]["band_timestamps"] = [
+                    ts for ts in customer_timestamps if first_day is None or ts.date() >= first_day
+                ]
+    return stats
+
+
+def _day(connection, column):
+    # date() returns ISO text on SQLite, which is how the Date column stores days there
+    return func.date(column) if connection.dialect.name == "sqlite" else cast(column, Date)
+
+
+def rebuild_transaction_stats(db) -> Dict[str, int]:
+    """Recompute daily_account_stats and daily_account_counterparties from transactions (backfill / drift repair)"""
+    t, stats, pairs = models.Transaction, models.DailyAccountStat.__table__, models.DailyAccountCounterparty.__table__
+    day = _day(db.connection(), t.timestamp)
+    db.execute(delete(stats))
+    db.execute(delete(pairs))
+    db.execute(pairs.insert().from_select(
+        ["account_id", "day", "counterparty_id"],
+        select(t.account_id, day, t.counterparty_id).distinct()
+        .where(t.timestamp.isnot(None), t.counterparty_id.isnot(None)),
+    ))
+    db.execute(stats.insert().from_select(
+        ["account_id", "day", "customer_id", "txn_count", "volume", "max_amount", "band_count", "wire_count",
+         "large_count", "counterparty_count", "first_at", "last_at"],
+        select(
+            t.account_id, day, models.Account.customer_id, func.count(t.id), func.sum(t.amount), func.max(t.amount),
+            func.sum(case((t.amount.between(*STRUCTURING_BAND), 1), else_=0)),
+            func.sum(case((func.lower(t.txn_type).like("%wire%"), 1), else_=0)),
+            func.sum(case((t.amount > LARGE_AMOUNT, 1), else_=0)),
+            0, func.min(t.timestamp), func.max(t.timestamp),
+        )
+        .join(models.Account, t.account_id == models.Account.id)
+        .where(t.timestamp.isnot(None))
+        .group_by(t.account_id, day, models.Account.customer_id),
+    ))
+    db.execute(update(stats).values(counterparty_count=(
+        select(func.count()).select_from(pairs)
+        .where(pairs.c.account_id == stats.c.account_id, pairs.c.day == stats.c.day)
+        .scalar_subquery()
+    )))
+    db.commit()
+    return {
+        "days": db.scalar(select(func.count()).select_from(stats)),
+        "counterparties": db.scalar(select(func.count()).select_from(pairs)),
+    }
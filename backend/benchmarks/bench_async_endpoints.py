@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark: async read endpoints vs. the previous sync implementation
+Usage:
+  python benchmarks/bench_async_endpoints.py [--rows 2000] [--requests 400] [--concurrency 10 50 200]
+
+Seeds a throwaway SQLite database (or uses DATABASE_URL when --use-env is given),
+then drives GET /api/cases/ concurrently in-process and reports requests/second for
+the async handler and for an equivalent sync `def` handler over get_db.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+from fastapi import Depends
+from sqlalchemy.orm import Session
+
+
+def seed(rows: int):
+    from app.db import session
+    from app.db.base import Base
+    from app import models
+    from app.core.security import create_access_token
+
+    Base.metadata.create_all(bind=session.get_engine())
+    db = session.get_session()
+    admin = models.User(username="bench", email="bench@aegis.local", hashed_password="x", role=models.RoleEnum.admin)
+    db.add(admin)
+    db.flush()
+    db.add_all([
+        models.Case(case_ref=f"CASE-BENCH-{i:06d}", title=f"Benchmark case {i}", description="x" * 200)
+        for i in range(rows)
+    ])
+    db.commit()
+    token = create_access_token({"user_id": admin.id})
+    db.close()
+    return token
+
+
+def mount_sync_baseline(app):
+    from app.core.deps import get_current_user
+    from app.db.session import get_db
+    from app import models
+
+    @app.get("/bench/sync-cases")
+    def sync_list_cases(db: Session = Depends(get_db), user=Depends(get_current_user)):
+        return db.query(models.Case).all()
+
+
+async def drive(app, path: str, token: str, total: int, concurrency: int) -> float:
+    from app.db.session import dispose_async_engine
+    from app.middleware.audit_middleware import flush_pending_audit_logs
+
+    headers = {"Authorization": f"Bearer {token}"}
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        async def one():
+            async with semaphore:
+                r = await client.get(path, headers=headers)
+                r.raise_for_status()
+
+        started = time.perf_counter()
+        await asyncio.gather(*[one() for _ in range(total)])
+        elapsed = time.perf_counter() - started
+    await flush_pending_audit_logs()
+    # async connections belong to this event loop; each run gets a fresh one
+    await dispose_async_engine()
+    return total / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--use-env", action="store_true", help="benchmark against DATABASE_URL instead of a temp SQLite file")
+    args = parser.parse_args()
+
+    if not args.use_env:
+        tmp = tempfile.mkdtemp(prefix="aegis-bench-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+
+    from app.main import app
+    token = seed(args.rows)
+    mount_sync_baseline(app)
+
+    print(f"{'concurrency':>12} {'sync req/s':>12} {'async req/s':>12} {'speedup':>8}")
+    for concurrency in args.concurrency:
+        sync_rps = asyncio.run(drive(app, "/bench/sync-cases", token, args.requests, concurrency))
+        async_rps = asyncio.run(drive(app, "/api/cases/", token, args.requests, concurrency))
+        print(f"{concurrency:>12} {sync_rps:>12.1f} {async_rps:>12.1f} {async_rps / sync_rps:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
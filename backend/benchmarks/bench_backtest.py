@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Backtest benchmark
+Usage:
+  python benchmarks/bench_backtest.py [--customers 1000000] [--transactions 3] [--variants 4] [--workers N]
+
+Seeds a throwaway SQLite database (or uses DATABASE_URL when --use-env is given) with
+--customers customers, each with one account and --transactions transactions over
+the last 60 days (every 20th customer structures deposits just below the reporting
+threshold; every 40th has an escalated case), then backtests the current rules and
+--variants variants that move the structuring threshold. Reports the extract and
+evaluate times, customers/second and each variant's alerts and hit rate.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert
+
+CHUNK = 20_000
+
+
+def seed(customers: int, transactions: int):
+    from app.db import session
+    from app.db.base import Base
+    from app.services.transaction_ingest_service import bulk_insert_transactions
+    from app import models
+
+    engine = session.get_engine()
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    for start in range(0, customers, CHUNK):
+        ids = range(start + 1, min(customers, start + CHUNK) + 1)
+        with engine.begin() as conn:
+            conn.execute(insert(models.Customer), [
+                {"id": i, "customer_id": f"CUST-{i}", "name": f"Customer {i}", "risk_rating": rng.randint(1, 5)}
+                for i in ids
+            ])
+            conn.execute(insert(models.Account), [{"id": i, "account_id": f"ACC-{i}", "customer_id": i} for i in ids])
+            conn.execute(insert(models.Case), [
+                {"case_ref": f"CASE-{i}", "title": "Escalated", "customer_id": i, "status": models.CaseStatus.escalated}
+                for i in ids if i % 40 == 0
+            ])
+        rows = [
+            {"txn_id": f"T-{i}-{n}", "account_id": i, "txn_type": "deposit",
+             "amount": rng.uniform(8100, 9400) if i % 20 == 0 else rng.uniform(10, 3000),
+             "timestamp": now - timedelta(days=rng.randint(1, 60), minutes=rng.randint(0, 1440))}
+            for i in ids for n in range(transactions)
+        ]
+        with session.session_scope() as db:
+            bulk_insert_transactions(db, rows)
+            db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=1_000_000)
+    parser.add_argument("--transactions", type=int, default=3, help="per customer")
+    parser.add_argument("--variants", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--use-env", action="store_true", help="use DATABASE_URL instead of a temp SQLite file")
+    args = parser.parse_args()
+
+    from app.core.config import settings
+
+    if not args.use_env:
+        tmp = tempfile.mkdtemp(prefix="aegis-bench-")
+        settings.DATABASE_URL = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    from app.db.session import session_scope
+    from app.services.backtest_service import format_report, run_backtest
+
+    started = time.perf_counter()
+    seed(args.customers, args.transactions)
+    print(f"seeded {args.customers} customers in {time.perf_counter() - started:.1f}s")
+
+    variants = {f"structuring>{threshold:.2f}": [{"name": "structuring", "threshold": threshold}]
+                for threshold in [0.3 + 0.1 * i for i in range(args.variants)]}
+    with session_scope() as db:
+        started = time.perf_counter()
+        result = run_backtest(db, variants, workers=args.workers, chunk_size=args.chunk_size)
+        elapsed = time.perf_counter() - started
+    print(format_report(result))
+    print(f"{'workers':>10}{'customers':>12}{'variants':>10}{'seconds':>10}{'cust/s':>10}")
+    print(f"{args.workers:>10}{result['customers']:>12}{len(result['variants']):>10}{elapsed:>10.1f}"
+          f"{result['customers'] / elapsed:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
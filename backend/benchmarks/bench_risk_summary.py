@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Latency benchmark: risk dashboard summary, set-based SQL vs. the previous implementation
+Usage:
+  python benchmarks/bench_risk_summary.py [--detections 1000000] [--sars 10000] [--repeat 5]
+
+Seeds a throwaway SQLite database (or uses DATABASE_URL when --use-env is given) with
+typology detections whose details carry a JSON severity, then times
+get_risk_dashboard_summary against the previous approach of loading every detection,
+json-parsing its details in Python and running one CQI query per recent SAR.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import insert, select
+
+SEVERITIES = ["CRITICAL", "HIGH", "MEDIUM", "LOW"]
+TYPES = ["structuring", "layering", "velocity_anomaly", "income_mismatch", "geographic_risk"]
+CHUNK = 50_000
+
+
+def seed(detections: int, sars: int):
+    from app.db import session
+    from app.db.base import Base
+    from app import models
+
+    engine = session.get_engine()
+    Base.metadata.create_all(bind=engine)
+    rng = random.Random(7)
+    now = datetime.utcnow()
+    with engine.begin() as conn:
+        user_id = conn.execute(insert(models.User).values(
+            username="bench", email="bench@example.com", hashed_password="x", role=models.RoleEnum.admin
+        )).inserted_primary_key[0]
+        case_id = conn.execute(insert(models.Case).values(case_ref="CASE-BENCH", title="Benchmark")).inserted_primary_key[0]
+        conn.execute(insert(models.SARReport), [
+            {"sar_ref": f"SAR-BENCH-{i}", "case_id": case_id, "created_by": user_id, "created_at": now - timedelta(minutes=i)}
+            for i in range(sars)
+        ])
+        sar_ids = conn.execute(select(models.SARReport.id)).scalars().all()
+        conn.execute(insert(models.CQIScore), [{"sar_id": s, "overall_score": rng.uniform(40, 95)} for s in sar_ids])
+    for start in range(0, detections, CHUNK):
+        rows = []
+        for _ in range(min(CHUNK, detections - start)):
+            severity = rng.choice(SEVERITIES)
+            rows.append({
+                "sar_id": rng.choice(sar_ids),
+                "detection_type": rng.choice(TYPES),
+                "score": rng.random(),
+                "details": json.dumps({"severity": severity, "confidence": round(rng.uniform(0.7, 0.99), 3)}),
+                "severity": severity,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(models.TypologyDetection), rows)
+
+
+async def legacy_summary(db):
+    from app import models
+
+    typologies = (await db.execute(
+        select(models.TypologyDetection.detection_type, models.TypologyDetection.details)
+    )).all()
+    type_counts = {}
+    severity_counts = {"CRITICAL": 0, "HIGH": 0, "MEDIUM": 0, "LOW": 0}
+    for typ in typologies:
+        type_counts[typ.detection_type] = type_counts.get(typ.detection_type, 0) + 1
+        try:
+            meta = json.loads(typ.details) if typ.details else {}
+            severity = meta.get("severity", "MEDIUM")
+            if severity in severity_counts:
+                severity_counts[severity] += 1
+        except Exception:
+            pass
+    recent_sars = (await db.execute(
+        select(models.SARReport.id).order_by(models.SARReport.created_at.desc()).limit(10)
+    )).scalars().all()
+    cqi_scores = []
+    for sar_id in recent_sars:
+        cqi = await db.scalar(select(models.CQIScore.overall_score).where(models.CQIScore.sar_id == sar_id))
+        if cqi is not None:
+            cqi_scores.append(cqi)
+    avg_cqi = sum(cqi_scores) / len(cqi_scores) if cqi_scores else 0
+    return {"typology_distribution": type_counts, "severity_breakdown": severity_counts, "average_cqi_score": round(avg_cqi, 2)}
+
+
+async def time_it(fn, repeat: int):
+    from app.db.session import get_async_sessionmaker
+
+    timings, result = [], None
+    for _ in range(repeat):
+        async with get_async_sessionmaker()() as db:
+            started = time.perf_counter()
+            result = await fn(db)
+            timings.append(time.perf_counter() - started)
+    return statistics.median(timings), result
+
+
+async def run(repeat: int):
+    from app.api.risk import get_risk_dashboard_summary
+    from app.db.session import dispose_async_engine
+
+    new_time, new = await time_it(lambda db: get_risk_dashboard_summary(db=db, current_user=None), repeat)
+    old_time, old = await time_it(legacy_summary, repeat)
+    await dispose_async_engine()
+    assert new["typology_distribution"] == old["typology_distribution"]
+    assert new["severity_breakdown"] == old["severity_breakdown"]
+    assert new["average_cqi_score"] == old["average_cqi_score"]
+    return new_time, old_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--detections", type=int, default=1_000_000)
+    parser.add_argument("--sars", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--use-env", action="store_true", help="use DATABASE_URL instead of a temp SQLite file")
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    if not args.use_env:
+        tmp = tempfile.mkdtemp(prefix="aegis-bench-")
+        settings.DATABASE_URL = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        settings.ASYNC_DATABASE_URL = None
+
+    print(f"Seeding {args.detections:,} detections across {args.sars:,} SARs...")
+    started = time.perf_counter()
+    seed(args.detections, args.sars)
+    print(f"  seeded in {time.perf_counter() - started:.1f}s")
+
+    new_time, old_time = asyncio.run(run(args.repeat))
+    print(f"{'implementation':<16}{'median ms':>12}")
+    print(f"{'set-based SQL':<16}{new_time * 1000:>12.1f}")
+    print(f"{'legacy':<16}{old_time * 1000:>12.1f}")
+    print(f"speedup: {old_time / new_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
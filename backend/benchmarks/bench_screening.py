@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Real-time screening benchmark
+Usage:
+  python benchmarks/bench_screening.py [--customers 100000] [--transactions 1000000] [--max-customers 50000]
+
+Screens --transactions synthetic transactions spread over --customers customers
+through an in-memory ScreeningStore holding at most --max-customers states (no
+database: every customer starts with empty state). Reports the p50/p99/max
+per-transaction scoring latency, evictions, and the process's peak RSS.
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+NARRATIONS = ["UPI-NAME-SHOP@OKAXIS-NOTE", "NEFT-HDFC0000001-ACME LTD-INV", "SWIFT to Panama", ""]
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--customers", type=int, default=100_000)
+    parser.add_argument("--transactions", type=int, default=1_000_000)
+    parser.add_argument("--max-customers", type=int, default=50_000)
+    parser.add_argument("--window-days", type=int, default=30)
+    args = parser.parse_args()
+
+    from app.services.screening_service import CustomerState, ScreeningStore
+
+    store = ScreeningStore(args.max_customers, ttl=float("inf"), window_days=args.window_days)
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1)
+    latencies = []
+    alerts = 0
+    baseline = peak_rss_mb()
+    for i in range(args.transactions):
+        customer_id = rng.randrange(args.customers)
+        account = f"ACC-{customer_id:07d}"
+        state = store.get(account) or store.put(account, customer_id, CustomerState(customer_id, rng.randint(1, 5), 0.0))
+        amount = rng.choice((9100.0, 120.0, 2500.0, 60000.0)) if i % 5 == 0 else rng.uniform(10, 5000)
+        timestamp = start + timedelta(seconds=i * 30)
+        began = time.perf_counter()
+        result = store.screen(state, amount, rng.choice(("deposit", "wire_out", "payment")), timestamp,
+                              NARRATIONS[i % len(NARRATIONS)])
+        latencies.append(time.perf_counter() - began)
+        alerts += result["alert"]
+
+    latencies.sort()
+    pct = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1e6  # noqa: E731
+    metrics = store.metrics()
+    print(f"{'screened':>10}{'alerts':>10}{'p50 us':>10}{'p99 us':>10}{'max us':>10}{'cached':>10}{'evicted':>10}{'RSS MB':>10}")
+    print(f"{args.transactions:>10}{alerts:>10}{pct(0.5):>10.0f}{pct(0.99):>10.0f}{latencies[-1] * 1e6:>10.0f}"
+          f"{metrics['customers']:>10}{metrics['evictions']:>10}{peak_rss_mb() - baseline:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Serialization and compression benchmark for large JSON responses
+Usage:
+  python benchmarks/bench_serialization.py [--sars 500] [--audit 500] [--repeat 20]
+
+Seeds a throwaway SQLite database (or uses DATABASE_URL when --use-env is given) and
+requests /api/sar/, /api/audit/ and /api/risk/intelligence/cross-case in-process with
+identity, gzip and br Accept-Encoding, reporting median latency and bytes on the wire.
+It then times the encoders on each payload: FastAPI's stdlib path
+(jsonable_encoder + json.dumps) against orjson (app.api.responses.dumps).
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+ENDPOINTS = ["/api/sar/?limit=500", "/api/audit/", "/api/risk/intelligence/cross-case"]
+ENCODINGS = ["identity", "gzip", "br"]
+
+
+def seed(sars: int, audit: int):
+    from app.db import session
+    from app.db.base import Base
+    from app import models
+    from app.core.security import create_access_token
+
+    Base.metadata.create_all(bind=session.get_engine())
+    db = session.get_session()
+    admin = models.User(username="bench", email="bench@example.com", hashed_password="x", role=models.RoleEnum.admin)
+    db.add(admin)
+    db.flush()
+    now = datetime.utcnow()
+    customers = [models.Customer(customer_id=f"CUST-{i}", name=f"Customer {i}") for i in range(50)]
+    db.add_all(customers)
+    db.flush()
+    cases = [
+        models.Case(case_ref=f"CASE-{i}", title=f"Case {i}", customer_id=customers[i % 50].id, created_at=now - timedelta(hours=i))
+        for i in range(sars)
+    ]
+    db.add_all(cases)
+    db.flush()
+    reports = [
+        models.SARReport(sar_ref=f"SAR-{i}", case_id=c.id, created_by=admin.id, narrative="Narrative text. " * 200,
+                         created_at=now - timedelta(hours=i))
+        for i, c in enumerate(cases)
+    ]
+    db.add_all(reports)
+    db.flush()
+    db.add_all([models.CQIScore(sar_id=r.id, overall_score=50 + i % 50) for i, r in enumerate(reports)])
+    db.add_all([
+        models.TypologyDetection(sar_id=r.id, detection_type=["structuring", "layering", "velocity_anomaly"][i % 3],
+                                 score=0.8, details='{"severity": "HIGH"}', created_at=now - timedelta(days=i % 60))
+        for i, r in enumerate(reports)
+    ])
+    db.add_all([
+        models.AuditLog(user_id=admin.id, action=f"GET /api/sar/{i}", entity_type="SARReport", entity_id=str(i),
+                        meta_data="request metadata " * 5, timestamp=now - timedelta(seconds=i))
+        for i in range(audit)
+    ])
+    db.commit()
+    token = create_access_token({"user_id": admin.id})
+    db.close()
+    return token
+
+
+async def measure(token: str, repeat: int):
+    from app.api.caching import response_cache
+    from app.db.session import dispose_async_engine
+    from app.main import app
+    from app.middleware.audit_middleware import flush_pending_audit_logs
+
+    results = {}
+    payloads = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        for path in ENDPOINTS:
+            for encoding in ENCODINGS:
+                headers = {"Authorization": f"Bearer {token}", "Accept-Encoding": encoding}
+                timings, size = [], 0
+                for _ in range(repeat):
+                    # time the full serialization, not the aggregate cache
+                    response_cache.clear()
+                    started = time.perf_counter()
+                    async with client.stream("GET", path, headers=headers) as r:
+                        r.raise_for_status()
+                        # bytes as sent, before httpx decodes them
+                        size = sum([len(chunk) async for chunk in r.aiter_raw()])
+                    timings.append(time.perf_counter() - started)
+                    applied = r.headers.get("content-encoding", "identity")
+                results[(path, encoding)] = (statistics.median(timings), size, applied)
+            payloads[path] = (await client.get(path, headers={"Authorization": f"Bearer {token}"})).json()
+    await flush_pending_audit_logs()
+    await dispose_async_engine()
+    return results, payloads
+
+
+def time_encoders(payload, repeat: int):
+    from fastapi.encoders import jsonable_encoder
+    from app.api.responses import dumps
+
+    def stdlib():
+        return json.dumps(jsonable_encoder(payload)).encode()
+
+    out = {}
+    for name, fn in (("jsonable_encoder+json", stdlib), ("orjson", lambda: dumps(payload))):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            fn()
+            timings.append(time.perf_counter() - started)
+        out[name] = statistics.median(timings)
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sars", type=int, default=500)
+    parser.add_argument("--audit", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--use-env", action="store_true", help="use DATABASE_URL instead of a temp SQLite file")
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    if not args.use_env:
+        tmp = tempfile.mkdtemp(prefix="aegis-bench-")
+        settings.DATABASE_URL = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        settings.ASYNC_DATABASE_URL = None
+
+    token = seed(args.sars, args.audit)
+    results, payloads = asyncio.run(measure(token, args.repeat))
+
+    print(f"{'endpoint':<36}{'encoding':>10}{'median ms':>12}{'bytes':>10}")
+    for (path, encoding), (seconds, size, applied) in results.items():
+        print(f"{path:<36}{applied:>10}{seconds * 1000:>12.2f}{size:>10}")
+
+    print()
+    print(f"{'payload':<36}{'encoder':>24}{'median ms':>12}")
+    for path, payload in payloads.items():
+        for name, seconds in time_encoders(payload, args.repeat).items():
+            print(f"{path:<36}{name:>24}{seconds * 1000:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
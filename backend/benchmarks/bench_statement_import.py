@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Statement import benchmark: serial extract-then-write vs the streaming page-parallel importer
+Usage:
+  python benchmarks/bench_statement_import.py [--pdf ../testpdf.pdf] [--password 242846433]
+                                              [--synthetic-pages 1000] [--workers 1 2 4]
+                                              [--serial-max-pages 200]
+
+Runs against the given statement and a synthetic statement built by repeating its
+pages up to --synthetic-pages (pypdfium2, installed with pdfplumber). For each it
+reports wall time, time until the first transaction reached the database and peak
+number of parsed transactions held before writing, importing into a throwaway
+SQLite database (or DATABASE_URL when --use-env is given).
+
+The serial baseline keeps every parsed page layout alive (as the old script did) and
+needs several GB for a 1000-page statement, so it only runs on statements of up to
+--serial-max-pages pages.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DEFAULT_PDF = os.path.join(os.path.dirname(__file__), "..", "..", "testpdf.pdf")
+
+
+def build_synthetic(source: str, password: str, pages: int, out_dir: str) -> str:
+    import pypdfium2 as pdfium
+
+    src = pdfium.PdfDocument(source, password=password)
+    dst = pdfium.PdfDocument.new()
+    while len(dst) < pages:
+        take = min(len(src), pages - len(dst))
+        dst.import_pages(src, pages=list(range(take)))
+    path = os.path.join(out_dir, f"synthetic-{pages}.pdf")
+    dst.save(path)
+    return path
+
+
+def new_account(db, name: str):
+    from app import models
+
+    customer = models.Customer(customer_id=f"CUST-{name}", name=name)
+    db.add(customer)
+    db.flush()
+    account = models.Account(account_id=f"ACC-{name}", customer_id=customer.id)
+    db.add(account)
+    db.flush()
+    return account
+
+
+def serial_import(db, path: str, password: str):
+    """The previous importer: parse every page into a list, then write"""
+    import pdfplumber
+    from app.importers import get_parser, write_transactions
+
+    parser = get_parser("hdfc")
+    started = time.perf_counter()
+    transactions = []
+    with pdfplumber.open(path, password=password) as pdf:
+        for page in pdf.pages:
+            transactions.extend(parser.parse_page(page))
+    first_write = time.perf_counter() - started
+    held = len(transactions)
+    account = new_account(db, f"serial-{time.time_ns()}")
+    counts = write_transactions(db, transactions, account.id, txn_prefix=f"SER-{account.id}-")
+    db.commit()
+    return time.perf_counter() - started, first_write, held, counts["inserted"]
+
+
+def streaming_import(db, path: str, password: str, workers: int):
+    from app.importers import iter_statement_transactions, write_transactions
+
+    started = time.perf_counter()
+    first_write = []
+    account = new_account(db, f"stream-{workers}-{time.time_ns()}")
+
+    def timed(transactions):
+        for txn in transactions:
+            if not first_write:
+                first_write.append(time.perf_counter() - started)
+            yield txn
+
+    transactions = iter_statement_transactions(path, password, parser="hdfc", workers=workers)
+    counts = write_transactions(db, timed(transactions), account.id, txn_prefix=f"STR-{account.id}-")
+    db.commit()
+    # the writer holds at most one batch of parsed transactions
+    return time.perf_counter() - started, first_write[0] if first_write else 0.0, 500, counts["inserted"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pdf", default=DEFAULT_PDF)
+    parser.add_argument("--password", default="242846433")
+    parser.add_argument("--synthetic-pages", type=int, default=1000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--serial-max-pages", type=int, default=200)
+    parser.add_argument("--use-env", action="store_true", help="use DATABASE_URL instead of a temp SQLite file")
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    tmp = tempfile.mkdtemp(prefix="aegis-bench-")
+    if not args.use_env:
+        settings.DATABASE_URL = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        settings.ASYNC_DATABASE_URL = None
+
+    from app.db import session
+    from app.db.base import Base
+    from app.importers import page_count
+
+    Base.metadata.create_all(bind=session.get_engine())
+    db = session.get_session()
+
+    statements = [(args.pdf, args.password)]
+    if args.synthetic_pages:
+        statements.append((build_synthetic(args.pdf, args.password, args.synthetic_pages, tmp), None))
+
+    print(f"{'statement':<22}{'pages':>7}{'importer':>16}{'txns':>8}{'total s':>10}{'first row s':>13}{'held':>8}")
+    for path, password in statements:
+        pages = page_count(path, password)
+        runs = []
+        if pages <= args.serial_max_pages:
+            runs.append(("serial", lambda: serial_import(db, path, password)))
+        runs += [(f"stream x{w}", lambda w=w: streaming_import(db, path, password, w)) for w in args.workers]
+        for name, run in runs:
+            total, first, held, inserted = run()
+            print(f"{os.path.basename(path):<22}{pages:>7}{name:>16}{inserted:>8}{total:>10.2f}{first:>13.2f}{held:>8}")
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+CSV / Parquet ingestion benchmark
+Usage:
+  python benchmarks/bench_tabular_ingest.py [--rows 1000000] [--accounts 5000] [--batch-size 10000]
+                                            [--format csv parquet]
+
+Writes a synthetic transaction file with --rows rows spread over --accounts accounts,
+then loads it with app.importers.tabular.ingest_file into a throwaway SQLite database
+(or DATABASE_URL when --use-env is given), creating the accounts on the way. Reports
+rows/s and the process's peak RSS, which should track the batch size, not the file.
+"""
+import argparse
+import csv
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HEADER = ["txn_id", "account_id", "customer_id", "amount", "txn_type", "timestamp", "narration"]
+
+
+def make_rows(prefix: str, count: int, accounts: int):
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        account = i % accounts
+        yield [f"{prefix}-{i:09d}", f"ACC-{account:06d}", f"CUST-{account // 2:06d}", round(10 + (i * 37) % 9990, 2),
+               ("deposit", "withdrawal", "wire")[i % 3], (start + timedelta(seconds=i)).isoformat(),
+               f"UPI-COUNTERPARTY-{i % 997}@OKAXIS"]
+
+
+def write_csv(path: str, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def write_parquet(path: str, rows, batch_size: int):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    writer = None
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == batch_size:
+            table = pa.table(list(zip(*batch)), names=HEADER)
+            writer = writer or pq.ParquetWriter(path, table.schema)
+            writer.write_table(table)
+            batch = []
+    if batch:
+        table = pa.table(list(zip(*batch)), names=HEADER)
+        writer = writer or pq.ParquetWriter(path, table.schema)
+        writer.write_table(table)
+    writer.close()
+
+
+def peak_rss_mb() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--accounts", type=int, default=5_000)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--format", nargs="+", default=["csv", "parquet"], choices=["csv", "parquet"])
+    parser.add_argument("--use-env", action="store_true", help="use DATABASE_URL instead of a temp SQLite file")
+    args = parser.parse_args()
+
+    from app.core.config import settings
+    tmp = tempfile.mkdtemp(prefix="aegis-bench-")
+    if not args.use_env:
+        settings.DATABASE_URL = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        settings.ASYNC_DATABASE_URL = None
+
+    from app.db import session
+    from app.db.base import Base
+    from app.importers.tabular import PYARROW_AVAILABLE, ingest_file
+
+    Base.metadata.create_all(bind=session.get_engine())
+    print(f"pyarrow: {'yes' if PYARROW_AVAILABLE else 'no (csv module)'}; baseline RSS {peak_rss_mb():.0f} MB")
+    print(f"{'format':<10}{'rows':>10}{'file MB':>10}{'inserted':>10}{'accounts':>10}{'seconds':>10}{'rows/s':>12}{'peak RSS MB':>13}")
+    for fmt in args.format:
+        prefix = f"{fmt.upper()}-{time.time_ns()}"
+        path = os.path.join(tmp, f"transactions.{fmt}")
+        rows = make_rows(prefix, args.rows, args.accounts)
+        if fmt == "csv":
+            write_csv(path, rows)
+        else:
+            write_parquet(path, rows, args.batch_size)
+
+        db = session.get_session()
+        started = time.perf_counter()
+        with open(path, "rb") as source:
+            result = ingest_file(db, source, fmt, create_accounts=True, batch_size=args.batch_size)
+        seconds = time.perf_counter() - started
+        db.close()
+        print(f"{fmt:<10}{result['rows']:>10}{os.path.getsize(path) / 1e6:>10.1f}{result['inserted']:>10}"
+              f"{result['accounts_created']:>10}{seconds:>10.2f}{result['rows'] / seconds:>12,.0f}{peak_rss_mb():>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
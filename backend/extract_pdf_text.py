@@ -11,7 +11,11 @@ except ImportError:
     import PyPDF2
     import pdfplumber
 
-pdf_path = '/Users/arnav/Code/AEGIS/AEGIS/testpdf.pdf'
+import sys
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from app.importers import resolve_parser
+
+pdf_path = sys.argv[1] if len(sys.argv) > 1 else '/Users/arnav/Code/AEGIS/AEGIS/testpdf.pdf'
 PDF_PASSWORD = '242846433'
 
 print("=" * 100)
@@ -19,6 +23,8 @@ print("EXTRACTING PDF CONTENT WITH PDFPLUMBER (Better for tables)")
 print("=" * 100)
 
 try:
+    parser = resolve_parser(pdf_path, PDF_PASSWORD)
+    print(f"\n🏦 Statement layout: {parser.name} ({parser.description})")
     with pdfplumber.open(pdf_path, password=PDF_PASSWORD) as pdf:
         print(f"\n📄 PDF has {len(pdf.pages)} pages\n")
         
@@ -40,6 +46,12 @@ try:
                     for row in table[:10]:  # Show first 10 rows
                         print(row)
             
+            # What the layout parser makes of this page
+            parsed = parser.parse_page(page)
+            print(f"\n--- {parser.name} PARSER: {len(parsed)} TRANSACTION(S) ON PAGE {page_num} ---")
+            for txn in parsed[:10]:
+                print(txn)
+            
             print("\n" + "="*100)
             
 except Exception as e:
@@ -5,6 +5,22 @@ Usage:
   python manage.py migrate        # Run pending migrations
   python manage.py migrate:down   # Rollback last migration
   python manage.py seed           # Seed sample data
+  python manage.py refresh-metrics  # Rebuild dashboard summary tables
+  python manage.py backfill-narrations [--batch-size N] [--reparse]  # Parse stored narrations into columns
+  python manage.py rebuild-transaction-stats  # Rebuild the daily per-account transaction statistics
+  python manage.py maintain-partitions [--months-ahead N]  # Create upcoming monthly transaction partitions
+  python manage.py load-rules FILE [--dry-run]  # Store the typology rules in a YAML/JSON file (by name)
+  python manage.py run-monitoring [--full] [--window DAYS ...] [--batch-size N] [--workers N]
+                                  # Open cases for customers flagged since the last sweep (run from cron)
+  python manage.py fit-anomaly-model [--method isolation_forest|robust_z] [--window DAYS] [--sample N]
+                                     [--contamination F]  # Fit and store the customer anomaly model
+  python manage.py backtest [--variants FILE] [--window DAYS ...] [--as-of YYYY-MM-DD] [--limit N]
+                            [--workers N] [--chunk-size N] [--json FILE]
+                            # Replay history through the typology rules and variants of them
+  python manage.py import-statement PDF --account ACC-ID [--customer CUST-ID] [--parser NAME]
+                                        [--password PW] [--workers N] [--dry-run] [--restart]
+  python manage.py import-transactions FILE [--format csv|parquet] [--map FIELD=COLUMN ...]
+                                            [--create-accounts] [--batch-size N] [--restart]
 """
 import sys
 import os
@@ -148,6 +164,310 @@ def seed():
     return 0
 
 
+def refresh_metrics():
+    """Recompute the dashboard summary tables from SARs, CQI scores and detections"""
+    from app.db.session import session_scope
+    from app.services.dashboard_metrics_service import rebuild_dashboard_metrics
+
+    with session_scope() as db:
+        result = rebuild_dashboard_metrics(db)
+    print(f"✅ Rebuilt {result['counters']} counters and {result['days']} daily CQI rows")
+    return 0
+
+
+def rebuild_transaction_stats():
+    """Recompute the daily per-account transaction statistics from the transactions table"""
+    from app.db.session import session_scope
+    from app.services.transaction_stats_service import rebuild_transaction_stats as rebuild
+
+    with session_scope() as db:
+        result = rebuild(db)
+    print(f"✅ Rebuilt {result['days']} account-days and {result['counterparties']} daily counterparties")
+    return 0
+
+
+def backfill_narrations(argv):
+    """Parse the narrations of stored transactions into the channel / counterparty / jurisdiction columns"""
+    import argparse
+    from app.db.session import session_scope
+    from app.services.narration_service import BACKFILL_BATCH_SIZE, backfill_narration_fields
+
+    parser = argparse.ArgumentParser(prog="manage.py backfill-narrations", description=backfill_narrations.__doc__)
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    parser.add_argument("--reparse", action="store_true", help="re-parse rows that were already parsed")
+    args = parser.parse_args(argv)
+
+    with session_scope() as db:
+        updated = backfill_narration_fields(db, args.batch_size, args.reparse)
+    print(f"✅ Parsed {updated} transaction narrations")
+    return 0
+
+
+def maintain_partitions(argv):
+    """Create the monthly transactions partitions for this month and the next few (PostgreSQL; run from cron)"""
+    import argparse
+    from app.db.session import get_engine
+    from app.db.partitions import MONTHS_AHEAD, is_partitioned, maintain_partitions as ensure_upcoming
+
+    parser = argparse.ArgumentParser(prog="manage.py maintain-partitions", description=maintain_partitions.__doc__)
+    parser.add_argument("--months-ahead", type=int, default=MONTHS_AHEAD)
+    args = parser.parse_args(argv)
+
+    with get_engine().begin() as connection:
+        if not is_partitioned(connection):
+            print("transactions is not partitioned on this database; nothing to do")
+            return 0
+        created = ensure_upcoming(connection, args.months_ahead)
+    print(f"✅ Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+    return 0
+
+
+def load_rules(argv):
+    """Validate the typology rules in a YAML or JSON file and store them, replacing stored rules of the same name"""
+    import argparse
+    import yaml
+    from app import models
+    from app.db.session import session_scope
+    from app.services.rule_engine import Rule, RuleError, parse_rules
+
+    parser = argparse.ArgumentParser(prog="manage.py load-rules", description=load_rules.__doc__)
+    parser.add_argument("file")
+    parser.add_argument("--dry-run", action="store_true", help="validate only")
+    args = parser.parse_args(argv)
+
+    try:
+        with open(args.file) as f:
+            definitions = parse_rules(f.read())
+        rules = [Rule(definition) for definition in definitions]
+    except (OSError, RuleError) as e:
+        print(f"❌ {e}")
+        return 1
+    if args.dry_run:
+        print(f"✅ {len(rules)} valid rules")
+        return 0
+
+    with session_scope() as db:
+        for rule, definition in zip(rules, definitions):
+            row = db.query(models.TypologyRule).filter(models.TypologyRule.name == rule.name).first()
+            if row is None:
+                row = models.TypologyRule(name=rule.name, version=0)
+                db.add(row)
+            row.definition = yaml.safe_dump(definition, sort_keys=False)
+            row.enabled = rule.enabled
+            row.version += 1
+        db.commit()
+    print(f"✅ Stored {len(rules)} rules: {', '.join(rule.name for rule in rules)}")
+    return 0
+
+
+def run_monitoring(argv):
+    """Run the risk detectors over customers with new transactions and open cases for the ones they flag"""
+    import argparse
+    from app.core.config import settings
+    from app.db.session import session_scope
+    from app.services.monitoring_service import MonitoringError, run_monitoring as sweep
+
+    parser = argparse.ArgumentParser(prog="manage.py run-monitoring", description=run_monitoring.__doc__)
+    parser.add_argument("--full", action="store_true", help="sweep every customer with transactions")
+    parser.add_argument("--window", dest="windows", type=int, action="append",
+                        help="lookback window in days (repeatable); defaults to RISK_LOOKBACK_WINDOWS")
+    parser.add_argument("--batch-size", type=int, default=settings.MONITORING_BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=settings.MONITORING_WORKERS)
+    args = parser.parse_args(argv)
+
+    try:
+        with session_scope() as db:
+            result = sweep(db, args.full, args.windows, args.batch_size, args.workers)
+    except MonitoringError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ Run #{result['run_id']}: {result['customers_scanned']} customers scanned, {result['alerts']} alerted, "
+          f"{result['cases_opened']} cases opened, {result['deduplicated']} already had an active case")
+    return 0
+
+
+def fit_anomaly_model(argv):
+    """Fit the customer anomaly model on a sample of active customers and store it; running processes pick it up"""
+    import argparse
+    from app.core.config import settings
+    from app.db.session import session_scope
+    from app.services.anomaly_service import METHODS, AnomalyError, fit_anomaly_model as fit
+
+    parser = argparse.ArgumentParser(prog="manage.py fit-anomaly-model", description=fit_anomaly_model.__doc__)
+    parser.add_argument("--method", choices=METHODS, default=METHODS[0])
+    parser.add_argument("--window", type=int, default=settings.ANOMALY_WINDOW_DAYS, help="days of activity per customer")
+    parser.add_argument("--sample", type=int, default=settings.ANOMALY_FIT_SAMPLE, help="customers to fit on at most")
+    parser.add_argument("--contamination", type=float, default=settings.ANOMALY_CONTAMINATION,
+                        help="share of customers flagged")
+    args = parser.parse_args(argv)
+
+    try:
+        with session_scope() as db:
+            result = fit(db, args.method, args.window, args.sample, args.contamination)
+    except AnomalyError as e:
+        print(f"❌ {e}")
+        return 1
+    print(f"✅ Model #{result['model_id']} ({result['method']}, {result['window_days']} days) fitted on "
+          f"{result['trained_customers']} customers: read {result['read_seconds']:.1f}s, fit {result['fit_seconds']:.1f}s")
+    return 0
+
+
+def backtest(argv):
+    """Replay customers' transactions through the typology rules and variants of them, and report alerts and hit rates"""
+    import argparse
+    import json
+    from datetime import date
+    from app.core.config import settings
+    from app.db.session import session_scope
+    from app.services.backtest_service import BacktestError, format_report, parse_variants, run_backtest
+
+    parser = argparse.ArgumentParser(prog="manage.py backtest", description=backtest.__doc__)
+    parser.add_argument("--variants", help="YAML/JSON file of rule overrides per variant")
+    parser.add_argument("--window", dest="windows", type=int, action="append",
+                        help="lookback window in days (repeatable); defaults to RISK_LOOKBACK_WINDOWS")
+    parser.add_argument("--as-of", type=date.fromisoformat, help="replay the history up to this day (default today)")
+    parser.add_argument("--limit", type=int, help="only the first N customers")
+    parser.add_argument("--workers", type=int, default=settings.BACKTEST_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=settings.BACKTEST_CHUNK_SIZE)
+    parser.add_argument("--json", dest="json_file", help="also write the full result to this file")
+    args = parser.parse_args(argv)
+
+    try:
+        variants = {}
+        if args.variants:
+            with open(args.variants) as f:
+                variants = parse_variants(f.read())
+        with session_scope() as db:
+            result = run_backtest(db, variants, args.windows, args.as_of, args.workers, args.chunk_size, args.limit)
+    except (OSError, BacktestError) as e:
+        print(f"❌ {e}")
+        return 1
+    print(format_report(result))
+    if args.json_file:
+        with open(args.json_file, "w") as f:
+            json.dump(result, f, indent=2)
+    return 0
+
+
+def import_statement(argv):
+    """Parse a bank statement PDF and bulk load its transactions into an account"""
+    import argparse
+    from pathlib import Path
+    from app.importers import ImportMetrics, available_parsers, iter_statement_transactions, resolve_parser, write_transactions
+
+    parser = argparse.ArgumentParser(prog="manage.py import-statement", description=import_statement.__doc__)
+    parser.add_argument("pdf")
+    parser.add_argument("--account", help="account_id to load into (required unless --dry-run)")
+    parser.add_argument("--customer", help="customer_id to create the account under if it does not exist")
+    parser.add_argument("--parser", choices=[p.name for p in available_parsers()],
+                        help="statement layout (detected from the first page by default)")
+    parser.add_argument("--password")
+    parser.add_argument("--workers", type=int, help="extraction processes (default: CPU count)")
+    parser.add_argument("--txn-prefix", help="transaction id prefix (default: derived from the file name)")
+    parser.add_argument("--dry-run", action="store_true", help="parse and report without writing")
+    parser.add_argument("--restart", action="store_true",
+                        help="import from the first page even if this file was imported (or partly imported) before")
+    args = parser.parse_args(argv)
+    if not args.dry_run and not args.account:
+        parser.error("--account is required unless --dry-run is given")
+
+    layout = resolve_parser(args.pdf, args.password, args.parser)
+    print(f"📄 {args.pdf}: {layout.name} layout")
+    metrics = ImportMetrics()
+
+    if args.dry_run:
+        for _ in iter_statement_transactions(args.pdf, args.password, parser=layout.name,
+                                             workers=args.workers, on_page=metrics):
+            pass
+        counts = {"inserted": 0, "skipped": 0, "rejected": 0}
+    else:
+        from app.db.session import session_scope
+        from app.importers.manifest import complete_manifest, file_sha256, open_manifest
+        from app.models import Account, Customer
+        from sqlalchemy import select
+
+        with session_scope() as db:
+            account = db.scalar(select(Account).where(Account.account_id == args.account))
+            if account is None:
+                if not args.customer:
+                    print(f"Account {args.account} does not exist; pass --customer to create it")
+                    return 1
+                customer = db.scalar(select(Customer).where(Customer.customer_id == args.customer))
+                if customer is None:
+                    customer = Customer(customer_id=args.customer, name=args.customer)
+                    db.add(customer)
+                    db.flush()
+                account = Account(account_id=args.account, customer_id=customer.id)
+                db.add(account)
+                db.flush()
+            manifest = open_manifest(db, file_sha256(args.pdf), "statement", Path(args.pdf).name,
+                                     account_id=account.id, restart=args.restart)
+            if manifest.account_id != account.id:
+                print(f"{args.pdf} was (partly) imported into another account; pass --restart to start over")
+                return 1
+            if manifest.status == "completed":
+                print(f"✅ Already imported ({manifest.inserted} transactions, manifest #{manifest.id}); "
+                      f"pass --restart to import it again")
+                return 0
+            if manifest.checkpoint:
+                print(f"↪️  Resuming after page {manifest.checkpoint}")
+            prefix = args.txn_prefix or f"{Path(args.pdf).stem.upper()}-"
+            transactions = iter_statement_transactions(args.pdf, args.password, parser=layout.name, workers=args.workers,
+                                                       on_page=metrics, first_page=manifest.checkpoint + 1)
+            counts = write_transactions(db, transactions, account.id, txn_prefix=prefix, manifest=manifest)
+            complete_manifest(db, manifest)
+
+    summary = metrics.summary()
+    print(f"✅ {summary['transactions']} transactions from {summary['pages']} pages "
+          f"({counts['inserted']} inserted, {counts['skipped']} already present, "
+          f"{counts['rejected']} rejected for an unreadable date)")
+    print(f"   {summary['elapsed_seconds']}s total, {summary['pages_per_second']} pages/s, "
+          f"{summary['transactions_per_second']} transactions/s")
+    print(f"   per page: median {summary['page_ms_median']} ms, p95 {summary['page_ms_p95']} ms, "
+          f"max {summary['page_ms_max']} ms (page {summary['slowest_page']})")
+    return 0
+
+
+def import_transactions(argv):
+    """Bulk load a CSV or Parquet file of transactions"""
+    import argparse
+    from app.db.session import session_scope
+    from app.importers.tabular import DEFAULT_COLUMN_MAPPING, TABULAR_BATCH_SIZE, IngestError, detect_format, ingest_file
+
+    parser = argparse.ArgumentParser(prog="manage.py import-transactions", description=import_transactions.__doc__)
+    parser.add_argument("file")
+    parser.add_argument("--format", choices=["csv", "parquet"], help="default: from the file extension")
+    parser.add_argument("--map", action="append", default=[], metavar="FIELD=COLUMN",
+                        help=f"source column for a field ({', '.join(DEFAULT_COLUMN_MAPPING)})")
+    parser.add_argument("--create-accounts", action="store_true",
+                        help="create unknown accounts (and customers) from the customer_id column")
+    parser.add_argument("--batch-size", type=int, default=TABULAR_BATCH_SIZE)
+    parser.add_argument("--restart", action="store_true",
+                        help="load from the first row even if this file was loaded (or partly loaded) before")
+    args = parser.parse_args(argv)
+    mapping = dict(item.split("=", 1) for item in args.map)
+
+    try:
+        fmt = detect_format(args.file, args.format)
+        with open(args.file, "rb") as source, session_scope() as db:
+            result = ingest_file(db, source, fmt, mapping, args.create_accounts, args.batch_size,
+                                 source_name=os.path.basename(args.file), restart=args.restart)
+    except IngestError as e:
+        print(f"❌ {e}")
+        return 1
+    if result["already_imported"]:
+        print(f"✅ Already imported (manifest #{result['manifest_id']}); pass --restart to load it again")
+        return 0
+    if result["resumed_from_batch"]:
+        print(f"↪️  Resumed after batch {result['resumed_from_batch']}")
+    print(f"✅ {result['rows']} rows in {result['batches']} batches: {result['inserted']} inserted, "
+          f"{result['skipped']} already present, {result['rejected']} rejected, "
+          f"{result['accounts_created']} accounts created")
+    for error in result["errors"]:
+        print(f"   ⚠️  {error}")
+    return 0
+
+
 if __name__ == "__main__":
     if len(sys.argv) < 2:
         print(__doc__)
@@ -160,6 +480,26 @@ if __name__ == "__main__":
         sys.exit(migrate_down())
     elif cmd == "seed":
         sys.exit(seed())
+    elif cmd == "refresh-metrics":
+        sys.exit(refresh_metrics())
+    elif cmd == "rebuild-transaction-stats":
+        sys.exit(rebuild_transaction_stats())
+    elif cmd == "backfill-narrations":
+        sys.exit(backfill_narrations(sys.argv[2:]))
+    elif cmd == "maintain-partitions":
+        sys.exit(maintain_partitions(sys.argv[2:]))
+    elif cmd == "load-rules":
+        sys.exit(load_rules(sys.argv[2:]))
+    elif cmd == "run-monitoring":
+        sys.exit(run_monitoring(sys.argv[2:]))
+    elif cmd == "fit-anomaly-model":
+        sys.exit(fit_anomaly_model(sys.argv[2:]))
+    elif cmd == "backtest":
+        sys.exit(backtest(sys.argv[2:]))
+    elif cmd == "import-statement":
+        sys.exit(import_statement(sys.argv[2:]))
+    elif cmd == "import-transactions":
+        sys.exit(import_transactions(sys.argv[2:]))
     else:
         print(f"Unknown command: {cmd}")
         print(__doc__)
@@ -0,0 +1,84 @@
+"""
+Shared fixtures: a throwaway SQLite database per test, either behind a plain
+session (db) or as the application's own engine (app_db) for tests that go
+through the API or spawn workers that open their own sessions
+"""
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.db import session as db_session
+from app.db.base import Base
+from app.main import app
+from app import models
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Session on an empty database with the full schema"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def customer(db):
+    """Customer CUST-1 with one account, ACC-1 (both id 1)"""
+    customer = models.Customer(customer_id="CUST-1", name="Customer")
+    db.add(customer)
+    db.flush()
+    db.add(models.Account(account_id="ACC-1", customer_id=customer.id))
+    db.commit()
+    return customer
+
+
+@pytest.fixture
+def app_db(tmp_path, monkeypatch):
+    """The application's engine pointed at an empty database with the full schema; yields a session on it"""
+    monkeypatch.setattr(settings, "DATABASE_URL", f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(settings, "ASYNC_DATABASE_URL", None)
+    db_session.dispose_engine()
+    Base.metadata.create_all(bind=db_session.get_engine())
+    session = db_session.get_session()
+    yield session
+    session.close()
+    db_session.dispose_engine()
+
+
+def _add_user(db, username: str, role: models.RoleEnum) -> models.User:
+    user = models.User(username=username, email=f"{username}@example.com", hashed_password="x", role=role)
+    db.add(user)
+    db.commit()
+    return user
+
+
+@pytest.fixture
+def user_token(app_db):
+    """Factory: user_token(username, role) adds that user to app_db and returns a bearer token for it"""
+    def make(username: str, role: models.RoleEnum = models.RoleEnum.analyst) -> str:
+        return create_access_token({"user_id": _add_user(app_db, username, role).id})
+    return make
+
+
+@pytest.fixture
+def admin(app_db):
+    """User "admin" with the admin role"""
+    return _add_user(app_db, "admin", models.RoleEnum.admin)
+
+
+@pytest.fixture
+def admin_token(admin):
+    return create_access_token({"user_id": admin.id})
+
+
+@pytest.fixture
+def api_client(admin_token):
+    """TestClient on app_db, authenticated as the admin user"""
+    with TestClient(app) as client:
+        client.headers["Authorization"] = f"Bearer {admin_token}"
+        yield client
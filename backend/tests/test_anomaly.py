@@ -0,0 +1,160 @@
+"""
+Tests for anomaly scoring of customer activity
+"""
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+import os
+import pickle
+import random
+import numpy as np
+import pytest
+import sklearn
+from sqlalchemy import select
+from app.services import transaction_ingest_service as ingest
+from app.services.anomaly_service import (
+    METHODS, VECTOR_FEATURES, AnomalyError, AnomalyScorer, anomaly_models, customer_vectors, dump_scorer,
+    fit_anomaly_model, load_scorer, save_scorer,
+)
+from app.services.risk_analysis_service import analyze_transaction_risk, assess_customers
+from app.services.rule_engine import CUSTOMER_FEATURES
+from app import models
+
+
+def _population(n=2000, outliers=5):
+    rng = np.random.default_rng(3)
+    vectors = np.column_stack([rng.normal(2, 0.3, n), rng.normal(7, 0.5, n), rng.normal(6, 0.5, n),
+                               *[np.zeros(n)] * 3, rng.uniform(0.3, 1, n), np.zeros(n), rng.normal(0.5, 0.2, n),
+                               rng.integers(1, 6, n)])
+    vectors[:outliers, 1] += 6  # far more volume
+    vectors[:outliers, 4] = 1.0  # all wires
+    return vectors
+
+
+def test_customer_vectors():
+    n = 2
+    features = {name: np.zeros(n) for name in CUSTOMER_FEATURES}
+    features.update(txn_count=np.array([4.0, 0.0]), volume=np.array([999.0, 0.0]), wire_count=np.array([1.0, 0.0]),
+                    risk_rating=np.array([2.0, 5.0]))
+    vectors = customer_vectors(features)
+    assert vectors.shape == (n, len(VECTOR_FEATURES))
+    row = dict(zip(VECTOR_FEATURES, vectors[0]))
+    assert row["log_volume"] == pytest.approx(np.log(1000))
+    assert row["wire_share"] == 0.25 and row["risk_rating"] == 2
+    assert vectors[1].tolist() == [0.0] * (len(VECTOR_FEATURES) - 1) + [5.0]
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_scorer_flags_the_unusual_customers(method):
+    vectors = _population()
+    scorer = AnomalyScorer(vectors, method, window_days=90, contamination=0.01)
+    percentiles = scorer.percentiles(vectors)
+    assert (percentiles[:5] > 0.99).all()
+    assert np.median(percentiles[5:]) == pytest.approx(0.5, abs=0.05)
+
+    found = scorer.detections(vectors, percentiles)
+    assert all(found[:5])
+    assert sum(1 for d in found if d) <= 0.012 * len(vectors)
+    assert found[0]["type"] == "anomaly" and found[0]["rule"] == method and 0.5 <= found[0]["score"] <= 1
+    assert "wire_share" in found[0]["evidence"] or "log_volume" in found[0]["evidence"]
+    # what gets stored is what scores
+    assert np.array_equal(load_scorer(_row(scorer)).percentiles(vectors), percentiles)
+
+
+def _row(fitted, **columns):
+    params, forest = dump_scorer(fitted)
+    return SimpleNamespace(**{"id": 1, "method": fitted.method, "window_days": fitted.window_days,
+                              "contamination": fitted.contamination, "scorer": params, "forest": forest,
+                              "sklearn_version": sklearn.__version__, **columns})
+
+
+def test_stored_models_are_loaded_safely():
+    scorer = AnomalyScorer(_population())
+    with pytest.raises(AnomalyError, match="scikit-learn 0.1"):
+        load_scorer(_row(scorer, sklearn_version="0.1"))
+    with pytest.raises(AnomalyError, match="storage format"):
+        load_scorer(_row(scorer, sklearn_version=None, scorer=pickle.dumps(scorer)))
+    # a forest blob that would run anything else is refused before it runs
+    with pytest.raises(AnomalyError, match="system is not allowed"):
+        load_scorer(_row(scorer, forest=pickle.dumps(_Exploit())))
+    # robust_z stores no forest, so it loads under any scikit-learn
+    robust = AnomalyScorer(_population(), "robust_z")
+    assert load_scorer(_row(robust, sklearn_version="0.1")).forest is None
+
+
+class _Exploit:
+    def __reduce__(self):
+        return os.system, ("true",)
+
+
+def test_scorer_validation():
+    with pytest.raises(AnomalyError, match="at least"):
+        AnomalyScorer(_population(10, 0))
+    with pytest.raises(AnomalyError, match="Unknown method"):
+        AnomalyScorer(_population(), "kmeans")
+    with pytest.raises(AnomalyError, match="contamination"):
+        AnomalyScorer(_population(), contamination=0)
+    with pytest.raises(AnomalyError, match="VECTOR_FEATURES"):
+        AnomalyScorer(_population()[:, :4])
+
+
+@pytest.fixture
+def db(app_db):
+    db = app_db
+    customers = 80
+    db.add_all([models.Customer(customer_id=f"CUST-{i}", name=f"Customer {i}", risk_rating=2)
+                for i in range(1, customers + 1)])
+    db.flush()
+    db.add_all([models.Account(account_id=f"ACC-{i}", customer_id=i) for i in range(1, customers + 1)])
+    db.add_all([models.Case(case_ref=f"CASE-{i}", title="Case", customer_id=i) for i in (1, 2)])
+    db.flush()
+    rng = random.Random(5)
+    now = datetime.utcnow()
+    rows = [{"txn_id": f"T-{i}-{n}", "account_id": i, "amount": rng.uniform(50, 900), "txn_type": "deposit",
+             "timestamp": now - timedelta(days=rng.randint(1, 50))} for i in range(2, customers + 1) for n in range(4)]
+    # customer 1 wires a lot of money out, without tripping any typology rule
+    rows += [{"txn_id": f"T-1-{n}", "account_id": 1, "amount": 20000.0 + n, "txn_type": "wire_transfer",
+              "timestamp": now - timedelta(days=10 + n * 9)} for n in range(4)]
+    ingest.bulk_insert_transactions(db, rows)
+    db.commit()
+    yield db
+    anomaly_models.reset()
+
+
+def test_fitted_model_scores_case_analysis_and_sweeps(db, caplog):
+    assert analyze_transaction_risk(db, 1, windows=[30, 90])["anomaly_score"] is None
+
+    result = fit_anomaly_model(db, window_days=60, contamination=0.02)
+    assert result["trained_customers"] == 80
+    assert db.scalar(select(models.AnomalyModel.method)) == "isolation_forest"
+
+    flagged = analyze_transaction_risk(db, 1, windows=[30, 90])
+    assert flagged["anomaly_score"] > 0.98
+    anomaly = next(d for d in flagged["detections"] if d["type"] == "anomaly")
+    assert anomaly["window_days"] == 60 and "furthest from typical" in anomaly["evidence"]
+    # the rules still only look at the requested windows
+    assert {d["window_days"] for d in flagged["detections"] if d["type"] != "anomaly"} <= {30, 90}
+
+    ordinary = analyze_transaction_risk(db, 2, windows=[30, 90])
+    assert ordinary["anomaly_score"] < 0.98
+    assert all(d["type"] != "anomaly" for d in ordinary["detections"])
+
+    assessed = assess_customers(db, [1, 2], windows=[30, 90])
+    assert assessed[1] == flagged["detections"] and assessed[2] == ordinary["detections"]
+    assert anomaly_models.metrics()["rows"] == 4
+
+    # a refit replaces the model in effect
+    fit_anomaly_model(db, method="robust_z", window_days=60, contamination=0.02)
+    assert anomaly_models.current(db, force=True).method == "robust_z"
+    assert analyze_transaction_risk(db, 1, windows=[30])["anomaly_score"] > 0.98
+
+    # a forest from another scikit-learn is refused loudly and the model in effect stays
+    in_effect = anomaly_models.current(db)
+    save_scorer(db, AnomalyScorer(_population(), window_days=60), 80).sklearn_version = "0.1"
+    db.commit()
+    assert anomaly_models.current(db, force=True) is in_effect
+    assert "scikit-learn 0.1" in caplog.text
+
+
+def test_too_few_customers_to_fit(db):
+    with pytest.raises(AnomalyError):
+        fit_anomaly_model(db, window_days=60, sample=20)
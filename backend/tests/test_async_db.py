@@ -0,0 +1,77 @@
+"""
+Tests for the async database layer and the async read endpoints
+"""
+import asyncio
+from datetime import datetime
+import httpx
+import pytest
+from app.core.config import settings
+from app.db import session
+from app.main import app
+from app.middleware.audit_middleware import flush_pending_audit_logs
+from app import models
+
+
+@pytest.mark.parametrize("url,expected", [
+    ("postgresql://u:p@db:5432/aegis", "postgresql+asyncpg://u:p@db:5432/aegis"),
+    ("sqlite:////tmp/aegis.db", "sqlite+aiosqlite:////tmp/aegis.db"),
+])
+def test_async_url_derived_from_database_url(monkeypatch, url, expected):
+    monkeypatch.setattr(settings, "DATABASE_URL", url)
+    monkeypatch.setattr(settings, "ASYNC_DATABASE_URL", None)
+    assert session.get_async_database_url() == expected
+
+
+@pytest.fixture
+def seeded_db(app_db, admin, admin_token, user_token):
+    tokens = {"admin": admin_token, "analyst": user_token("analyst")}
+    db = app_db
+    open_case = models.Case(case_ref="CASE-1", title="Open case", status=models.CaseStatus.open)
+    closed_case = models.Case(case_ref="CASE-2", title="Closed case", status=models.CaseStatus.closed)
+    db.add_all([open_case, closed_case])
+    db.flush()
+    sar = models.SARReport(sar_ref="SAR-1", case_id=open_case.id, created_by=admin.id, narrative="structuring", created_at=datetime.utcnow())
+    db.add(sar)
+    db.flush()
+    db.add(models.CQIScore(sar_id=sar.id, overall_score=80.0))
+    db.add(models.TypologyDetection(sar_id=sar.id, detection_type="structuring", score=0.9, details='{"severity": "HIGH"}'))
+    db.commit()
+    return tokens
+
+
+def _get(paths_and_tokens):
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            results = [await client.get(path, headers={"Authorization": f"Bearer {token}"}) for path, token in paths_and_tokens]
+        await flush_pending_audit_logs()
+        await session.dispose_async_engine()
+        return results
+    return asyncio.run(run())
+
+
+def test_async_read_endpoints(seeded_db):
+    admin, analyst = seeded_db["admin"], seeded_db["analyst"]
+    cases_admin, cases_analyst, sars, audit, metrics, summary = _get([
+        ("/api/cases/", admin),
+        ("/api/cases/", analyst),
+        ("/api/sar/", admin),
+        ("/api/audit/", admin),
+        ("/api/dashboard/metrics", admin),
+        ("/api/risk/dashboard/risk-summary", admin),
+    ])
+
+    assert len(cases_admin.json()) == 2
+    # analysts only see open or assigned cases
+    assert [c["case_ref"] for c in cases_analyst.json()] == ["CASE-1"]
+    assert sars.json()[0]["sar_ref"] == "SAR-1"
+    assert audit.status_code == 200
+    assert metrics.json()["sar_volume"] == 1
+    assert metrics.json()["typology_counts"] == {"structuring": 1}
+    assert summary.json()["severity_breakdown"]["HIGH"] == 1
+    assert summary.json()["average_cqi_score"] == 80.0
+
+
+def test_async_role_check(seeded_db):
+    (audit,) = _get([("/api/audit/", seeded_db["analyst"])])
+    assert audit.status_code == 403
@@ -0,0 +1,108 @@
+"""
+Tests for backtesting the typology rules over historical data
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.services import transaction_ingest_service as ingest
+from app.services.backtest_service import BacktestError, CURRENT, parse_variants, run_backtest
+from app.services.risk_analysis_service import assess_customers
+from app.services.rule_engine import typology_rules
+from app import models
+
+STRUCTURED = [9100.0, 9200.0, 9300.0, 150.0]
+ORDINARY = [120.0, 80.0]
+
+
+@pytest.fixture
+def db(app_db):
+    # worker processes open their own sessions, so the test database is the app engine's
+    db = app_db
+    user = models.User(username="analyst", email="analyst@example.com", hashed_password="x")
+    db.add(user)
+    for i in range(1, 7):
+        db.add(models.Customer(customer_id=f"CUST-{i}", name=f"Customer {i}", risk_rating=2))
+    db.flush()
+    db.add_all([models.Account(account_id=f"ACC-{i}", customer_id=i) for i in range(1, 7)])
+    db.flush()
+    now = datetime.utcnow()
+    rows = []
+    for customer_id, amounts in ((1, STRUCTURED), (2, STRUCTURED), (3, STRUCTURED), (4, ORDINARY), (5, ORDINARY)):
+        rows += [{"txn_id": f"T-{customer_id}-{i}", "account_id": customer_id, "amount": amount, "txn_type": "deposit",
+                  "timestamp": now - timedelta(days=3, hours=i)} for i, amount in enumerate(amounts)]
+    rows.append({"txn_id": "T-6", "account_id": 6, "amount": 75.0, "txn_type": "deposit",
+                 "timestamp": now - timedelta(days=40)})
+    ingest.bulk_insert_transactions(db, rows)
+    # 1 was escalated and 4 had a SAR filed; 2's case is still open and 3's SAR is a draft
+    cases = [models.Case(case_ref=f"CASE-{i}", title="Case", customer_id=i, status=status)
+             for i, status in ((1, models.CaseStatus.escalated), (2, models.CaseStatus.open),
+                               (3, models.CaseStatus.in_review), (4, models.CaseStatus.closed))]
+    db.add_all(cases)
+    db.flush()
+    db.add_all([models.SARReport(sar_ref="SAR-3", case_id=cases[2].id, created_by=user.id, approved=False),
+                models.SARReport(sar_ref="SAR-4", case_id=cases[3].id, created_by=user.id, approved=True)])
+    db.commit()
+    yield db
+    typology_rules.reset()
+
+
+VARIANTS = """
+variants:
+  no_structuring:
+    - {name: structuring, enabled: false}
+  low_value:
+    - name: small_deposits
+      type: velocity_anomaly
+      when: "txn_count >= 2 and max_amount < 500"
+      score: 0.9
+"""
+
+
+def test_backtest_reports_alerts_and_hit_rates(db):
+    result = run_backtest(db, parse_variants(VARIANTS), windows=[30, 90], workers=1, chunk_size=2)
+    assert (result["customers"], result["positives"]) == (6, 2)
+
+    current = result["variants"][CURRENT]
+    assert (current["alerted"], current["alerts"], current["hits"]) == (3, 3, 1)
+    assert current["hit_rate"] == pytest.approx(1 / 3) and current["recall"] == 0.5
+    assert current["rules"]["structuring"]["alerted"] == 3
+    # the same customers the monitoring sweep would flag
+    assessed = assess_customers(db, list(range(1, 7)), windows=[30, 90])
+    assert current["alerted"] == sum(1 for found in assessed.values() if found)
+
+    assert result["variants"]["no_structuring"]["alerted"] == 0
+    assert "structuring" not in result["variants"]["no_structuring"]["rules"]
+    low_value = result["variants"]["low_value"]
+    assert low_value["rules"]["small_deposits"] == {"alerted": 2, "hits": 1, "hit_rate": 0.5, "recall": 0.5}
+    assert (low_value["alerted"], low_value["hits"], low_value["recall"]) == (5, 2, 1.0)
+
+
+def test_backtest_replays_history_as_of_a_day(db):
+    result = run_backtest(db, windows=[30], as_of=(datetime.utcnow() - timedelta(days=20)).date(), workers=1)
+    # only customer 6 had transactions then, and nothing of theirs fires
+    assert result["customers"] == 1
+    assert result["variants"][CURRENT]["alerted"] == 0
+
+    empty = run_backtest(db, windows=[30], as_of=(datetime.utcnow() - timedelta(days=60)).date(), workers=1)
+    assert empty["customers"] == 0 and empty["variants"][CURRENT]["hit_rate"] is None
+
+
+def test_worker_processes_match_a_single_process(db, tmp_path):
+    variants = parse_variants(VARIANTS)
+    single = run_backtest(db, variants, windows=[30, 90], workers=1, chunk_size=2)
+    parallel = run_backtest(db, variants, windows=[30, 90], workers=2, chunk_size=2, workdir=str(tmp_path / "work"))
+    assert parallel["variants"] == single["variants"]
+    assert (tmp_path / "work" / "features.npy").exists()
+
+
+def test_invalid_variants():
+    with pytest.raises(BacktestError, match="each with a name"):
+        parse_variants("looser: [{threshold: 0.1}]")
+    with pytest.raises(BacktestError, match="reserved"):
+        parse_variants("current: []")
+    with pytest.raises(BacktestError):
+        parse_variants("variants: [1, 2]")
+
+
+def test_variant_overrides_are_validated(db):
+    with pytest.raises(BacktestError, match="structuring"):
+        run_backtest(db, {"broken": [{"name": "structuring", "score": "amount / 2"}]}, workers=1)
@@ -0,0 +1,74 @@
+"""
+Tests for response compression and orjson serialization
+"""
+from datetime import datetime
+import numpy as np
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from fastapi.testclient import TestClient
+from app.api.responses import dumps
+from app.middleware.compression import CompressionMiddleware
+from app.schemas import CaseRead
+
+LARGE = "suspicious activity " * 500
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=1024)
+
+    @app.get("/large", response_class=PlainTextResponse)
+    def large():
+        return LARGE
+
+    @app.get("/small", response_class=PlainTextResponse)
+    def small():
+        return "ok"
+
+    @app.get("/events")
+    def events():
+        return StreamingResponse(iter([LARGE]), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+def test_gzip_above_threshold_only(client):
+    large = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert large.headers["content-encoding"] == "gzip"
+    assert large.text == LARGE
+    assert int(large.headers["content-length"]) < len(LARGE) / 10
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+    # event streams must reach the browser unbuffered
+    assert "content-encoding" not in client.get("/events", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_brotli_preferred_when_accepted(client):
+    pytest.importorskip("brotli")
+    response = client.get("/large", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.text == LARGE
+
+
+def test_dumps_matches_fastapi_encoding():
+    case = CaseRead(id=1, case_ref="CASE-1", title="t", description=None, status="open",
+                    customer_id=None, assigned_to=None, created_at=datetime(2026, 1, 2, 3, 4, 5))
+    payload = {"when": datetime(2026, 1, 2, 3, 4, 5), "score": np.float64(0.5), 7: "int key", "case": case}
+    assert dumps(payload) == (
+        b'{"when":"2026-01-02T03:04:05","score":0.5,"7":"int key","case":{"id":1,"case_ref":"CASE-1",'
+        b'"title":"t","description":null,"status":"open","customer_id":null,"assigned_to":null,'
+        b'"created_at":"2026-01-02T03:04:05"}}'
+    )
+
+
+def test_dict_routes_render_with_orjson():
+    from fastapi.routing import APIRoute
+    from app.api import admin, sar
+    from app.api.responses import ORJSONResponse
+    routes = [route for module in (admin, sar) for route in module.router.routes if isinstance(route, APIRoute)]
+    # routes returning plain dicts use orjson; routes with a response model keep FastAPI's pydantic-core path
+    assert all(route.response_class is ORJSONResponse for route in routes if route.response_model is None)
+    assert all(route.response_class is not ORJSONResponse for route in routes if route.response_model is not None)
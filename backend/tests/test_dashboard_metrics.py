@@ -0,0 +1,72 @@
+"""
+Tests for the incrementally maintained dashboard metrics
+"""
+from datetime import datetime, timedelta
+import pytest
+from app.services.dashboard_metrics_service import build_dashboard_metrics, rebuild_dashboard_metrics, trend_cutoff
+from app import models
+
+
+@pytest.fixture
+def db(db):
+    db.add_all([models.User(username="analyst", email="analyst@example.com", hashed_password="x"),
+                models.Case(case_ref="CASE-1", title="Case")])
+    db.commit()
+    return db
+
+
+def _add_sar(db, ref, score, detections=(), created_at=None):
+    sar = models.SARReport(sar_ref=ref, case_id=1, created_by=1, created_at=created_at or datetime.utcnow())
+    db.add(sar)
+    db.flush()
+    db.add(models.CQIScore(sar_id=sar.id, overall_score=score))
+    db.add_all([models.TypologyDetection(sar_id=sar.id, detection_type=t) for t in detections])
+    db.commit()
+    return sar
+
+
+def _metrics(db):
+    counters = db.query(models.DashboardCounter).all()
+    daily = db.query(models.DailyCQIMetric).filter(models.DailyCQIMetric.day >= trend_cutoff()).all()
+    return build_dashboard_metrics(counters, daily)
+
+
+def test_writes_update_summary_tables(db):
+    _add_sar(db, "SAR-1", 80.0, ["structuring", "layering"])
+    _add_sar(db, "SAR-2", 60.0, ["structuring"])
+    _add_sar(db, "SAR-OLD", 10.0, created_at=datetime.utcnow() - timedelta(days=90))
+
+    m = _metrics(db)
+    assert m["sar_volume"] == 3
+    assert m["average_cqi"] == pytest.approx(50.0)
+    assert m["typology_counts"] == {"structuring": 2, "layering": 1}
+    # the 90-day-old SAR is outside the trend window
+    assert [p["score"] for p in m["risk_score_trend"]] == [70.0]
+
+
+def test_rescoring_and_deletes_adjust_totals(db):
+    sar = _add_sar(db, "SAR-1", 80.0, ["structuring"])
+    _add_sar(db, "SAR-2", 60.0)
+
+    sar.cqi.overall_score = 40.0
+    db.commit()
+    assert _metrics(db)["average_cqi"] == pytest.approx(50.0)
+
+    for detection in db.query(models.TypologyDetection).all():
+        db.delete(detection)
+    db.delete(sar.cqi)
+    db.delete(sar)
+    db.commit()
+    m = _metrics(db)
+    assert m["sar_volume"] == 1
+    assert m["average_cqi"] == pytest.approx(60.0)
+    assert m["typology_counts"] == {}
+
+
+def test_rebuild_matches_incremental_state(db):
+    _add_sar(db, "SAR-1", 80.0, ["structuring", "layering"])
+    _add_sar(db, "SAR-2", 55.0, ["velocity_anomaly"], created_at=datetime.utcnow() - timedelta(days=3))
+    incremental = _metrics(db)
+
+    rebuild_dashboard_metrics(db)
+    assert _metrics(db) == incremental
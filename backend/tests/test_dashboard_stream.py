@@ -0,0 +1,86 @@
+"""
+Tests for pushing dashboard metric deltas to streaming subscribers
+"""
+import asyncio
+from unittest.mock import AsyncMock, Mock
+from app.api import dashboard
+from app.services.metrics_broadcaster import SUBSCRIBER_QUEUE_SIZE, MetricsBroadcaster
+
+
+class FakeMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.state = {"sar_volume": 1, "average_cqi": 50.0, "typology_counts": {}}
+
+    async def __call__(self):
+        self.calls += 1
+        return dict(self.state)
+
+
+def test_one_computation_per_refresh_for_all_subscribers():
+    async def run():
+        compute = FakeMetrics()
+        broadcaster = MetricsBroadcaster(compute, interval=3600)
+        queues = [broadcaster.subscribe() for _ in range(50)]
+        await asyncio.sleep(0)  # let the background task run its first refresh
+
+        compute.state["sar_volume"] = 2
+        await broadcaster.refresh()
+        await broadcaster.refresh()  # nothing changed: nothing published
+        await broadcaster.stop()
+        return compute, queues
+
+    compute, queues = asyncio.run(run())
+    assert compute.calls == 3
+    for queue in queues:
+        assert queue.get_nowait() == ("snapshot", {"sar_volume": 1, "average_cqi": 50.0, "typology_counts": {}})
+        assert queue.get_nowait() == ("delta", {"sar_volume": 2})
+        assert queue.empty()
+
+
+def test_late_subscriber_gets_current_snapshot_and_slow_subscriber_resyncs():
+    async def run():
+        compute = FakeMetrics()
+        broadcaster = MetricsBroadcaster(compute, interval=3600)
+        slow = broadcaster.subscribe()
+        await asyncio.sleep(0)
+        for i in range(SUBSCRIBER_QUEUE_SIZE + 1):
+            compute.state["sar_volume"] = 100 + i
+            await broadcaster.refresh()
+        late = broadcaster.subscribe()
+        await broadcaster.stop()
+        return broadcaster, slow, late
+
+    broadcaster, slow, late = asyncio.run(run())
+    assert late.get_nowait() == ("snapshot", {"sar_volume": 100 + SUBSCRIBER_QUEUE_SIZE, "average_cqi": 50.0, "typology_counts": {}})
+    assert broadcaster.resyncs == 1
+    event, data = slow.get_nowait()
+    assert event == "snapshot"
+
+
+def test_stream_endpoint_emits_server_sent_events(monkeypatch):
+    compute = FakeMetrics()
+    monkeypatch.setattr(dashboard, "dashboard_broadcaster", MetricsBroadcaster(compute, interval=3600))
+    request = Mock()
+    # connected for the first two checks, then the client goes away
+    request.is_disconnected = AsyncMock(side_effect=[False, False, True])
+    db = Mock(close=AsyncMock())
+
+    async def run():
+        response = await dashboard.stream_metrics(request, db=db, user=None)
+        body = []
+        async for chunk in response.body_iterator:
+            body.append(chunk)
+            if len(body) == 1:
+                compute.state["average_cqi"] = 75.0
+                await dashboard.dashboard_broadcaster.refresh()
+        await dashboard.dashboard_broadcaster.stop()
+        return response, body
+
+    response, body = asyncio.run(run())
+    assert response.media_type == "text/event-stream"
+    db.close.assert_awaited_once()
+    assert body[0].startswith("event: snapshot\ndata: {")
+    assert body[1] == 'event: delta\ndata: {"average_cqi":75.0}\n\n'
+    # the subscriber is gone once the client disconnects
+    assert dashboard.dashboard_broadcaster.metrics()["subscribers"] == 0
@@ -0,0 +1,55 @@
+"""
+Load test for the connection pool and per-request session lifecycle
+"""
+import asyncio
+import httpx
+import pytest
+from app.core.config import settings
+from app.db import session
+from app.db.pool_metrics import pool_metrics
+from app.main import app
+from app.middleware.audit_middleware import flush_pending_audit_logs
+from app import models
+
+CONCURRENT_REQUESTS = 200
+
+
+@pytest.fixture
+def small_pool_db(app_db, admin_token, monkeypatch):
+    case = models.Case(case_ref="CASE-LOAD-1", title="Load test case")
+    app_db.add(case)
+    app_db.commit()
+    case_id = case.id
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 5)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 5)
+    monkeypatch.setattr(settings, "DB_POOL_TIMEOUT", 30)
+    # rebuilt with the small pool on next use
+    session.dispose_engine()
+    pool_metrics.reset()
+    return admin_token, case_id
+
+
+def test_no_pool_exhaustion_under_concurrent_requests(small_pool_db):
+    """200 concurrent requests to a sync endpoint on a 10-connection pool all succeed without checkout timeouts"""
+    token, case_id = small_pool_db
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            results = await asyncio.gather(*[
+                client.get(f"/api/cases/{case_id}", headers=headers) for _ in range(CONCURRENT_REQUESTS)
+            ])
+        await flush_pending_audit_logs()
+        return results
+
+    responses = asyncio.run(run())
+
+    assert all(r.status_code == 200 for r in responses)
+    stats = session.get_pool_metrics()
+    assert stats["timeouts"] == 0
+    assert stats["peak_checked_out"] <= settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW
+    # every connection went back to the pool once the requests finished
+    assert stats["checked_out"] == 0
+    # request sessions plus one audit write per request
+    assert stats["checkouts"] >= 2 * CONCURRENT_REQUESTS
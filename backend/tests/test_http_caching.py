@@ -0,0 +1,59 @@
+"""
+Tests for ETag revalidation and the aggregate response cache
+"""
+import pytest
+from app.api.caching import response_cache
+from app.db import session
+from app import models
+
+
+@pytest.fixture
+def client(app_db, admin, api_client):
+    response_cache.clear()
+    case = models.Case(case_ref="CASE-1", title="Case")
+    app_db.add(case)
+    app_db.flush()
+    app_db.add(models.SARReport(sar_ref="SAR-1", case_id=case.id, created_by=admin.id, narrative="narrative"))
+    app_db.commit()
+    yield api_client
+    response_cache.clear()
+
+
+def test_entity_etag_revalidation(client):
+    first = client.get("/api/sar/1")
+    etag = first.headers["ETag"]
+    assert first.json()["narrative"] == "narrative"
+
+    again = client.get("/api/sar/1", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+    assert again.headers["ETag"] == etag
+
+    # approving bumps updated_at, so the old ETag no longer matches
+    assert client.post("/api/sar/1/approve").status_code == 200
+    changed = client.get("/api/sar/1", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.json()["approved"] is True
+    assert changed.headers["ETag"] != etag
+
+    case = client.get("/api/cases/1")
+    assert client.get("/api/cases/1", headers={"If-None-Match": f'W/{case.headers["ETag"]}'}).status_code == 304
+
+
+def test_dashboard_metrics_cached_until_a_write(client):
+    first = client.get("/api/dashboard/metrics")
+    assert first.json()["sar_volume"] == 1
+    hits = response_cache.hits
+
+    cached = client.get("/api/dashboard/metrics", headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+    assert response_cache.hits == hits + 1
+
+    db = session.get_session()
+    db.add(models.SARReport(sar_ref="SAR-2", case_id=1, created_by=1))
+    db.commit()
+    db.close()
+
+    fresh = client.get("/api/dashboard/metrics", headers={"If-None-Match": first.headers["ETag"]})
+    assert fresh.status_code == 200
+    assert fresh.json()["sar_volume"] == 2
@@ -0,0 +1,117 @@
+"""
+Tests for the monitoring sweep that opens cases
+"""
+from datetime import datetime, timedelta
+import json
+import pytest
+from sqlalchemy import select
+from app.core.config import settings
+from app.services import monitoring_service
+from app.services import transaction_ingest_service as ingest
+from app.services.risk_analysis_service import analyze_transaction_risk, assess_customers
+from app import models
+
+
+@pytest.fixture
+def db(app_db):
+    # the sweep's workers open their own sessions, so the test database is the app engine's
+    for i in range(1, 5):
+        app_db.add(models.Customer(customer_id=f"CUST-{i}", name=f"Customer {i}", risk_rating=2))
+    app_db.flush()
+    app_db.add_all([models.Account(account_id=f"ACC-{i}", customer_id=i) for i in range(1, 5)])
+    app_db.commit()
+    return app_db
+
+
+def _ingest(db, prefix, account_id, amounts):
+    now = datetime.utcnow()
+    ingest.bulk_insert_transactions(db, [
+        {"txn_id": f"{prefix}-{i}", "account_id": account_id, "amount": amount, "txn_type": "deposit",
+         "timestamp": now - timedelta(days=3, hours=i)}
+        for i, amount in enumerate(amounts)
+    ])
+    db.commit()
+
+
+STRUCTURED = [9100.0, 9200.0, 9300.0, 150.0]
+ORDINARY = [120.0, 80.0]
+
+
+def test_sweep_opens_one_case_per_flagged_customer(db):
+    _ingest(db, "A", 1, STRUCTURED)
+    _ingest(db, "B", 2, ORDINARY)
+    _ingest(db, "C", 3, STRUCTURED)
+    # customer 3 is already being investigated
+    db.add(models.Case(case_ref="CASE-3", title="Open", customer_id=3, status=models.CaseStatus.in_review))
+    db.commit()
+
+    result = monitoring_service.run_monitoring(db, batch_size=2, workers=2)
+    assert result["customers_scanned"] == 3
+    assert (result["alerts"], result["cases_opened"], result["deduplicated"]) == (2, 1, 1)
+
+    case = db.scalars(select(models.Case).where(models.Case.case_ref.like("MON-%"))).one()
+    assert case.customer_id == 1 and case.status == models.CaseStatus.open
+    assert "structuring" in case.title
+    detections = db.scalars(select(models.TypologyDetection).where(models.TypologyDetection.case_id == case.id)).all()
+    assert [d.detection_type for d in detections] == ["structuring"]
+    assert detections[0].severity == "MEDIUM"
+    assert json.loads(detections[0].details)["monitoring_run_id"] == result["run_id"]
+    assert db.get(models.DashboardCounter, ("typology", "structuring")).count == 1
+
+    run = db.get(models.MonitoringRun, result["run_id"])
+    assert run.status == monitoring_service.COMPLETED and run.finished_at is not None
+
+    # nothing new since: nobody is scanned
+    assert monitoring_service.run_monitoring(db)["customers_scanned"] == 0
+
+    # new activity on customer 1 while its case is open is deduplicated; once closed it opens another
+    _ingest(db, "A2", 1, [9050.0])
+    assert monitoring_service.run_monitoring(db)["deduplicated"] == 1
+    case.status = models.CaseStatus.closed
+    db.commit()
+    _ingest(db, "A3", 1, [60.0])
+    assert monitoring_service.run_monitoring(db)["cases_opened"] == 1
+
+
+def test_batch_assessment_matches_case_analysis(db):
+    _ingest(db, "A", 1, STRUCTURED)
+    _ingest(db, "B", 2, ORDINARY)
+    _ingest(db, "D", 4, [60000.0, 70000.0, 100.0])
+    for customer_id in (1, 2, 4):
+        db.add(models.Case(case_ref=f"CASE-{customer_id}", title="Case", customer_id=customer_id))
+    db.commit()
+
+    assessed = assess_customers(db, [1, 2, 3, 4])
+    assert assessed[3] == []
+    for customer_id in (1, 2, 4):
+        case_id = db.scalar(select(models.Case.id).where(models.Case.customer_id == customer_id))
+        assert assessed[customer_id] == analyze_transaction_risk(db, case_id)["detections"]
+    assert {d["type"] for d in assessed[4]} == {"counterparty_risk"}
+
+
+def test_failed_sweep_is_covered_by_the_next(db, monkeypatch):
+    _ingest(db, "A", 1, STRUCTURED)
+
+    def broken(*args):
+        raise RuntimeError("database went away")
+
+    monkeypatch.setattr(monitoring_service, "open_cases", broken)
+    with pytest.raises(RuntimeError):
+        monitoring_service.run_monitoring(db)
+    failed = db.scalars(select(models.MonitoringRun)).one()
+    assert failed.status == monitoring_service.FAILED and "went away" in failed.error
+
+    monkeypatch.undo()
+    result = monitoring_service.run_monitoring(db)
+    assert (result["from_transaction_id"], result["cases_opened"]) == (0, 1)
+
+
+def test_one_sweep_at_a_time(db, monkeypatch):
+    db.add(models.MonitoringRun(status=monitoring_service.RUNNING))
+    db.commit()
+    with pytest.raises(monitoring_service.MonitoringError):
+        monitoring_service.run_monitoring(db)
+
+    # a run that has been "running" for longer than the timeout is presumed dead
+    monkeypatch.setattr(settings, "MONITORING_RUN_TIMEOUT_SECONDS", 0)
+    assert monitoring_service.run_monitoring(db)["customers_scanned"] == 0
@@ -0,0 +1,118 @@
+"""
+Tests for narration parsing into structured transaction columns
+"""
+from datetime import datetime
+from types import SimpleNamespace
+import os
+import subprocess
+import sys
+import pytest
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.orm import Session
+from app.services import risk_analysis_service
+from app.services.narration_service import backfill_narration_fields, narration_from_meta, parse_narration
+from app.services.transaction_ingest_service import bulk_insert_transactions
+from app.services.transaction_stats_service import empty_stats
+from app import models
+
+
+@pytest.mark.parametrize("narration, txn_type, expected", [
+    ("UPI-TANVI KABI-TANVI.KABI@OKAXIS-SBIN0017042-424035494393-CIVILANDMECHANIC", "withdrawal",
+     ("UPI", "tanvi.kabi@okaxis", "SBIN", "IN", "debit")),
+    ("UPI-PRITHVISINGHTOMARM-PRITHVITOMAR88-2@OKHDFCBANK-ICIC0001770-433682014618-UPI", "deposit",
+     ("UPI", "prithvitomar88-2@okhdfcbank", "ICIC", "IN", "credit")),
+    ("IMPS-432808682196-MS MEENA PUGGAL-SBIN-XXXXXXXXXXXXX0064-REQPAY", "deposit",
+     ("IMPS", "XXXXXXXXXXXXX0064", "SBIN", "IN", "credit")),
+    ("NEFTCR-IDFB0010201-MRSMEENAPUGGAL-ARNAVPUGGAL-IDFBH24236607640", None,
+     ("NEFT", "MRSMEENAPUGGAL", "IDFB", "IN", "credit")),
+    ("Wire Transfer OUT", "wire", ("WIRE", None, None, None, "debit")),
+    ("Transfer to offshore holding, Cayman Islands", "wire_transfer", ("WIRE", None, None, "KY", None)),
+    (None, "cash_deposit", ("CASH", None, None, None, "credit")),
+    ("misc", "fee", ("OTHER", None, None, None, None)),
+])
+def test_parse_narration(narration, txn_type, expected):
+    parsed = parse_narration(narration, txn_type)
+    assert tuple(parsed[k] for k in ("channel", "counterparty_id", "counterparty_bank", "jurisdiction", "direction")) == expected
+
+
+def test_narration_from_statement_meta():
+    assert narration_from_meta("Page: 3 | UPI-A-B@OKAXIS | Ref: 0001 | Balance: 10.0") == "UPI-A-B@OKAXIS"
+    assert narration_from_meta("plain note") == "plain note"
+    assert narration_from_meta(None) == ""
+
+
+@pytest.mark.usefixtures("customer")
+def test_columns_filled_on_bulk_and_orm_insert_and_by_backfill(db):
+    bulk_insert_transactions(db, [
+        {"txn_id": "B-1", "account_id": 1, "amount": 10, "txn_type": "deposit",
+         "timestamp": datetime(2025, 1, 1),
+         "meta_data": "Page: 1 | IMPS-1-X-SBIN-XXXXXX0064-REQ | Ref: 1 | Balance: 10"},
+        {"txn_id": "B-2", "account_id": 1, "amount": 10, "txn_type": "withdrawal", "timestamp": datetime(2025, 1, 1),
+         "narration": "UPI-A-A@OKAXIS-X"},
+    ])
+    db.add(models.Transaction(txn_id="O-1", account_id=1, amount=5, txn_type="wire", meta_data="SWIFT to Panama"))
+    db.commit()
+    parsed = {t.txn_id: (t.channel, t.counterparty_id, t.jurisdiction) for t in db.scalars(select(models.Transaction))}
+    assert parsed == {
+        "B-1": ("IMPS", "XXXXXX0064", "IN"),
+        "B-2": ("UPI", "a@okaxis", "IN"),
+        "O-1": ("WIRE", None, "PA"),
+    }
+
+    # rows stored before the columns existed
+    db.execute(models.Transaction.__table__.update().values(channel=None, jurisdiction=None))
+    db.commit()
+    assert backfill_narration_fields(db, batch_size=2) == 3
+    assert backfill_narration_fields(db) == 0
+    assert db.scalar(select(models.Transaction.jurisdiction).where(models.Transaction.txn_id == "O-1")) == "PA"
+    assert backfill_narration_fields(db, reparse=True) == 3
+
+
+@pytest.mark.usefixtures("customer")
+def test_geographic_risk_counts_high_risk_jurisdictions(db):
+    db.add_all([
+        models.Transaction(txn_id=f"T-{i}", account_id=1, amount=100, txn_type="wire", timestamp=datetime(2025, 1, i + 1),
+                           meta_data="Wire via Hong Kong" if i == 0 else "UPI-A-A@OKAXIS")
+        for i in range(4)
+    ])
+    db.commit()
+    whole_history = {None: None}
+    count = risk_analysis_service._high_risk_jurisdiction_counts(db, [1], whole_history)[None]
+    assert _geographic_risk(count, 4) == 0.75
+    assert risk_analysis_service._high_risk_jurisdiction_counts(db, [2], whole_history) == {None: 0}
+    assert _geographic_risk(0, 4) == 0.0
+
+
+def _geographic_risk(count, total):
+    stats = {**empty_stats(), "txn_count": total}
+    found = risk_analysis_service.detect_typologies(SimpleNamespace(risk_rating=1), stats, count)
+    return next((d["score"] for d in found if d["type"] == "geographic_risk"), 0.0)
+
+
+def test_migration_leaves_existing_rows_to_the_backfill(tmp_path):
+    url = f"sqlite:///{tmp_path / 'migrated.db'}"
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+    def upgrade(revision):
+        subprocess.run([sys.executable, "-m", "alembic", "upgrade", revision], cwd=backend, check=True,
+                       env={**os.environ, "DATABASE_URL": url}, capture_output=True)
+
+    upgrade("005")
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO customers (id, customer_id, name) VALUES (1, 'CUST-1', 'Customer')"))
+        conn.execute(text("INSERT INTO accounts (id, account_id, customer_id) VALUES (1, 'ACC-1', 1)"))
+        conn.execute(text("INSERT INTO transactions (id, txn_id, amount, txn_type, account_id, meta_data) "
+                          "VALUES (:id, :txn_id, 100, 'wire', 1, :meta)"), [
+            {"id": 1, "txn_id": "T-1", "meta": "SWIFT transfer to Cayman Islands"},
+            {"id": 2, "txn_id": "T-2", "meta": "Page: 1 | UPI-TANVI KABI-TANVI.KABI@OKAXIS-SBIN0017042-4240354 | Ref: R | Balance: 1.00"},
+        ])
+    upgrade("006")
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT channel FROM transactions WHERE channel IS NOT NULL")).all() == []
+    with Session(engine) as db:
+        assert backfill_narration_fields(db) == 2
+    with engine.connect() as conn:
+        rows = conn.execute(text("SELECT channel, jurisdiction FROM transactions ORDER BY id")).all()
+    engine.dispose()
+    assert [tuple(row) for row in rows] == [("WIRE", "KY"), ("UPI", "IN")]
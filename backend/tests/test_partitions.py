@@ -0,0 +1,119 @@
+"""
+Tests for monthly transactions partitions and lookback-bounded risk queries
+"""
+from datetime import date, datetime, timedelta
+from unittest.mock import MagicMock
+import pytest
+from app.db import partitions
+from app.services.risk_analysis_service import analyze_transaction_risk, customer_transactions_stmt
+from app import models
+
+
+class FakePostgres:
+    """Just enough of a PostgreSQL connection to drive ensure_partitions"""
+
+    def __init__(self, existing=(), default_rows=()):
+        self.dialect = MagicMock()
+        self.dialect.name = "postgresql"
+        self.engine = MagicMock()
+        self.engine.url.render_as_string.return_value = "postgresql://aegis@db/aegis"
+        self.existing = [partitions.partition_name(month) for month in existing] + [partitions.DEFAULT_PARTITION]
+        self.default_rows = set(default_rows)
+        self.statements = []
+
+    def scalar(self, stmt, params=None):
+        sql = str(stmt)
+        if "pg_partitioned_table" in sql:
+            return 1
+        return params["start"] in self.default_rows
+
+    def scalars(self, stmt, params=None):
+        return list(self.existing)
+
+    def execute(self, stmt, params=None):
+        self.statements.append(str(stmt))
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    partitions.reset_cache()
+    commits = []
+    monkeypatch.setattr(partitions, "_after_commit", lambda connection, callback: commits.append(callback))
+    yield commits
+    partitions.reset_cache()
+
+
+def test_month_arithmetic():
+    assert partitions.next_month(date(2025, 12, 1)) == date(2026, 1, 1)
+    assert partitions.add_months(date(2025, 11, 1), 3) == date(2026, 2, 1)
+    assert partitions.partition_name(date(2026, 3, 1)) == "transactions_y2026m03"
+
+
+def test_creates_only_missing_months_and_remembers_them_after_commit(fresh_cache):
+    conn = FakePostgres(existing=[date(2025, 1, 1)])
+    created = partitions.ensure_partitions_for(conn, [datetime(2025, 1, 9), datetime(2025, 2, 3), None])
+    assert created == ["transactions_y2025m02"]
+    assert any("pg_advisory_xact_lock" in sql for sql in conn.statements)
+    assert any('"transactions_y2025m02" PARTITION OF' in sql and "FROM ('2025-02-01') TO ('2025-03-01')" in sql
+               for sql in conn.statements)
+
+    # not committed yet: the next call checks again
+    conn.statements.clear()
+    partitions.ensure_partitions_for(conn, [datetime(2025, 2, 3)])
+    assert conn.statements
+
+    for on_commit in fresh_cache:
+        on_commit(conn)
+    conn.statements.clear()
+    assert partitions.ensure_partitions_for(conn, [datetime(2025, 1, 20), datetime(2025, 2, 28)]) == []
+    assert conn.statements == []
+
+
+def test_moves_rows_out_of_the_default_partition():
+    conn = FakePostgres(default_rows=[date(2024, 6, 1)])
+    assert partitions.ensure_partitions(conn, [date(2024, 6, 1)]) == ["transactions_y2024m06"]
+    detach, create, move, attach = conn.statements[1:]
+    assert "DETACH PARTITION" in detach and partitions.DEFAULT_PARTITION in detach
+    assert "transactions_y2024m06" in create
+    assert move.startswith("WITH moved AS (DELETE FROM")
+    assert "ATTACH PARTITION" in attach and attach.endswith("DEFAULT")
+
+
+def test_maintain_covers_the_months_ahead():
+    conn = FakePostgres()
+    created = partitions.maintain_partitions(conn, months_ahead=3, today=date(2026, 11, 5))
+    assert created == ["transactions_y2026m11", "transactions_y2026m12", "transactions_y2027m01",
+                       "transactions_y2027m02"]
+
+
+def test_noop_without_partitioned_table(db):
+    conn = db.connection()
+    assert not partitions.is_partitioned(conn)
+    assert partitions.ensure_partitions_for(conn, [datetime(2025, 1, 1)]) == []
+    assert partitions.maintain_partitions(conn) == []
+
+
+def test_lookback_bounds_the_customer_query(db):
+    sql = str(customer_transactions_stmt(1, datetime(2025, 1, 1)))
+    assert "transactions.timestamp >=" in sql
+    assert "transactions.timestamp >=" not in str(customer_transactions_stmt(1))
+
+    customer = models.Customer(customer_id="CUST-1", name="Customer", risk_rating=1)
+    db.add(customer)
+    db.flush()
+    account = models.Account(account_id="ACC-1", customer_id=customer.id)
+    db.add(account)
+    db.flush()
+    now = datetime.utcnow()
+    for i, days_ago in enumerate((400, 200, 20, 5)):
+        db.add(models.Transaction(txn_id=f"TXN-{i}", account_id=account.id, amount=100.0, txn_type="deposit",
+                                  timestamp=now - timedelta(days=days_ago), meta_data="Offshore transfer"))
+    case = models.Case(case_ref="CASE-1", title="Case", customer_id=customer.id)
+    db.add(case)
+    db.commit()
+
+    assert analyze_transaction_risk(db, case.id, windows=[])["total_transactions"] == 4
+    recent = analyze_transaction_risk(db, case.id, lookback_days=30)
+    assert recent["total_transactions"] == 2
+    assert recent["lookback_days"] == 30
+    assert analyze_transaction_risk(db, case.id, lookback_days=365)["total_transactions"] == 3
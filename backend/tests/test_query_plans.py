@@ -0,0 +1,62 @@
+"""
+EXPLAIN checks that the hot queries use the indexes from the migrations
+"""
+import os
+from datetime import datetime
+import subprocess
+import sys
+import pytest
+from sqlalchemy import create_engine, select
+from app.services.risk_analysis_service import customer_transactions_stmt
+from app import models
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="module")
+def migrated(tmp_path_factory):
+    """An empty SQLite database built by `alembic upgrade head`, not create_all"""
+    url = f"sqlite:///{tmp_path_factory.mktemp('plans') / 'migrated.db'}"
+    subprocess.run([sys.executable, "-m", "alembic", "upgrade", "head"], cwd=BACKEND_DIR, check=True,
+                   env={**os.environ, "DATABASE_URL": url}, capture_output=True)
+    engine = create_engine(url)
+    yield engine
+    engine.dispose()
+
+
+def _plan(engine, stmt) -> str:
+    sql = stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        return "\n".join(row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+
+
+@pytest.mark.parametrize("stmt, indexes", [
+    (customer_transactions_stmt(1), ["ix_accounts_customer_id", "ix_transactions_account_id_timestamp"]),
+    (customer_transactions_stmt(1, datetime(2025, 1, 1)),
+     ["ix_accounts_customer_id", "ix_transactions_account_id_timestamp"]),
+    (select(models.Transaction).where(models.Transaction.account_id == 1).order_by(models.Transaction.timestamp),
+     ["ix_transactions_account_id_timestamp"]),
+    (select(models.Case).where(models.Case.customer_id == 1), ["ix_cases_customer_id"]),
+    (select(models.Case.id).where(models.Case.status == models.CaseStatus.assigned, models.Case.assigned_to == 2),
+     ["ix_cases_status_assigned_to"]),
+    (select(models.SARReport).where(models.SARReport.case_id == 1), ["ix_sar_reports_case_id"]),
+    (select(models.SARReport.id).where(models.SARReport.created_by == 1)
+     .order_by(models.SARReport.created_at.desc(), models.SARReport.id.desc()),
+     ["ix_sar_reports_created_by_created_at_id"]),
+    (select(models.CQIScore).where(models.CQIScore.sar_id == 1), ["sqlite_autoindex_cqi_scores"]),
+], ids=["customer_transactions", "customer_transactions_since", "account_transactions", "customer_cases", "analyst_queue",
+        "case_sar", "my_sars", "sar_cqi"])
+def test_hot_queries_use_indexes(migrated, stmt, indexes):
+    plan = _plan(migrated, stmt)
+    for index in indexes:
+        assert index in plan, plan
+    assert "SCAN" not in plan, plan
+
+
+@pytest.mark.parametrize("stmt", [
+    select(models.Transaction).where(models.Transaction.account_id == 1).order_by(models.Transaction.timestamp),
+    select(models.SARReport.id).where(models.SARReport.created_by == 1)
+    .order_by(models.SARReport.created_at.desc(), models.SARReport.id.desc()),
+])
+def test_ordered_lookups_need_no_sort(migrated, stmt):
+    assert "TEMP B-TREE" not in _plan(migrated, stmt)
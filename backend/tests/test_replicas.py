@@ -0,0 +1,88 @@
+"""
+Tests for read-replica routing, using two SQLite databases as primary and replica
+"""
+import asyncio
+from datetime import datetime
+import httpx
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.db import session
+from app.db.base import Base
+from app.db.replicas import Replica, ReplicaRouter
+from app.main import app
+from app.middleware.audit_middleware import flush_pending_audit_logs
+from app import models
+
+
+def _seed_sars(db, user_id: int, count: int):
+    case = models.Case(case_ref="CASE-1", title="Case")
+    db.add(case)
+    db.flush()
+    db.add_all([
+        models.SARReport(sar_ref=f"SAR-{i}", case_id=case.id, created_by=user_id, created_at=datetime.utcnow())
+        for i in range(count)
+    ])
+    db.commit()
+
+
+@pytest.fixture
+def primary_and_replica(app_db, admin, admin_token, tmp_path, monkeypatch):
+    # distinguishable data: the replica holds 3 SARs, the primary (app_db) 1
+    _seed_sars(app_db, admin.id, 1)
+    replica_url = f"sqlite:///{tmp_path / 'replica.db'}"
+    engine = create_engine(replica_url)
+    Base.metadata.create_all(bind=engine)
+    with Session(engine) as db:
+        db.add(models.User(id=admin.id, username="admin", email="admin@example.com", hashed_password="x",
+                           role=models.RoleEnum.admin))
+        _seed_sars(db, admin.id, 3)
+    engine.dispose()
+    monkeypatch.setattr(settings, "DATABASE_REPLICA_URLS", [replica_url])
+    monkeypatch.setattr(settings, "REPLICA_MAX_LAG_SECONDS", 5.0)
+    # rebuilt with the replica on next use
+    session.dispose_engine()
+    return admin_token
+
+
+def _sar_volume(token: str) -> int:
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            r = await client.get("/api/dashboard/metrics", headers={"Authorization": f"Bearer {token}"})
+        await flush_pending_audit_logs()
+        await session.dispose_async_engine()
+        return r.json()["sar_volume"]
+    return asyncio.run(run())
+
+
+def test_dashboard_reads_from_replica(primary_and_replica):
+    assert _sar_volume(primary_and_replica) == 3
+    assert session.get_replica_router().metrics()["replicas"][0]["routed"] == 1
+
+
+def test_lagging_replica_falls_back_to_primary(primary_and_replica):
+    router = session.get_replica_router()
+    router.lag_probe = lambda conn: 60.0
+    assert _sar_volume(primary_and_replica) == 1
+    assert router.primary_fallbacks == 1
+    assert router.replicas[0].healthy is False
+
+
+def test_router_skips_unreachable_replica(tmp_path):
+    healthy_url = f"sqlite:///{tmp_path / 'ok.db'}"
+    broken = Replica("sqlite:////nonexistent-dir/replica.db", {})
+    healthy = Replica(healthy_url, {})
+    router = ReplicaRouter([broken, healthy], max_lag=5.0, check_interval=60.0)
+
+    picks = [router.pick() for _ in range(4)]
+
+    assert all(p is healthy for p in picks)
+    assert broken.last_error is not None
+    router.dispose()
+
+
+def test_router_without_replicas_uses_primary():
+    router = ReplicaRouter([], max_lag=5.0, check_interval=10.0)
+    assert router.pick() is None
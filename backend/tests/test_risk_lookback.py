@@ -0,0 +1,75 @@
+"""
+Tests for lookback windows in risk analysis
+"""
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app.core.config import settings
+from app.services import risk_analysis_service
+from app.services.risk_analysis_service import analyze_transaction_risk, resolve_windows
+from app import models
+
+
+@pytest.fixture
+def db(db, customer):
+    customer.risk_rating = 1
+    db.add(models.Case(case_ref="CASE-1", title="Case", customer_id=customer.id))
+    db.commit()
+    return db
+
+
+def _add(db, txn_id, when, meta_data="UPI-A-A@OKAXIS"):
+    db.add(models.Transaction(txn_id=txn_id, account_id=1, amount=100.0, txn_type="deposit", timestamp=when,
+                              meta_data=meta_data))
+
+
+def test_resolve_windows():
+    assert resolve_windows() == sorted(settings.RISK_LOOKBACK_WINDOWS)
+    assert resolve_windows(lookback_days=45) == [45]
+    assert resolve_windows(windows=[365, 30, 30]) == [30, 365]
+    assert resolve_windows(lookback_days=45, windows=[7]) == [7]
+    assert resolve_windows(windows=[]) == [None]
+
+
+def test_detections_report_the_window_that_produced_them(db):
+    now = datetime.utcnow()
+    # a burst today on top of a year of monthly activity and one very old transaction
+    for i in range(20):
+        _add(db, f"BURST-{i}", now - timedelta(hours=1, minutes=i))
+    for i, days_ago in enumerate(range(40, 371, 30)):
+        _add(db, f"MONTHLY-{i}", now - timedelta(days=days_ago))
+    _add(db, "OLD", now - timedelta(days=800))
+    db.commit()
+
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append((args[2], args[3])))
+    profile = analyze_transaction_risk(db, 1, windows=[30, 90, 365])
+    assert profile["windows"] == [30, 90, 365]
+    assert profile["lookback_days"] == 365
+    # only the longest window is loaded
+    assert profile["total_transactions"] == 20 + 11
+    assert any("transactions.timestamp >=" in sql for sql, _ in statements)
+
+    velocity = [d for d in profile["detections"] if d["type"] == "velocity_anomaly"]
+    assert len(velocity) == 1
+    assert velocity[0]["window_days"] == 30
+
+    # the whole history dilutes the burst away
+    assert not [d for d in analyze_transaction_risk(db, 1, windows=[])["detections"]
+                if d["type"] == "velocity_anomaly"]
+
+
+def test_high_risk_jurisdictions_counted_per_window_in_one_query(db):
+    now = datetime.utcnow()
+    _add(db, "PA-10", now - timedelta(days=10), "SWIFT to Panama")
+    _add(db, "PA-200", now - timedelta(days=200), "SWIFT to Panama")
+    _add(db, "PA-500", now - timedelta(days=500), "SWIFT to Panama")
+    _add(db, "IN-5", now - timedelta(days=5))
+    db.commit()
+
+    starts = {days: now - timedelta(days=days) for days in (30, 90, 365)}
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+    counts = risk_analysis_service._high_risk_jurisdiction_counts(db, [1], starts)
+    assert counts == {30: 1, 90: 1, 365: 2}
+    assert len(statements) == 1
@@ -0,0 +1,78 @@
+"""
+Tests for the set-based risk dashboard summary
+"""
+import asyncio
+from datetime import datetime, timedelta
+import httpx
+import pytest
+from sqlalchemy import event
+from app.db import session
+from app.main import app
+from app.middleware.audit_middleware import flush_pending_audit_logs
+from app import models
+
+
+@pytest.mark.parametrize("details,expected", [
+    ('{"severity": "CRITICAL"}', "CRITICAL"),
+    ('{"confidence": 0.9}', "MEDIUM"),
+    (None, "MEDIUM"),
+    ("Detected keywords indicating structuring.", None),
+    ("[1, 2]", None),
+])
+def test_severity_from_details(details, expected):
+    assert models.severity_from_details(details) == expected
+
+
+@pytest.fixture
+def summary_db(app_db, admin, admin_token):
+    db = app_db
+    case = models.Case(case_ref="CASE-1", title="Case")
+    db.add(case)
+    db.flush()
+    now = datetime.utcnow()
+    sars = [
+        models.SARReport(sar_ref=f"SAR-{i}", case_id=case.id, created_by=admin.id, created_at=now - timedelta(hours=i))
+        for i in range(12)
+    ]
+    db.add_all(sars)
+    db.flush()
+    # the newest SAR has no CQI yet; the two oldest fall outside the 10 most recent
+    db.add_all([models.CQIScore(sar_id=s.id, overall_score=100.0 if i >= 10 else 50.0 + i) for i, s in enumerate(sars) if i > 0])
+    db.add_all([
+        models.TypologyDetection(detection_type="structuring", details='{"severity": "HIGH"}'),
+        models.TypologyDetection(detection_type="structuring", details='{"severity": "CRITICAL"}'),
+        models.TypologyDetection(detection_type="layering", details='{"confidence": 0.8}'),
+        models.TypologyDetection(detection_type="layering", details="free text"),
+        models.TypologyDetection(detection_type="velocity_anomaly", details="free text", severity="LOW"),
+    ])
+    db.commit()
+    return admin_token
+
+
+def test_risk_summary_uses_fixed_number_of_queries(summary_db):
+    headers = {"Authorization": f"Bearer {summary_db}"}
+    statements = []
+
+    async def run():
+        engine = session.get_async_engine().sync_engine
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            event.listen(engine, "before_cursor_execute", listener)
+            response = await client.get("/api/risk/dashboard/risk-summary", headers=headers)
+            event.remove(engine, "before_cursor_execute", listener)
+        await flush_pending_audit_logs()
+        await session.dispose_async_engine()
+        return response
+
+    body = asyncio.run(run()).json()
+
+    assert body["typology_distribution"] == {"structuring": 2, "layering": 2, "velocity_anomaly": 1}
+    assert body["total_detections"] == 5
+    assert body["severity_breakdown"] == {"CRITICAL": 1, "HIGH": 1, "MEDIUM": 1, "LOW": 1}
+    assert body["high_risk_cases"] == 2
+    assert body["recent_sar_count"] == 10
+    # SARs 1..9 have scores 51..59
+    assert body["average_cqi_score"] == 55.0
+    # user lookup plus three aggregate queries, independent of row counts
+    assert len(statements) == 4
@@ -0,0 +1,163 @@
+"""
+Tests for the declarative typology rule engine
+"""
+from datetime import datetime, timedelta
+import numpy as np
+import pytest
+from app.services.rule_engine import (
+    CUSTOMER_FEATURES, Rule, RuleError, RuleRegistry, RuleSet, compile_expression, customer_features, typology_rules,
+)
+from app.services.risk_analysis_service import analyze_transaction_risk
+from app.services.transaction_stats_service import empty_stats
+from app import models
+
+
+def _features(**columns):
+    n = len(next(iter(columns.values())))
+    return {name: np.asarray(columns.get(name, [0.0] * n), dtype=float) for name in CUSTOMER_FEATURES}
+
+
+def test_expressions_compile_to_vectorized_functions():
+    features = _features(txn_count=[0, 4, 10], band_count=[0, 2, 8], volume=[0, 900, 2e6])
+    ratio = compile_expression("min(1, band_count / txn_count) if txn_count >= 3 else -1", CUSTOMER_FEATURES)
+    assert ratio(features).tolist() == [-1, 0.5, 0.8]
+    # x / 0 is 0, chained comparisons, boolean operators
+    assert compile_expression("volume / txn_count", CUSTOMER_FEATURES)(features).tolist() == [0, 225, 2e5]
+    inside = compile_expression("1 <= band_count < 8 or not volume", CUSTOMER_FEATURES)(features)
+    assert inside.tolist() == [True, True, False]
+    assert compile_expression(0.5, CUSTOMER_FEATURES)(features) == 0.5
+
+    for bad in ("txn_count +", "amount > 1", "__import__('os')", "txn_count.real", "min(txn_count)",
+                "[txn_count]", "lambda: 1", "where(txn_count, 1)"):
+        with pytest.raises(RuleError):
+            compile_expression(bad, CUSTOMER_FEATURES)
+
+
+def test_rule_validation():
+    with pytest.raises(RuleError, match="needs a name"):
+        Rule({"score": 1})
+    with pytest.raises(RuleError, match="kind"):
+        Rule({"name": "x", "kind": "other", "score": 1})
+    with pytest.raises(RuleError, match="need a score"):
+        Rule({"name": "x"})
+    with pytest.raises(RuleError, match="Unknown field"):
+        Rule({"name": "x", "score": 1, "evidence": "{amount} seen"})
+    with pytest.raises(RuleError, match="Invalid template"):
+        Rule({"name": "x", "score": 1, "evidence": "{volume:d} moved"})
+    assert Rule({"name": "x", "score": 1, "evidence": "{volume:,.0f} moved"}).evidence_fields == ["volume"]
+    with pytest.raises(RuleError, match="keywords"):
+        Rule({"name": "x", "kind": "narrative"})
+    with pytest.raises(RuleError):
+        Rule({"name": "x", "score": 1, "threshold": "high"})
+
+
+def test_one_pass_over_many_rows_with_severity_evidence_and_timings():
+    registry = RuleRegistry(reload_interval=60)
+    registry.rule_set = RuleSet([Rule({
+        "name": "wire_heavy", "type": "layering", "when": "txn_count >= 2", "score": "wire_count / txn_count",
+        "threshold": 0.5, "severity": {"CRITICAL": "score >= 1", "HIGH": "score > 0.7", "default": "LOW"},
+        "evidence": "{wire_count} of {txn_count} are wires",
+    })])
+
+    found = registry.evaluate_customers(_features(txn_count=[1, 4, 4, 10, 3], wire_count=[1, 2, 3, 10, 2]))
+    assert [[(d["severity"], d["evidence"]) for d in row] for row in found] == [
+        [], [], [("HIGH", "3 of 4 are wires")], [("CRITICAL", "10 of 10 are wires")], [("LOW", "2 of 3 are wires")],
+    ]
+    assert found[2][0]["type"] == "layering" and found[2][0]["rule"] == "wire_heavy"
+
+    stats = registry.describe()[0]
+    assert (stats["calls"], stats["rows"], stats["hits"]) == (1, 5, 3)
+    assert stats["seconds"] >= 0 and stats["us_per_row"] is not None
+
+
+def test_a_failing_rule_is_skipped():
+    registry = RuleRegistry(reload_interval=60)
+    broken = Rule({"name": "broken", "score": 1, "evidence": "{volume}"})
+    broken.evidence = "{volume:d}"  # slipped past validation
+    registry.rule_set = RuleSet([broken, Rule({"name": "busy", "score": "txn_count", "threshold": 2})])
+
+    found = registry.evaluate_customers(_features(txn_count=[1, 4], volume=[10.5, 20.5]))
+    assert [[d["rule"] for d in row] for row in found] == [[], ["busy"]]
+
+
+def test_customer_features_from_window_stats():
+    start = datetime(2025, 1, 1)
+    stats = {**empty_stats(), "txn_count": 30, "band_count": 3, "first_at": start, "last_at": start + timedelta(days=2),
+             "band_timestamps": [start, start + timedelta(hours=5), start + timedelta(hours=40)]}
+    features = customer_features([(stats, 2, None, 30), (empty_stats(), 0, 4, None)])
+    assert features["band_clustered"].tolist() == [1, 0]
+    assert features["span_days"].tolist() == [2, 0]
+    assert features["velocity"].tolist() == [15, 0]
+    assert features["risk_rating"].tolist() == [0, 4]
+    assert features["window_days"].tolist() == [30, 0]
+    assert features["high_risk_count"].tolist() == [2, 0]
+
+
+def test_keyword_rules():
+    assert [d["type"] for d in typology_rules.match_narrative("Deposits were SPLIT to avoid reporting")] == ["structuring"]
+    assert typology_rules.match_narrative("a player account") == []  # keywords match at word starts
+    assert typology_rules.infer_pattern(["structuring", "cash"]) == "Structuring Pattern"
+    assert typology_rules.infer_pattern(["company", "invoice"]) is None
+
+
+@pytest.fixture
+def db(db, customer):
+    customer.risk_rating = 1
+    db.add(models.Case(case_ref="CASE-1", title="Case", customer_id=customer.id))
+    now = datetime.utcnow()
+    db.add_all([models.Transaction(txn_id=f"T-{i}", account_id=1, amount=9000.0 if i < 3 else 60000.0,
+                                   txn_type="deposit", timestamp=now - timedelta(days=2, hours=i)) for i in range(4)])
+    db.commit()
+    return db
+    typology_rules.reset()
+
+
+def _types(db):
+    return sorted(d["type"] for d in analyze_transaction_risk(db, 1, windows=[30])["detections"])
+
+
+def test_stored_rules_reload_without_restart(db):
+    assert _types(db) == ["counterparty_risk", "structuring"]
+
+    db.add(models.TypologyRule(name="structuring", definition="score: 0", enabled=False))
+    db.add(models.TypologyRule(name="big_and_banded", definition='{"when": "band_count >= 3 and large_count >= 1", '
+                                                                   '"score": 0.95, "severity": "HIGH"}'))
+    db.add(models.TypologyRule(name="broken", definition="score: nonsense("))
+    db.commit()
+    typology_rules.refresh(db, force=True)
+    assert _types(db) == ["big_and_banded", "counterparty_risk"]
+    assert {r["name"]: r["source"] for r in typology_rules.describe()}["big_and_banded"] == "database"
+
+    rule = db.query(models.TypologyRule).filter_by(name="structuring").one()
+    rule.enabled, rule.version = True, rule.version + 1
+    db.commit()
+    typology_rules.refresh(db)  # not due yet
+    assert "structuring" not in _types(db)
+    typology_rules._checked_at = float("-inf")
+    typology_rules.refresh(db)
+    # the stored definition now applies, and it never fires
+    assert _types(db) == ["big_and_banded", "counterparty_risk"]
+
+
+@pytest.fixture
+def client(api_client):
+    yield api_client
+    typology_rules.reset()
+
+
+def test_rules_api(client):
+    assert client.put("/api/admin/rules/x", json={"definition": "score: txn_count +"}).status_code == 422
+    assert client.put("/api/admin/rules/x", json={"definition": "score: 1\nevidence: '{volume:d} moved'"}).status_code == 422
+    response = client.put("/api/admin/rules/layering", json={"definition": "kind: customer\nscore: 0.99\n"})
+    assert response.status_code == 200
+    assert response.json()["source"] == "database"
+
+    rules = {r["name"]: r for r in client.get("/api/admin/rules").json()}
+    assert rules["layering"]["definition"]["score"] == 0.99
+    assert rules["structuring"]["source"] == "default"
+
+    assert client.delete("/api/admin/rules/layering").status_code == 200
+    assert client.delete("/api/admin/rules/layering").status_code == 404
+    rules = {r["name"]: r for r in client.get("/api/admin/rules").json()}
+    assert rules["layering"]["source"] == "default"
+    assert client.get("/api/admin/metrics").json()["typology_rules"]["reloads"] >= 2
@@ -0,0 +1,190 @@
+"""
+Tests for real-time transaction screening
+"""
+from datetime import datetime, timedelta, timezone
+import time
+import pytest
+from app.core.config import settings
+from app.db import session
+from app.services import transaction_ingest_service as ingest
+from app.services.risk_analysis_service import analyze_transaction_risk
+from app.services.screening_service import CustomerState, ScreeningStore, load_customer_state, screening_store
+from app import models
+
+
+def _store(**kwargs):
+    return ScreeningStore(**{"max_customers": 10, "ttl": 300.0, "window_days": 30, **kwargs})
+
+
+def _state(customer_id=1, risk_rating=1):
+    return CustomerState(customer_id, risk_rating, time.monotonic())
+
+
+def test_structuring_and_velocity_alerts():
+    store = _store()
+    now = datetime(2025, 6, 1, 12)
+    state = _state()
+    assert not store.screen(state, 120.0, "deposit", now - timedelta(days=3))["alert"]
+
+    decisions = [store.screen(state, 9000.0, "deposit", now + timedelta(hours=i)) for i in range(3)]
+    assert [d["alert"] for d in decisions] == [False, False, True]
+    assert decisions[-1]["detections"][0]["type"] == "structuring"
+    assert decisions[-1]["window_transactions"] == 4
+
+    burst = _state(customer_id=2)
+    for i in range(20):
+        result = store.screen(burst, 50.0, "deposit", now + timedelta(minutes=i))
+    assert result["alert"]
+    assert {d["type"] for d in result["detections"]} == {"velocity_anomaly"}
+
+
+def test_high_risk_jurisdiction_from_the_narration():
+    store = _store()
+    state = _state()
+    now = datetime(2025, 6, 1, 12)
+    store.screen(state, 100.0, "deposit", now - timedelta(days=1))
+    result = store.screen(state, 100.0, "wire", now, "SWIFT transfer to Cayman Islands")
+    assert result["jurisdiction"] == "KY"
+    assert [d["type"] for d in result["detections"]] == ["geographic_risk"]
+
+
+def test_retried_txn_id_is_added_once_and_counterparties_are_counted():
+    store = _store()
+    state = _state()
+    now = datetime(2025, 6, 1, 12)
+    store.screen(state, 100.0, "deposit", now - timedelta(days=1), "UPI-A-A@OKAXIS-NOTE", txn_id="T-1")
+    retried = store.screen(state, 100.0, "deposit", now - timedelta(days=1), "UPI-A-A@OKAXIS-NOTE", txn_id="T-1")
+    assert retried["window_transactions"] == 1
+
+    store.screen(state, 100.0, "deposit", now, "UPI-B-B@OKAXIS-NOTE", txn_id="T-2")
+    store.screen(state, 100.0, "deposit", now, "UPI-A-A@OKAXIS-NOTE")
+    stats, _ = state.window(now, 30)
+    assert (stats["txn_count"], stats["counterparty_count"]) == (3, 2)
+
+
+def test_old_activity_leaves_the_window():
+    store = _store(window_days=7)
+    state = _state()
+    start = datetime(2025, 6, 1)
+    for i in range(3):
+        store.screen(state, 9000.0, "deposit", start + timedelta(hours=i))
+    later = store.screen(state, 100.0, "deposit", start + timedelta(days=20))
+    assert not later["alert"]
+    assert later["window_transactions"] == 1
+    assert len(state.days) == 1 and state.band_times == []
+
+
+def test_out_of_order_timestamps_keep_the_history():
+    store = _store(window_days=7)
+    state = _state()
+    now = datetime.utcnow()
+    for i in range(3):
+        store.screen(state, 9000.0, "deposit", now - timedelta(days=1, hours=i))
+    # a timestamp far ahead neither wipes the real window nor is counted by earlier ones
+    ahead = store.screen(state, 100.0, "deposit", now + timedelta(days=30))
+    assert ahead["window_transactions"] == 1
+    backdated = store.screen(state, 100.0, "deposit", now - timedelta(days=3))
+    assert backdated["window_transactions"] == 1 and not backdated["alert"]
+    current = store.screen(state, 100.0, "deposit", now.replace(tzinfo=timezone.utc))
+    assert current["window_transactions"] == 5 and current["alert"]
+
+
+def test_lru_eviction_and_ttl():
+    store = _store(max_customers=2)
+    for customer_id in (1, 2):
+        store.put(f"ACC-{customer_id}", customer_id, _state(customer_id))
+    assert store.get("ACC-1") is not None  # 1 is now the most recent
+    store.put("ACC-3", 3, _state(3))
+    assert store.get("ACC-2") is None
+    assert store.get("ACC-1") is not None and store.get("ACC-3") is not None
+    assert store.metrics()["evictions"] == 1
+
+    stale = _state(4)
+    stale.loaded_at -= 301
+    store.put("ACC-4", 4, stale)
+    assert store.get("ACC-4") is None
+
+
+def test_scores_in_well_under_5ms():
+    store = _store()
+    state = _state()
+    now = datetime(2025, 6, 1)
+    for i in range(500):
+        store.screen(state, 100.0 + i, "deposit", now + timedelta(hours=i))
+    started = time.perf_counter()
+    for i in range(500):
+        store.screen(state, 9000.0 if i % 7 == 0 else 250.0, "wire", now + timedelta(hours=500 + i),
+                     "UPI-NAME-X@OKAXIS-NOTE")
+    assert (time.perf_counter() - started) / 500 < 0.005
+
+
+@pytest.fixture
+def client(app_db, api_client):
+    customer = models.Customer(customer_id="CUST-1", name="Customer", risk_rating=2)
+    app_db.add(customer)
+    app_db.flush()
+    app_db.add(models.Account(account_id="ACC-1", customer_id=customer.id))
+    app_db.add(models.Case(case_ref="CASE-1", title="Case", customer_id=customer.id))
+    app_db.flush()
+    now = datetime.utcnow()
+    ingest.bulk_insert_transactions(app_db, [
+        {"txn_id": f"T-{i}", "account_id": 1, "amount": amount, "txn_type": "deposit",
+         "timestamp": now - timedelta(days=2, hours=i), "narration": narration}
+        for i, (amount, narration) in enumerate([(9100.0, "UPI-A-A@OKAXIS-NOTE"), (9200.0, ""),
+                                                 (300.0, "Transfer from Panama")])
+    ])
+    app_db.commit()
+    screening_store.clear()
+    yield api_client
+    screening_store.clear()
+
+
+def test_screen_endpoint_agrees_with_case_analysis(client):
+    now = datetime.utcnow()
+    response = client.post("/api/risk/screen", json={
+        "account_id": "ACC-1", "amount": 9300.0, "txn_type": "deposit", "timestamp": now.isoformat(), "txn_id": "NEW-1",
+    })
+    assert response.status_code == 200
+    result = response.json()
+    assert result["txn_id"] == "NEW-1"
+    assert result["alert"] is True
+    assert result["window_transactions"] == 4
+    assert result["elapsed_ms"] < 5
+
+    # the same transaction stored and analyzed over the same window scores the same
+    db = session.get_session()
+    ingest.bulk_insert_transactions(db, [{"txn_id": "NEW-1", "account_id": 1, "amount": 9300.0,
+                                          "txn_type": "deposit", "timestamp": now}])
+    db.commit()
+    profile = analyze_transaction_risk(db, 1, windows=[settings.SCREENING_WINDOW_DAYS])
+    _, fresh = load_customer_state(db, "ACC-1", settings.SCREENING_WINDOW_DAYS)
+    db.close()
+    assert {(d["type"], d["score"]) for d in result["detections"]} == \
+        {(d["type"], d["score"]) for d in profile["detections"]}
+    assert result["risk_score"] == pytest.approx(profile["overall_risk_score"])
+    assert sum(bucket[0] for bucket in fresh.days.values()) == 4
+    assert fresh.window(now, settings.SCREENING_WINDOW_DAYS)[0]["counterparty_count"] == 1
+
+    # a retried request is scored again but not counted twice
+    assert client.post("/api/risk/screen", json={"account_id": "ACC-1", "amount": 9300.0, "txn_type": "deposit",
+                                                 "timestamp": now.isoformat(),
+                                                 "txn_id": "NEW-1"}).json()["window_transactions"] == 4
+
+    # cached: later transactions don't reload
+    assert client.post("/api/risk/screen", json={"account_id": "ACC-1", "amount": 10.0,
+                                                 "txn_type": "deposit"}).json()["window_transactions"] == 5
+    assert screening_store.metrics()["hits"] == 2
+
+    assert client.post("/api/risk/screen", json={"account_id": "NOPE", "amount": 1.0,
+                                                 "txn_type": "deposit"}).status_code == 404
+
+    # offsets are converted to UTC; timestamps outside the window are refused before touching the state
+    aware = (now + timedelta(minutes=1)).replace(tzinfo=timezone.utc).astimezone(timezone(timedelta(hours=5, minutes=30)))
+    assert client.post("/api/risk/screen", json={"account_id": "ACC-1", "amount": 10.0, "txn_type": "deposit",
+                                                 "timestamp": aware.isoformat()}).json()["window_transactions"] == 6
+    for timestamp in (now + timedelta(days=2), now - timedelta(days=settings.SCREENING_WINDOW_DAYS + 1)):
+        response = client.post("/api/risk/screen", json={"account_id": "ACC-1", "amount": 10.0,
+                                                          "txn_type": "deposit", "timestamp": timestamp.isoformat()})
+        assert response.status_code == 422
+    assert client.post("/api/risk/screen", json={"account_id": "ACC-1", "amount": 10.0,
+                                                 "txn_type": "deposit"}).json()["window_transactions"] == 7
@@ -0,0 +1,116 @@
+"""
+Unit tests for password hashing executor and login throttling
+"""
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from passlib.context import CryptContext
+from app.core import security
+from app.main import app
+from app import models
+from starlette.requests import Request
+from app.core.rate_limit import LoginAttemptLimiter, client_ip
+
+
+def test_limiter_blocks_after_max_failures():
+    """Test that a username is throttled once it hits the failure limit"""
+    limiter = LoginAttemptLimiter(max_failures=3, window_seconds=60, max_ip_failures=10)
+
+    for i in range(3):
+        assert limiter.retry_after("alice", "10.0.0.1", now=100.0 + i) == 0
+        limiter.record_failure("alice", "10.0.0.1", now=100.0 + i)
+
+    assert limiter.retry_after("alice", "10.0.0.9", now=103.0) > 0
+    # Same IP, different username is not, until the IP reaches its own limit
+    assert limiter.retry_after("bob", "10.0.0.1", now=103.0) == 0
+    for i in range(7):
+        limiter.record_failure(f"user{i}", "10.0.0.1", now=104.0)
+    assert limiter.retry_after("bob", "10.0.0.1", now=105.0) > 0
+    assert limiter.retry_after("bob", "10.0.0.2", now=105.0) == 0
+    # Window expiry releases the lock
+    assert limiter.retry_after("alice", None, now=200.0) == 0
+    assert limiter.retry_after("bob", "10.0.0.1", now=200.0) == 0
+
+
+def test_limiter_without_ip_limit():
+    limiter = LoginAttemptLimiter(max_failures=2, window_seconds=60)
+    for i in range(50):
+        limiter.record_failure(f"user{i}", "10.0.0.1", now=1.0)
+    assert limiter.retry_after("bob", "10.0.0.1", now=2.0) == 0
+
+
+def _request(client, forwarded=None):
+    headers = [(b"x-forwarded-for", forwarded.encode())] if forwarded else []
+    return Request({"type": "http", "client": (client, 1234), "headers": headers})
+
+
+def test_client_ip_behind_trusted_proxies():
+    proxies = ["10.0.0.0/8", "192.168.1.5"]
+    assert client_ip(_request("203.0.113.7"), proxies) == "203.0.113.7"
+    # a client can't pick its own address by sending the header
+    assert client_ip(_request("203.0.113.7", "198.51.100.1"), proxies) == "203.0.113.7"
+    assert client_ip(_request("10.1.2.3", "198.51.100.1"), proxies) == "198.51.100.1"
+    # spoofed hops in front of the real client are skipped
+    assert client_ip(_request("10.1.2.3", "1.1.1.1, 198.51.100.1, 192.168.1.5"), proxies) == "198.51.100.1"
+    assert client_ip(_request("10.1.2.3"), proxies) == "10.1.2.3"
+    assert client_ip(_request("10.1.2.3", "198.51.100.1"), []) == "10.1.2.3"
+
+
+def test_limiter_reset_on_success():
+    """Test that a successful login clears the username failures"""
+    limiter = LoginAttemptLimiter(max_failures=2, window_seconds=60)
+    limiter.record_failure("alice", None, now=1.0)
+    limiter.record_failure("alice", None, now=2.0)
+    assert limiter.retry_after("alice", None, now=3.0) > 0
+
+    limiter.reset("Alice")
+    assert limiter.retry_after("alice", None, now=3.0) == 0
+
+
+def test_limiter_evicts_oldest_keys():
+    """Test that tracked keys stay bounded"""
+    limiter = LoginAttemptLimiter(max_failures=5, window_seconds=60, max_keys=10)
+    for i in range(50):
+        limiter.record_failure(f"user{i}", None, now=1.0)
+    assert limiter.metrics()["tracked_keys"] == 10
+
+
+def test_verify_and_update_rehashes_on_cost_change(monkeypatch):
+    """Test that a hash created with an old cost is upgraded on login"""
+    old_hash = CryptContext(schemes=["bcrypt"], bcrypt__rounds=4).hash("s3cret-pass")
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=5))
+
+    valid, new_hash = asyncio.run(security.verify_and_update_password("s3cret-pass", old_hash))
+
+    assert valid
+    assert new_hash is not None and new_hash.startswith("$2b$05$")
+    assert security.password_hasher.metrics()["completed"] >= 1
+
+
+def test_hash_executor_rejects_when_queue_full():
+    """Test that the executor sheds work beyond its queue bound"""
+    executor = security.PasswordHashExecutor(max_workers=1, max_queue=0)
+    with pytest.raises(security.HashQueueFull):
+        asyncio.run(executor.run(lambda: None))
+    assert executor.metrics()["rejected"] == 1
+
+
+def test_unknown_username_costs_a_verification(app_db, monkeypatch):
+    """Test that login spends bcrypt time on unknown usernames too, so they can't be found by timing"""
+    monkeypatch.setattr(security, "pwd_context", CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=4))
+    monkeypatch.setattr(security, "_unknown_user_hash", None)
+    app_db.add(models.User(username="alice", email="alice@example.com", hashed_password=security.hash_password("right-pass")))
+    app_db.commit()
+
+    with TestClient(app) as client:
+        completed = security.password_hasher.metrics()["completed"]
+        wrong = client.post("/api/auth/login", data={"username": "alice", "password": "wrong-pass"})
+        assert security.password_hasher.metrics()["completed"] == completed + 1
+        unknown = client.post("/api/auth/login", data={"username": "mallory", "password": "wrong-pass"})
+        # hashing the dummy on first use, then verifying against it
+        assert security.password_hasher.metrics()["completed"] == completed + 3
+        client.post("/api/auth/login", data={"username": "eve", "password": "wrong-pass"})
+        assert security.password_hasher.metrics()["completed"] == completed + 4
+
+    assert wrong.status_code == unknown.status_code == 401
+    assert wrong.json() == unknown.json()
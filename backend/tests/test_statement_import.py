@@ -0,0 +1,222 @@
+"""
+Tests for the statement parser registry and the streaming, page-parallel importer
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import random
+import time
+import pytest
+from sqlalchemy import func, select
+from app.importers import StatementParser, detect_parser, get_parser, pipeline, register_parser
+from app.importers import complete_manifest, open_manifest, registry
+from app.services.transaction_ingest_service import transaction_fingerprint
+from app import models
+
+PAGE = """PageNo.:2 Statementofaccount
+Date Narration Chq./Ref.No. ValueDt WithdrawalAmt. DepositAmt. ClosingBalance
+23/08/24 NEFTCR-IDFB0010201-MRSMEENAPUGGAL-ARN IDFBH24236607640 23/08/24 20,000.00 20,000.00
+27/08/24 UPI-TANVI KABI-TANVI.KABI@OKAXIS-SBIN00 0000424035494393 27/08/24 200.00 15,011.00
+17042-424035494393-CIVILANDMECHANIC
+StatementFrom : 01/04/2024 To : 31/03/2025"""
+
+
+def _word(text, x0, top):
+    return {"text": text, "x0": x0, "x1": x0 + 6 * len(text), "top": top}
+
+
+# an HDFC page as pdfplumber word boxes: header, a deposit, a withdrawal whose
+# narration wraps onto a second line, then the statement summary
+WORDS = [
+    _word("Date", 40, 234), _word("Narration", 144, 234), _word("WithdrawalAmt.", 405, 234),
+    _word("23/08/24", 34, 252), _word("NEFTCR-IDFB0010201", 68, 252), _word("IDFBH2423", 289, 252),
+    _word("23/08/24", 362, 252), _word("20,000.00", 500, 252.4), _word("20,000.00", 570, 252),
+    _word("24/08/24", 34, 286), _word("UPI-SRMIST", 68, 286), _word("0000423780", 293, 286),
+    _word("24/08/24", 362, 286), _word("560.00", 440, 286), _word("19,440.00", 570, 286),
+    _word("-CIUB0000032-UPI", 68, 303),
+    _word("STATEMENTSUMMARY", 68, 340),
+]
+
+
+def test_hdfc_columns_from_word_positions():
+    transactions = get_parser("hdfc").parse_words(WORDS, 3)
+    assert [(t["timestamp"].day, t["amount"], t["txn_type"], t["balance"], t["ref_no"]) for t in transactions] == [
+        (23, 20000.0, "deposit", 20000.0, "IDFBH2423"),
+        (24, 560.0, "withdrawal", 19440.0, "0000423780"),
+    ]
+    assert transactions[1]["narration"] == "UPI-SRMIST-CIUB0000032-UPI"
+    assert all(t["page"] == 3 for t in transactions)
+
+
+def test_hdfc_text_fallback():
+    transactions = get_parser("hdfc").parse_text(PAGE, 2)
+    assert [(t["timestamp"].month, t["amount"], t["txn_type"]) for t in transactions] == [
+        (8, 20000.0, "deposit"),
+        (8, 200.0, "withdrawal"),
+    ]
+
+
+def test_generic_parser_carries_dates_over():
+    text = "Statement 2024\n2024-01-02 Cash Deposit - Branch A 9,800.00 19,800.00\nWire Transfer OUT 45,000.00\nfooter"
+    transactions = get_parser("generic").parse_text(text, 1)
+    assert [(t["timestamp"].isoformat(), t["narration"], t["amount"], t["txn_type"], t["balance"]) for t in transactions] == [
+        ("2024-01-02T00:00:00", "Cash Deposit - Branch A", 9800.0, "deposit", 19800.0),
+        ("2024-01-02T00:00:00", "Wire Transfer OUT", 45000.0, "withdrawal", None),
+    ]
+
+
+def test_registry_detects_by_priority(monkeypatch):
+    monkeypatch.setattr(registry, "_parsers", dict(registry._parsers))
+    assert detect_parser(PAGE).name == "hdfc"
+    assert detect_parser("Some other bank").name == "generic"
+
+    @register_parser
+    class OtherBank(StatementParser):
+        name = "otherbank"
+        priority = 5
+
+        def detect(self, first_page_text):
+            return "Other Bank" in first_page_text
+
+    assert detect_parser("Other Bank plc").name == "otherbank"
+    with pytest.raises(ValueError):
+        register_parser(OtherBank)
+    with pytest.raises(ValueError):
+        get_parser("missing")
+
+
+def test_pages_are_yielded_in_order_while_workers_finish_out_of_order(monkeypatch):
+    def extract_pages(path, password, parser_name, page_numbers):
+        # later batches often finish first
+        time.sleep(random.uniform(0, 0.01))
+        return [(n, [{"page": n, "seq": i} for i in range(3)], 0.0) for n in page_numbers]
+
+    monkeypatch.setattr(pipeline, "resolve_parser", lambda path, password, name: get_parser("hdfc"))
+    monkeypatch.setattr(pipeline, "page_count", lambda path, password: 25)
+    monkeypatch.setattr(pipeline, "extract_pages", extract_pages)
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", ThreadPoolExecutor)
+
+    metrics = pipeline.ImportMetrics()
+    transactions = pipeline.iter_statement_transactions("statement.pdf", workers=4, pages_per_task=2, on_page=metrics)
+    first = next(transactions)
+    assert first == {"page": 1, "seq": 0}
+    rest = list(transactions)
+    assert [(t["page"], t["seq"]) for t in [first, *rest]] == [(p, i) for p in range(1, 26) for i in range(3)]
+    assert list(metrics.page_seconds) == list(range(1, 26))
+    summary = metrics.summary()
+    assert summary["pages"] == 25
+    assert summary["transactions"] == 75
+
+
+@pytest.mark.usefixtures("customer")
+def test_write_transactions_in_batches_and_skips_existing(db):
+    transactions = get_parser("hdfc").parse_text(PAGE, 1) * 3
+
+    counts = pipeline.write_transactions(db, iter(transactions), account_id=1, txn_prefix="PDF-", batch_size=4)
+    db.commit()
+    assert counts == {"inserted": 6, "skipped": 0, "rejected": 0}
+    assert db.scalar(select(func.count(models.Transaction.id))) == 6
+    stored = db.scalars(select(models.Transaction).order_by(models.Transaction.id)).first()
+    assert stored.txn_id == "PDF-" + stored.fingerprint[:16].upper()
+    assert stored.meta_data.startswith("Page: 1 | NEFTCR")
+    assert stored.timestamp.date().isoformat() == "2024-08-23"
+
+    counts = pipeline.write_transactions(db, iter(transactions), account_id=1, txn_prefix="PDF-", batch_size=4)
+    assert counts == {"inserted": 0, "skipped": 6, "rejected": 0}
+
+    # a parser change that drops a row shifts positions but not fingerprints,
+    # even under another id prefix
+    counts = pipeline.write_transactions(db, iter(transactions[1:]), account_id=1, txn_prefix="RERUN-", batch_size=4)
+    assert counts == {"inserted": 0, "skipped": 5, "rejected": 0}
+
+
+def _pages(pages, fail_after=None):
+    parsed = get_parser("hdfc").parse_text(PAGE, 1)
+    for page in pages:
+        if page == fail_after:
+            raise RuntimeError("worker crashed")
+        for i, txn in enumerate(parsed):
+            yield {**txn, "page": page, "ref_no": f"REF{page}-{i}"}
+
+
+@pytest.mark.usefixtures("customer")
+def test_interrupted_import_resumes_from_checkpoint(db):
+    manifest = open_manifest(db, "a" * 64, "statement", "statement.pdf", account_id=1)
+    with pytest.raises(RuntimeError):
+        pipeline.write_transactions(db, _pages(range(1, 6), fail_after=4), 1, "PDF-", batch_size=3, manifest=manifest)
+    db.rollback()
+    # each page's rows were committed with the checkpoint; page 3 was still pending
+    assert (manifest.checkpoint, manifest.inserted) == (2, 4)
+    assert db.scalar(select(func.count(models.Transaction.id))) == 4
+
+    resumed = open_manifest(db, "a" * 64, "statement", "statement.pdf", account_id=1)
+    assert resumed.id == manifest.id and resumed.status == "running"
+    counts = pipeline.write_transactions(db, _pages(range(resumed.checkpoint + 1, 6)), 1, "PDF-",
+                                         batch_size=3, manifest=resumed)
+    complete_manifest(db, resumed)
+    assert counts == {"inserted": 6, "skipped": 0, "rejected": 0}
+    assert db.scalar(select(func.count(models.Transaction.id))) == 10
+    assert open_manifest(db, "a" * 64, "statement").status == "completed"
+    assert open_manifest(db, "a" * 64, "statement", restart=True).checkpoint == 0
+
+
+@pytest.mark.usefixtures("customer")
+def test_identical_rows_on_different_pages_are_kept(db):
+    # the same payment on two pages, one with balances printed and one without
+    row = get_parser("hdfc").parse_text(PAGE, 1)[1]
+    pages = [{**row, "page": 1}, {**row, "page": 2, "balance": row["balance"] - 200}]
+    counts = pipeline.write_transactions(db, iter(pages), 1, "PDF-", batch_size=1)
+    assert counts == {"inserted": 2, "skipped": 0, "rejected": 0}
+
+    plain = [{**row, "page": page, "balance": None} for page in (1, 2, 3)]
+    counts = pipeline.write_transactions(db, iter(plain), 1, "PDF-", batch_size=1)
+    assert counts == {"inserted": 3, "skipped": 0, "rejected": 0}
+    counts = pipeline.write_transactions(db, iter(plain), 1, "PDF-", batch_size=1)
+    assert counts == {"inserted": 0, "skipped": 3, "rejected": 0}
+
+
+@pytest.mark.usefixtures("customer")
+def test_resumed_import_keeps_numbering_identical_rows(db):
+    row = {**get_parser("hdfc").parse_text(PAGE, 1)[1], "balance": None}
+
+    def pages(numbers, fail_after=None):
+        for page in numbers:
+            if page == fail_after:
+                raise RuntimeError("worker crashed")
+            yield {**row, "page": page}
+
+    manifest = open_manifest(db, "b" * 64, "statement", "statement.pdf", account_id=1)
+    with pytest.raises(RuntimeError):
+        pipeline.write_transactions(db, pages(range(1, 6), fail_after=3), 1, "PDF-", batch_size=1, manifest=manifest)
+    db.rollback()
+    assert (manifest.checkpoint, manifest.inserted) == (1, 1)
+
+    resumed = open_manifest(db, "b" * 64, "statement", "statement.pdf", account_id=1)
+    counts = pipeline.write_transactions(db, pages(range(resumed.checkpoint + 1, 6)), 1, "PDF-",
+                                         batch_size=1, manifest=resumed)
+    assert counts == {"inserted": 4, "skipped": 0, "rejected": 0}
+    assert db.scalar(select(func.count(models.Transaction.id))) == 5
+    # and the resumed rows are the ones a single uninterrupted run stores
+    counts = pipeline.write_transactions(db, pages(range(1, 6)), 1, "PDF-", batch_size=1)
+    assert counts == {"inserted": 0, "skipped": 5, "rejected": 0}
+    assert open_manifest(db, "b" * 64, "statement", restart=True).occurrences is None
+
+
+@pytest.mark.usefixtures("customer")
+def test_unparseable_dates_are_rejected(db):
+    parser = get_parser("hdfc")
+    assert parser.parse_date("32/13/24") is None
+    rows = parser.parse_text(PAGE, 1)
+    rows[0] = {**rows[0], "timestamp": parser.parse_date("not a date")}
+    counts = pipeline.write_transactions(db, iter(rows), 1, "PDF-")
+    assert counts == {"inserted": 1, "skipped": 0, "rejected": 1}
+    assert db.scalar(select(func.count(models.Transaction.id))) == 1
+
+
+def test_fingerprint_number_identical_rows():
+    when = datetime(2024, 8, 23, 15, 30)
+    first = transaction_fingerprint(1, when, 200, "UPI-TANVI  KABI", "REF1")
+    assert first == transaction_fingerprint(1, when.replace(hour=0), 200.0, "UPI-TANVI KABI", " REF1")
+    assert first != transaction_fingerprint(1, when, 200, "UPI-TANVI KABI", "REF1", occurrence=1)
+    assert first != transaction_fingerprint(2, when, 200, "UPI-TANVI KABI", "REF1")
+    assert first != transaction_fingerprint(1, when, 200, "UPI-TANVI KABI", "REF1", balance=15011)
+    assert len(first) == 64
@@ -0,0 +1,122 @@
+"""
+Tests for CSV / Parquet transaction ingestion
+"""
+import io
+import pytest
+from sqlalchemy import func, select
+from app.importers import tabular
+from app.services.transaction_ingest_service import bulk_insert_transactions
+from app import models
+
+CSV = b"""Reference,Account,Customer,Amount,Date,Narration
+T-1,ACC-1,CUST-1,"1,200.50",2025-01-02,UPI-ALICE
+T-2,ACC-1,CUST-1,-75,02/01/2025,ATM WITHDRAWAL
+T-3,ACC-2,CUST-2,9000,2025-01-03T10:15:00,NEFT-BOB
+T-4,ACC-9,,10,2025-01-03,no customer for a new account
+T-5,ACC-1,CUST-1,not a number,2025-01-03,bad amount
+"""
+MAPPING = {"txn_id": "Reference", "customer_id": "Customer"}
+
+
+@pytest.mark.parametrize("use_pyarrow", [True, False])
+@pytest.mark.usefixtures("customer")
+def test_csv_in_batches_with_mapping_and_account_creation(db, monkeypatch, use_pyarrow):
+    if use_pyarrow:
+        pytest.importorskip("pyarrow")
+    else:
+        monkeypatch.setattr(tabular, "PYARROW_AVAILABLE", False)
+
+    result = tabular.ingest_file(db, io.BytesIO(CSV), "csv", MAPPING, create_accounts=True, batch_size=2)
+    assert result["batches"] == 3
+    assert {k: result[k] for k in ("rows", "inserted", "skipped", "rejected", "accounts_created")} == {
+        "rows": 5, "inserted": 3, "skipped": 0, "rejected": 2, "accounts_created": 1,
+    }
+    assert result["errors"] == ["unknown account ACC-9", "row 5: could not convert string to float: 'not a number'"]
+
+    txns = {t.txn_id: t for t in db.scalars(select(models.Transaction))}
+    assert txns["T-1"].amount == 1200.5 and txns["T-1"].txn_type == "deposit"
+    assert txns["T-2"].amount == 75 and txns["T-2"].txn_type == "withdrawal"
+    assert txns["T-2"].timestamp.month == 1 and txns["T-2"].timestamp.day == 2
+    assert txns["T-3"].account.account_id == "ACC-2"
+    assert txns["T-3"].account.customer.customer_id == "CUST-2"
+    assert txns["T-1"].meta_data == "UPI-ALICE"
+
+    assert tabular.ingest_file(db, io.BytesIO(CSV), "csv", MAPPING, create_accounts=True)["already_imported"]
+    again = tabular.ingest_file(db, io.BytesIO(CSV), "csv", MAPPING, create_accounts=True, restart=True)
+    assert (again["inserted"], again["skipped"], again["accounts_created"]) == (0, 3, 0)
+
+
+@pytest.mark.usefixtures("customer")
+def test_interrupted_load_resumes_at_next_batch(db, monkeypatch):
+    calls = []
+
+    def crash_on_third_batch(db, rows, chunk_size):
+        calls.append(len(rows))
+        if len(calls) == 3:
+            raise RuntimeError("connection lost")
+        return bulk_insert_transactions(db, rows, chunk_size)
+
+    monkeypatch.setattr(tabular, "bulk_insert_transactions", crash_on_third_batch)
+    with pytest.raises(RuntimeError):
+        tabular.ingest_file(db, io.BytesIO(CSV), "csv", MAPPING, create_accounts=True, batch_size=2)
+    db.rollback()
+    assert db.scalar(select(func.count(models.Transaction.id))) == 3
+
+    # resumed with the batch size the load started with
+    result = tabular.ingest_file(db, io.BytesIO(CSV), "csv", MAPPING, create_accounts=True, batch_size=1000)
+    assert (result["resumed_from_batch"], result["batches"], result["rows"], result["inserted"]) == (2, 1, 1, 0)
+    assert result["errors"] == ["row 5: could not convert string to float: 'not a number'"]
+    manifest = db.get(models.ImportManifest, result["manifest_id"])
+    assert (manifest.status, manifest.checkpoint, manifest.inserted, manifest.unit_size) == ("completed", 3, 3, 2)
+
+
+@pytest.mark.usefixtures("customer")
+def test_parquet(db, tmp_path):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.parquet as pq
+    from datetime import datetime
+
+    path = tmp_path / "txns.parquet"
+    pq.write_table(pa.table({
+        "txn_id": [f"P-{i}" for i in range(25)],
+        "account_id": ["ACC-1"] * 25,
+        "amount": [float(i + 1) for i in range(25)],
+        "txn_type": ["wire"] * 25,
+        "timestamp": [datetime(2025, 2, 1)] * 25,
+    }), path, row_group_size=10)
+
+    with open(path, "rb") as f:
+        result = tabular.ingest_file(db, f, "parquet", batch_size=10)
+    assert (result["rows"], result["inserted"], result["batches"]) == (25, 25, 3)
+    assert db.scalar(select(func.sum(models.Transaction.amount))) == sum(range(1, 26))
+
+
+def test_required_columns_are_reported():
+    with pytest.raises(tabular.IngestError, match="amount"):
+        tabular.resolve_columns(["txn_id", "account_id", "value"])
+    with pytest.raises(tabular.IngestError):
+        tabular.detect_format("transactions.xlsx")
+
+
+def test_rows_without_a_date_are_rejected():
+    columns = {"txn_id": "txn_id", "account_id": "account_id", "amount": "amount", "timestamp": "date"}
+    with pytest.raises(ValueError, match="missing timestamp"):
+        tabular.map_row({"txn_id": "T-1", "account_id": "ACC-1", "amount": "5", "date": ""}, columns)
+
+
+def test_upload_endpoint(api_client, user_token):
+    files = {"file": ("transactions.csv", CSV, "text/csv")}
+    data = {"mapping": '{"txn_id": "Reference", "customer_id": "Customer"}', "create_accounts": "true"}
+
+    denied = api_client.post("/api/ingest/transactions", files=files, data=data,
+                             headers={"Authorization": f"Bearer {user_token('analyst')}"})
+    assert denied.status_code == 403
+
+    # api_client is signed in as an admin
+    response = api_client.post("/api/ingest/transactions", files=files, data=data)
+    assert response.status_code == 200
+    assert response.json()["inserted"] == 3
+    assert response.json()["accounts_created"] == 2
+
+    bad = api_client.post("/api/ingest/transactions", files={"file": ("t.xlsx", b"x")})
+    assert bad.status_code == 400
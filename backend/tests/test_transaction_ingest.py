@@ -0,0 +1,63 @@
+"""
+Tests for chunked bulk transaction ingestion
+"""
+from datetime import datetime
+import pytest
+from sqlalchemy import event, func, select
+from app.services import transaction_ingest_service as ingest
+from app import models
+
+
+def _rows(start, stop):
+    for i in range(start, stop):
+        yield {"txn_id": f"TXN-{i:05d}", "account_id": 1, "amount": float(i), "txn_type": "wire",
+               "timestamp": datetime(2025, 1, 1)}
+
+
+def _count(db):
+    return db.scalar(select(func.count(models.Transaction.id)))
+
+
+@pytest.mark.parametrize("native_upsert", [True, False])
+@pytest.mark.usefixtures("customer")
+def test_inserts_new_rows_and_skips_existing(db, monkeypatch, native_upsert):
+    if not native_upsert:
+        monkeypatch.setattr(ingest, "_UPSERTS", {})
+    statements = []
+    event.listen(db.get_bind(), "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    assert ingest.bulk_insert_transactions(db, _rows(0, 25), chunk_size=10) == {"inserted": 25, "skipped": 0}
+    db.commit()
+    inserts = [s for s in statements if s.startswith("INSERT INTO transactions")]
+    assert len(inserts) == 3  # one per chunk, not one per row
+
+    # overlapping re-import, with a duplicate inside the same chunk
+    rows = [*_rows(20, 30), {"txn_id": "TXN-00029", "account_id": 1, "amount": 1.0, "txn_type": "wire",
+                                 "timestamp": datetime(2025, 1, 1)}]
+    assert ingest.bulk_insert_transactions(db, rows, chunk_size=10) == {"inserted": 10 - 5, "skipped": 5 + 1}
+    db.commit()
+    assert _count(db) == 30
+    assert db.scalar(select(models.Transaction.amount).where(models.Transaction.txn_id == "TXN-00029")) == 29.0
+
+
+@pytest.mark.usefixtures("customer")
+def test_missing_optional_columns_get_defaults(db):
+    ingest.bulk_insert_transactions(db, [{"txn_id": "T-1", "account_id": 1, "amount": 5.0, "txn_type": "cash",
+                                          "timestamp": datetime(2025, 1, 1)}])
+    txn = db.scalars(select(models.Transaction)).one()
+    assert txn.meta_data is None
+    assert txn.fingerprint is None
+
+
+@pytest.mark.usefixtures("customer")
+def test_rows_without_a_timestamp_are_rejected(db):
+    # stamping the import time would store the row again on every re-import
+    with pytest.raises(ValueError, match="T-1 has no timestamp"):
+        ingest.bulk_insert_transactions(db, [{"txn_id": "T-1", "account_id": 1, "amount": 5.0, "txn_type": "cash"}])
+
+
+@pytest.mark.usefixtures("customer")
+def test_rolled_back_with_the_session(db):
+    ingest.bulk_insert_transactions(db, _rows(0, 5))
+    db.rollback()
+    assert _count(db) == 0
@@ -0,0 +1,108 @@
+"""
+Tests for the daily per-account transaction statistics
+"""
+from datetime import datetime
+import pytest
+from sqlalchemy import select
+from app.services import transaction_ingest_service as ingest
+from app.services import transaction_stats_service as stats_service
+from app.services.ai_service import build_prompt
+from app.services.risk_analysis_service import analyze_transaction_risk, customer_transactions_stmt
+from app import models
+
+
+@pytest.fixture
+def db(db, customer):
+    customer.risk_rating = 4
+    db.add(models.Account(account_id="ACC-2", customer_id=customer.id))
+    db.add(models.Case(case_ref="CASE-1", title="Case", customer_id=customer.id))
+    db.commit()
+    return db
+
+
+def _row(i, account_id, amount, txn_type, day, hour, counterparty):
+    return {"txn_id": f"T-{i}", "account_id": account_id, "amount": amount, "txn_type": txn_type,
+            "timestamp": datetime(2025, 3, day, hour), "narration": f"UPI-NAME-{counterparty}@OKAXIS-NOTE"}
+
+
+ROWS = [
+    _row(1, 1, 8500.0, "deposit", 1, 9, "A"),
+    _row(2, 1, 9000.0, "wire_out", 1, 11, "B"),
+    _row(3, 1, 60000.0, "wire_out", 1, 15, "A"),
+    _row(4, 1, 100.0, "deposit", 2, 10, "C"),
+    _row(5, 2, 9400.0, "deposit", 1, 12, "A"),
+]
+
+
+def _table(db):
+    return {
+        (s.account_id, s.day.isoformat()): (s.customer_id, s.txn_count, s.volume, s.max_amount, s.band_count,
+                                            s.wire_count, s.large_count, s.counterparty_count, s.first_at, s.last_at)
+        for s in db.scalars(select(models.DailyAccountStat))
+    }
+
+
+@pytest.mark.parametrize("native_upsert", [True, False])
+def test_maintained_during_ingestion(db, monkeypatch, native_upsert):
+    if not native_upsert:
+        monkeypatch.setattr(ingest, "_UPSERTS", {})
+        monkeypatch.setattr(stats_service, "_UPSERTS", {})
+    # split across chunks so the same account-day is added to twice
+    ingest.bulk_insert_transactions(db, ROWS[:2], chunk_size=1)
+    ingest.bulk_insert_transactions(db, ROWS, chunk_size=2)  # the first two are skipped
+    # ORM inserts go through the after_insert hook
+    db.add(models.Transaction(txn_id="T-6", account_id=2, amount=50.0, txn_type="cash",
+                              timestamp=datetime(2025, 3, 1, 8), meta_data="UPI-NAME-D@OKAXIS-NOTE"))
+    db.commit()
+
+    assert _table(db) == {
+        (1, "2025-03-01"): (1, 3, 77500.0, 60000.0, 2, 2, 1, 2, datetime(2025, 3, 1, 9), datetime(2025, 3, 1, 15)),
+        (1, "2025-03-02"): (1, 1, 100.0, 100.0, 0, 0, 0, 1, datetime(2025, 3, 2, 10), datetime(2025, 3, 2, 10)),
+        (2, "2025-03-01"): (1, 2, 9450.0, 9400.0, 1, 0, 0, 2, datetime(2025, 3, 1, 8), datetime(2025, 3, 1, 12)),
+    }
+    incremental = _table(db)
+    assert stats_service.rebuild_transaction_stats(db) == {"days": 3, "counterparties": 5}
+    assert _table(db) == incremental
+
+
+def test_record_transaction_ids_with_gaps(db):
+    # Core writes skip the hooks; ids 1, 3 and 5 are not a contiguous run
+    table = models.Transaction.__table__
+    for i, row in enumerate(ROWS, start=1):
+        parsed = ingest._normalize(row)
+        db.execute(table.insert().values(id=i * 2 - 1, **parsed))
+    stats_service.record_transaction_ids(db.connection(), [1, 3, 5])
+    db.commit()
+
+    assert _table(db) == {
+        (1, "2025-03-01"): (1, 3, 77500.0, 60000.0, 2, 2, 1, 2, datetime(2025, 3, 1, 9), datetime(2025, 3, 1, 15)),
+    }
+
+
+def test_window_stats_match_the_raw_transactions(db):
+    ingest.bulk_insert_transactions(db, ROWS)
+    db.commit()
+    transactions = db.scalars(customer_transactions_stmt(1)).all()
+    expected = stats_service.stats_from_transactions(transactions)
+
+    windows = stats_service.customer_window_stats(db, 1, {None: None, "march-2": datetime(2025, 3, 2, 0)})
+    assert windows[None] == expected
+    assert windows[None]["counterparty_count"] == 3  # A, B, C across both accounts
+    assert windows["march-2"]["txn_count"] == 1
+    assert windows["march-2"]["band_timestamps"] == []
+
+
+def test_analysis_and_prompt_read_the_aggregates(db):
+    ingest.bulk_insert_transactions(db, ROWS)
+    db.commit()
+    profile = analyze_transaction_risk(db, 1, windows=[])
+    assert profile["total_transactions"] == 5
+    assert profile["total_volume"] == 87000.0
+    assert profile["distinct_counterparties"] == 3
+    assert {d["type"] for d in profile["detections"]} >= {"structuring", "counterparty_risk"}
+
+    case = db.get(models.Case, 1)
+    stats = stats_service.customer_window_stats(db, 1, {None: None})[None]
+    prompt = build_prompt(case, [], [], db.get(models.Customer, 1), stats)
+    assert "5 transactions totaling $87,000.00 from 2025-03-01 to 2025-03-02" in prompt
+    assert "Distinct counterparties: 3" in prompt
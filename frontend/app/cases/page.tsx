@@ -1,7 +1,7 @@
 'use client'
 
 import React, { useEffect, useState } from 'react'
-import { casesAPI, sarAPI } from '@/lib/api'
+import { casesAPI, sarAPI, nextCursor } from '@/lib/api'
 import ProtectedRoute from '@/components/ProtectedRoute'
 import { motion, AnimatePresence } from 'framer-motion'
 import { 
@@ -26,11 +26,28 @@ export default function CasesPage() {
   const [generatingSar, setGeneratingSar] = useState<number | null>(null)
   const router = useRouter()
   
-  useEffect(() => {
-    casesAPI.list()
-      .then((r) => setCases(r.data))
+  const [cursor, setCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [pageStart, setPageStart] = useState(0)  // only a newly loaded page staggers in
+
+  // first page on mount, then the next one each time "Load more" is pressed
+  const loadPage = (after?: string) => {
+    if (after) setLoadingMore(true)
+    casesAPI.list({ cursor: after })
+      .then((r) => {
+        setCases((loaded) => (after ? [...loaded, ...r.data] : r.data))
+        setCursor(nextCursor(r))
+        setPageStart(after ? cases.length : 0)
+      })
       .catch((err) => console.error(err))
-      .finally(() => setLoading(false))
+      .finally(() => {
+        setLoading(false)
+        setLoadingMore(false)
+      })
+  }
+
+  useEffect(() => {
+    loadPage()
   }, [])
 
   const handleGenerateSar = async (caseId: number) => {
@@ -92,7 +109,7 @@ export default function CasesPage() {
                 <motion.div 
                   initial={{ opacity: 0, x: -20 }}
                   animate={{ opacity: 1, x: 0 }}
-                  transition={{ delay: index * 0.05 }}
+                  transition={{ delay: Math.max(0, index - pageStart) * 0.05 }}
                   key={c.id} 
                   className="glass-card p-6 flex flex-col md:flex-row md:items-center gap-6 group hover:bg-white/[0.03]"
                 >
@@ -143,6 +160,17 @@ export default function CasesPage() {
             </AnimatePresence>
           )}
 
+          {!loading && cursor && (
+            <button
+              onClick={() => loadPage(cursor)}
+              disabled={loadingMore}
+              className="w-full py-3 bg-white/5 border border-white/10 rounded-xl text-xs font-bold uppercase tracking-widest text-slate-400 hover:bg-white/10 hover:text-white transition-all flex items-center justify-center gap-2 disabled:opacity-50"
+            >
+              {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+              Load more
+            </button>
+          )}
+
           {!loading && cases.length === 0 && (
             <div className="glass-card p-20 text-center space-y-4">
               <div className="w-16 h-16 bg-white/5 rounded-full flex items-center justify-center mx-auto mb-6">
@@ -47,6 +47,15 @@ export default function DashboardPage() {
       }
     }
     fetchData()
+
+    // live updates pushed by the server instead of re-polling
+    const controller = new AbortController()
+    dashboardAPI.stream(({ event, data }) => {
+      setMetrics((prev: any) => (event === 'snapshot' ? data : { ...prev, ...data }))
+    }, controller.signal).catch((error) => {
+      if (!controller.signal.aborted) console.error('Metrics stream closed:', error)
+    })
+    return () => controller.abort()
   }, [])
 
   if (loading) {
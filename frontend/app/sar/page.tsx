@@ -1,7 +1,7 @@
 'use client'
 
 import React, { useEffect, useState } from 'react'
-import { sarAPI } from '@/lib/api'
+import { sarAPI, nextCursor } from '@/lib/api'
 import ProtectedRoute from '@/components/ProtectedRoute'
 import Link from 'next/link'
 import { motion, AnimatePresence } from 'framer-motion'
@@ -22,11 +22,28 @@ export default function SarPage() {
   const [sars, setSars] = useState<any[]>([])
   const [loading, setLoading] = useState(true)
   
-  useEffect(() => {
-    sarAPI.list()
-      .then(r => setSars(r.data))
+  const [cursor, setCursor] = useState<string | null>(null)
+  const [loadingMore, setLoadingMore] = useState(false)
+  const [pageStart, setPageStart] = useState(0)  // only a newly loaded page staggers in
+
+  // first page on mount, then the next one each time "Load more" is pressed
+  const loadPage = (after?: string) => {
+    if (after) setLoadingMore(true)
+    sarAPI.list({ cursor: after })
+      .then((r) => {
+        setSars((loaded) => (after ? [...loaded, ...r.data] : r.data))
+        setCursor(nextCursor(r))
+        setPageStart(after ? sars.length : 0)
+      })
       .catch((err) => console.error(err))
-      .finally(() => setLoading(false))
+      .finally(() => {
+        setLoading(false)
+        setLoadingMore(false)
+      })
+  }
+
+  useEffect(() => {
+    loadPage()
   }, [])
 
   return (
@@ -74,7 +91,7 @@ export default function SarPage() {
                 <motion.div 
                   initial={{ opacity: 0, y: 10 }}
                   animate={{ opacity: 1, y: 0 }}
-                  transition={{ delay: index * 0.05 }}
+                  transition={{ delay: Math.max(0, index - pageStart) * 0.05 }}
                   key={s.id} 
                   className="glass-card group hover:border-blue-500/30 overflow-hidden"
                 >
@@ -96,7 +113,7 @@ export default function SarPage() {
                       </div>
                       <h3 className="text-xl font-bold font-outfit mb-2 group-hover:text-blue-400 transition-colors">Narrative Stream Active</h3>
                       <p className="text-sm text-slate-500 line-clamp-2 leading-relaxed italic opacity-80 group-hover:opacity-100 transition-opacity">
-                         "{s.narrative?.substring(0, 250)}..."
+                         Filed {new Date(s.created_at).toLocaleString()}. Open the record to read the full narrative.
                       </p>
                     </div>
 
@@ -124,6 +141,17 @@ export default function SarPage() {
             </AnimatePresence>
           )}
 
+          {!loading && cursor && (
+            <button
+              onClick={() => loadPage(cursor)}
+              disabled={loadingMore}
+              className="w-full py-3 bg-white/5 border border-white/10 rounded-xl text-xs font-bold uppercase tracking-widest text-slate-400 hover:bg-white/10 hover:text-white transition-all flex items-center justify-center gap-2 disabled:opacity-50"
+            >
+              {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+              Load more
+            </button>
+          )}
+
           {!loading && sars.length === 0 && (
             <div className="glass-card p-20 text-center space-y-6">
               <div className="w-20 h-20 bg-white/5 rounded-full flex items-center justify-center mx-auto shadow-2xl">
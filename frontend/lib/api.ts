@@ -1,4 +1,4 @@
-import axios from 'axios'
+import axios, { AxiosResponse } from 'axios'
 
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000/api'
 
@@ -33,24 +33,63 @@ export const authAPI = {
   register: (data: any) => api.post('/auth/register', data),
 }
 
+// List endpoints are keyset-paginated: pass the X-Next-Cursor response header
+// back as `cursor` to fetch the next page
+export interface ListParams {
+  limit?: number
+  cursor?: string
+  order?: 'asc' | 'desc'
+  [filter: string]: string | number | boolean | undefined
+}
+
+// The cursor for the page after this one, or null on the last page
+export const nextCursor = (res: AxiosResponse): string | null => (res.headers['x-next-cursor'] as string | undefined) ?? null
+
 // Cases API
 export const casesAPI = {
-  list: () => api.get('/cases'),
+  list: (params?: ListParams) => api.get('/cases', { params }),
   get: (id: number) => api.get(`/cases/${id}`),
   create: (data: any) => api.post('/cases', data),
 }
 
 // SAR API
 export const sarAPI = {
-  list: () => api.get('/sar'),
+  list: (params?: ListParams) => api.get('/sar', { params }),
   get: (id: number) => api.get(`/sar/${id}`),
   generate: (caseId: number) => api.post('/sar/generate', { case_id: caseId }),
   approve: (id: number) => api.post(`/sar/${id}/approve`),
 }
 
 // Dashboard API
+export type MetricsEvent = { event: 'snapshot' | 'delta'; data: Record<string, any> }
+
 export const dashboardAPI = {
   metrics: () => api.get('/dashboard/metrics'),
+  // Server-sent metric updates: a full snapshot, then only the keys that changed.
+  // Uses fetch rather than EventSource so the bearer token goes in a header.
+  stream: async (onEvent: (e: MetricsEvent) => void, signal: AbortSignal) => {
+    const token = localStorage.getItem('aegis_token')
+    const res = await fetch(`${API_BASE}/dashboard/stream`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+      signal,
+    })
+    if (!res.ok || !res.body) throw new Error(`Metrics stream failed: ${res.status}`)
+    const reader = res.body.pipeThrough(new TextDecoderStream()).getReader()
+    let buffer = ''
+    for (;;) {
+      const { value, done } = await reader.read()
+      if (done) return
+      buffer += value
+      let end
+      while ((end = buffer.indexOf('\n\n')) >= 0) {
+        const frame = buffer.slice(0, end)
+        buffer = buffer.slice(end + 2)
+        const event = frame.match(/^event: (.*)$/m)?.[1]
+        const data = frame.match(/^data: (.*)$/m)?.[1]
+        if (event && data) onEvent({ event: event as MetricsEvent['event'], data: JSON.parse(data) })
+      }
+    }
+  },
 }
 
 // Audit API
@@ -60,6 +99,6 @@ export const auditAPI = {
 
 // Admin API
 export const adminAPI = {
-  listUsers: () => api.get('/admin/users'),
+  listUsers: (params?: ListParams) => api.get('/admin/users', { params }),
   deactivateUser: (userId: number) => api.post(`/admin/users/${userId}/deactivate`),
 }